@@ -7,7 +7,6 @@ from pathlib import Path
 from typing import List, Optional
 
 from src.config_loader import load_config, ConfigError
-from src.ai_generator import MetaRequest, generate_metadata, write_metadata_to_config
 
 
 SCOPES = [
@@ -15,13 +14,16 @@ SCOPES = [
 ]
 
 
-# Test-friendly aliases (monkeypatch points) – resolved lazily if None
+# Test-friendly aliases (monkeypatch points) – resolved lazily if None.
+# Chaque sous-commande n'importe que ses propres modules (démarrage rapide)
+generate_metadata = None  # type: ignore
 get_credentials = None  # type: ignore
 upload_video = None  # type: ignore
 download_source = None  # type: ignore
 enhance_video = None  # type: ignore
 run_bot_from_sources = None  # type: ignore
 process_queue = None  # type: ignore
+run_daemon = None  # type: ignore
 
 
 def _quality_defaults(name: Optional[str]) -> dict:
@@ -83,6 +85,16 @@ def _quality_defaults(name: Optional[str]) -> dict:
     return presets.get(q, {})
 
 
+def _crf_value(value: str):
+    """Type argparse de --crf: entier ou 'auto'."""
+    if value.strip().lower() == "auto":
+        return "auto"
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("CRF entier ou 'auto' attendu")
+
+
 def build_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(
         description="CLI d'upload YouTube (resumable, planification, miniature)",
@@ -223,9 +235,9 @@ def build_parser() -> argparse.ArgumentParser:
     )
     up.add_argument(
         "--enhance-crf",
-        type=int,
+        type=_crf_value,
         default=None,
-        help="Qualité x264 (0-51, par défaut 18 si --bitrate non défini)",
+        help="Qualité x264 (0-51, par défaut 18 si --bitrate non défini) ou 'auto'",
     )
     up.add_argument(
         "--enhance-bitrate",
@@ -438,9 +450,9 @@ def build_parser() -> argparse.ArgumentParser:
     )
     enh.add_argument(
         "--crf",
-        type=int,
+        type=_crf_value,
         default=None,
-        help="Qualité x264 (0-51, plus bas = meilleure qualité). Par défaut selon preset (18 si non précisé)",
+        help="Qualité x264 (0-51, plus bas = meilleure qualité) ou 'auto' (choix par extraits). Par défaut selon preset (18 si non précisé)",
     )
     enh.add_argument(
         "--bitrate",
@@ -475,6 +487,71 @@ def build_parser() -> argparse.ArgumentParser:
         help="Bitrate audio si réencodage (par défaut 192k)",
     )
     enh.add_argument(
+        "--fast-path",
+        action="store_true",
+        help="Analyser la source d'abord: skip/remux si déjà conforme au profil",
+    )
+    enh.add_argument(
+        "--chunked",
+        action="store_true",
+        help="Encoder par segments en parallèle (longues vidéos, libx265/av1)",
+    )
+    enh.add_argument(
+        "--chunk-workers",
+        type=int,
+        default=None,
+        help="Encodages de segments simultanés (défaut: nb de cœurs / 4)",
+    )
+    enh.add_argument(
+        "--segment-seconds",
+        type=float,
+        default=None,
+        help="Durée visée d'un segment en secondes (défaut 120)",
+    )
+    enh.add_argument(
+        "--log-level",
+        type=str,
+        default="INFO",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        help="Niveau de logs",
+    )
+
+    # Calibration de l'hôte (coût des presets et filtres)
+    bench = sub.add_parser(
+        "enhance-bench",
+        help="Mesurer le débit des presets et filtres d'encodage sur cette machine",
+    )
+    bench.add_argument(
+        "--output",
+        type=str,
+        default="cache/enhance_bench.json",
+        help="Profil de calibration écrit (lu par le worker: enhance.bench_profile)",
+    )
+    bench.add_argument(
+        "--codecs",
+        type=str,
+        default="h264,hevc",
+        help="Codecs mesurés, séparés par des virgules (h264, hevc, av1)",
+    )
+    bench.add_argument(
+        "--presets",
+        type=str,
+        default="ultrafast,veryfast,fast,medium,slow",
+        help="Presets mesurés, séparés par des virgules",
+    )
+    bench.add_argument(
+        "--seconds",
+        type=float,
+        default=5.0,
+        help="Durée du clip synthétique (testsrc2)",
+    )
+    bench.add_argument(
+        "--size",
+        type=str,
+        default="1920x1080",
+        help="Résolution du clip synthétique (WIDTHxHEIGHT)",
+    )
+    bench.add_argument(
         "--log-level",
         type=str,
         default="INFO",
@@ -523,6 +600,171 @@ def build_parser() -> argparse.ArgumentParser:
         help="Config vidéo (YAML) pour presets et métadonnées basiques",
     )
     wk.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Nombre de tâches traitées en parallèle (1 = séquentiel)",
+    )
+    wk.add_argument(
+        "--cpu-slots",
+        type=int,
+        default=None,
+        help="Étapes CPU simultanées (enhance, Whisper). Défaut: 1",
+    )
+    wk.add_argument(
+        "--io-slots",
+        type=int,
+        default=None,
+        help="Étapes I/O simultanées (upload, IA, sous-titres). Défaut: --concurrency",
+    )
+    wk.add_argument(
+        "--parallel-steps",
+        type=int,
+        default=2,
+        help="Étapes indépendantes d'une tâche exécutées en parallèle (ex: enhance + IA)",
+    )
+    wk.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Worker résident: surveille la file en continu (arrêt via SIGTERM/Ctrl+C)",
+    )
+    wk.add_argument(
+        "--poll-interval",
+        type=float,
+        default=0.5,
+        help="Mode démon: délai (s) entre deux scans de la file",
+    )
+    wk.add_argument(
+        "--lease-ttl",
+        type=float,
+        default=300.0,
+        help="Durée (s) du bail de réservation d'une tâche (file partagée entre workers; 0 = désactivé)",
+    )
+    wk.add_argument(
+        "--log-level",
+        type=str,
+        default="INFO",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        help="Niveau de logs",
+    )
+
+    # Import en masse d'un répertoire de vidéos (rattrapage de chaîne)
+    bi = sub.add_parser(
+        "batch-import",
+        help="Créer une tâche par vidéo d'un répertoire puis traiter la file",
+    )
+    bi.add_argument("directory", type=str, help="Répertoire des vidéos (récursif)")
+    bi.add_argument(
+        "--manifest",
+        type=str,
+        default=None,
+        help="Métadonnées CSV/YAML par fichier (défaut: batch.csv/batch.yaml du répertoire)",
+    )
+    bi.add_argument(
+        "--queue-dir",
+        type=str,
+        default="queue",
+        help="Dossier de la file (tâches JSON)",
+    )
+    bi.add_argument(
+        "--archive-dir",
+        type=str,
+        default="queue_archive",
+        help="Dossier d'archivage des tâches traitées",
+    )
+    bi.add_argument(
+        "--config",
+        type=str,
+        default=None,
+        help="Config vidéo (YAML) utilisée par le worker",
+    )
+    bi.add_argument(
+        "--privacy",
+        type=str,
+        default=None,
+        choices=["public", "private", "unlisted"],
+        help="Statut de confidentialité par défaut des vidéos importées",
+    )
+    bi.add_argument(
+        "--priority",
+        type=str,
+        default="low",
+        choices=["high", "normal", "low"],
+        help="Priorité des tâches importées (défaut: low, après les tâches Telegram)",
+    )
+    bi.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Nombre de tâches traitées en parallèle (1 = séquentiel)",
+    )
+    bi.add_argument(
+        "--cpu-slots",
+        type=int,
+        default=None,
+        help="Étapes CPU simultanées (enhance, Whisper). Défaut: 1",
+    )
+    bi.add_argument(
+        "--io-slots",
+        type=int,
+        default=None,
+        help="Étapes I/O simultanées (upload, IA, sous-titres). Défaut: --concurrency",
+    )
+    bi.add_argument(
+        "--parallel-steps",
+        type=int,
+        default=2,
+        help="Étapes indépendantes d'une tâche exécutées en parallèle (ex: enhance + IA)",
+    )
+    bi.add_argument(
+        "--no-run",
+        action="store_true",
+        help="Créer les tâches sans lancer le worker (ex: worker démon déjà actif)",
+    )
+    bi.add_argument(
+        "--report",
+        type=str,
+        default=None,
+        help="Écrire le rapport de débit (JSON) dans ce fichier",
+    )
+    bi.add_argument(
+        "--log-level",
+        type=str,
+        default="INFO",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        help="Niveau de logs",
+    )
+
+    # Migration de la file JSON vers le store SQLite
+    mig = sub.add_parser(
+        "migrate-tasks",
+        help="Importer les tâches JSON (file + archives) dans le store SQLite",
+    )
+    mig.add_argument(
+        "--queue-dir",
+        type=str,
+        default="queue",
+        help="Dossier de la file (tâches JSON)",
+    )
+    mig.add_argument(
+        "--archive-dir",
+        type=str,
+        default="queue_archive",
+        help="Dossier d'archivage des tâches traitées",
+    )
+    mig.add_argument(
+        "--db",
+        type=str,
+        default=None,
+        help="Base SQLite cible (défaut: task_store.path de --config)",
+    )
+    mig.add_argument(
+        "--config",
+        type=str,
+        default="config/video.yaml",
+        help="Config du worker (bloc task_store)",
+    )
+    mig.add_argument(
         "--log-level",
         type=str,
         default="INFO",
@@ -679,6 +921,11 @@ def main(argv: Optional[List[str]] = None) -> int:
                     preset=preset,
                     reencode_audio=reencode_audio,
                     audio_bitrate=audio_bitrate,
+                    **(
+                        {"crf_auto": (enhance_cfg or {}).get("crf_auto") or {}}
+                        if crf == "auto"
+                        else {}
+                    ),
                 )
                 video_path = str(enhanced)
                 logging.info("Vidéo améliorée: %s", video_path)
@@ -720,6 +967,12 @@ def main(argv: Optional[List[str]] = None) -> int:
         vid = resp.get("id")
         print(f"Video ID: {vid}")
     elif args.command == "ai-meta":
+        from src.ai_generator import MetaRequest, write_metadata_to_config
+
+        _generate_metadata = globals().get("generate_metadata")
+        if not callable(_generate_metadata):
+            from src.ai_generator import generate_metadata as _generate_metadata
+
         kw = args.target_keywords if args.target_keywords else None
         req = MetaRequest(
             topic=args.topic,
@@ -736,7 +989,7 @@ def main(argv: Optional[List[str]] = None) -> int:
         )
         # Utiliser le même fichier de config que --out-config si fourni, sinon défaut
         cfg_path = args.out_config if args.out_config else "config/video.yaml"
-        data = generate_metadata(req, config_path=cfg_path, video_path=args.video_path)
+        data = _generate_metadata(req, config_path=cfg_path, video_path=args.video_path)
         if args.print or not args.out_config:
             # Affiche un aperçu simple
             print("Title:\n" + data.get("title", ""))
@@ -803,6 +1056,13 @@ def main(argv: Optional[List[str]] = None) -> int:
         sharpen_amount = pick2(args.sharpen_amount, "sharpen_amount")
         contrast = pick2(args.contrast, "contrast")
         saturation = pick2(args.saturation, "saturation")
+        encode_opts = {"fast_path": True} if args.fast_path else {}
+        if args.chunked:
+            encode_opts.update(
+                chunked=True,
+                chunk_workers=args.chunk_workers,
+                segment_seconds=args.segment_seconds,
+            )
 
         out = _enhance_video2(
             input_path=args.input,
@@ -826,8 +1086,31 @@ def main(argv: Optional[List[str]] = None) -> int:
             preset=preset,
             reencode_audio=reencode_audio,
             audio_bitrate=audio_bitrate,
+            **encode_opts,
         )
         print(str(out))
+    elif args.command == "enhance-bench":
+        from src.encode_bench import format_profile, run_bench, save_profile
+        from src.video_enhance import EnhanceError
+
+        try:
+            width, height = (int(v) for v in args.size.lower().split("x", 1))
+        except ValueError:
+            logging.error("Résolution invalide: %s (attendu WIDTHxHEIGHT)", args.size)
+            return 2
+        try:
+            profile = run_bench(
+                codecs=[c.strip() for c in args.codecs.split(",") if c.strip()],
+                presets=[p.strip() for p in args.presets.split(",") if p.strip()],
+                seconds=args.seconds,
+                size=(width, height),
+            )
+        except EnhanceError as e:
+            logging.error("Calibration impossible: %s", e)
+            return 2
+        path = save_profile(profile, args.output)
+        print(format_profile(profile))
+        print(f"Profil écrit: {path}")
     elif args.command == "telegram-bot":
         # Lazy import telegram bot (allow alias override)
         _run_bot = globals().get("run_bot_from_sources")
@@ -838,6 +1121,25 @@ def main(argv: Optional[List[str]] = None) -> int:
         logging.getLogger("httpx").setLevel(logging.WARNING)
         _run_bot(args.sources)
     elif args.command == "worker":
+        if args.daemon:
+            _run_daemon = globals().get("run_daemon")
+            if not callable(_run_daemon):
+                from src.worker import run_daemon as _impl
+
+                _run_daemon = _impl
+            _run_daemon(
+                queue_dir=args.queue_dir,
+                archive_dir=args.archive_dir,
+                config_path=args.config,
+                log_level=args.log_level,
+                concurrency=args.concurrency,
+                cpu_slots=args.cpu_slots,
+                io_slots=args.io_slots,
+                parallel_steps=args.parallel_steps,
+                poll_interval=args.poll_interval,
+                lease_ttl=args.lease_ttl,
+            )
+            return 0
         # Lazy import worker (allow alias override)
         _process_queue = globals().get("process_queue")
         if not callable(_process_queue):
@@ -849,6 +1151,97 @@ def main(argv: Optional[List[str]] = None) -> int:
             archive_dir=args.archive_dir,
             config_path=args.config,
             log_level=args.log_level,
+            concurrency=args.concurrency,
+            cpu_slots=args.cpu_slots,
+            io_slots=args.io_slots,
+            parallel_steps=args.parallel_steps,
+            lease_ttl=args.lease_ttl,
+        )
+    elif args.command == "batch-import":
+        import time
+
+        from src import worker_metrics
+        from src.batch_import import (
+            BatchImportError,
+            build_report,
+            format_report,
+            import_directory,
+        )
+
+        defaults = {"priority": args.priority}
+        if args.privacy:
+            defaults["privacy_status"] = args.privacy
+        try:
+            result = import_directory(
+                args.directory,
+                args.queue_dir,
+                args.archive_dir,
+                manifest=args.manifest,
+                defaults=defaults,
+            )
+        except (BatchImportError, OSError, ValueError) as e:
+            logging.error("Import impossible: %s", e)
+            return 2
+        tasks = result["created"] + result["queued"]
+        print(
+            f"Import {result['batch_id']}: {len(result['created'])} tâche(s) créée(s), "
+            f"{len(result['queued'])} encore en file, {result['skipped']} déjà traitée(s)"
+        )
+        if args.no_run or not tasks:
+            return 0
+        _process_queue = globals().get("process_queue")
+        if not callable(_process_queue):
+            from src.worker import process_queue as _impl
+
+            _process_queue = _impl
+        before = worker_metrics.REGISTRY.snapshot()
+        t0 = time.monotonic()
+        _process_queue(
+            queue_dir=args.queue_dir,
+            archive_dir=args.archive_dir,
+            config_path=args.config,
+            log_level=args.log_level,
+            concurrency=args.concurrency,
+            cpu_slots=args.cpu_slots,
+            io_slots=args.io_slots,
+            parallel_steps=args.parallel_steps,
+        )
+        report = build_report(
+            tasks,
+            args.queue_dir,
+            args.archive_dir,
+            wall_seconds=time.monotonic() - t0,
+            metrics_before=before,
+            metrics_after=worker_metrics.REGISTRY.snapshot(),
+        )
+        report["batch_id"] = result["batch_id"]
+        print(format_report(report))
+        if args.report:
+            from src.queue_events import write_json_atomic
+
+            write_json_atomic(args.report, report)
+        return 1 if report["failed"] else 0
+    elif args.command == "migrate-tasks":
+        from src.task_store import (
+            SqliteTaskStore,
+            history_db_path,
+            migrate_directories,
+            task_store_settings,
+        )
+
+        db_path = (
+            Path(args.db)
+            if args.db
+            else history_db_path(task_store_settings(args.config), args.queue_dir)
+        )
+        store = SqliteTaskStore(db_path)
+        try:
+            counts = migrate_directories(args.queue_dir, args.archive_dir, store)
+        finally:
+            store.close()
+        print(
+            f"{counts['queue']} tâche(s) en file, {counts['archive']} archivée(s) "
+            f"importée(s) dans {db_path} ({counts['errors']} ignorée(s))"
         )
 
     return 0
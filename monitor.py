@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 Lanceur pour l'interface web de monitoring
-Usage: python monitor.py [--host HOST] [--port PORT] [--queue-dir DIR] [--archive-dir DIR]
+Usage: python monitor.py [--host HOST] [--port PORT] [--queue-dir DIR] [--archive-dir DIR] [--config FILE]
 """
 
 import argparse
@@ -30,6 +30,11 @@ def main():
         default="./queue_archive",
         help="Répertoire des tâches archivées",
     )
+    parser.add_argument(
+        "--config",
+        default="config/video.yaml",
+        help="Config du worker: son bloc task_store active l'historique SQLite",
+    )
 
     args = parser.parse_args()
     # Créer les répertoires s'ils n'existent pas
@@ -42,7 +47,13 @@ def main():
     print(f"URL: http://{args.host}:{args.port}")
     print("=" * 40)
     try:
-        run_server(args.queue_dir, args.archive_dir, args.host, args.port)
+        run_server(
+            args.queue_dir,
+            args.archive_dir,
+            args.host,
+            args.port,
+            config_path=args.config,
+        )
     except KeyboardInterrupt:
         print("\n👋 Arrêt du serveur...")
     except Exception as e:
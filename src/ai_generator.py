@@ -3,19 +3,18 @@ from __future__ import annotations
 import json
 import os
 import re
-from .config_loader import load_config
-from .vision_analyzer import create_vision_analyzer
-from .seo_optimizer import create_seo_optimizer
+from .config_loader import load_config, load_raw_config
+from .stage_metrics import span
 from dataclasses import dataclass
 from typing import Any, Dict, Iterable, List, Optional
 
 import yaml
 
-try:
-    # New OpenAI SDK (>=1.0)
-    from openai import OpenAI  # type: ignore
-except Exception:  # pragma: no cover - fallback if old SDK
-    OpenAI = None  # type: ignore
+# Alias paresseux (points de monkeypatch): le SDK OpenAI, aiohttp (SEO) et la
+# vision ne sont importés qu'au premier appel qui en a besoin
+OpenAI = None  # type: ignore
+create_vision_analyzer = None  # type: ignore
+create_seo_optimizer = None  # type: ignore
 
 
 @dataclass
@@ -41,16 +40,24 @@ def _get_openai_client():
         raise RuntimeError(
             "OPENAI_API_KEY n'est pas défini dans les variables d'environnement"
         )
-    if OpenAI is None:
-        raise RuntimeError("Le paquet openai>=1.0 est requis")
-    return OpenAI()
+    client_cls = globals().get("OpenAI")
+    if client_cls is None:
+        try:
+            # New OpenAI SDK (>=1.0)
+            from openai import OpenAI as client_cls  # type: ignore
+        except Exception as e:  # pragma: no cover - fallback if old SDK
+            raise RuntimeError("Le paquet openai>=1.0 est requis") from e
+    return client_cls()
 
 
 def generate_metadata(
     req: MetaRequest,
     config_path: str = "config/video.yaml",
     video_path: Optional[str] = None,
+    vision_analysis: Optional[dict] = None,
 ) -> dict:
+    # `vision_analysis`: résultat Vision déjà calculé par l'appelant (worker),
+    # la vidéo n'est alors pas réanalysée
     # Charger la configuration
     config = None
     try:
@@ -62,17 +69,22 @@ def generate_metadata(
         log.warning(f"Erreur chargement config: {e}")
 
     # Analyser le contenu vidéo avec IA Vision si disponible
-    vision_analysis = None
-    if video_path and config:
+    if vision_analysis is None and video_path and config:
         try:
             from pathlib import Path
 
             vision_config = config.get("vision", {})
 
             if vision_config.get("enabled", False):
-                analyzer = create_vision_analyzer(vision_config)
+                _create_analyzer = globals().get("create_vision_analyzer")
+                if not callable(_create_analyzer):
+                    from .vision_analyzer import (
+                        create_vision_analyzer as _create_analyzer,
+                    )
+                analyzer = _create_analyzer(vision_config)
                 if analyzer:
-                    vision_analysis = analyzer.analyze_video(Path(video_path))
+                    with span("ai_meta.vision"):
+                        vision_analysis = analyzer.analyze_video(Path(video_path))
         except Exception as e:
             import logging
 
@@ -85,13 +97,9 @@ def generate_metadata(
     # Fallback: si load_config a échoué, tenter de lire le YAML brut pour récupérer le bloc SEO
     if not seo_cfg:
         try:
-            from pathlib import Path
-
-            cfg_path = Path(config_path)
-            if cfg_path.exists() and cfg_path.suffix.lower() in {".yaml", ".yml"}:
-                raw_doc = yaml.safe_load(cfg_path.read_text(encoding="utf-8")) or {}
-                if isinstance(raw_doc, dict):
-                    seo_cfg = raw_doc.get("seo") or {}
+            raw_doc = load_raw_config(config_path) or {}
+            if isinstance(raw_doc, dict):
+                seo_cfg = raw_doc.get("seo") or {}
         except Exception:
             seo_cfg = {}
     default_provider = (
@@ -167,7 +175,8 @@ def generate_metadata(
         # défaut: openai si possible, sinon heuristique
         try:
             client = _get_openai_client()
-            metadata = _openai_generate(req, client, vision_analysis)
+            with span("ai_meta.openai"):
+                metadata = _openai_generate(req, client, vision_analysis)
         except Exception:
             metadata = _heuristic_generate(req, vision_analysis)
 
@@ -177,7 +186,10 @@ def generate_metadata(
             import asyncio
 
             seo_config = config.get("seo_advanced", {})
-            optimizer = create_seo_optimizer(seo_config)
+            _create_optimizer = globals().get("create_seo_optimizer")
+            if not callable(_create_optimizer):
+                from .seo_optimizer import create_seo_optimizer as _create_optimizer
+            optimizer = _create_optimizer(seo_config)
 
             if optimizer:
                 # Exécuter l'optimisation SEO de manière asynchrone
@@ -477,7 +489,7 @@ Réponds UNIQUEMENT en JSON valide avec cette structure exacte:
         import httpx as _httpx
 
         client_timeout = _httpx.Timeout(env_timeout)
-        with httpx.Client(timeout=client_timeout) as client:
+        with httpx.Client(timeout=client_timeout) as client, span("ai_meta.ollama"):
             response = client.post(f"{host}/api/generate", json=payload)
             response.raise_for_status()
 
@@ -549,7 +561,8 @@ def _ollama_generate_fast(
         f"Langue: {req.language}\n"
         f"Donne UNIQUEMENT un titre accrocheur (<= {req.max_title_chars} caractères)."
     )
-    title_out = _gen(title_prompt, title_predict, expect_json=False)
+    with span("ai_meta.ollama_title"):
+        title_out = _gen(title_prompt, title_predict, expect_json=False)
     title = (
         title_out.splitlines()[0] if title_out else (req.topic or "Nouvelle vidéo")
     )[: req.max_title_chars]
@@ -562,14 +575,16 @@ def _ollama_generate_fast(
         f" Evite les balises. Contenu seulement.\n"
         + (f"Contexte: {input_hint}\n" if input_hint else "")
     )
-    description = _gen(desc_prompt, desc_predict, expect_json=False)
+    with span("ai_meta.ollama_description"):
+        description = _gen(desc_prompt, desc_predict, expect_json=False)
 
     # 3) Tags JSON
     tags_prompt = (
         f"Sujet: {req.topic}\nLangue: {req.language}\n"
         f"Retourne UNIQUEMENT un tableau JSON de {req.max_tags} tags en minuscules, sans #."
     )
-    tags_raw = _gen(tags_prompt, tags_predict, expect_json=True)
+    with span("ai_meta.ollama_tags"):
+        tags_raw = _gen(tags_prompt, tags_predict, expect_json=True)
     tags_data = _safe_json_loads(tags_raw)
     tags = []
     if isinstance(tags_data, list):
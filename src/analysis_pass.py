@@ -0,0 +1,253 @@
+"""
+Passe d'analyse unique de la source (un seul décodage).
+
+Au lieu de relancer ffmpeg/ffprobe pour chaque besoin (miniature, frames
+Vision, langue audio, audio pour Whisper), une seule commande ffmpeg décode la
+source et, via un graphe `split`, écrit en une fois:
+
+- les miniatures candidates (plusieurs instants, cadrées 1280x720)
+- les frames pour l'analyse Vision (réparties sur la durée)
+- l'audio en WAV mono 16 kHz, format natif de Whisper
+
+Les métadonnées (durée, codecs, langue de la piste audio) viennent d'un
+ffprobe préalable, qui lit les en-têtes sans décoder. Par défaut seules les
+images clés sont décodées (`-skip_frame nokey`): les frames extraites sont les
+premières images clés après chaque instant visé.
+"""
+
+from __future__ import annotations
+
+import logging
+import shutil
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from . import video_enhance as _ve
+from .media_probe import MediaInfo, probe_media
+from .resource_governor import get_governor
+
+log = logging.getLogger(__name__)
+
+# Instants des miniatures candidates (fraction de la durée)
+DEFAULT_THUMBNAIL_POSITIONS = (0.2, 0.3, 0.5, 0.7)
+THUMBNAIL_SIZE = (1280, 720)
+AUDIO_SAMPLE_RATE = 16000
+# Décodage des seules images clés: passe légère, à côté d'un encodage
+ANALYSIS_THREADS = 2
+
+
+@dataclass
+class AnalysisArtifacts:
+    """Fichiers produits par la passe d'analyse (chemins absents = non produits)."""
+
+    directory: Path
+    info: Optional[MediaInfo] = None
+    thumbnails: List[Path] = field(default_factory=list)
+    frames: List[Path] = field(default_factory=list)
+    audio: Optional[Path] = None
+
+    @property
+    def audio_language(self) -> Optional[str]:
+        return self.info.audio_language if self.info else None
+
+    def best_thumbnail(self) -> Optional[Path]:
+        """Candidate la plus détaillée (JPEG le plus lourd).
+
+        Un fondu, un écran noir ou un plan flou se compressent très bien: la
+        taille du JPEG écarte ces frames sans décoder les images.
+        """
+        sized = []
+        for path in self.thumbnails:
+            try:
+                sized.append((path.stat().st_size, path))
+            except OSError:
+                continue
+        return max(sized)[1] if sized else None
+
+    def to_dict(self) -> dict:
+        """Forme JSON, stockée dans le checkpoint de l'étape."""
+        return {
+            "dir": str(self.directory),
+            "info": asdict(self.info) if self.info else None,
+            "audio_language": self.audio_language,
+            "thumbnails": [str(p) for p in self.thumbnails],
+            "frames": [str(p) for p in self.frames],
+            "audio": str(self.audio) if self.audio else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> Optional["AnalysisArtifacts"]:
+        """Relit un checkpoint; ne garde que les fichiers encore présents."""
+        if not isinstance(data, dict) or not data.get("dir"):
+            return None
+        info = None
+        if isinstance(data.get("info"), dict):
+            known = {f.name for f in fields(MediaInfo)}
+            info = MediaInfo(**{k: v for k, v in data["info"].items() if k in known})
+        audio = Path(data["audio"]) if data.get("audio") else None
+        return cls(
+            directory=Path(data["dir"]),
+            info=info,
+            thumbnails=[
+                Path(p) for p in data.get("thumbnails") or [] if Path(p).exists()
+            ],
+            frames=[Path(p) for p in data.get("frames") or [] if Path(p).exists()],
+            audio=audio if audio and audio.exists() else None,
+        )
+
+
+def thumbnail_times(duration: float, positions: Sequence[float]) -> List[float]:
+    return sorted({round(duration * float(p), 3) for p in positions if 0 < p < 1})
+
+
+def frame_times(duration: float, count: int) -> List[float]:
+    """Instants répartis uniformément (milieu de la vidéo pour une seule frame)."""
+    if count <= 0:
+        return []
+    if count == 1:
+        return [round(duration / 2, 3)]
+    step = duration / (count + 1)
+    return [round(step * (i + 1), 3) for i in range(count)]
+
+
+def select_expr(times: Sequence[float]) -> str:
+    """Expression du filtre select: première frame à partir de chaque instant.
+
+    `prev_pts` vaut NAN sur la première frame: gte(NAN, t) est faux, la
+    première frame reste sélectionnable.
+    """
+    terms = [f"gte(t,{t:.3f})*not(gte(prev_pts*TB,{t:.3f}))" for t in times]
+    return "'" + "+".join(terms) + "'"
+
+
+def build_analysis_command(
+    in_path: Path,
+    out_dir: Path,
+    *,
+    thumbnails: Sequence[float] = (),
+    frames: Sequence[float] = (),
+    audio: bool = False,
+    keyframes_only: bool = True,
+    thumbnail_size: Tuple[int, int] = THUMBNAIL_SIZE,
+) -> List[str]:
+    """Commande ffmpeg unique produisant toutes les sorties demandées."""
+    width, height = thumbnail_size
+    branches = []
+    if thumbnails:
+        branches.append(
+            (
+                "thumbs",
+                f"select={select_expr(thumbnails)},"
+                f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:black",
+                "thumb_%02d.jpg",
+            )
+        )
+    if frames:
+        branches.append(("frames", f"select={select_expr(frames)}", "frame_%02d.jpg"))
+
+    cmd = ["ffmpeg", "-y", "-hide_banner"]
+    if keyframes_only and branches:
+        cmd += ["-skip_frame:v", "nokey"]
+    cmd += ["-i", str(in_path)]
+    if branches:
+        if len(branches) == 1:
+            name, chain, _ = branches[0]
+            graph = f"[0:v:0]{chain}[{name}]"
+        else:
+            graph = f"[0:v:0]split={len(branches)}" + "".join(
+                f"[{name}_in]" for name, _, _ in branches
+            )
+            graph += "".join(
+                f";[{name}_in]{chain}[{name}]" for name, chain, _ in branches
+            )
+        cmd += ["-filter_complex", graph]
+        for name, _, pattern in branches:
+            cmd += [
+                "-map",
+                f"[{name}]",
+                "-fps_mode",
+                "vfr",
+                "-q:v",
+                "2",
+                str(out_dir / pattern),
+            ]
+    if audio:
+        cmd += [
+            "-map",
+            "0:a:0",
+            "-ac",
+            "1",
+            "-ar",
+            str(AUDIO_SAMPLE_RATE),
+            "-c:a",
+            "pcm_s16le",
+            str(out_dir / f"{in_path.stem}.audio.wav"),
+        ]
+    return cmd
+
+
+def run_analysis(
+    video_path: str | Path,
+    out_dir: Optional[str | Path] = None,
+    *,
+    thumbnail_positions: Sequence[float] = DEFAULT_THUMBNAIL_POSITIONS,
+    frames: int = 0,
+    audio: bool = False,
+    keyframes_only: bool = True,
+) -> Optional[AnalysisArtifacts]:
+    """Analyse `video_path` en une passe.
+
+    Args:
+        out_dir: Répertoire des artefacts (défaut: `<source>.analysis` à côté)
+        frames: Nombre de frames Vision (0: aucune)
+        audio: Extraire le WAV 16 kHz pour Whisper
+
+    Returns:
+        Les artefacts produits (éventuellement partiels), None si ffprobe ou
+        ffmpeg est absent ou si la source est illisible
+    """
+    video_path = Path(video_path)
+    if not shutil.which("ffmpeg"):
+        return None
+    info = probe_media(video_path)
+    if info is None:
+        return None
+    out_dir = Path(out_dir or video_path.with_name(video_path.stem + ".analysis"))
+    shutil.rmtree(out_dir, ignore_errors=True)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    artifacts = AnalysisArtifacts(directory=out_dir, info=info)
+
+    duration = info.duration or 0.0
+    has_video = bool(info.video_codec) and duration > 0
+    thumbs = thumbnail_times(duration, thumbnail_positions) if has_video else []
+    shots = frame_times(duration, frames) if has_video else []
+    audio = audio and bool(info.audio_codec)
+    if not (thumbs or shots or audio):
+        return artifacts
+
+    cmd = build_analysis_command(
+        video_path,
+        out_dir,
+        thumbnails=thumbs,
+        frames=shots,
+        audio=audio,
+        keyframes_only=keyframes_only,
+    )
+    try:
+        with get_governor().acquire(ANALYSIS_THREADS, label="analyse"):
+            _ve._run_ffmpeg(cmd, log, label="analyse", record_speed=False)
+    except _ve.EnhanceError as e:
+        log.warning("Passe d'analyse en échec: %s", e)
+    artifacts.thumbnails = sorted(out_dir.glob("thumb_*.jpg"))
+    artifacts.frames = sorted(out_dir.glob("frame_*.jpg"))
+    wav = out_dir / f"{video_path.stem}.audio.wav"
+    artifacts.audio = wav if wav.exists() else None
+    log.info(
+        "Analyse: %d miniatures, %d frames, audio %s",
+        len(artifacts.thumbnails),
+        len(artifacts.frames),
+        "oui" if artifacts.audio else "non",
+    )
+    return artifacts
@@ -0,0 +1,257 @@
+"""
+Cache d'artefacts adressé par contenu (sorties d'encodage ffmpeg).
+
+La clé combine une empreinte rapide du fichier source (taille + échantillons
+répartis, sans lire tout le fichier) et la liste normalisée des arguments
+ffmpeg. Sur un hit, le fichier en cache est lié (hard link) vers la sortie
+demandée au lieu de ré-encoder. La taille totale est bornée avec éviction LRU.
+
+Plusieurs processus (workers) partagent le même répertoire: chaque écriture
+relit index.json sous verrou fichier (`index.lock`) et y fusionne ses
+changements; les fichiers absents de l'index (processus interrompu) sont
+supprimés pour ne pas échapper à la limite de taille.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: verrou entre threads seulement
+    fcntl = None
+
+from .queue_events import write_json_atomic
+
+log = logging.getLogger(__name__)
+
+# À incrémenter si le format des entrées ou la sémantique de la clé change
+CACHE_VERSION = "1"
+INDEX_NAME = "index.json"
+LOCK_NAME = "index.lock"
+STATS = ("hits", "misses", "evictions")
+
+
+def fast_file_hash(
+    path: str | Path, sample_size: int = 1024 * 1024, samples: int = 8
+) -> str:
+    """Empreinte rapide: taille + `samples` blocs répartis (début, milieu, fin).
+
+    Les fichiers plus petits que samples * sample_size sont hachés en entier.
+    """
+    p = Path(path)
+    size = p.stat().st_size
+    h = hashlib.blake2b(digest_size=20)
+    h.update(str(size).encode("ascii"))
+    with open(p, "rb") as f:
+        if size <= sample_size * samples:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        else:
+            step = (size - sample_size) / (samples - 1)
+            for i in range(samples):
+                f.seek(int(i * step))
+                h.update(f.read(sample_size))
+    return h.hexdigest()
+
+
+def cache_key(input_hash: str, args: Iterable[str]) -> str:
+    """Clé de cache: empreinte source + arguments ffmpeg (sans chemins d'E/S)."""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(CACHE_VERSION.encode("ascii"))
+    h.update(input_hash.encode("ascii"))
+    h.update(json.dumps(list(args), ensure_ascii=False).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _link_or_copy(src: Path, dest: Path) -> None:
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if dest.exists() or dest.is_symlink():
+        dest.unlink()
+    try:
+        os.link(src, dest)
+    except OSError:
+        # Autre système de fichiers ou FS sans hard links
+        shutil.copy2(src, dest)
+
+
+class ArtifactCache:
+    """Cache disque borné (LRU) avec compteurs hits/misses persistés.
+
+    Args:
+        root: Répertoire du cache (index.json + fichiers)
+        max_bytes: Taille totale maximale avant éviction des entrées les moins récentes
+    """
+
+    def __init__(self, root: str | Path, max_bytes: int = 20 * 1024**3):
+        self.root = Path(root)
+        self.max_bytes = max(0, int(max_bytes))
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._index_path = self.root / INDEX_NAME
+        self._lock_path = self.root / LOCK_NAME
+        self._entries: Dict[str, dict] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Compteurs de ce processus pas encore fusionnés dans l'index
+        self._pending = dict.fromkeys(STATS, 0)
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self._index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+        self._entries = data.get("entries") or {}
+        stats = data.get("stats") or {}
+        for name in STATS:
+            setattr(self, name, int(stats.get(name, 0)) + self._pending[name])
+
+    def _count(self, name: str) -> None:
+        setattr(self, name, getattr(self, name) + 1)
+        self._pending[name] += 1
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """Relit l'index sous verrou exclusif (threads et processus) puis le réécrit."""
+        with self._lock, open(self._lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            self._load()
+            yield
+            self._save()
+            self._pending = dict.fromkeys(STATS, 0)
+
+    def _save(self) -> None:
+        write_json_atomic(
+            self._index_path,
+            {
+                "version": CACHE_VERSION,
+                "entries": self._entries,
+                "stats": {
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "evictions": self.evictions,
+                },
+            },
+        )
+
+    def _file_for(self, key: str, suffix: str) -> Path:
+        return self.root / key[:2] / f"{key}{suffix}"
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(int(e.get("size", 0)) for e in self._entries.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "total_bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def fetch(self, key: str, dest: str | Path) -> Optional[Path]:
+        """Lie l'artefact en cache vers dest. Renvoie dest sur hit, None sinon."""
+        dest = Path(dest)
+        with self._lock:
+            # Lecture seule: un miss n'écrit pas l'index (fusionné à la
+            # prochaine écriture, l'entrée orpheline est purgée par store)
+            self._load()
+            entry = self._entries.get(key)
+            if entry is None or not (self.root / entry["file"]).exists():
+                self._count("misses")
+                return None
+        with self._transaction():
+            entry = self._entries.get(key)
+            cached = self.root / entry["file"] if entry else None
+            if cached is None or not cached.exists():
+                self._count("misses")
+                return None
+            _link_or_copy(cached, dest)
+            entry["last_used"] = time.time()
+            entry["hits"] = int(entry.get("hits", 0)) + 1
+            self._count("hits")
+        log.info("Cache enhance: hit %s -> %s", key[:12], dest)
+        return dest
+
+    def store(self, key: str, src: str | Path) -> Optional[Path]:
+        """Ajoute src au cache (hard link si possible) puis applique la limite LRU."""
+        src = Path(src)
+        if not src.exists():
+            return None
+        size = src.stat().st_size
+        if self.max_bytes and size > self.max_bytes:
+            log.info(
+                "Cache enhance: artefact trop gros pour le cache (%d octets)", size
+            )
+            return None
+        target = self._file_for(key, src.suffix)
+        with self._transaction():
+            _link_or_copy(src, target)
+            now = time.time()
+            self._entries[key] = {
+                "file": str(target.relative_to(self.root)),
+                "size": size,
+                "created": now,
+                "last_used": now,
+                "hits": 0,
+            }
+            self._prune()
+            self._evict()
+        return target
+
+    def _prune(self) -> None:
+        """Aligne index et disque: entrées sans fichier et fichiers sans entrée."""
+        for key, entry in list(self._entries.items()):
+            if not (self.root / entry["file"]).exists():
+                self._entries.pop(key, None)
+        indexed = {entry["file"] for entry in self._entries.values()}
+        for path in self.root.glob("*/*"):
+            if path.is_file() and str(path.relative_to(self.root)) not in indexed:
+                log.info("Cache enhance: fichier orphelin supprimé %s", path.name)
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def _evict(self) -> None:
+        total = self.total_bytes
+        if not self.max_bytes or total <= self.max_bytes:
+            return
+        for key, entry in sorted(
+            self._entries.items(), key=lambda kv: kv[1].get("last_used", 0)
+        ):
+            if total <= self.max_bytes:
+                break
+            try:
+                (self.root / entry["file"]).unlink()
+            except OSError:
+                pass
+            total -= int(entry.get("size", 0))
+            self._entries.pop(key, None)
+            self._count("evictions")
+            log.info("Cache enhance: éviction %s", key[:12])
+
+
+def create_enhance_cache(cache_cfg: Optional[dict]) -> Optional[ArtifactCache]:
+    """Construit le cache depuis le bloc `enhance.cache` de la config (None si désactivé)."""
+    if not isinstance(cache_cfg, dict) or not cache_cfg.get("enabled", False):
+        return None
+    max_gb = float(cache_cfg.get("max_size_gb", 20))
+    return ArtifactCache(
+        cache_cfg.get("dir") or "cache/enhance", max_bytes=int(max_gb * 1024**3)
+    )
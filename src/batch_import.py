@@ -0,0 +1,343 @@
+"""
+Import en masse d'un répertoire de vidéos dans la file du worker.
+
+Pensé pour les rattrapages de chaîne (plusieurs milliers de fichiers):
+- une tâche par vidéo, métadonnées tirées du nom de fichier, d'un fichier
+  voisin (`video.yaml`/`video.yml`/`video.json`) ou d'un manifeste CSV/YAML
+  indexé par chemin relatif
+- nom de tâche dérivé du chemin de la vidéo: relancer l'import ne crée pas de
+  doublon (les tâches déjà en file ou archivées sont ignorées)
+- rapport de débit après traitement (durée, vitesse d'encodage, Mo/s
+  d'upload, échecs) pour dimensionner le matériel des rattrapages
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import logging
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from .queue_events import write_json_atomic
+from .task_lease import INFLIGHT_DIR
+
+log = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".mkv", ".avi", ".webm", ".m4v", ".mpg", ".mpeg")
+MANIFEST_NAMES = ("batch.csv", "batch.yaml", "batch.yml")
+SIDECAR_SUFFIXES = (".yaml", ".yml", ".json")
+TASK_PREFIX = "task_batch_"
+# Champs de manifeste/sidecar recopiés au niveau de la tâche (le reste va dans meta)
+TASK_FIELDS = ("privacy_status", "publish_at", "priority", "deadline", "chat_id")
+FAILED_STATUSES = ("error", "blocked", "cancelled")
+
+
+class BatchImportError(Exception):
+    pass
+
+
+def iter_videos(root: str | Path) -> Iterator[Path]:
+    """Vidéos de l'arborescence, dans un ordre stable (chemin relatif)."""
+    root = Path(root)
+    for path in sorted(root.rglob("*")):
+        if path.suffix.lower() in VIDEO_EXTENSIONS and path.is_file():
+            if not any(part.startswith(".") for part in path.relative_to(root).parts):
+                yield path
+
+
+def title_from_filename(path: Path) -> str:
+    """Titre lisible depuis le nom de fichier (séparateurs -> espaces)."""
+    title = re.sub(r"[_\-.]+", " ", path.stem)
+    return re.sub(r"\s+", " ", title).strip() or path.stem
+
+
+def _split_tags(value) -> List[str]:
+    if isinstance(value, (list, tuple)):
+        return [str(t).strip() for t in value if str(t).strip()]
+    if isinstance(value, str):
+        return [t.strip() for t in re.split(r"[,;|]", value) if t.strip()]
+    return []
+
+
+def _read_mapping_file(path: Path):
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() == ".json":
+        return json.loads(text)
+    import yaml
+
+    return yaml.safe_load(text)
+
+
+def load_manifest(path: str | Path) -> Dict[str, dict]:
+    """Manifeste CSV (colonne `file`) ou YAML (liste ou dict par fichier).
+
+    Returns:
+        Entrées indexées par chemin relatif normalisé (séparateurs `/`)
+    """
+    path = Path(path)
+    entries: Dict[str, dict] = {}
+    if path.suffix.lower() == ".csv":
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        data = _read_mapping_file(path) or []
+        if isinstance(data, dict):
+            rows = [dict(v or {}, file=k) for k, v in data.items()]
+        elif isinstance(data, list):
+            rows = [r for r in data if isinstance(r, dict)]
+        else:
+            raise BatchImportError(f"Manifeste invalide: {path}")
+    for row in rows:
+        name = str(row.get("file") or row.get("path") or "").strip()
+        if not name:
+            continue
+        entries[Path(name).as_posix()] = {
+            k: v
+            for k, v in row.items()
+            if k not in ("file", "path") and v not in (None, "")
+        }
+    return entries
+
+
+def _sidecar(video: Path) -> dict:
+    for suffix in SIDECAR_SUFFIXES:
+        candidate = video.with_suffix(suffix)
+        if candidate.is_file():
+            try:
+                data = _read_mapping_file(candidate)
+            except Exception as e:
+                log.warning("Sidecar illisible %s: %s", candidate, e)
+                return {}
+            return data if isinstance(data, dict) else {}
+    return {}
+
+
+def task_name_for(video: Path) -> str:
+    """Nom de tâche stable pour une vidéo (import rejouable)."""
+    digest = hashlib.sha1(str(video.resolve()).encode("utf-8")).hexdigest()[:16]
+    return f"{TASK_PREFIX}{digest}.json"
+
+
+def build_task(
+    video: Path,
+    rel_path: str,
+    overrides: Optional[dict] = None,
+    *,
+    batch_id: str,
+    defaults: Optional[dict] = None,
+) -> dict:
+    """Tâche de file pour une vidéo (même forme que les tâches Telegram)."""
+    fields = dict(defaults or {})
+    fields.update(overrides or {})
+    task = {
+        "source": "batch",
+        "batch_id": batch_id,
+        "batch_file": rel_path,
+        "received_at": datetime.utcnow().isoformat() + "Z",
+        "video_path": str(video.resolve()),
+        "status": "pending",
+    }
+    for key in TASK_FIELDS:
+        if fields.get(key) not in (None, ""):
+            task[key] = fields.pop(key)
+        else:
+            fields.pop(key, None)
+    meta = {k: v for k, v in fields.items() if v not in (None, "")}
+    meta["title"] = str(meta.get("title") or title_from_filename(video))
+    meta["tags"] = _split_tags(meta.get("tags"))
+    task["meta"] = meta
+    return task
+
+
+def _task_location(name: str, queue_dir: Path, archive_dir: Path) -> Optional[str]:
+    if (archive_dir / name).exists():
+        return "archive"
+    if (queue_dir / name).exists() or (queue_dir / INFLIGHT_DIR / name).exists():
+        return "queue"
+    return None
+
+
+def import_directory(
+    root: str | Path,
+    queue_dir: str | Path,
+    archive_dir: str | Path,
+    *,
+    manifest: Optional[str | Path] = None,
+    defaults: Optional[dict] = None,
+    batch_id: Optional[str] = None,
+) -> dict:
+    """Crée une tâche par vidéo de `root` dans la file.
+
+    Le manifeste (`--manifest`, sinon batch.csv/batch.yaml à la racine) et les
+    sidecars complètent les métadonnées; le sidecar est prioritaire.
+
+    Returns:
+        {"batch_id", "created": [tâches créées], "queued": [tâches d'un import
+        précédent encore en file], "skipped": n déjà archivées, "unlisted": n
+        vidéos absentes du manifeste}
+    """
+    root = Path(root)
+    if not root.is_dir():
+        raise BatchImportError(f"Répertoire introuvable: {root}")
+    queue_dir, archive_dir = Path(queue_dir), Path(archive_dir)
+    queue_dir.mkdir(parents=True, exist_ok=True)
+    if manifest is None:
+        manifest = next(
+            (root / n for n in MANIFEST_NAMES if (root / n).is_file()), None
+        )
+    entries = load_manifest(manifest) if manifest else {}
+    batch_id = batch_id or datetime.now().strftime("%Y%m%d-%H%M%S")
+
+    created: List[str] = []
+    queued: List[str] = []
+    skipped = 0
+    unlisted = 0
+    for video in iter_videos(root):
+        rel_path = video.relative_to(root).as_posix()
+        name = task_name_for(video)
+        location = _task_location(name, queue_dir, archive_dir)
+        if location == "queue":
+            queued.append(name)
+            continue
+        if location == "archive":
+            skipped += 1
+            continue
+        overrides = dict(entries.get(rel_path) or {})
+        if entries and not overrides:
+            unlisted += 1
+        overrides.update(_sidecar(video))
+        task = build_task(
+            video, rel_path, overrides, batch_id=batch_id, defaults=defaults
+        )
+        # Écriture atomique: le worker démon est réveillé par le renommage final
+        write_json_atomic(queue_dir / name, task)
+        created.append(name)
+    log.info(
+        "Import %s: %d tâche(s) créée(s), %d encore en file, %d déjà traitée(s)",
+        batch_id,
+        len(created),
+        len(queued),
+        skipped,
+    )
+    return {
+        "batch_id": batch_id,
+        "created": created,
+        "queued": queued,
+        "skipped": skipped,
+        "unlisted": unlisted,
+    }
+
+
+def _load_result(name: str, queue_dir: Path, archive_dir: Path) -> Optional[dict]:
+    for d in (archive_dir, queue_dir, queue_dir / INFLIGHT_DIR):
+        try:
+            with open(d / name, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            continue
+        except (OSError, ValueError):
+            return None
+    return None
+
+
+def _series_total(snapshot: dict, name: str, **labels) -> float:
+    total = 0.0
+    for entry in snapshot.get(name) or []:
+        if all(entry.get("labels", {}).get(k) == v for k, v in labels.items()):
+            value = entry.get("value")
+            total += float(value if not isinstance(value, dict) else value["sum"])
+    return total
+
+
+def _histogram_count(snapshot: dict, name: str, **labels) -> int:
+    count = 0
+    for entry in snapshot.get(name) or []:
+        if all(entry.get("labels", {}).get(k) == v for k, v in labels.items()):
+            count += int((entry.get("value") or {}).get("count") or 0)
+    return count
+
+
+def build_report(
+    task_names: List[str],
+    queue_dir: str | Path,
+    archive_dir: str | Path,
+    *,
+    wall_seconds: float,
+    metrics_before: dict,
+    metrics_after: dict,
+) -> dict:
+    """Rapport de débit d'un import traité par le worker.
+
+    Vitesse d'encodage et débit d'upload proviennent du registre de métriques
+    du worker (différence avant/après le run), l'état final de chaque tâche de
+    son fichier JSON.
+    """
+    queue_dir, archive_dir = Path(queue_dir), Path(archive_dir)
+    counts: Dict[str, int] = {}
+    failures = []
+    for name in task_names:
+        task = _load_result(name, queue_dir, archive_dir)
+        status = (task or {}).get("status") or "missing"
+        counts[status] = counts.get(status, 0) + 1
+        if status in FAILED_STATUSES or task is None:
+            failures.append(
+                {
+                    "task": name,
+                    "file": (task or {}).get("batch_file"),
+                    "status": status,
+                    "error": (task or {}).get("error"),
+                }
+            )
+
+    def delta(fn, metric, **labels):
+        return fn(metrics_after, metric, **labels) - fn(
+            metrics_before, metric, **labels
+        )
+
+    encodes = delta(_histogram_count, "encode_speed_ratio")
+    speed_sum = delta(_series_total, "encode_speed_ratio")
+    upload_bytes = delta(_series_total, "upload_bytes_total")
+    upload_seconds = delta(_series_total, "stage_duration_seconds", stage="upload")
+    done = counts.get("done", 0)
+    wall = max(1e-6, float(wall_seconds))
+    return {
+        "tasks": len(task_names),
+        "done": done,
+        "failed": len(failures),
+        "statuses": counts,
+        "wall_seconds": round(wall, 2),
+        "tasks_per_hour": round(done * 3600.0 / wall, 2),
+        "encodes": encodes,
+        "avg_encode_speed": round(speed_sum / encodes, 3) if encodes else None,
+        "upload_mb": round(upload_bytes / 1e6, 2),
+        "upload_mb_per_s": (
+            round(upload_bytes / 1e6 / upload_seconds, 3) if upload_seconds else None
+        ),
+        "failures": failures,
+    }
+
+
+def format_report(report: dict) -> str:
+    """Résumé texte du rapport pour la console."""
+    speed = report.get("avg_encode_speed")
+    mbps = report.get("upload_mb_per_s")
+    lines = [
+        f"Tâches: {report['done']}/{report['tasks']} publiées, "
+        f"{report['failed']} en échec",
+        f"Durée totale: {report['wall_seconds']:.1f}s "
+        f"({report['tasks_per_hour']:.2f} tâches/h)",
+        "Vitesse d'encodage moyenne: "
+        + (f"x{speed:.2f} ({report['encodes']} encodage(s))" if speed else "n/a"),
+        f"Upload: {report['upload_mb']:.1f} Mo"
+        + (f" à {mbps:.2f} Mo/s" if mbps else ""),
+    ]
+    for failure in report.get("failures") or []:
+        lines.append(
+            f"  - {failure.get('file') or failure['task']}: {failure['status']}"
+            + (f" ({failure['error']})" if failure.get("error") else "")
+        )
+    return "\n".join(lines)
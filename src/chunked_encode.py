@@ -0,0 +1,325 @@
+"""
+Encodage segmenté en parallèle (mode `chunked` de enhance_video).
+
+Un seul processus ffmpeg n'occupe pas tous les cœurs avec libx265,
+libaom-av1 ou les presets lents. En mode segmenté:
+
+1. la piste vidéo source est découpée aux images clés, en copie de flux (sans
+   ré-encodage), en segments d'environ `segment_seconds`
+2. chaque segment est encodé par son propre processus ffmpeg, avec la même
+   chaîne de filtres, `workers` à la fois
+   (chaque segment réserve THREADS_PER_ENCODE threads au gouverneur CPU: au-delà
+   du budget, les segments attendent)
+3. les segments encodés sont concaténés sans perte (demuxer concat) et l'audio
+   de la source est traité en une seule passe (loudnorm mesure le fichier entier)
+4. la durée de la sortie est comparée à celle de la source
+
+encode_chunked() renvoie False quand le mode ne s'applique pas (clip court,
+ffprobe absent, trop peu d'images clés) ou échoue: l'appelant encode alors
+en une passe.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+from . import video_enhance as _ve
+from .encode_progress import ProgressCallback, ProgressTracker
+from .resource_governor import current_priority, get_governor
+from .worker_metrics import observe as _metric_observe
+
+DEFAULT_SEGMENT_SECONDS = 120.0
+# Sous cette durée (s), le découpage coûte plus qu'il ne rapporte
+DEFAULT_MIN_DURATION = 300.0
+# Threads qu'un encodeur logiciel exploite bien à lui seul (libx265, libaom)
+THREADS_PER_ENCODE = 4
+# Écart de durée toléré entre source et sortie: max(absolu, relatif)
+DURATION_TOLERANCE = (0.5, 0.005)
+
+
+def _ffprobe(args: List[str], timeout: float) -> Optional[str]:
+    if not shutil.which("ffprobe"):
+        return None
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error"] + args,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+
+def probe_duration(path: Path) -> Optional[float]:
+    """Durée du conteneur en secondes, None si inconnue."""
+    out = _ffprobe(
+        [
+            "-show_entries",
+            "format=duration",
+            "-of",
+            "default=noprint_wrappers=1:nokey=1",
+            str(path),
+        ],
+        timeout=30,
+    )
+    try:
+        return float((out or "").strip())
+    except ValueError:
+        return None
+
+
+def probe_keyframes(path: Path) -> List[float]:
+    """Instants (s) des images clés de la première piste vidéo.
+
+    `-skip_frame nokey` ne décode que les images clés: rapide même sur un
+    long fichier.
+    """
+    out = _ffprobe(
+        [
+            "-select_streams",
+            "v:0",
+            "-skip_frame",
+            "nokey",
+            "-show_entries",
+            "frame=pts_time",
+            "-of",
+            "csv=p=0",
+            str(path),
+        ],
+        timeout=300,
+    )
+    times = []
+    for line in (out or "").splitlines():
+        try:
+            times.append(float(line.strip().strip(",")))
+        except ValueError:
+            continue
+    return sorted(times)
+
+
+def plan_segments(
+    duration: float, keyframes: List[float], segment_seconds: float
+) -> List[float]:
+    """Points de coupe: première image clé après chaque multiple de segment_seconds.
+
+    Le dernier segment n'est jamais plus court que la moitié de segment_seconds
+    (il est fusionné avec le précédent).
+    """
+    cuts: List[float] = []
+    target = segment_seconds
+    for kf in keyframes:
+        if kf < target or kf <= 0:
+            continue
+        if duration - kf < segment_seconds / 2:
+            break
+        cuts.append(kf)
+        target = kf + segment_seconds
+    return cuts
+
+
+def default_workers() -> int:
+    return max(2, (os.cpu_count() or 2) // THREADS_PER_ENCODE)
+
+
+def _duration_matches(expected: float, actual: Optional[float]) -> bool:
+    if actual is None:
+        return False
+    absolute, relative = DURATION_TOLERANCE
+    return abs(actual - expected) <= max(absolute, relative * expected)
+
+
+def _concat_line(path: Path) -> str:
+    escaped = str(path.resolve()).replace("'", "'\\''")
+    return f"file '{escaped}'\n"
+
+
+def encode_chunked(
+    in_path: Path,
+    out_path: Path,
+    args: List[str],
+    *,
+    workers: Optional[int] = None,
+    segment_seconds: float = DEFAULT_SEGMENT_SECONDS,
+    min_duration: float = DEFAULT_MIN_DURATION,
+    log: Optional[logging.Logger] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> bool:
+    """Encode `in_path` vers `out_path` par segments parallèles.
+
+    Args:
+        args: Arguments d'encodage (build_ffmpeg_args), identiques en une passe
+        progress: Reçoit la progression cumulée de tous les segments
+
+    Returns:
+        True si la sortie est produite et vérifiée, False pour repasser en une passe
+    """
+    log = log or logging.getLogger("video_enhance")
+    duration = probe_duration(in_path)
+    if duration is None or duration < max(min_duration, 2 * segment_seconds):
+        log.info("Encodage segmenté ignoré (clip court ou durée inconnue)")
+        return False
+    cuts = plan_segments(duration, probe_keyframes(in_path), segment_seconds)
+    if not cuts:
+        log.info("Encodage segmenté ignoré (pas d'image clé exploitable)")
+        return False
+
+    video_args, audio_args = _ve.split_stream_args(args)
+    tag = []
+    if "-tag:v" in video_args:
+        i = video_args.index("-tag:v")
+        tag = video_args[i : i + 2]
+    workers = max(1, int(workers or default_workers()))
+    governor = get_governor()
+    # Les segments tournent dans d'autres threads: priorité de l'appelant
+    priority = current_priority()
+    work_dir = Path(tempfile.mkdtemp(prefix=".chunks-", dir=out_path.parent))
+    started = time.monotonic()
+    try:
+        # 1. Découpage aux images clés (copie de flux); léger retrait pour que
+        # l'arrondi de ffprobe ne repousse pas la coupe à l'image clé suivante
+        with governor.acquire(1, label="découpage"):
+            _ve._run_ffmpeg(
+                [
+                    "ffmpeg",
+                    "-y",
+                    "-hide_banner",
+                    "-i",
+                    str(in_path),
+                    "-map",
+                    "0:v:0",
+                    "-c",
+                    "copy",
+                    "-an",
+                    "-f",
+                    "segment",
+                    "-segment_times",
+                    ",".join(f"{max(0.0, t - 0.001):.3f}" for t in cuts),
+                    "-reset_timestamps",
+                    "1",
+                    str(work_dir / "src_%05d.mkv"),
+                ],
+                log,
+                record_speed=False,
+            )
+        sources = sorted(work_dir.glob("src_*.mkv"))
+        if len(sources) < 2:
+            log.warning("Découpage en segments inattendu (%d segment)", len(sources))
+            return False
+
+        # 2. Encodage parallèle: un processus ffmpeg par segment
+        log.info(
+            "Encodage segmenté: %d segments, %d en parallèle", len(sources), workers
+        )
+        encoded = [work_dir / f"enc_{i:05d}.mp4" for i in range(len(sources))]
+        overall = ProgressTracker(duration, label=f"{len(sources)} segments")
+        seg_seconds = [0.0] * len(sources)
+        seg_frames = [0] * len(sources)
+        progress_lock = threading.Lock()
+
+        def _segment_progress(i: int, event: dict) -> None:
+            with progress_lock:
+                seg_seconds[i] = event.get("out_seconds") or seg_seconds[i]
+                seg_frames[i] = event.get("frame") or seg_frames[i]
+                block = {
+                    "out_time_us": str(int(sum(seg_seconds) * 1e6)),
+                    "frame": str(sum(seg_frames)),
+                }
+                progress(overall.event(block))
+
+        def _encode(i: int) -> None:
+            label = f"segment {i + 1}/{len(sources)}"
+            with governor.acquire(THREADS_PER_ENCODE, priority=priority, label=label):
+                _ve._run_ffmpeg(
+                    ["ffmpeg", "-y", "-hide_banner", "-i", str(sources[i])]
+                    + video_args
+                    + ["-an", str(encoded[i])],
+                    log,
+                    record_speed=False,
+                    label=label,
+                    progress=(
+                        (lambda event: _segment_progress(i, event))
+                        if progress
+                        else None
+                    ),
+                )
+
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="encode"
+        ) as pool:
+            futures = [pool.submit(_encode, i) for i in range(len(sources))]
+            try:
+                for fut in futures:
+                    fut.result()
+            except BaseException:
+                for fut in futures:
+                    fut.cancel()
+                raise
+
+        # 3. Concaténation sans perte + audio de la source en une passe
+        list_file = work_dir / "segments.txt"
+        list_file.write_text(
+            "".join(_concat_line(p) for p in encoded), encoding="utf-8"
+        )
+        with governor.acquire(1, label="concaténation"):
+            _ve._run_ffmpeg(
+                [
+                    "ffmpeg",
+                    "-y",
+                    "-hide_banner",
+                    "-f",
+                    "concat",
+                    "-safe",
+                    "0",
+                    "-i",
+                    str(list_file),
+                    "-i",
+                    str(in_path),
+                    "-map",
+                    "0:v:0",
+                    "-map",
+                    "1:a:0?",
+                    "-c:v",
+                    "copy",
+                ]
+                + tag
+                + audio_args
+                + ["-movflags", "+faststart", str(out_path)],
+                log,
+                record_speed=False,
+            )
+
+        # 4. Vérification de la durée
+        out_duration = probe_duration(out_path)
+        if not _duration_matches(duration, out_duration):
+            log.warning(
+                "Durée de la sortie segmentée incorrecte (%.2fs au lieu de %.2fs)",
+                out_duration or 0.0,
+                duration,
+            )
+            return False
+    except _ve.EnhanceError as e:
+        log.warning("Encodage segmenté en échec: %s", e)
+        return False
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    elapsed = time.monotonic() - started
+    if elapsed > 0:
+        _metric_observe("encode_speed_ratio", duration / elapsed)
+    log.info(
+        "Encodage segmenté terminé en %.1fs (x%.2f temps réel)",
+        elapsed,
+        duration / max(elapsed, 1e-6),
+    )
+    return True
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import copy
 import json
+import os
+import threading
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import yaml
 
@@ -11,6 +15,98 @@ class ConfigError(Exception):
     pass
 
 
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """Vue figée d'un fichier de configuration: brute et normalisée.
+
+    `config` vaut None (et `error` est renseigné) si la normalisation a échoué:
+    la vue brute reste utilisable (ex: blocs seo/notifications).
+    """
+
+    path: Path
+    mtime_ns: int
+    inode: int
+    size: int
+    raw: Dict[str, Any]
+    config: Optional[Dict[str, Any]]
+    error: Optional[str] = None
+
+
+_snapshots: Dict[Path, ConfigSnapshot] = {}
+_snapshots_lock = threading.Lock()
+
+
+def _read_raw(p: Path) -> Dict[str, Any]:
+    if p.suffix.lower() in {".yaml", ".yml"}:
+        return yaml.safe_load(p.read_text(encoding="utf-8")) or {}
+    if p.suffix.lower() == ".json":
+        return json.loads(p.read_text(encoding="utf-8"))
+    raise ConfigError(
+        "Extension de configuration non supportée (utilisez .yaml/.yml ou .json)"
+    )
+
+
+def get_config_snapshot(path: str | Path) -> ConfigSnapshot:
+    """Snapshot partagé par tout le processus, relu seulement si le fichier change.
+
+    Le fichier est identifié par (mtime_ns, inode, taille): un remplacement
+    atomique (nouvel inode) ou une réécriture en place invalident le cache.
+    """
+    p = Path(path)
+    try:
+        st = os.stat(p)
+    except OSError:
+        raise ConfigError(f"Fichier de configuration introuvable: {p}")
+    key = p.resolve()
+    snap = _snapshots.get(key)
+    if snap is not None and (snap.mtime_ns, snap.inode, snap.size) == (
+        st.st_mtime_ns,
+        st.st_ino,
+        st.st_size,
+    ):
+        return snap
+    with _snapshots_lock:
+        snap = _snapshots.get(key)
+        if snap is not None and (snap.mtime_ns, snap.inode, snap.size) == (
+            st.st_mtime_ns,
+            st.st_ino,
+            st.st_size,
+        ):
+            return snap
+        raw = _read_raw(p)
+        config: Optional[Dict[str, Any]] = None
+        error: Optional[str] = None
+        if isinstance(raw, dict):
+            try:
+                config = _normalize(raw)
+            except ConfigError as e:
+                error = str(e)
+        else:
+            error = "La configuration doit être un objet/dict"
+        snap = ConfigSnapshot(
+            path=key,
+            mtime_ns=st.st_mtime_ns,
+            inode=st.st_ino,
+            size=st.st_size,
+            raw=raw,
+            config=config,
+            error=error,
+        )
+        _snapshots[key] = snap
+        return snap
+
+
+def clear_config_cache() -> None:
+    """Oublie tous les snapshots (tests, rechargement forcé)."""
+    with _snapshots_lock:
+        _snapshots.clear()
+
+
+def load_raw_config(path: str | Path) -> Any:
+    """Contenu brut (YAML/JSON) du fichier, copie modifiable du snapshot."""
+    return copy.deepcopy(get_config_snapshot(path).raw)
+
+
 def load_config(path: str | Path) -> Dict[str, Any]:
     """
     Charge une configuration YAML/JSON et normalise les clés attendues.
@@ -26,21 +122,17 @@ def load_config(path: str | Path) -> Dict[str, Any]:
       - publish_at (str | None)  # RFC3339 UTC (ex: 2025-08-31T12:00:00Z)
       - made_for_kids (bool | None)
       - enhance (dict | None)  # paramètres d'amélioration qualité ffmpeg
+
+    Le fichier n'est analysé qu'une fois tant qu'il ne change pas (voir
+    get_config_snapshot); chaque appel renvoie une copie indépendante.
     """
-    p = Path(path)
-    if not p.exists():
-        raise ConfigError(f"Fichier de configuration introuvable: {p}")
+    snap = get_config_snapshot(path)
+    if snap.config is None:
+        raise ConfigError(snap.error or "Configuration invalide")
+    return copy.deepcopy(snap.config)
 
-    raw: Dict[str, Any]
-    if p.suffix.lower() in {".yaml", ".yml"}:
-        raw = yaml.safe_load(p.read_text(encoding="utf-8")) or {}
-    elif p.suffix.lower() == ".json":
-        raw = json.loads(p.read_text(encoding="utf-8"))
-    else:
-        raise ConfigError(
-            "Extension de configuration non supportée (utilisez .yaml/.yml ou .json)"
-        )
 
+def _normalize(raw: Dict[str, Any]) -> Dict[str, Any]:
     # Alias possibles (français et API)
     def take(*keys, default=None):
         for k in keys:
@@ -98,6 +190,12 @@ def load_config(path: str | Path) -> Dict[str, Any]:
             "preset",
             "reencode_audio",
             "audio_bitrate",
+            "cache",
+            "chunked",
+            "fast_path",
+            "crf_auto",
+            "renditions",
+            "bench_profile",
         }
         enhance_cfg = {}
         for k, v in enh_raw.items():
@@ -135,8 +233,16 @@ def load_config(path: str | Path) -> Dict[str, Any]:
             isinstance(enhance_cfg["fps"], (int, float)) or enhance_cfg["fps"] is None
         ):
             raise ConfigError("'enhance.fps' doit être un nombre")
-        if "crf" in enhance_cfg and not isinstance(enhance_cfg["crf"], int):
-            raise ConfigError("'enhance.crf' doit être un entier")
+        if "crf" in enhance_cfg and not (
+            isinstance(enhance_cfg["crf"], int) or enhance_cfg["crf"] == "auto"
+        ):
+            raise ConfigError("'enhance.crf' doit être un entier ou 'auto'")
+        if "crf_auto" in enhance_cfg:
+            crf_auto = enhance_cfg["crf_auto"]
+            if not isinstance(crf_auto, dict):
+                raise ConfigError("'enhance.crf_auto' doit être un objet/dict")
+            if crf_auto.get("metric", "ssim") not in ("ssim", "psnr"):
+                raise ConfigError("'enhance.crf_auto.metric' doit être ssim ou psnr")
         if "loudnorm" in enhance_cfg and not isinstance(enhance_cfg["loudnorm"], bool):
             raise ConfigError("'enhance.loudnorm' doit être booléen")
         if "deband" in enhance_cfg and not isinstance(enhance_cfg["deband"], bool):
@@ -155,6 +261,32 @@ def load_config(path: str | Path) -> Dict[str, Any]:
             enhance_cfg["saturation"], (int, float)
         ):
             raise ConfigError("'enhance.saturation' doit être un nombre (ex: 1.12)")
+        if "cache" in enhance_cfg and not isinstance(enhance_cfg["cache"], dict):
+            raise ConfigError("'enhance.cache' doit être un objet/dict")
+        if "fast_path" in enhance_cfg and not isinstance(
+            enhance_cfg["fast_path"], bool
+        ):
+            raise ConfigError("'enhance.fast_path' doit être booléen")
+        if "chunked" in enhance_cfg and not isinstance(enhance_cfg["chunked"], dict):
+            raise ConfigError("'enhance.chunked' doit être un objet/dict")
+        if "bench_profile" in enhance_cfg and not isinstance(
+            enhance_cfg["bench_profile"], str
+        ):
+            raise ConfigError(
+                "'enhance.bench_profile' doit être une chaîne (chemin du profil)"
+            )
+        if "renditions" in enhance_cfg:
+            renditions = enhance_cfg["renditions"]
+            if not isinstance(renditions, list) or not all(
+                isinstance(r, dict) and isinstance(r.get("name"), str) and r["name"]
+                for r in renditions
+            ):
+                raise ConfigError(
+                    "'enhance.renditions' doit être une liste d'objets avec un 'name'"
+                )
+            names = [r["name"] for r in renditions]
+            if len(set(names)) != len(names):
+                raise ConfigError("'enhance.renditions': noms dupliqués")
         # Pas d'autre validation stricte ici pour rester flexible
 
     cfg["enhance"] = enhance_cfg
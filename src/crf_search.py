@@ -0,0 +1,323 @@
+"""
+Choix du CRF par contenu (`crf: auto`).
+
+Quelques extraits courts de la source sont encodés à des CRF candidats avec la
+même chaîne de filtres, puis comparés à la source filtrée avec les filtres
+ffmpeg `ssim` ou `psnr`. Le CRF retenu est le plus élevé (le moins coûteux)
+dont le plus mauvais extrait atteint la qualité cible; la qualité décroissant
+avec le CRF, la recherche est dichotomique.
+
+Le résultat est mis en cache par empreinte de source et réglages d'encodage.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: verrou entre threads seulement
+    fcntl = None
+
+from . import video_enhance as _ve
+from .artifact_cache import cache_key, fast_file_hash
+from .chunked_encode import probe_duration
+from .queue_events import write_json_atomic
+from .resource_governor import get_governor
+
+log = logging.getLogger("video_enhance")
+
+DEFAULT_CACHE_FILE = "cache/crf_auto.json"
+DEFAULT_SAMPLES = 3
+DEFAULT_SAMPLE_SECONDS = 4.0
+# Qualité minimale par métrique (SSIM global, PSNR moyen en dB)
+DEFAULT_TARGETS = {"ssim": 0.985, "psnr": 42.0}
+# CRF candidats et CRF de repli (analyse impossible) par codec
+CANDIDATES = {
+    "h264": (30, 28, 26, 24, 22, 20, 18),
+    "hevc": (32, 30, 28, 26, 24, 22, 20),
+    "vp9": (44, 40, 36, 32, 28, 24),
+    "av1": (44, 40, 36, 32, 28, 24),
+}
+FALLBACK_CRF = {"h264": 20, "hevc": 22, "vp9": 32, "av1": 32}
+
+# Partagé par toutes les instances: select_crf crée un CrfCache par appel
+_CACHE_LOCK = threading.Lock()
+
+_SCORE_RE = {
+    "ssim": re.compile(r"SSIM .*All:([\d.]+)"),
+    "psnr": re.compile(r"PSNR .*average:([\d.]+|inf)"),
+}
+
+
+class CrfCache:
+    """Résultats de recherche persistés dans un fichier JSON (clé -> résultat).
+
+    Les écritures relisent le fichier sous verrou (threads et processus).
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_CACHE_FILE):
+        self.path = Path(path)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with _CACHE_LOCK:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            lock_path = self.path.with_name(self.path.name + ".lock")
+            with open(lock_path, "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                yield
+
+    def _load(self) -> Dict[str, dict]:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8")) or {}
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key: str) -> Optional[dict]:
+        # Remplacement atomique du fichier: lecture sans verrou
+        entry = self._load().get(key)
+        return entry if isinstance(entry, dict) else None
+
+    def put(self, key: str, result: dict) -> None:
+        with self._locked():
+            data = self._load()
+            data[key] = result
+            write_json_atomic(self.path, data)
+
+
+def sample_starts(
+    duration: float,
+    count: int = DEFAULT_SAMPLES,
+    length: float = DEFAULT_SAMPLE_SECONDS,
+) -> List[float]:
+    """Débuts d'extraits répartis au milieu de segments égaux (évite générique/fin)."""
+    if duration <= length:
+        return [0.0]
+    count = max(1, min(int(count), int(duration // length)))
+    step = duration / count
+    return [round(max(0.0, step * (i + 0.5) - length / 2), 3) for i in range(count)]
+
+
+def parse_score(metric: str, stderr: str) -> Optional[float]:
+    """Score global du filtre ssim/psnr dans la sortie ffmpeg."""
+    m = None
+    for m in _SCORE_RE[metric].finditer(stderr or ""):
+        pass
+    if m is None:
+        return None
+    value = m.group(1)
+    return float("inf") if value == "inf" else float(value)
+
+
+def pick_crf(
+    candidates: List[int], score: Callable[[int], Optional[float]], target: float
+) -> tuple:
+    """Recherche dichotomique du CRF le plus élevé atteignant `target`.
+
+    Returns:
+        (crf, score du crf retenu, {crf: score mesuré})
+    """
+    ordered = sorted(set(int(c) for c in candidates))
+    scores: Dict[int, Optional[float]] = {}
+    lo, hi = 0, len(ordered) - 1
+    best = None
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        crf = ordered[mid]
+        scores[crf] = score(crf)
+        if scores[crf] is not None and scores[crf] >= target:
+            best = crf
+            lo = mid + 1
+        else:
+            hi = mid - 1
+    if best is None:
+        # Même le meilleur candidat n'atteint pas la cible: qualité maximale
+        best = ordered[0]
+        if best not in scores:
+            scores[best] = score(best)
+    return best, scores.get(best), scores
+
+
+def _score_sample(
+    metric: str,
+    encoded: Path,
+    source: Path,
+    start: float,
+    length: float,
+    vf: Optional[str],
+) -> Optional[float]:
+    ref = f"[1:v]{vf + ',' if vf else ''}format=yuv420p,setpts=PTS-STARTPTS[ref]"
+    graph = f"[0:v]format=yuv420p,setpts=PTS-STARTPTS[enc];{ref};[enc][ref]{metric}"
+    cmd = [
+        "ffmpeg",
+        "-hide_banner",
+        "-nostats",
+        "-i",
+        str(encoded),
+        "-ss",
+        f"{start:.3f}",
+        "-t",
+        f"{length:.3f}",
+        "-i",
+        str(source),
+        "-lavfi",
+        graph,
+        "-f",
+        "null",
+        "-",
+    ]
+    try:
+        with get_governor().acquire(label=f"score {metric}") as lease:
+            result = subprocess.run(
+                lease.ffmpeg_command(cmd),
+                capture_output=True,
+                text=True,
+                timeout=600,
+            )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return parse_score(metric, result.stderr) if result.returncode == 0 else None
+
+
+def select_crf(
+    in_path: Path,
+    encode_opts: dict,
+    settings: Optional[dict] = None,
+    *,
+    work_dir: Optional[Path] = None,
+) -> int:
+    """CRF retenu pour `in_path` avec les réglages `encode_opts` de enhance_video.
+
+    Args:
+        settings: Bloc `enhance.crf_auto` (metric, target, samples,
+            sample_seconds, candidates, cache_file)
+        work_dir: Répertoire des extraits temporaires (défaut: celui de la source)
+    """
+    settings = dict(settings or {})
+    codec = (encode_opts.get("codec") or "h264").lower()
+    metric = str(settings.get("metric") or "ssim").lower()
+    if metric not in _SCORE_RE:
+        raise _ve.EnhanceError(f"Métrique crf_auto inconnue: {metric}")
+    target = float(settings.get("target") or DEFAULT_TARGETS[metric])
+    count = int(settings.get("samples") or DEFAULT_SAMPLES)
+    length = float(settings.get("sample_seconds") or DEFAULT_SAMPLE_SECONDS)
+    candidates = list(settings.get("candidates") or CANDIDATES.get(codec, ()))
+    fallback = FALLBACK_CRF.get(codec, 20)
+
+    base_opts = dict(encode_opts, crf="auto", reencode_audio=False, loudnorm=False)
+    key_args = _ve.build_ffmpeg_args(**base_opts)
+    cache = CrfCache(settings.get("cache_file") or DEFAULT_CACHE_FILE)
+    key = None
+    try:
+        key = cache_key(
+            fast_file_hash(in_path),
+            ["crf-auto", metric, str(target), str(count), str(length)]
+            + [str(c) for c in candidates]
+            + key_args,
+        )
+        cached = cache.get(key)
+    except OSError as e:
+        log.warning("Cache crf_auto indisponible: %s", e)
+        cached = None
+    if cached and "crf" in cached:
+        log.info(
+            "CRF auto (cache): %s (%s=%s)", cached["crf"], metric, cached.get("score")
+        )
+        return int(cached["crf"])
+
+    duration = probe_duration(in_path)
+    if not candidates or duration is None or not shutil.which("ffmpeg"):
+        log.warning(
+            "CRF auto impossible (durée inconnue ou ffmpeg absent): CRF %d", fallback
+        )
+        return fallback
+
+    starts = sample_starts(duration, count, length)
+    vf = key_args[key_args.index("-vf") + 1] if "-vf" in key_args else None
+    tmp = Path(tempfile.mkdtemp(prefix=".crf-", dir=work_dir or in_path.parent))
+    started = time.monotonic()
+
+    def score(crf: int) -> Optional[float]:
+        video_args = _ve.split_stream_args(
+            _ve.build_ffmpeg_args(**dict(base_opts, crf=crf))
+        )[0]
+        worst = None
+        for i, start in enumerate(starts):
+            sample = tmp / f"crf{crf}_{i}.mp4"
+            _ve._run_ffmpeg(
+                [
+                    "ffmpeg",
+                    "-y",
+                    "-hide_banner",
+                    "-ss",
+                    f"{start:.3f}",
+                    "-t",
+                    f"{length:.3f}",
+                    "-i",
+                    str(in_path),
+                    "-map",
+                    "0:v:0",
+                ]
+                + video_args
+                + ["-an", str(sample)],
+                log,
+                label=f"crf {crf} extrait {i + 1}/{len(starts)}",
+                record_speed=False,
+            )
+            value = _score_sample(metric, sample, in_path, start, length, vf)
+            if value is None:
+                return None
+            worst = value if worst is None else min(worst, value)
+        log.debug("CRF %d: %s=%.4f", crf, metric, worst)
+        return worst
+
+    try:
+        crf, best_score, scores = pick_crf(candidates, score, target)
+    except _ve.EnhanceError as e:
+        log.warning("CRF auto en échec (%s): CRF %d", e, fallback)
+        return fallback
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if all(value is None for value in scores.values()):
+        # Notation impossible (filtre ssim/psnr en échec): ni choix ni cache
+        log.warning("CRF auto: aucun extrait noté, CRF %d", fallback)
+        return fallback
+
+    log.info(
+        "CRF auto: %d (%s=%s, cible %s, %d essais en %.1fs)",
+        crf,
+        metric,
+        best_score,
+        target,
+        len(scores),
+        time.monotonic() - started,
+    )
+    if key is not None:
+        try:
+            cache.put(
+                key,
+                {
+                    "crf": crf,
+                    "score": best_score,
+                    "metric": metric,
+                    "scores": {str(k): v for k, v in scores.items()},
+                    "source": str(in_path),
+                    "created": time.time(),
+                },
+            )
+        except OSError as e:
+            log.warning("Impossible d'enregistrer le CRF auto: %s", e)
+    return crf
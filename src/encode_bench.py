@@ -0,0 +1,355 @@
+"""
+Calibration de l'hôte pour l'encodage (`main.py enhance-bench`).
+
+Le coût des presets (ultrafast…slow) et des filtres d'amélioration (hqdn3d,
+unsharp, gradfun, deblock, scale lanczos…) varie fortement d'une machine à
+l'autre. Le banc d'essai génère un clip synthétique (`testsrc2`), puis mesure
+sur cette machine:
+
+- le décodage seul (référence)
+- chaque filtre seul, sortie `-f null`
+- chaque couple codec/preset sans filtre
+
+Le profil stocke les fps mesurés. Le coût d'une combinaison est estimé par
+addition des coûts par image au-delà du décodage (mesurer tout le produit
+cartésien prendrait des heures), proportionnellement au nombre de pixels.
+Le worker s'en sert pour choisir un preset qui tient l'échéance d'une tâche.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import platform
+import shutil
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from . import video_enhance as _ve
+from .queue_events import write_json_atomic
+
+log = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_PATH = "cache/enhance_bench.json"
+BENCH_SIZE = (1920, 1080)
+BENCH_FPS = 30
+BENCH_SECONDS = 5.0
+DEFAULT_CODECS = ("h264", "hevc")
+# Du plus rapide au plus lent
+PRESET_ORDER = (
+    "ultrafast",
+    "superfast",
+    "veryfast",
+    "faster",
+    "fast",
+    "medium",
+    "slow",
+    "slower",
+    "veryslow",
+)
+DEFAULT_PRESETS = ("ultrafast", "veryfast", "fast", "medium", "slow")
+# Options de enhance_video mesurées; scale = agrandissement lanczos x2
+FILTER_OPTIONS = (
+    "deinterlace",
+    "denoise",
+    "deband",
+    "deblock",
+    "sharpen",
+    "color_fix",
+    "scale",
+)
+BENCH_SCALE_FACTOR = 2
+
+
+def synthetic_clip_command(
+    path: Path,
+    *,
+    seconds: float = BENCH_SECONDS,
+    size: Sequence[int] = BENCH_SIZE,
+    fps: int = BENCH_FPS,
+) -> List[str]:
+    """Clip testsrc2 quasi sans perte (le décodage reste représentatif du H.264)."""
+    width, height = size
+    return [
+        "ffmpeg",
+        "-y",
+        "-hide_banner",
+        "-f",
+        "lavfi",
+        "-i",
+        f"testsrc2=size={width}x{height}:rate={fps}",
+        "-t",
+        f"{seconds:g}",
+        "-c:v",
+        "libx264",
+        "-preset",
+        "ultrafast",
+        "-crf",
+        "10",
+        "-pix_fmt",
+        "yuv420p",
+        str(path),
+    ]
+
+
+_NO_FILTERS = dict(
+    deinterlace=False,
+    crop=None,
+    scale=None,
+    denoise=False,
+    deband=False,
+    deblock=False,
+    sharpen=False,
+    sharpen_amount=None,
+    contrast=None,
+    saturation=None,
+    color_fix=False,
+    fps=None,
+)
+
+
+def filter_chain(option: str, height: int = BENCH_SIZE[1]) -> str:
+    """Chaîne -vf qu'enhance_video produit pour une option seule."""
+    if option == "scale":
+        opts = {"scale": f"{height * BENCH_SCALE_FACTOR}p"}
+    else:
+        opts = {option: True}
+    return ",".join(_ve._video_filters(**{**_NO_FILTERS, **opts}))
+
+
+def encoder_args(codec: str, preset: str) -> List[str]:
+    """Arguments vidéo d'encodage (sans filtre ni audio) d'un couple codec/preset."""
+    video, _ = _ve.split_stream_args(_ve.build_ffmpeg_args(codec=codec, preset=preset))
+    return video
+
+
+def _pixels_ratio(height: Optional[int], reference: int) -> float:
+    # Largeur proportionnelle à la hauteur (même format d'image)
+    return (height / reference) ** 2 if height else 1.0
+
+
+@dataclass
+class CalibrationProfile:
+    """Débits mesurés (images/s) sur cet hôte, à la résolution du banc."""
+
+    width: int
+    height: int
+    decode_fps: float
+    encoders: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    filters: Dict[str, float] = field(default_factory=dict)
+    host: Dict[str, object] = field(default_factory=dict)
+    created_at: str = ""
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CalibrationProfile":
+        return cls(
+            width=int(data["width"]),
+            height=int(data["height"]),
+            decode_fps=float(data["decode_fps"]),
+            encoders={
+                codec: {p: float(v) for p, v in (presets or {}).items()}
+                for codec, presets in (data.get("encoders") or {}).items()
+            },
+            filters={k: float(v) for k, v in (data.get("filters") or {}).items()},
+            host=dict(data.get("host") or {}),
+            created_at=str(data.get("created_at") or ""),
+        )
+
+    def _extra_cost(self, fps: float) -> float:
+        """Secondes par image au-delà du décodage."""
+        return max(0.0, 1.0 / fps - 1.0 / self.decode_fps)
+
+    def estimate_fps(
+        self,
+        codec: str,
+        preset: str,
+        *,
+        filters: Iterable[str] = (),
+        in_height: Optional[int] = None,
+        out_height: Optional[int] = None,
+    ) -> Optional[float]:
+        """Débit estimé d'un encodage complet, None si le couple n'est pas mesuré.
+
+        Le décodage suit les pixels de la source; encodeur et filtres (placés
+        après le scale dans la chaîne) suivent les pixels de sortie.
+        """
+        fps = (self.encoders.get(codec) or {}).get(preset)
+        if not fps:
+            return None
+        out_height = out_height or in_height
+        per_frame = (1.0 / self.decode_fps) * _pixels_ratio(in_height, self.height)
+        extra = self._extra_cost(fps)
+        for name in filters:
+            measured = self.filters.get(name)
+            if not measured:
+                continue
+            cost = self._extra_cost(measured)
+            if name == "scale":
+                # Mesuré en sortie x BENCH_SCALE_FACTOR: ramené aux pixels du banc
+                cost /= BENCH_SCALE_FACTOR**2
+            extra += cost
+        per_frame += extra * _pixels_ratio(out_height, self.height)
+        return 1.0 / per_frame
+
+    def estimate_seconds(
+        self,
+        codec: str,
+        preset: str,
+        *,
+        duration: float,
+        source_fps: Optional[float] = None,
+        **kwargs,
+    ) -> Optional[float]:
+        """Durée d'encodage estimée (s) d'une vidéo de `duration` secondes."""
+        fps = self.estimate_fps(codec, preset, **kwargs)
+        if not fps:
+            return None
+        return duration * (source_fps or BENCH_FPS) / fps
+
+    def preset_for_deadline(
+        self,
+        codec: str,
+        preset: str,
+        *,
+        budget_seconds: float,
+        duration: float,
+        source_fps: Optional[float] = None,
+        **kwargs,
+    ) -> str:
+        """Preset configuré s'il tient le budget, sinon le plus lent qui le tient.
+
+        Jamais plus lent que le preset configuré; si aucun preset mesuré ne
+        tient le budget, le plus rapide.
+        """
+        measured = self.encoders.get(codec) or {}
+        if preset not in PRESET_ORDER or preset not in measured:
+            # Coût du preset configuré inconnu: pas de dégradation à l'aveugle
+            return preset
+        faster = list(reversed(PRESET_ORDER[: PRESET_ORDER.index(preset) + 1]))
+        candidates = [p for p in faster if p in measured]
+        for candidate in candidates:
+            seconds = self.estimate_seconds(
+                codec, candidate, duration=duration, source_fps=source_fps, **kwargs
+            )
+            if seconds is not None and seconds <= budget_seconds:
+                return candidate
+        return candidates[-1] if candidates else preset
+
+
+def load_profile(
+    path: str | Path = DEFAULT_PROFILE_PATH,
+) -> Optional[CalibrationProfile]:
+    """Profil de calibration, None s'il est absent ou illisible."""
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        return CalibrationProfile.from_dict(data)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        log.warning("Profil de calibration illisible (%s): %s", path, e)
+        return None
+
+
+def save_profile(
+    profile: CalibrationProfile, path: str | Path = DEFAULT_PROFILE_PATH
+) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_json_atomic(path, profile.to_dict())
+    return path
+
+
+def _measure(cmd: List[str], frames: int, label: str) -> float:
+    """Débit (images/s) d'une commande ffmpeg sur le clip du banc."""
+    started = time.monotonic()
+    _ve._run_ffmpeg(cmd, log, label=label, record_speed=False)
+    elapsed = max(1e-6, time.monotonic() - started)
+    fps = frames / elapsed
+    log.info("Banc %s: %.1f fps", label, fps)
+    return round(fps, 2)
+
+
+def run_bench(
+    *,
+    codecs: Sequence[str] = DEFAULT_CODECS,
+    presets: Sequence[str] = DEFAULT_PRESETS,
+    filters: Sequence[str] = FILTER_OPTIONS,
+    seconds: float = BENCH_SECONDS,
+    size: Sequence[int] = BENCH_SIZE,
+    fps: int = BENCH_FPS,
+    work_dir: Optional[str | Path] = None,
+) -> CalibrationProfile:
+    """Mesure décodage, filtres et encodeurs sur un clip synthétique.
+
+    Raises:
+        EnhanceError: ffmpeg absent ou génération du clip en échec (une mesure
+            isolée en échec est seulement ignorée)
+    """
+    if not shutil.which("ffmpeg"):
+        raise _ve.EnhanceError("ffmpeg introuvable dans le PATH")
+    width, height = size
+    frames = max(1, int(round(seconds * fps)))
+    tmp = Path(tempfile.mkdtemp(prefix=".bench-", dir=work_dir))
+    try:
+        clip = tmp / "testsrc2.mp4"
+        _ve._run_ffmpeg(
+            synthetic_clip_command(clip, seconds=seconds, size=size, fps=fps),
+            log,
+            label="clip de test",
+            record_speed=False,
+        )
+        head = ["ffmpeg", "-y", "-hide_banner", "-i", str(clip), "-an"]
+        null = ["-f", "null", "-"]
+        profile = CalibrationProfile(
+            width=width,
+            height=height,
+            decode_fps=_measure(head + null, frames, "décodage"),
+            host={
+                "name": platform.node(),
+                "machine": platform.machine(),
+                "cpu_count": os.cpu_count(),
+            },
+            created_at=datetime.now(timezone.utc).isoformat(),
+        )
+        for name in filters:
+            try:
+                profile.filters[name] = _measure(
+                    head + ["-vf", filter_chain(name, height)] + null, frames, name
+                )
+            except _ve.EnhanceError as e:
+                log.warning("Filtre %s non mesuré: %s", name, e)
+        for codec in codecs:
+            for preset in presets:
+                label = f"{codec}/{preset}"
+                try:
+                    profile.encoders.setdefault(codec, {})[preset] = _measure(
+                        head + encoder_args(codec, preset) + null, frames, label
+                    )
+                except _ve.EnhanceError as e:
+                    log.warning("Encodeur %s non mesuré: %s", label, e)
+        return profile
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def format_profile(profile: CalibrationProfile) -> str:
+    """Résumé texte du profil (sortie de la commande CLI)."""
+    lines = [
+        f"Calibration {profile.width}x{profile.height} "
+        f"({profile.host.get('cpu_count') or '?'} cœurs): "
+        f"décodage {profile.decode_fps:.1f} fps"
+    ]
+    for name, fps in profile.filters.items():
+        lines.append(f"  filtre {name:<12} {fps:8.1f} fps")
+    for codec, presets in profile.encoders.items():
+        for preset, fps in presets.items():
+            lines.append(f"  {codec:<5} {preset:<14} {fps:8.1f} fps")
+    return "\n".join(lines)
@@ -0,0 +1,200 @@
+"""
+Progression structurée des encodages ffmpeg.
+
+ffmpeg est lancé avec `-progress pipe:1`: des blocs clé=valeur (frame, fps,
+out_time_us, speed, progress=continue|end) arrivent sur stdout. ProgressTracker
+en tire des événements (pourcentage, fps d'encodage, vitesse en multiple du temps
+réel, ETA en temps réel écoulé et non en secondes de média restantes).
+
+Le worker publie ces événements dans `queue/progress/<tâche>.json` (un fichier
+par tâche en cours, réécrit au plus une fois par seconde); le moniteur web et la
+commande Telegram /status les lisent sans toucher au fichier de la tâche.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from .queue_events import write_json_atomic
+
+log = logging.getLogger(__name__)
+
+PROGRESS_DIR = "progress"
+# Au-delà, un fichier de progression est considéré abandonné (worker arrêté)
+STALE_SECONDS = 60.0
+
+ProgressCallback = Callable[[dict], None]
+
+
+def _number(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    value = value.strip().rstrip("x")
+    if not value or value == "N/A":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class ProgressTracker:
+    """Agrège les blocs `-progress` de ffmpeg en événements de progression.
+
+    Args:
+        total_seconds: Durée du média à encoder si connue (sinon lue sur stderr)
+        clock: Horloge monotone (remplaçable en test)
+    """
+
+    def __init__(
+        self,
+        total_seconds: Optional[float] = None,
+        *,
+        label: Optional[str] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.total_seconds = total_seconds
+        self.label = label
+        self.clock = clock
+        self.started = clock()
+        self._block: Dict[str, str] = {}
+
+    def feed(self, line: str) -> Optional[dict]:
+        """Ajoute une ligne clé=valeur; renvoie un événement en fin de bloc."""
+        key, sep, value = line.strip().partition("=")
+        if not sep:
+            return None
+        if key != "progress":
+            self._block[key] = value
+            return None
+        block, self._block = self._block, {}
+        return self.event(block, done=value.strip() == "end")
+
+    def event(self, block: Dict[str, str], *, done: bool = False) -> dict:
+        elapsed = max(1e-6, self.clock() - self.started)
+        out_us = _number(block.get("out_time_us")) or _number(block.get("out_time_ms"))
+        out_seconds = max(0.0, out_us / 1e6) if out_us is not None else None
+        frame = _number(block.get("frame"))
+        fps = _number(block.get("fps"))
+        if not fps and frame:
+            fps = frame / elapsed
+        # Vitesse moyenne depuis le début (plus stable que la valeur instantanée)
+        speed = out_seconds / elapsed if out_seconds else _number(block.get("speed"))
+        total = self.total_seconds
+        percent = eta = None
+        if total and out_seconds is not None:
+            percent = 100.0 if done else max(0.0, min(100.0, out_seconds / total * 100))
+            eta = (
+                0.0
+                if done
+                else (max(0.0, total - out_seconds) / speed if speed else None)
+            )
+        return {
+            "label": self.label,
+            "frame": int(frame) if frame is not None else None,
+            "fps": round(fps, 2) if fps else None,
+            "speed": round(speed, 3) if speed else None,
+            "out_seconds": round(out_seconds, 2) if out_seconds is not None else None,
+            "total_seconds": round(total, 2) if total else None,
+            "percent": round(percent, 1) if percent is not None else None,
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "elapsed_seconds": round(elapsed, 1),
+            "done": done,
+        }
+
+
+def format_progress(event: dict) -> str:
+    """Résumé lisible: '42.0% - x1.80 - 120 fps - fin dans ~3 min'."""
+    parts = []
+    if event.get("percent") is not None:
+        parts.append(f"{event['percent']:.1f}%")
+    if event.get("speed"):
+        parts.append(f"x{event['speed']:.2f}")
+    if event.get("fps"):
+        parts.append(f"{event['fps']:.0f} fps")
+    eta = event.get("eta_seconds")
+    if eta is not None and not event.get("done"):
+        parts.append(
+            f"fin dans ~{eta / 60:.0f} min" if eta >= 90 else f"fin dans ~{eta:.0f}s"
+        )
+    return " - ".join(parts) or "en cours"
+
+
+def progress_path(queue_dir: str | Path, task_name: str) -> Path:
+    return Path(queue_dir) / PROGRESS_DIR / task_name
+
+
+class ProgressPublisher:
+    """Publie les événements d'une tâche dans queue/progress (écriture limitée).
+
+    Utilisable comme callback `progress` de enhance_video; en contexte `with`,
+    le fichier est supprimé à la sortie (encodage terminé ou en échec).
+    """
+
+    def __init__(
+        self,
+        queue_dir: str | Path,
+        task_name: str,
+        *,
+        stage: str = "enhance",
+        interval: float = 1.0,
+    ):
+        self.path = progress_path(queue_dir, task_name)
+        self.task_name = task_name
+        self.stage = stage
+        self.interval = interval
+        self._last = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, event: dict) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if not event.get("done") and now - self._last < self.interval:
+                return
+            self._last = now
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                write_json_atomic(
+                    self.path,
+                    dict(
+                        event,
+                        task=self.task_name,
+                        stage=self.stage,
+                        updated_at=time.time(),
+                    ),
+                )
+            except OSError as e:
+                log.debug("Progression non publiée: %s", e)
+
+    def clear(self) -> None:
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+    def __enter__(self) -> "ProgressPublisher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.clear()
+
+
+def read_progress(
+    queue_dir: str | Path, *, now: Optional[float] = None
+) -> Dict[str, dict]:
+    """Progressions récentes par nom de tâche (fichiers périmés ignorés)."""
+    now = time.time() if now is None else now
+    result: Dict[str, dict] = {}
+    for path in sorted((Path(queue_dir) / PROGRESS_DIR).glob("*.json")):
+        try:
+            event = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if now - float(event.get("updated_at") or 0) <= STALE_SECONDS:
+            result[path.name] = event
+    return result
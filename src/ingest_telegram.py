@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional
 
@@ -22,6 +23,19 @@ from telegram.ext import (
     filters,
 )
 from src.ai_generator import MetaRequest, generate_metadata
+from src.config_loader import load_raw_config
+from src.encode_progress import format_progress, read_progress
+from src.encode_bench import DEFAULT_PROFILE_PATH
+from src.queue_events import write_json_atomic
+from src.scheduler import UploadScheduler
+from src.task_estimator import Estimate, TaskEstimator
+from src.task_lease import locate_task
+from src.video_fingerprint import (
+    INDEX_NAME as FINGERPRINT_INDEX,
+    DuplicateMatch,
+    FingerprintIndex,
+    compute_fingerprint,
+)
 import re
 
 
@@ -35,6 +49,8 @@ class TelegramConfig:
     download_dir: Path
     queue_dir: Path
     filename_pattern: str = "{unix}_{chat}_{orig}"
+    # Détection des vidéos déjà reçues (exactes ou ré-encodées)
+    dedupe: bool = True
 
     @staticmethod
     def from_dict(d: dict) -> "TelegramConfig":
@@ -53,6 +69,7 @@ class TelegramConfig:
             download_dir=dl,
             queue_dir=q,
             filename_pattern=patt,
+            dedupe=bool(d.get("dedupe", True)),
         )
 
 
@@ -63,6 +80,85 @@ def _safe_filename(name: str) -> str:
     return base[:200] if len(base) > 200 else base
 
 
+_fingerprint_indexes: dict[Path, FingerprintIndex] = {}
+
+
+def _fingerprint_index(queue_dir: Path) -> FingerprintIndex:
+    """Index d'empreintes partagé par le bot (chargé une seule fois par file)."""
+    idx = _fingerprint_indexes.get(queue_dir)
+    if idx is None:
+        idx = _fingerprint_indexes[queue_dir] = FingerprintIndex(
+            queue_dir / FINGERPRINT_INDEX
+        )
+    return idx
+
+
+# Planification et archives, à côté de la file (mêmes défauts que le worker)
+SCHEDULE_DIR = "schedule"
+ARCHIVE_DIR = "queue_archive"
+
+
+def _scheduled_status(queue_dir: Path, task_name: str) -> Optional[str]:
+    """Statut de la planification d'une tâche de la file (None si non planifiée)."""
+    path = queue_dir.parent / SCHEDULE_DIR / "scheduled_tasks.json"
+    try:
+        entries = json.loads(path.read_text(encoding="utf-8")) or []
+    except (OSError, ValueError):
+        return None
+    for entry in entries if isinstance(entries, list) else []:
+        if Path(str(entry.get("original_task_path") or "")).name == task_name:
+            return entry.get("status")
+    return None
+
+
+def _match_still_relevant(record: dict, queue_dir: Optional[Path] = None) -> bool:
+    """Un doublon ne compte que si la vidéo a été publiée, est planifiée ou est
+    encore en file.
+
+    La tâche d'origine est cherchée dans la file (et inflight/), dans la
+    planification puis dans les archives (tâche déplacée vers le planning ou
+    terminée sans youtube_id reporté dans l'index).
+    """
+    if record.get("youtube_id"):
+        return True
+    task = record.get("task")
+    if not task:
+        return False
+    task_path = Path(task)
+    queue_dir = Path(queue_dir) if queue_dir is not None else task_path.parent
+    if _scheduled_status(queue_dir, task_path.name) in (
+        "scheduled",
+        "ready",
+        "processing",
+        "completed",
+    ):
+        return True
+    for candidate in (
+        locate_task(task_path),
+        queue_dir.parent / ARCHIVE_DIR / task_path.name,
+    ):
+        try:
+            data = json.loads(candidate.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        return data.get("status") not in ("cancelled", "error", "failed")
+    return False
+
+
+def _duplicate_text(match: DuplicateMatch) -> str:
+    rec = match.record
+    if rec.get("youtube_id"):
+        where = f"déjà publiée: https://youtu.be/{rec['youtube_id']}"
+    else:
+        where = f"déjà en file ({Path(rec.get('task', '')).name})"
+    if match.kind == "exact":
+        return f"♻️ Cette vidéo a déjà été reçue, {where}. Aucune nouvelle tâche créée."
+    return (
+        f"⚠️ Vidéo très proche d'une vidéo {where} "
+        f"(distance {match.distance}). Confirmez seulement s'il ne s'agit pas d'un doublon."
+    )
+
+
 def _reply_menu_keyboard() -> ReplyKeyboardMarkup:
     # Clavier persistant (s'affiche en bas, ne dépend pas du message)
     rows = [
@@ -109,12 +205,25 @@ def _get_last_task(queue_dir: Path, chat_id: int) -> Optional[Path]:
         return None
     try:
         data = json.loads(p.read_text(encoding="utf-8"))
-        t = Path(data.get("task_path", ""))
+        # La tâche peut être en cours de traitement (queue/inflight)
+        t = locate_task(data.get("task_path", ""))
         return t if t.exists() else None
     except Exception:
         return None
 
 
+def _pending_task(queue_dir: Path, chat_id: int) -> Optional[dict]:
+    """Dernière tâche du chat si elle est encore en attente."""
+    taskp = _get_last_task(queue_dir, chat_id)
+    if not taskp:
+        return None
+    try:
+        data = json.loads(taskp.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    return data if data.get("status") == "pending" else None
+
+
 def _extract_hashtags(text: str) -> list[str]:
     tags: list[str] = []
     word = ""
@@ -156,6 +265,63 @@ def _save_prefs(queue_dir: Path, chat_id: int, prefs: dict) -> None:
     )
 
 
+def _preparation_estimate(
+    queue_dir: Path, task: dict, *, config_path: str = "config/video.yaml"
+) -> Optional[Estimate]:
+    """Durée prévue d'encodage + upload d'une tâche (historique du worker)."""
+    try:
+        enhance_cfg = (load_raw_config(config_path) or {}).get("enhance")
+    except Exception:
+        enhance_cfg = None
+    if not isinstance(enhance_cfg, dict):
+        enhance_cfg = None
+    estimator = TaskEstimator.for_queue(
+        queue_dir,
+        profile_path=(enhance_cfg or {}).get("bench_profile") or DEFAULT_PROFILE_PATH,
+    )
+    return estimator.estimate_video(
+        task.get("video_path") or "",
+        enhance_cfg,
+        encode=not task.get("skip_enhance", False),
+    )
+
+
+def schedule_feasibility(
+    queue_dir: Path,
+    task: dict,
+    scheduled_time: Optional[datetime] = None,
+    *,
+    config_path: str = "config/video.yaml",
+) -> str:
+    """Avertissement /schedule selon la préparation prévue de la tâche.
+
+    Heure précise: signale qu'elle sera probablement dépassée (et l'heure au
+    plus tôt); mode auto: indique le prochain créneau tenable. Chaîne vide
+    sans estimation.
+    """
+    estimate = _preparation_estimate(queue_dir, task, config_path=config_path)
+    if estimate is None or estimate.total_seconds <= 0:
+        return ""
+    lead = timedelta(seconds=estimate.total_seconds)
+    if scheduled_time is not None:
+        earliest = datetime.now() + lead
+        if earliest <= scheduled_time:
+            return ""
+        return (
+            f"⚠️ Préparation estimée: {estimate.describe()}. L'heure demandée sera "
+            f"probablement dépassée (prête vers {earliest.strftime('%d/%m/%Y %H:%M')})."
+        )
+    scheduler = UploadScheduler(
+        config_path=Path(config_path),
+        schedule_dir=Path(queue_dir).parent / SCHEDULE_DIR,
+    )
+    slot = scheduler.find_next_optimal_slot(lead_time=lead)
+    return (
+        f"⏱️ Préparation estimée: {estimate.describe()}. "
+        f"Prochain créneau tenable: {slot.strftime('%d/%m/%Y %H:%M')}"
+    )
+
+
 def ai_regenerate_title_tags(
     queue_dir: Path, chat_id: int, *, config_path: str = "config/video.yaml"
 ) -> dict:
@@ -236,7 +402,7 @@ def ai_regenerate_title_tags(
         changed_description = False
     meta["tags"] = new_tags
     data["meta"] = meta
-    taskp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    write_json_atomic(taskp, data)
 
     return {
         "meta": meta,
@@ -273,6 +439,16 @@ async def _handle_video(
     else:
         return
 
+    index = _fingerprint_index(cfg.queue_dir) if cfg.dedupe else None
+    unique_id = getattr(vid, "file_unique_id", None)
+    if index is not None and unique_id:
+        # Même fichier Telegram: inutile de le retélécharger
+        rec = index.lookup_unique_id(unique_id)
+        if rec is not None and _match_still_relevant(rec, cfg.queue_dir):
+            log.info("Doublon Telegram ignoré (%s)", unique_id)
+            await msg.reply_text(_duplicate_text(DuplicateMatch("exact", rec)))
+            return
+
     file = await context.bot.get_file(vid.file_id)
 
     ts = int(datetime.utcnow().timestamp())
@@ -295,6 +471,24 @@ async def _handle_video(
     await file.download_to_drive(str(out_path))
     log.info("Vidéo téléchargée: %s", out_path)
 
+    fingerprint = None
+    duplicate: Optional[DuplicateMatch] = None
+    if index is not None:
+        try:
+            fingerprint = await asyncio.to_thread(compute_fingerprint, out_path)
+            duplicate = index.find(fingerprint)
+        except Exception as e:
+            log.warning("Empreinte vidéo impossible, pas de dédoublonnage: %s", e)
+        if duplicate is not None and not _match_still_relevant(
+            duplicate.record, cfg.queue_dir
+        ):
+            duplicate = None
+        if duplicate is not None and duplicate.kind == "exact":
+            log.info("Doublon exact ignoré: %s", out_path)
+            out_path.unlink(missing_ok=True)
+            await msg.reply_text(_duplicate_text(duplicate))
+            return
+
     # Créer tâche dans la queue
     caption = (msg.caption or "").strip()
     initial_tags = _extract_hashtags(caption) if caption else []
@@ -329,14 +523,29 @@ async def _handle_video(
             "tags": initial_tags,
         },
     }
+    if fingerprint is not None:
+        task["fingerprint"] = {"file_hash": fingerprint.file_hash}
+    if duplicate is not None:
+        task["duplicate_of"] = {
+            "task": duplicate.record.get("task"),
+            "youtube_id": duplicate.record.get("youtube_id"),
+            "distance": duplicate.distance,
+        }
     task_path = cfg.queue_dir / f"task_{ts}_{chat_id}.json"
-    with open(task_path, "w", encoding="utf-8") as f:
-        json.dump(task, f, ensure_ascii=False, indent=2)
+    # Écriture atomique: le worker est réveillé par le renommage final
+    write_json_atomic(task_path, task)
     _set_last_task(cfg.queue_dir, chat_id, task_path)
+    if fingerprint is not None:
+        index.add(
+            fingerprint, task=str(task_path), unique_id=unique_id, chat_id=chat_id
+        )
+    confirm_text = "✅ Vidéo sauvegardée. Appuyez sur OK pour démarrer le traitement."
+    if duplicate is not None:
+        confirm_text = _duplicate_text(duplicate) + "\n\n" + confirm_text
     # Demander confirmation de démarrage avant de lancer la tâche
     await context.bot.send_message(
         chat_id=chat_id,
-        text="✅ Vidéo sauvegardée. Appuyez sur OK pour démarrer le traitement.",
+        text=confirm_text,
         reply_to_message_id=msg.message_id,
         reply_markup=InlineKeyboardMarkup(
             [
@@ -366,10 +575,7 @@ async def _video_handler(
 
 
 def load_sources_yaml(path: str | Path) -> dict:
-    import yaml
-
-    with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f) or {}
+    return load_raw_config(path) or {}
 
 
 def _main_menu_keyboard() -> InlineKeyboardMarkup:
@@ -604,10 +810,7 @@ def build_application(cfg: TelegramConfig) -> Application:
                         data = json.loads(taskp.read_text(encoding="utf-8"))
                         if data.get("status") == "pending":
                             data.setdefault("prefs", {})["quality"] = preset
-                            taskp.write_text(
-                                json.dumps(data, ensure_ascii=False, indent=2),
-                                encoding="utf-8",
-                            )
+                            write_json_atomic(taskp, data)
                     except Exception:
                         pass
                 await msg.reply_text(f"✅ Qualité définie sur '{preset}' pour ce chat.")
@@ -628,10 +831,7 @@ def build_application(cfg: TelegramConfig) -> Application:
                         data = json.loads(taskp.read_text(encoding="utf-8"))
                         if data.get("status") == "pending":
                             data["privacy_status"] = privacy
-                            taskp.write_text(
-                                json.dumps(data, ensure_ascii=False, indent=2),
-                                encoding="utf-8",
-                            )
+                            write_json_atomic(taskp, data)
                     except Exception:
                         pass
                 await msg.reply_text(
@@ -655,10 +855,7 @@ def build_application(cfg: TelegramConfig) -> Application:
                         data = json.loads(taskp.read_text(encoding="utf-8"))
                         if data.get("status") == "pending":
                             data["subtitles_enabled"] = enabled
-                            taskp.write_text(
-                                json.dumps(data, ensure_ascii=False, indent=2),
-                                encoding="utf-8",
-                            )
+                            write_json_atomic(taskp, data)
                     except Exception:
                         pass
                 status = "activés" if enabled else "désactivés"
@@ -681,10 +878,7 @@ def build_application(cfg: TelegramConfig) -> Application:
                         data = json.loads(taskp.read_text(encoding="utf-8"))
                         if data.get("status") == "pending":
                             data.setdefault("prefs", {})["ai_title_force"] = force
-                            taskp.write_text(
-                                json.dumps(data, ensure_ascii=False, indent=2),
-                                encoding="utf-8",
-                            )
+                            write_json_atomic(taskp, data)
                     except Exception:
                         pass
                 await msg.reply_text(
@@ -705,10 +899,7 @@ def build_application(cfg: TelegramConfig) -> Application:
                         data = json.loads(taskp.read_text(encoding="utf-8"))
                         if data.get("status") == "pending":
                             data["schedule_mode"] = mode
-                            taskp.write_text(
-                                json.dumps(data, ensure_ascii=False, indent=2),
-                                encoding="utf-8",
-                            )
+                            write_json_atomic(taskp, data)
                     except Exception:
                         pass
                 mode_text = (
@@ -738,9 +929,7 @@ def build_application(cfg: TelegramConfig) -> Application:
                     data["status"] = "pending"
                 # Marquer pour skip enhancement
                 data["skip_enhance"] = True
-                taskp.write_text(
-                    json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8"
-                )
+                write_json_atomic(taskp, data)
                 await msg.reply_text(
                     "✅ Upload direct programmé (sans amélioration). La vidéo sera uploadée telle quelle."
                 )
@@ -760,9 +949,7 @@ def build_application(cfg: TelegramConfig) -> Application:
                     return
                 # Annule quelle que soit l'étape d'attente/début
                 data["status"] = "cancelled"
-                taskp.write_text(
-                    json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8"
-                )
+                write_json_atomic(taskp, data)
                 await msg.reply_text("✅ Tâche annulée.")
             except Exception as e:
                 await msg.reply_text(f"Erreur: {e}")
@@ -787,9 +974,7 @@ def build_application(cfg: TelegramConfig) -> Application:
             return
         data = json.loads(taskp.read_text(encoding="utf-8"))
         data.setdefault("meta", {})["title"] = title[1].strip()
-        taskp.write_text(
-            json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8"
-        )
+        write_json_atomic(taskp, data)
         await msg.reply_text("✅ Titre mis à jour.")
 
     async def _cmd_desc(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -809,9 +994,7 @@ def build_application(cfg: TelegramConfig) -> Application:
             return
         data = json.loads(taskp.read_text(encoding="utf-8"))
         data.setdefault("meta", {})["description"] = parts[1].strip()
-        taskp.write_text(
-            json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8"
-        )
+        write_json_atomic(taskp, data)
         await msg.reply_text("✅ Description mise à jour.")
 
     async def _cmd_tags(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -838,9 +1021,7 @@ def build_application(cfg: TelegramConfig) -> Application:
                 tags.add(t.lower())
         data = json.loads(taskp.read_text(encoding="utf-8"))
         data.setdefault("meta", {})["tags"] = sorted(tags)
-        taskp.write_text(
-            json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8"
-        )
+        write_json_atomic(taskp, data)
         await msg.reply_text("✅ Tags mis à jour.")
 
     app.add_handler(CommandHandler("title", _cmd_title))
@@ -867,10 +1048,7 @@ def build_application(cfg: TelegramConfig) -> Application:
                     data = json.loads(taskp.read_text(encoding="utf-8"))
                     if data.get("status") == "pending":
                         data.setdefault("prefs", {})["ai_title_force"] = True
-                        taskp.write_text(
-                            json.dumps(data, ensure_ascii=False, indent=2),
-                            encoding="utf-8",
-                        )
+                        write_json_atomic(taskp, data)
                 except Exception:
                     pass
             await msg.reply_text("✅ Titre IA: activé (forcé depuis la description).")
@@ -884,10 +1062,7 @@ def build_application(cfg: TelegramConfig) -> Application:
                     data = json.loads(taskp.read_text(encoding="utf-8"))
                     if data.get("status") == "pending":
                         data.setdefault("prefs", {})["ai_title_force"] = False
-                        taskp.write_text(
-                            json.dumps(data, ensure_ascii=False, indent=2),
-                            encoding="utf-8",
-                        )
+                        write_json_atomic(taskp, data)
                 except Exception:
                     pass
             await msg.reply_text(
@@ -904,10 +1079,7 @@ def build_application(cfg: TelegramConfig) -> Application:
                     data = json.loads(taskp.read_text(encoding="utf-8"))
                     if data.get("status") == "pending":
                         data.setdefault("prefs", {})["ai_title_force"] = new_val
-                        taskp.write_text(
-                            json.dumps(data, ensure_ascii=False, indent=2),
-                            encoding="utf-8",
-                        )
+                        write_json_atomic(taskp, data)
                 except Exception:
                     pass
             await msg.reply_text(
@@ -961,6 +1133,10 @@ def build_application(cfg: TelegramConfig) -> Application:
         ]
         if enhanced_path:
             lines.append(f"Enhancé: {enhanced_path}")
+        # Encodage en cours: progression publiée par le worker (queue/progress)
+        live = read_progress(cfg.queue_dir).get(taskp.name)
+        if live:
+            lines.append(f"Encodage: {format_progress(live)}")
         if youtube_id:
             lines.append(f"YouTube ID: {youtube_id}")
         # Afficher privacy_status
@@ -1080,6 +1256,11 @@ def build_application(cfg: TelegramConfig) -> Application:
             lines.append(f"\n⚠️ BLOQUÉ: {error_msg}")
             if blocked_at:
                 lines.append(f"Bloqué le: {blocked_at[:19].replace('T', ' ')}")
+            retry_after = data.get("retry_after", "")
+            if retry_after:
+                lines.append(
+                    f"Nouvel essai après: {retry_after[:16].replace('T', ' ')} (UTC)"
+                )
         await msg.reply_text("\n".join(lines))
 
     app.add_handler(CommandHandler("status", _cmd_status))
@@ -1211,9 +1392,7 @@ def build_application(cfg: TelegramConfig) -> Application:
             meta["description"] = (
                 (desc + block) if desc else ("Chapitres:\n" + "\n".join(lines))
             )
-            taskp.write_text(
-                json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8"
-            )
+            write_json_atomic(taskp, data)
             await msg.reply_text(
                 "✅ Chapitres insérés dans la description de la dernière tâche."
             )
@@ -1248,9 +1427,7 @@ def build_application(cfg: TelegramConfig) -> Application:
                 data = json.loads(taskp.read_text(encoding="utf-8"))
                 if data.get("status") == "pending":
                     data["privacy_status"] = privacy
-                    taskp.write_text(
-                        json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8"
-                    )
+                    write_json_atomic(taskp, data)
             except Exception:
                 pass
         await msg.reply_text(f"✅ Visibilité définie sur '{privacy}' pour ce chat.")
@@ -1284,9 +1461,7 @@ def build_application(cfg: TelegramConfig) -> Application:
                 data = json.loads(taskp.read_text(encoding="utf-8"))
                 if data.get("status") == "pending":
                     data["subtitles_enabled"] = enabled
-                    taskp.write_text(
-                        json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8"
-                    )
+                    write_json_atomic(taskp, data)
             except Exception:
                 pass
 
@@ -1312,9 +1487,14 @@ def build_application(cfg: TelegramConfig) -> Application:
             prefs = _load_prefs(cfg.queue_dir, chat_id)
             prefs["schedule_mode"] = "auto"
             _save_prefs(cfg.queue_dir, chat_id, prefs)
-            await msg.reply_text(
-                "✅ Mode planification automatique activé (heures optimales)"
-            )
+            text = "✅ Mode planification automatique activé (heures optimales)"
+            data = _pending_task(cfg.queue_dir, chat_id)
+            if data is not None:
+                note = await asyncio.to_thread(
+                    schedule_feasibility, cfg.queue_dir, data
+                )
+                text += f"\n{note}" if note else ""
+            await msg.reply_text(text)
 
         elif schedule_arg.lower() == "now":
             # Mode immédiat
@@ -1343,22 +1523,23 @@ def build_application(cfg: TelegramConfig) -> Application:
 
                 # Mettre à jour la dernière tâche
                 taskp = _get_last_task(cfg.queue_dir, chat_id)
-                if taskp:
+                data = _pending_task(cfg.queue_dir, chat_id)
+                if taskp and data is not None:
                     try:
-                        data = json.loads(taskp.read_text(encoding="utf-8"))
-                        if data.get("status") == "pending":
-                            data["schedule_mode"] = "custom"
-                            data["custom_schedule_time"] = scheduled_time.isoformat()
-                            taskp.write_text(
-                                json.dumps(data, ensure_ascii=False, indent=2),
-                                encoding="utf-8",
-                            )
+                        data["schedule_mode"] = "custom"
+                        data["custom_schedule_time"] = scheduled_time.isoformat()
+                        write_json_atomic(taskp, data)
                     except Exception:
                         pass
 
-                await msg.reply_text(
-                    f"✅ Upload planifié pour le {scheduled_time.strftime('%d/%m/%Y à %H:%M')}"
-                )
+                text = f"✅ Upload planifié pour le {scheduled_time.strftime('%d/%m/%Y à %H:%M')}"
+                if data is not None:
+                    # Échéance intenable d'après les durées des dernières tâches
+                    note = await asyncio.to_thread(
+                        schedule_feasibility, cfg.queue_dir, data, scheduled_time
+                    )
+                    text += f"\n{note}" if note else ""
+                await msg.reply_text(text)
 
             except ValueError:
                 await msg.reply_text(
@@ -1394,9 +1575,7 @@ def build_application(cfg: TelegramConfig) -> Application:
                 data = json.loads(taskp.read_text(encoding="utf-8"))
                 if data.get("status") in (None, "pending"):
                     data.setdefault("prefs", {})["quality"] = preset
-                    taskp.write_text(
-                        json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8"
-                    )
+                    write_json_atomic(taskp, data)
             except Exception:
                 pass
         await msg.reply_text(f"✅ Qualité préférée définie sur: {preset}")
@@ -1414,9 +1593,7 @@ def build_application(cfg: TelegramConfig) -> Application:
             data = json.loads(taskp.read_text(encoding="utf-8"))
             if data.get("status") in (None, "pending"):
                 data["status"] = "cancelled"
-                taskp.write_text(
-                    json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8"
-                )
+                write_json_atomic(taskp, data)
                 await msg.reply_text("✅ Tâche annulée.")
             else:
                 await msg.reply_text("Impossible d'annuler: tâche déjà traitée.")
@@ -1452,9 +1629,7 @@ def build_application(cfg: TelegramConfig) -> Application:
                 "meta": data.get("meta") or {},
             }
             new_taskp = cfg.queue_dir / f"task_{ts}_{chat_id}.json"
-            new_taskp.write_text(
-                json.dumps(new_task, ensure_ascii=False, indent=2), encoding="utf-8"
-            )
+            write_json_atomic(new_taskp, new_task)
             _set_last_task(cfg.queue_dir, chat_id, new_taskp)
             await msg.reply_text("✅ Nouvelle tâche recréée à partir de la dernière.")
         except Exception:
@@ -1492,19 +1667,13 @@ def build_application(cfg: TelegramConfig) -> Application:
                     return
                 if data == "confirm_start":
                     tdata["status"] = "pending"
-                    taskp.write_text(
-                        json.dumps(tdata, ensure_ascii=False, indent=2),
-                        encoding="utf-8",
-                    )
+                    write_json_atomic(taskp, tdata)
                     await query.edit_message_text(
                         "✅ Démarrage confirmé. La tâche est en attente de traitement."
                     )
                 else:
                     tdata["status"] = "cancelled"
-                    taskp.write_text(
-                        json.dumps(tdata, ensure_ascii=False, indent=2),
-                        encoding="utf-8",
-                    )
+                    write_json_atomic(taskp, tdata)
                     await query.edit_message_text("✅ Tâche annulée.")
             except Exception as e:
                 await query.edit_message_text(f"❌ Erreur: {e}")
@@ -1593,10 +1762,7 @@ def build_application(cfg: TelegramConfig) -> Application:
                     dataj = json.loads(taskp.read_text(encoding="utf-8"))
                     if dataj.get("status") in (None, "pending"):
                         dataj.setdefault("prefs", {})["quality"] = preset
-                        taskp.write_text(
-                            json.dumps(dataj, ensure_ascii=False, indent=2),
-                            encoding="utf-8",
-                        )
+                        write_json_atomic(taskp, dataj)
                 except Exception:
                     pass
             await query.edit_message_text(f"✅ Qualité préférée: {preset}")
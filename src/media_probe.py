@@ -0,0 +1,214 @@
+"""
+Analyse d'un fichier média avant encodage (ffprobe).
+
+Fournit ce qu'il faut pour décider si la source respecte déjà le profil de
+sortie: codec, résolution affichée (rotation comprise), cadence, débit,
+pix_fmt, entrelacement, codec et langue audio, conteneur, faststart et, à part (une
+passe de décodage audio), loudness intégrée (EBU R128).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+import shutil
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+MP4_FORMATS = ("mov", "mp4")
+_LOUDNORM_JSON_RE = re.compile(r"\{[^{}]*\"input_i\"[^{}]*\}", re.S)
+
+
+@dataclass
+class MediaInfo:
+    """Caractéristiques utiles d'une vidéo (None si inconnues)."""
+
+    format_name: str = ""
+    duration: Optional[float] = None
+    video_codec: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    fps: Optional[float] = None
+    video_bitrate: Optional[int] = None
+    pix_fmt: Optional[str] = None
+    field_order: Optional[str] = None
+    audio_codec: Optional[str] = None
+    audio_bitrate: Optional[int] = None
+    audio_language: Optional[str] = None
+    faststart: Optional[bool] = None
+
+    @property
+    def is_mp4(self) -> bool:
+        names = set((self.format_name or "").split(","))
+        return any(f in names for f in MP4_FORMATS)
+
+    @property
+    def interlaced(self) -> bool:
+        return (self.field_order or "progressive") not in ("progressive", "unknown")
+
+    @classmethod
+    def from_ffprobe(cls, data: dict) -> "MediaInfo":
+        """Construit l'info depuis la sortie JSON de ffprobe -show_streams -show_format."""
+        fmt = data.get("format") or {}
+        streams = data.get("streams") or []
+        video = next((s for s in streams if s.get("codec_type") == "video"), {})
+        audio = next((s for s in streams if s.get("codec_type") == "audio"), {})
+        info = cls(
+            format_name=str(fmt.get("format_name") or ""),
+            duration=_float(fmt.get("duration")),
+            video_codec=video.get("codec_name"),
+            width=_int(video.get("width")),
+            height=_int(video.get("height")),
+            fps=_rate(video.get("avg_frame_rate")) or _rate(video.get("r_frame_rate")),
+            video_bitrate=_int(video.get("bit_rate")),
+            pix_fmt=video.get("pix_fmt"),
+            field_order=video.get("field_order"),
+            audio_codec=audio.get("codec_name"),
+            audio_bitrate=_int(audio.get("bit_rate")),
+            audio_language=_language(audio),
+        )
+        # Téléphones: vidéo stockée en paysage avec une rotation de 90°
+        if abs(_rotation(video)) % 180 == 90:
+            info.width, info.height = info.height, info.width
+        # MKV/WebM: pas de débit par flux, déduit du débit global
+        if info.video_bitrate is None and _int(fmt.get("bit_rate")):
+            info.video_bitrate = _int(fmt.get("bit_rate")) - (info.audio_bitrate or 0)
+        return info
+
+
+def _float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _int(value) -> Optional[int]:
+    f = _float(value)
+    return int(f) if f is not None else None
+
+
+def _rate(value) -> Optional[float]:
+    """'30000/1001' -> 29.97; None pour 0/0."""
+    try:
+        num, _, den = str(value).partition("/")
+        rate = float(num) / float(den or 1)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    return rate if rate > 0 else None
+
+
+def _language(stream: dict) -> Optional[str]:
+    lang = str((stream.get("tags") or {}).get("language") or "").strip().lower()
+    return lang if lang and lang != "und" else None
+
+
+def _rotation(stream: dict) -> float:
+    for side in stream.get("side_data_list") or []:
+        if "rotation" in side:
+            return _float(side["rotation"]) or 0.0
+    return _float((stream.get("tags") or {}).get("rotate")) or 0.0
+
+
+def has_faststart(path: str | Path) -> Optional[bool]:
+    """True si l'atome moov précède mdat (lecture progressive), None si non-MP4."""
+    try:
+        with open(path, "rb") as f:
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    return None
+                size = int.from_bytes(header[:4], "big")
+                kind = header[4:8]
+                if kind == b"moov":
+                    return True
+                if kind == b"mdat":
+                    return False
+                if size == 1:
+                    size = int.from_bytes(f.read(8), "big") - 8
+                if size < 8:
+                    return None
+                f.seek(size - 8, 1)
+    except OSError:
+        return None
+
+
+def probe_media(path: str | Path) -> Optional[MediaInfo]:
+    """Analyse ffprobe du fichier; None si ffprobe est absent ou échoue."""
+    if not shutil.which("ffprobe"):
+        return None
+    try:
+        result = subprocess.run(
+            [
+                "ffprobe",
+                "-v",
+                "error",
+                "-show_streams",
+                "-show_format",
+                "-of",
+                "json",
+                str(path),
+            ],
+            capture_output=True,
+            text=True,
+            timeout=60,
+        )
+        if result.returncode != 0:
+            log.debug("ffprobe a échoué sur %s: %s", path, result.stderr.strip())
+            return None
+        info = MediaInfo.from_ffprobe(json.loads(result.stdout or "{}"))
+    except (OSError, ValueError, subprocess.TimeoutExpired) as e:
+        log.debug("Analyse ffprobe impossible (%s): %s", path, e)
+        return None
+    if info.is_mp4:
+        info.faststart = has_faststart(path)
+    return info
+
+
+def measure_loudness(path: str | Path) -> Optional[Tuple[float, Optional[float]]]:
+    """Loudness intégrée (LUFS) et true peak (dBTP) de la première piste audio.
+
+    Passe loudnorm en mesure seule (audio décodé, pas de vidéo); None si
+    la mesure échoue.
+    """
+    if not shutil.which("ffmpeg"):
+        return None
+    try:
+        result = subprocess.run(
+            [
+                "ffmpeg",
+                "-hide_banner",
+                "-nostats",
+                "-i",
+                str(path),
+                "-map",
+                "0:a:0",
+                "-af",
+                "loudnorm=I=-23:TP=-2:LRA=7:print_format=json",
+                "-f",
+                "null",
+                "-",
+            ],
+            capture_output=True,
+            text=True,
+            timeout=900,
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        log.debug("Mesure de loudness impossible (%s): %s", path, e)
+        return None
+    m = _LOUDNORM_JSON_RE.search(result.stderr or "")
+    if result.returncode != 0 or not m:
+        return None
+    try:
+        data = json.loads(m.group(0))
+    except ValueError:
+        return None
+    loudness = _float(data.get("input_i"))
+    if loudness is None:
+        return None
+    return loudness, _float(data.get("input_tp"))
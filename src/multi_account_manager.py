@@ -5,7 +5,7 @@ Permet de gérer plusieurs chaînes YouTube avec load balancing et quotas
 
 import logging
 import json
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Dict, List, Optional, Iterable
 from dataclasses import dataclass, asdict
@@ -13,6 +13,26 @@ from dataclasses import dataclass, asdict
 
 log = logging.getLogger(__name__)
 
+# Les quotas YouTube sont réinitialisés à minuit, heure du Pacifique
+QUOTA_RESET_TIMEZONE = "America/Los_Angeles"
+
+
+def next_quota_reset(now: Optional[datetime] = None) -> datetime:
+    """Prochaine réinitialisation des quotas YouTube (datetime avec fuseau)."""
+    import pytz
+
+    tz = pytz.timezone(QUOTA_RESET_TIMEZONE)
+    local = (now or datetime.now(timezone.utc)).astimezone(tz)
+    midnight = tz.localize(
+        datetime.combine(local.date() + timedelta(days=1), datetime.min.time())
+    )
+    return midnight.astimezone(timezone.utc)
+
+
+def _aware(dt: datetime) -> datetime:
+    # Dates naïves (anciens fichiers, saisie manuelle): heure locale
+    return dt if dt.tzinfo is not None else dt.astimezone()
+
 
 @dataclass
 class YouTubeAccount:
@@ -44,19 +64,32 @@ class QuotaUsage:
     api_calls: int = 0
     uploads: int = 0
     last_upload: Optional[datetime] = None
+    # uploadLimitExceeded reçu: compte ignoré jusqu'à cette date
+    exhausted_until: Optional[datetime] = None
 
     def to_dict(self) -> Dict:
         data = asdict(self)
         if self.last_upload:
             data["last_upload"] = self.last_upload.isoformat()
+        if self.exhausted_until:
+            data["exhausted_until"] = self.exhausted_until.isoformat()
         return data
 
     @classmethod
     def from_dict(cls, data: Dict) -> "QuotaUsage":
         if data.get("last_upload"):
             data["last_upload"] = datetime.fromisoformat(data["last_upload"])
+        if data.get("exhausted_until"):
+            data["exhausted_until"] = _aware(
+                datetime.fromisoformat(data["exhausted_until"])
+            )
         return cls(**data)
 
+    def is_exhausted(self, now: Optional[datetime] = None) -> bool:
+        if self.exhausted_until is None:
+            return False
+        return self.exhausted_until > (now or datetime.now(timezone.utc))
+
 
 class MultiAccountManager:
     """Gestionnaire principal des comptes multiples"""
@@ -171,8 +204,16 @@ class MultiAccountManager:
             today = datetime.now().strftime("%Y-%m-%d")
 
             for account_id, usage_data in data.items():
-                if usage_data.get("date") == today:  # Seulement les données du jour
-                    self.quota_usage[account_id] = QuotaUsage.from_dict(usage_data)
+                usage = QuotaUsage.from_dict(usage_data)
+                if usage.date == today:  # Seulement les données du jour
+                    self.quota_usage[account_id] = usage
+                elif usage.is_exhausted():
+                    # Minuit local avant minuit Pacifique: le compte reste épuisé
+                    self.quota_usage[account_id] = QuotaUsage(
+                        account_id=account_id,
+                        date=today,
+                        exhausted_until=usage.exhausted_until,
+                    )
 
         except Exception as e:
             log.error(f"Erreur chargement quotas: {e}")
@@ -258,15 +299,21 @@ class MultiAccountManager:
 
         if account_id and account_id in self.accounts:
             account = self.accounts[account_id]
-            if account.enabled:
+            if account.enabled and not self.is_exhausted(account_id):
                 return account
+            if account.enabled:
+                log.info("Compte %s épuisé, bascule sur un autre compte", account_id)
 
         # Fallback: utiliser le load balancing
         return self.get_best_account_for_upload()
 
     def get_best_account_for_upload(self) -> Optional[YouTubeAccount]:
         """Sélectionner le meilleur compte pour un upload (load balancing)"""
-        available_accounts = [acc for acc in self.accounts.values() if acc.enabled]
+        available_accounts = [
+            acc
+            for acc in self.accounts.values()
+            if acc.enabled and not self.is_exhausted(acc.account_id)
+        ]
 
         if not available_accounts:
             log.error("Aucun compte disponible pour upload")
@@ -351,6 +398,57 @@ class MultiAccountManager:
             self.accounts[account_id].daily_upload_limit,
         )
 
+    def is_exhausted(self, account_id: str, now: Optional[datetime] = None) -> bool:
+        """True si YouTube a refusé un upload du compte avant la réinitialisation."""
+        usage = self.quota_usage.get(account_id)
+        return usage is not None and usage.is_exhausted(now)
+
+    def mark_upload_limit_reached(
+        self, account_id: str, until: Optional[datetime] = None
+    ) -> datetime:
+        """Marque le compte épuisé (uploadLimitExceeded) jusqu'à `until`.
+
+        Par défaut jusqu'à la prochaine réinitialisation des quotas YouTube.
+        """
+        until = _aware(until) if until else next_quota_reset()
+        today = datetime.now().strftime("%Y-%m-%d")
+        usage = self.quota_usage.get(account_id)
+        if usage is None or usage.date != today:
+            usage = self.quota_usage[account_id] = QuotaUsage(
+                account_id=account_id, date=today
+            )
+        usage.exhausted_until = until
+        self._save_quota_usage()
+        log.warning(
+            "Compte %s épuisé jusqu'au %s",
+            account_id,
+            until.isoformat(timespec="minutes"),
+        )
+        return until
+
+    def next_available_at(self) -> Optional[datetime]:
+        """Date à laquelle un compte actif pourra de nouveau uploader.
+
+        None s'il n'y a aucun compte actif (attendre ne servirait à rien).
+        """
+        today = datetime.now().strftime("%Y-%m-%d")
+        dates = []
+        for account in self.accounts.values():
+            if not account.enabled:
+                continue
+            usage = self.quota_usage.get(account.account_id)
+            if usage is not None and usage.is_exhausted():
+                dates.append(usage.exhausted_until)
+            elif (
+                usage is not None
+                and usage.date == today
+                and usage.uploads >= account.daily_upload_limit
+            ):
+                dates.append(next_quota_reset())
+            else:
+                return datetime.now(timezone.utc)
+        return min(dates) if dates else None
+
     def get_account_status(self, account_id: str) -> Dict:
         """Obtenir le statut détaillé d'un compte"""
         if account_id not in self.accounts:
@@ -380,8 +478,15 @@ class MultiAccountManager:
             "api_calls_limit": account.daily_quota_limit,
             "quota_percentage": ((api_calls_used / account.daily_quota_limit) * 100),
             "last_upload": last_upload.isoformat() if last_upload else None,
+            "exhausted_until": (
+                usage.exhausted_until.isoformat()
+                if usage is not None and usage.is_exhausted()
+                else None
+            ),
             "can_upload": (
-                uploads_used < account.daily_upload_limit and account.enabled
+                uploads_used < account.daily_upload_limit
+                and account.enabled
+                and not self.is_exhausted(account_id)
             ),
         }
 
@@ -436,7 +541,9 @@ class MultiAccountManager:
 
         # Supprimer les données qui ne sont pas d'aujourd'hui
         old_accounts = [
-            acc_id for acc_id, usage in self.quota_usage.items() if usage.date != today
+            acc_id
+            for acc_id, usage in self.quota_usage.items()
+            if usage.date != today and not usage.is_exhausted()
         ]
 
         for acc_id in old_accounts:
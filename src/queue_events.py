@@ -0,0 +1,268 @@
+"""
+Sources d'événements pour la surveillance des répertoires de file.
+
+- InotifyEventSource: notifications noyau (Linux), réveil immédiat sans CPU au repos
+- PollingEventSource: repli portable par scan périodique des répertoires
+
+Les producteurs de tâches doivent écrire via write_json_atomic(): le fichier est
+écrit sous un nom temporaire puis renommé en place, ce qui déclenche un unique
+événement IN_MOVED_TO une fois le contenu complet.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import fnmatch
+import json
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+log = logging.getLogger(__name__)
+
+QUEUE_PATTERNS = ("task_*.json", "scheduled_*.json")
+
+# Constantes inotify (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def write_json_atomic(path: str | Path, data) -> None:
+    """Écrit un JSON via fichier temporaire + os.replace (jamais lu à moitié)."""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+
+
+def _matches(name: str, patterns: Iterable[str]) -> bool:
+    return any(fnmatch.fnmatch(name, pat) for pat in patterns)
+
+
+class QueueEventSource:
+    """Interface commune: attendre un lot de fichiers modifiés."""
+
+    def __init__(self, directories: Iterable[str | Path], patterns: Iterable[str]):
+        self.directories = [Path(d) for d in directories]
+        self.patterns = tuple(patterns)
+
+    def wait(self, timeout: Optional[float] = None) -> List[Path]:
+        """Bloque jusqu'à un événement (ou timeout) et renvoie les chemins concernés.
+
+        Un répertoire dans la liste signifie « rescanner tout le répertoire ».
+        """
+        raise NotImplementedError
+
+    def wake(self) -> None:
+        """Débloque un wait() en cours (ex: arrêt demandé)."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PollingEventSource(QueueEventSource):
+    """Repli portable: compare périodiquement les mtimes des fichiers surveillés."""
+
+    def __init__(
+        self,
+        directories: Iterable[str | Path],
+        patterns: Iterable[str],
+        poll_interval: float = 2.0,
+    ):
+        super().__init__(directories, patterns)
+        self.poll_interval = max(0.01, float(poll_interval))
+        self._woken = threading.Event()
+        self._snapshot = self._scan()
+
+    def _scan(self) -> Dict[Path, int]:
+        snap: Dict[Path, int] = {}
+        for d in self.directories:
+            try:
+                entries = list(os.scandir(d))
+            except OSError:
+                continue
+            for e in entries:
+                if _matches(e.name, self.patterns):
+                    try:
+                        snap[Path(e.path)] = e.stat().st_mtime_ns
+                    except OSError:
+                        pass
+        return snap
+
+    def wait(self, timeout: Optional[float] = None) -> List[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = (
+                self.poll_interval
+                if deadline is None
+                else min(self.poll_interval, deadline - time.monotonic())
+            )
+            if remaining > 0 and self._woken.wait(remaining):
+                self._woken.clear()
+                return []
+            snap = self._scan()
+            changed = [p for p, m in snap.items() if self._snapshot.get(p) != m]
+            self._snapshot = snap
+            if changed:
+                return sorted(changed)
+            if deadline is not None and time.monotonic() >= deadline:
+                return []
+
+    def wake(self) -> None:
+        self._woken.set()
+
+
+class InotifyEventSource(QueueEventSource):
+    """Notifications inotify (Linux) sur IN_MOVED_TO et IN_CLOSE_WRITE.
+
+    Les rafales d'événements sont regroupées: après le premier événement, la
+    lecture continue tant que de nouveaux arrivent dans batch_window secondes.
+    """
+
+    def __init__(
+        self,
+        directories: Iterable[str | Path],
+        patterns: Iterable[str],
+        batch_window: float = 0.05,
+    ):
+        super().__init__(directories, patterns)
+        self.batch_window = max(0.0, float(batch_window))
+        libc_name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or not libc_name:
+            raise OSError("inotify indisponible sur cette plateforme")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 a échoué")
+        self._fd = fd
+        self._wds: Dict[int, Path] = {}
+        try:
+            for d in self.directories:
+                d.mkdir(parents=True, exist_ok=True)
+                wd = self._libc.inotify_add_watch(
+                    fd, os.fsencode(str(d)), IN_MOVED_TO | IN_CLOSE_WRITE
+                )
+                if wd < 0:
+                    raise OSError(ctypes.get_errno(), f"inotify_add_watch {d}")
+                self._wds[wd] = d
+            self._wake_r, self._wake_w = os.pipe()
+        except Exception:
+            os.close(fd)
+            raise
+
+    def _read_events(self) -> List[Path]:
+        out: List[Path] = []
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return out
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(buf):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(buf, offset)
+                offset += _EVENT_HEADER.size
+                raw = buf[offset : offset + length]
+                offset += length
+                base = self._wds.get(wd)
+                if mask & IN_Q_OVERFLOW:
+                    # File noyau saturée: demander un rescan complet
+                    out.extend(self.directories)
+                    continue
+                name = os.fsdecode(raw.split(b"\0", 1)[0])
+                if base is not None and name and _matches(name, self.patterns):
+                    out.append(base / name)
+
+    def wait(self, timeout: Optional[float] = None) -> List[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed: List[Path] = []
+        while True:
+            remaining = (
+                None if deadline is None else max(0.0, deadline - time.monotonic())
+            )
+            ready, _, _ = select.select([self._fd, self._wake_r], [], [], remaining)
+            if self._wake_r in ready:
+                os.read(self._wake_r, 4096)
+                return sorted(set(changed))
+            if not ready:
+                return sorted(set(changed))
+            changed.extend(self._read_events())
+            if changed:
+                break
+        # Regrouper la rafale en cours
+        while True:
+            ready, _, _ = select.select([self._fd], [], [], self.batch_window)
+            if not ready:
+                break
+            changed.extend(self._read_events())
+        return sorted(set(changed))
+
+    def wake(self) -> None:
+        try:
+            os.write(self._wake_w, b"\0")
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self._wds.clear()
+
+
+def create_event_source(
+    directories: Iterable[str | Path],
+    patterns: Iterable[str] = QUEUE_PATTERNS,
+    *,
+    backend: str = "auto",
+    poll_interval: float = 2.0,
+    batch_window: float = 0.05,
+) -> QueueEventSource:
+    """Crée la meilleure source disponible.
+
+    Args:
+        backend: "auto" (inotify si possible), "inotify" ou "polling"
+        poll_interval: Intervalle du repli par polling
+        batch_window: Fenêtre de regroupement des rafales (inotify)
+    """
+    directories = list(directories)
+    if backend in ("auto", "inotify"):
+        try:
+            return InotifyEventSource(directories, patterns, batch_window=batch_window)
+        except Exception as e:
+            if backend == "inotify":
+                raise
+            log.debug("inotify indisponible (%s), repli sur le polling", e)
+    return PollingEventSource(directories, patterns, poll_interval=poll_interval)
@@ -0,0 +1,260 @@
+"""
+Budget CPU partagé par les sous-processus lourds (ffmpeg, Whisper).
+
+Sans limite, un encodage libx265, Whisper et les extractions de frames lancés
+en même temps prennent chacun tous les cœurs: la machine est sursouscrite et le
+bot Telegram ne répond plus. Le gouverneur distribue un budget de threads:
+
+- chaque job demande un nombre de threads (bail); s'il ne reste pas assez de
+  budget, il attend, par ordre de priorité puis d'arrivée
+- le bail fixe `-threads`/`-filter_threads` de ffmpeg et `--threads` de Whisper
+- la commande est préfixée par `nice`/`ionice` selon la priorité de la tâche
+
+Le gouverneur par défaut (CLI `enhance`) ne change pas la priorité des
+processus; le worker installe le sien, construit depuis la section `resources`
+de la config, le temps de son exécution.
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+
+from .task_queue import DEFAULT_PRIORITY, PRIORITY_CLASSES, priority_class
+
+log = logging.getLogger(__name__)
+
+# Cœurs laissés libres pour le bot Telegram, le worker et les uploads
+DEFAULT_RESERVED_THREADS = 1
+# (nice, classe ionice, niveau ionice) par classe de priorité de tâche
+NICE_LEVELS = {
+    PRIORITY_CLASSES["high"]: (5, 2, 4),
+    PRIORITY_CLASSES["normal"]: (10, 2, 7),
+    PRIORITY_CLASSES["low"]: (19, 3, None),
+}
+
+_local = threading.local()
+
+
+def _nice_levels(priority: int):
+    return NICE_LEVELS.get(priority, NICE_LEVELS[PRIORITY_CLASSES["low"]])
+
+
+@dataclass(frozen=True)
+class Lease:
+    """Part du budget accordée à un job (un sous-processus)."""
+
+    threads: int
+    priority: int
+    label: str = ""
+    renice: bool = False
+
+    def ffmpeg_command(self, cmd: List[str]) -> List[str]:
+        """Ajoute les limites de threads à une commande ffmpeg.
+
+        Options globales de filtrage avant la première entrée, `-threads`
+        (encodeur) devant la sortie si la commande ne le fixe pas déjà.
+        """
+        n = str(self.threads)
+        cmd = list(cmd)
+        # Options globales juste avant la première entrée
+        at = cmd.index("-i") if "-i" in cmd else 1
+        cmd[at:at] = ["-filter_threads", n, "-filter_complex_threads", n]
+        if "-threads" not in cmd:
+            cmd = cmd[:-1] + ["-threads", n, cmd[-1]]
+        return self.wrap(cmd)
+
+    def whisper_command(self, cmd: List[str]) -> List[str]:
+        return self.wrap(list(cmd) + ["--threads", str(self.threads)])
+
+    def wrap(self, cmd: List[str]) -> List[str]:
+        """Préfixe nice/ionice (POSIX, si les outils sont installés)."""
+        if not self.renice or os.name != "posix":
+            return list(cmd)
+        nice, io_class, io_level = _nice_levels(self.priority)
+        prefix: List[str] = []
+        if shutil.which("ionice"):
+            prefix += ["ionice", "-c", str(io_class)]
+            if io_level is not None:
+                prefix += ["-n", str(io_level)]
+        if shutil.which("nice"):
+            prefix += ["nice", "-n", str(nice)]
+        return prefix + list(cmd)
+
+
+class ResourceGovernor:
+    """Distribue un budget de threads CPU entre les jobs concurrents.
+
+    Args:
+        total_threads: Budget total (défaut: nb de cœurs moins `reserved`)
+        reserved: Cœurs jamais distribués (bot, worker, I/O)
+        job_threads: Threads accordés à un job qui n'en demande pas de précis
+            (défaut: tout le budget)
+        renice: Préfixer les commandes par nice/ionice selon la priorité
+    """
+
+    def __init__(
+        self,
+        total_threads: Optional[int] = None,
+        *,
+        reserved: int = DEFAULT_RESERVED_THREADS,
+        job_threads: Optional[int] = None,
+        renice: bool = False,
+    ):
+        if total_threads is None:
+            total_threads = (os.cpu_count() or 1) - max(0, int(reserved))
+        self.total = max(1, int(total_threads))
+        self.job_threads = max(1, min(self.total, int(job_threads or self.total)))
+        self.renice = renice
+        self._cond = threading.Condition()
+        self._in_use = 0
+        self._active: List[Lease] = []
+        # File d'attente: (priorité, ordre d'arrivée)
+        self._waiting: List[tuple] = []
+        self._seq = itertools.count()
+
+    @property
+    def in_use(self) -> int:
+        return self._in_use
+
+    def _can_start(self, key: tuple, threads: int) -> bool:
+        return min(self._waiting) == key and self._in_use + threads <= self.total
+
+    @contextmanager
+    def acquire(
+        self,
+        threads: Optional[int] = None,
+        *,
+        priority=None,
+        label: str = "",
+    ) -> Iterator[Lease]:
+        """Réserve `threads` threads (bloquant) pour la durée du bloc.
+
+        Réentrant: un thread qui détient déjà un bail le réutilise (l'appelant
+        a choisi le budget, `_run_ffmpeg` ne le redemande pas).
+        """
+        held = current_lease()
+        if held is not None:
+            yield held
+            return
+        threads = max(1, min(self.total, int(threads or self.job_threads)))
+        prio = priority_class(priority if priority is not None else current_priority())
+        key = (prio, next(self._seq))
+        started = time.monotonic()
+        with self._cond:
+            self._waiting.append(key)
+            if not self._can_start(key, threads):
+                log.info(
+                    "%s en attente de %d thread(s) CPU (%d/%d utilisés)",
+                    label or "Job",
+                    threads,
+                    self._in_use,
+                    self.total,
+                )
+                self._cond.wait_for(lambda: self._can_start(key, threads))
+            self._waiting.remove(key)
+            self._in_use += threads
+            lease = Lease(threads, prio, label, self.renice)
+            self._active.append(lease)
+            # Le suivant dans la file peut tenir dans le budget restant
+            self._cond.notify_all()
+        waited = time.monotonic() - started
+        if waited >= 1.0:
+            log.info("%s démarré après %.1fs d'attente", label or "Job", waited)
+        _local.lease = lease
+        try:
+            yield lease
+        finally:
+            _local.lease = None
+            with self._cond:
+                self._in_use -= threads
+                self._active.remove(lease)
+                self._cond.notify_all()
+
+    def snapshot(self) -> dict:
+        """État courant (budget, jobs actifs, jobs en attente)."""
+        with self._cond:
+            return {
+                "total_threads": self.total,
+                "in_use": self._in_use,
+                "active": [
+                    {"label": lease.label, "threads": lease.threads}
+                    for lease in self._active
+                ],
+                "waiting": len(self._waiting),
+            }
+
+
+def current_lease() -> Optional[Lease]:
+    """Bail détenu par le thread courant, s'il y en a un."""
+    return getattr(_local, "lease", None)
+
+
+def current_priority():
+    return getattr(_local, "priority", None) or DEFAULT_PRIORITY
+
+
+@contextmanager
+def job_priority(priority) -> Iterator[None]:
+    """Priorité (high/normal/low) des jobs lancés par le thread courant."""
+    previous = getattr(_local, "priority", None)
+    _local.priority = priority
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+_governor: Optional[ResourceGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_governor() -> ResourceGovernor:
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = ResourceGovernor()
+        return _governor
+
+
+def install_governor(
+    governor: Optional[ResourceGovernor],
+) -> Optional[ResourceGovernor]:
+    """Installe le gouverneur du processus; renvoie le précédent (à restaurer)."""
+    global _governor
+    with _governor_lock:
+        previous, _governor = _governor, governor
+    return previous
+
+
+def governor_from_settings(
+    settings: Optional[dict] = None, *, cpu_slots: int = 1
+) -> ResourceGovernor:
+    """Gouverneur du worker depuis la section `resources` de la config.
+
+    Sans `job_threads`, le budget est partagé entre les `cpu_slots` étapes
+    CPU simultanées du worker.
+    """
+    settings = settings if isinstance(settings, dict) else {}
+    governor = ResourceGovernor(
+        settings.get("cpu_threads"),
+        reserved=settings.get("reserved_threads", DEFAULT_RESERVED_THREADS),
+        renice=bool(settings.get("nice", True)),
+    )
+    slots = max(1, int(cpu_slots or 1))
+    job_threads = settings.get("job_threads") or governor.total // slots
+    governor.job_threads = max(1, min(governor.total, int(job_threads)))
+    log.info(
+        "Budget CPU: %d thread(s), %d par job%s",
+        governor.total,
+        governor.job_threads,
+        ", priorité abaissée (nice/ionice)" if governor.renice else "",
+    )
+    return governor
@@ -1,15 +1,17 @@
 """
 Worker pour traiter les tâches planifiées
-Vérifie périodiquement les tâches prêtes et les déplace vers la queue normale
+Attend la prochaine échéance (ou une modification du planning) et déplace les
+tâches prêtes vers la queue normale
 """
 
 import logging
-import time
 import json
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 
-from .scheduler import UploadScheduler
+from .queue_events import create_event_source, write_json_atomic
+from .scheduler import ScheduleStatus, UploadScheduler
 
 log = logging.getLogger(__name__)
 
@@ -23,6 +25,7 @@ class ScheduledWorker:
         queue_dir: Path,
         archive_dir: Path,
         check_interval: int = 60,
+        event_backend: str = "auto",
     ):
         self.scheduler = UploadScheduler(
             config_path=Path("config/video.yaml"), schedule_dir=schedule_dir
@@ -30,7 +33,9 @@ class ScheduledWorker:
         self.queue_dir = Path(queue_dir)
         self.archive_dir = Path(archive_dir)
         self.check_interval = check_interval
+        self.event_backend = event_backend
         self.running = False
+        self._events = None
 
         # Créer les répertoires
         self.queue_dir.mkdir(parents=True, exist_ok=True)
@@ -39,25 +44,56 @@ class ScheduledWorker:
     def start(self):
         """Démarrer le worker en mode continu"""
         self.running = True
-        log.info("Démarrage du scheduled worker")
+        # Réveil sur modification du planning (tâche planifiée par le worker/bot)
+        self._events = create_event_source(
+            [self.scheduler.schedule_dir],
+            [self.scheduler.schedule_file.name],
+            backend=self.event_backend,
+            poll_interval=min(5.0, float(self.check_interval)),
+        )
+        log.info(
+            "Démarrage du scheduled worker (événements: %s)",
+            type(self._events).__name__,
+        )
 
-        while self.running:
-            try:
-                self.process_ready_tasks()
-                self.cleanup_old_tasks()
-                time.sleep(self.check_interval)
-            except KeyboardInterrupt:
-                log.info("Arrêt demandé par l'utilisateur")
-                break
-            except Exception as e:
-                log.error(f"Erreur dans le scheduled worker: {e}")
-                time.sleep(self.check_interval)
+        try:
+            while self.running:
+                try:
+                    self.process_ready_tasks()
+                    self.cleanup_old_tasks()
+                    changed = self._events.wait(timeout=self._next_wait())
+                    if changed:
+                        self.scheduler.load_scheduled_tasks()
+                except KeyboardInterrupt:
+                    log.info("Arrêt demandé par l'utilisateur")
+                    break
+                except Exception as e:
+                    log.error(f"Erreur dans le scheduled worker: {e}")
+                    self._events.wait(timeout=self.check_interval)
+        finally:
+            self._events.close()
+            self._events = None
 
         log.info("Scheduled worker arrêté")
 
     def stop(self):
         """Arrêter le worker"""
         self.running = False
+        if self._events is not None:
+            self._events.wake()
+
+    def _next_wait(self, now: Optional[datetime] = None) -> float:
+        """Délai jusqu'à la prochaine échéance, borné par check_interval."""
+        now = now or datetime.now(self.scheduler.timezone)
+        due = [
+            t.release_time
+            for t in self.scheduler.scheduled_tasks
+            if t.status == ScheduleStatus.SCHEDULED
+        ]
+        if not due:
+            return float(self.check_interval)
+        delay = (min(due) - now).total_seconds()
+        return max(0.0, min(float(self.check_interval), delay))
 
     def process_ready_tasks(self):
         """Traiter les tâches prêtes à être exécutées"""
@@ -102,8 +138,8 @@ class ScheduledWorker:
         new_task_path = self.queue_dir / f"scheduled_{scheduled_task.task_id}.json"
 
         try:
-            with open(new_task_path, "w", encoding="utf-8") as f:
-                json.dump(task_data, f, ensure_ascii=False, indent=2)
+            # Écriture atomique: le worker démon est réveillé par le renommage
+            write_json_atomic(new_task_path, task_data)
 
             # Marquer comme en cours de traitement
             self.scheduler.mark_task_processing(scheduled_task.task_id)
@@ -13,6 +13,9 @@ from typing import Any, Dict, List, Optional
 
 import pytz
 
+from .config_loader import get_config_snapshot
+from .queue_events import write_json_atomic
+
 log = logging.getLogger(__name__)
 
 
@@ -81,11 +84,19 @@ class ScheduledTask:
     created_at: Optional[datetime] = None
     attempts: int = 0
     max_attempts: int = 3
+    # Durée estimée de préparation (encodage + upload): sortie du planning
+    # en avance pour que la vidéo soit prête au créneau
+    lead_seconds: float = 0.0
 
     def __post_init__(self):
         if self.created_at is None:
             self.created_at = datetime.now()
 
+    @property
+    def release_time(self) -> datetime:
+        """Heure de sortie du planning vers la queue."""
+        return self.scheduled_time - timedelta(seconds=self.lead_seconds or 0)
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             "task_id": self.task_id,
@@ -95,6 +106,7 @@ class ScheduledTask:
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "attempts": self.attempts,
             "max_attempts": self.max_attempts,
+            "lead_seconds": self.lead_seconds,
         }
 
     @classmethod
@@ -111,6 +123,7 @@ class ScheduledTask:
             ),
             attempts=data.get("attempts", 0),
             max_attempts=data.get("max_attempts", 3),
+            lead_seconds=float(data.get("lead_seconds") or 0.0),
         )
 
 
@@ -139,13 +152,11 @@ class UploadScheduler:
         """Charger la configuration des créneaux"""
         if self.slots_file.exists():
             try:
-                with open(self.slots_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    self.time_slots = {}
-                    for day, slots in data.items():
-                        self.time_slots[day] = [
-                            TimeSlot.from_dict(slot) for slot in slots
-                        ]
+                # Snapshot partagé: pas de relecture tant que le fichier ne change pas
+                data = get_config_snapshot(self.slots_file).raw
+                self.time_slots = {}
+                for day, slots in data.items():
+                    self.time_slots[day] = [TimeSlot.from_dict(slot) for slot in slots]
             except Exception as e:
                 log.error(f"Erreur chargement créneaux: {e}")
                 self.time_slots = self._default_time_slots()
@@ -239,8 +250,8 @@ class UploadScheduler:
         """Sauvegarder les tâches planifiées"""
         try:
             data = [task.to_dict() for task in self.scheduled_tasks]
-            with open(self.schedule_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            # Écriture atomique: le scheduled worker relit ce fichier sur événement
+            write_json_atomic(self.schedule_file, data)
         except Exception as e:
             log.error(f"Erreur sauvegarde tâches planifiées: {e}")
 
@@ -249,6 +260,7 @@ class UploadScheduler:
         from_time: Optional[datetime] = None,
         preferred_days: Optional[List[str]] = None,
         min_delay_hours: int = 1,
+        lead_time: Optional[timedelta] = None,
     ) -> datetime:
         """
         Trouve le prochain créneau optimal pour un upload
@@ -257,6 +269,8 @@ class UploadScheduler:
             from_time: Heure de départ (maintenant par défaut)
             preferred_days: Jours préférés (tous par défaut)
             min_delay_hours: Délai minimum en heures
+            lead_time: Durée estimée de préparation de la tâche (encodage +
+                upload); seuls les créneaux tenables sont retenus
 
         Returns:
             Datetime du prochain créneau optimal
@@ -264,8 +278,11 @@ class UploadScheduler:
         if from_time is None:
             from_time = datetime.now(self.timezone)
 
-        # Ajouter le délai minimum
-        search_start = from_time + timedelta(hours=min_delay_hours)
+        # Ajouter le délai minimum (ou la préparation estimée si plus longue)
+        delay = timedelta(hours=min_delay_hours)
+        if lead_time is not None and lead_time > delay:
+            delay = lead_time
+        search_start = from_time + delay
 
         # Chercher sur les 14 prochains jours
         for days_ahead in range(14):
@@ -332,6 +349,7 @@ class UploadScheduler:
         task_path: Path,
         scheduled_time: Optional[datetime] = None,
         preferred_days: Optional[List[str]] = None,
+        lead_time: Optional[timedelta] = None,
     ) -> ScheduledTask:
         """
         Planifier une tâche
@@ -340,12 +358,16 @@ class UploadScheduler:
             task_path: Chemin vers la tâche à planifier
             scheduled_time: Heure spécifique (auto si None)
             preferred_days: Jours préférés pour la planification auto
+            lead_time: Durée estimée de préparation: la tâche sort du planning
+                d'autant en avance (et le créneau auto doit la laisser passer)
 
         Returns:
             Tâche planifiée créée
         """
         if scheduled_time is None:
-            scheduled_time = self.find_next_optimal_slot(preferred_days=preferred_days)
+            scheduled_time = self.find_next_optimal_slot(
+                preferred_days=preferred_days, lead_time=lead_time
+            )
 
         # Générer un ID unique
         task_id = f"sched_{int(scheduled_time.timestamp())}_{task_path.stem}"
@@ -356,6 +378,7 @@ class UploadScheduler:
             scheduled_time=scheduled_time,
             original_task_path=task_path,
             created_at=datetime.now(self.timezone),
+            lead_seconds=lead_time.total_seconds() if lead_time else 0.0,
         )
 
         self.scheduled_tasks.append(scheduled_task)
@@ -375,7 +398,7 @@ class UploadScheduler:
         for task in self.scheduled_tasks:
             if (
                 task.status == ScheduleStatus.SCHEDULED
-                and task.scheduled_time <= current_time
+                and task.release_time <= current_time
             ):
                 task.status = ScheduleStatus.READY
                 ready_tasks.append(task)
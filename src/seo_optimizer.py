@@ -10,7 +10,6 @@ import os
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Optional
-import aiohttp
 from dataclasses import dataclass
 
 log = logging.getLogger(__name__)
@@ -76,6 +75,8 @@ class YouTubeTrendsAPI:
             if category_id:
                 params["videoCategoryId"] = category_id
 
+            import aiohttp
+
             async with aiohttp.ClientSession() as session:
                 async with session.get(
                     f"{self.base_url}/videos", params=params
@@ -102,6 +103,8 @@ class YouTubeTrendsAPI:
                 "key": self.api_key,
             }
 
+            import aiohttp
+
             async with aiohttp.ClientSession() as session:
                 async with session.get(
                     f"{self.base_url}/search", params=params
@@ -0,0 +1,240 @@
+"""
+Mesure de la durée de chaque étape d'une tâche.
+
+- TaskTimings: spans (début/fin en horloge monotone, relatifs au début de la
+  tâche) enregistrés dans le bloc `timings` du JSON de la tâche
+- span(): sous-étape rattachée au span courant du thread (ex: chacun des
+  appels Ollama à l'intérieur de ai_meta), sans rien faire hors d'une tâche
+- StageMetrics: historique glissant (JSONL dans la file) des durées par étape
+  des dernières tâches, lu par le monitor web pour les p50/p95 et par
+  l'estimateur de durée de préparation (task_estimator)
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: verrou entre threads seulement
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+TIMINGS_KEY = "timings"
+METRICS_FILE = "stage_metrics.jsonl"
+DEFAULT_WINDOW = 200
+
+_current: contextvars.ContextVar[Optional["TaskTimings"]] = contextvars.ContextVar(
+    "task_timings", default=None
+)
+
+
+class TaskTimings:
+    """Spans d'exécution d'une tâche (thread-safe: étapes parallèles)."""
+
+    def __init__(self):
+        self._origin = time.monotonic()
+        self.started_at = datetime.now().isoformat()
+        self._spans: List[tuple] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Mesure le bloc; les span() imbriqués du même thread sont rattachés à la tâche."""
+        token = _current.set(self)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            end = time.monotonic()
+            _current.reset(token)
+            with self._lock:
+                self._spans.append((start - self._origin, end - self._origin, name))
+
+    def totals(self) -> Dict[str, float]:
+        """Durée cumulée par étape (une étape peut s'exécuter plusieurs fois)."""
+        out: Dict[str, float] = {}
+        with self._lock:
+            for start, end, name in self._spans:
+                out[name] = out.get(name, 0.0) + (end - start)
+        return {name: round(seconds, 3) for name, seconds in out.items()}
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            # Ordre chronologique, l'étape englobante avant ses sous-étapes
+            spans = sorted(self._spans, key=lambda s: (s[0], -s[1]))
+        return {
+            "started_at": self.started_at,
+            "total_seconds": round(time.monotonic() - self._origin, 3),
+            "spans": [
+                {
+                    "stage": name,
+                    "start": round(start, 3),
+                    "end": round(end, 3),
+                    "seconds": round(end - start, 3),
+                }
+                for start, end, name in spans
+            ],
+            "stages": self.totals(),
+        }
+
+
+def span(name: str):
+    """Sous-étape de la tâche en cours dans ce thread (no-op hors tâche)."""
+    timings = _current.get()
+    return timings.span(name) if timings is not None else nullcontext()
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Percentile par rang le plus proche (q entre 0 et 100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class StageMetrics:
+    """Historique glissant des durées par étape (une ligne JSON par tâche).
+
+    Les ajouts sont des écritures O_APPEND d'une ligne sous verrou partagé;
+    le fichier est compacté aux `window` dernières tâches quand il double,
+    sous verrou exclusif (`<fichier>.lock`). Le fichier n'est relu que quand
+    sa taille dépasse le seuil estimé depuis la dernière lecture.
+    """
+
+    def __init__(self, path: str | Path, window: int = DEFAULT_WINDOW):
+        self.path = Path(path)
+        self.window = max(1, int(window))
+        self._lock_path = self.path.with_name(self.path.name + ".lock")
+        self._thread_lock = threading.Lock()
+        # Taille (octets) à partir de laquelle relire le fichier pour compacter
+        self._compact_at = 0
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        with self._thread_lock, open(self._lock_path, "a") as lock_file:
+            if fcntl is not None:
+                mode = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+                fcntl.flock(lock_file.fileno(), mode)
+            yield
+
+    def append(
+        self,
+        task_name: str,
+        timings: dict,
+        ok: bool = True,
+        features: Optional[dict] = None,
+    ) -> None:
+        """Ajoute une tâche; `features` (durée, résolution, codec...) nourrit
+        l'estimateur des durées (task_estimator)."""
+        record = {
+            "task": task_name,
+            "finished_at": datetime.now().isoformat(),
+            "ok": bool(ok),
+            "total_seconds": timings.get("total_seconds"),
+            "stages": timings.get("stages") or {},
+        }
+        if features:
+            record["features"] = features
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._locked(exclusive=False):
+            fd = os.open(str(self.path), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, line)
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+        if size >= self._compact_at:
+            self._maybe_compact()
+
+    def _read(self) -> List[dict]:
+        try:
+            lines = self.path.read_text(encoding="utf-8").splitlines()
+        except FileNotFoundError:
+            return []
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue  # Ligne partielle (écriture concurrente)
+        return records
+
+    def _maybe_compact(self) -> None:
+        with self._locked(exclusive=True):
+            records = self._read()
+            try:
+                size = self.path.stat().st_size
+            except OSError:
+                return
+            if len(records) <= 2 * self.window:
+                # Prochaine relecture quand la taille moyenne des lignes
+                # annonce plus de 2 * window enregistrements
+                per_record = size / max(1, len(records))
+                self._compact_at = int(per_record * (2 * self.window + 1))
+                return
+            keep = records[-self.window :]
+            tmp_name = None
+            try:
+                with tempfile.NamedTemporaryFile(
+                    "w",
+                    encoding="utf-8",
+                    dir=self.path.parent,
+                    prefix=self.path.name,
+                    suffix=".tmp",
+                    delete=False,
+                ) as tmp:
+                    tmp_name = tmp.name
+                    tmp.writelines(
+                        json.dumps(r, ensure_ascii=False) + "\n" for r in keep
+                    )
+                os.replace(tmp_name, self.path)
+                # Le fichier compacté doit doubler avant la prochaine relecture
+                self._compact_at = 2 * self.path.stat().st_size
+            except OSError as e:
+                log.debug("Compaction des métriques ignorée: %s", e)
+                if tmp_name:
+                    Path(tmp_name).unlink(missing_ok=True)
+
+    def recent(self, last: Optional[int] = None) -> List[dict]:
+        records = self._read()
+        return records[-(last or self.window) :]
+
+    def percentiles(self, last: Optional[int] = None) -> Dict[str, dict]:
+        """p50/p95 (secondes) par étape sur les `last` dernières tâches."""
+        samples: Dict[str, List[float]] = {}
+        for rec in self.recent(last):
+            for stage, seconds in (rec.get("stages") or {}).items():
+                if isinstance(seconds, (int, float)):
+                    samples.setdefault(stage, []).append(float(seconds))
+            if isinstance(rec.get("total_seconds"), (int, float)):
+                samples.setdefault("total", []).append(float(rec["total_seconds"]))
+        return {
+            stage: {
+                "count": len(values),
+                "p50": round(percentile(values, 50), 3),
+                "p95": round(percentile(values, 95), 3),
+            }
+            for stage, values in sorted(samples.items())
+        }
+
+
+def save_timings(task: dict, timings: TaskTimings) -> dict:
+    """Écrit le bloc `timings` dans la tâche et le renvoie."""
+    block = timings.to_dict()
+    task[TIMINGS_KEY] = block
+    return block
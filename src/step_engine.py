@@ -0,0 +1,308 @@
+"""
+Moteur d'exécution des tâches sous forme de graphe d'étapes.
+
+Chaque étape déclare ses entrées et ses sorties. Les sorties d'une étape réussie
+sont enregistrées (checkpoint) dans la tâche: une nouvelle exécution reprend à la
+première étape incomplète au lieu de tout recommencer (ré-encodage, appels LLM).
+
+Les étapes indépendantes (aucune sortie de l'une n'est une entrée de l'autre)
+peuvent s'exécuter en parallèle.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+STATE_KEY = "steps_state"
+
+
+class StepAbort(Exception):
+    """Interrompt la tâche sans nouvelle tentative (ex: tâche archivée).
+
+    Args:
+        stop_worker: True si le worker doit cesser de traiter d'autres tâches
+    """
+
+    def __init__(self, message: str = "", *, stop_worker: bool = False):
+        super().__init__(message)
+        self.stop_worker = stop_worker
+
+
+class StepFailed(Exception):
+    """Une étape obligatoire a échoué après toutes ses tentatives."""
+
+    def __init__(self, step: str, error: BaseException):
+        super().__init__(f"{step}: {error}")
+        self.step = step
+        self.error = error
+
+
+@dataclass
+class RetryPolicy:
+    """Nombre de tentatives et délai exponentiel entre elles."""
+
+    max_attempts: int = 1
+    backoff_seconds: float = 0.0
+    backoff_factor: float = 2.0
+    retry_on: Tuple[type, ...] = (Exception,)
+
+    def delay(self, attempt: int) -> float:
+        """Délai avant la tentative suivante (attempt commence à 1)."""
+        return self.backoff_seconds * (self.backoff_factor ** max(0, attempt - 1))
+
+
+@dataclass
+class Step:
+    """Nœud du graphe.
+
+    Attributes:
+        fn: Reçoit le contexte d'exécution et les entrées, renvoie un dict de sorties
+        inputs: Clés lues (produites par une autre étape ou présentes au départ)
+        outputs: Clés produites, persistées dans le checkpoint
+        after: Dépendances explicites sans échange de données
+        fallback: Sorties de repli si toutes les tentatives échouent (étape optionnelle)
+        cache_key: Empreinte des paramètres; un checkpoint d'empreinte différente est ignoré
+        is_valid: Vérifie qu'un checkpoint est encore utilisable (ex: fichier présent)
+        terminal: Checkpoint définitif (effet externe irréversible, ex: vidéo
+            publiée): conservé même si une dépendance est rejouée
+    """
+
+    name: str
+    fn: Callable[[Any, Dict[str, Any]], Optional[Dict[str, Any]]]
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    after: Tuple[str, ...] = ()
+    retry: RetryPolicy = field(default_factory=RetryPolicy)
+    fallback: Optional[
+        Callable[[Any, Dict[str, Any], BaseException], Dict[str, Any]]
+    ] = None
+    cache_key: Optional[Callable[[Any], str]] = None
+    is_valid: Optional[Callable[[Dict[str, Any]], bool]] = None
+    terminal: Optional[Callable[[Dict[str, Any]], bool]] = None
+
+
+class StepGraph:
+    """Ensemble ordonné d'étapes avec dépendances déduites des entrées/sorties.
+
+    Une entrée absente de `initial` doit être produite par une étape précédente.
+    """
+
+    def __init__(self, steps: Iterable[Step], initial: Iterable[str] = ()):
+        self.steps: List[Step] = list(steps)
+        self.by_name = {s.name: s for s in self.steps}
+        if len(self.by_name) != len(self.steps):
+            raise ValueError("Noms d'étapes dupliqués")
+        producers: Dict[str, str] = {}
+        for s in self.steps:
+            for out in s.outputs:
+                if out in producers:
+                    raise ValueError(
+                        f"Sortie '{out}' produite par {producers[out]} et {s.name}"
+                    )
+                producers[out] = s.name
+        available = set(initial)
+        self.deps: Dict[str, set] = {}
+        for s in self.steps:
+            deps = set(s.after)
+            for inp in s.inputs:
+                if inp in producers:
+                    deps.add(producers[inp])
+                elif inp not in available:
+                    raise ValueError(f"Entrée '{inp}' de {s.name} jamais produite")
+            unknown = deps - set(self.by_name)
+            if unknown:
+                raise ValueError(f"Dépendances inconnues pour {s.name}: {unknown}")
+            self.deps[s.name] = deps
+        # L'ordre de déclaration doit être topologique (exécution séquentielle)
+        position = {s.name: i for i, s in enumerate(self.steps)}
+        for s in self.steps:
+            late = [d for d in self.deps[s.name] if position[d] >= position[s.name]]
+            if late:
+                raise ValueError(f"{s.name} déclarée avant ses dépendances {late}")
+
+
+class StepEngine:
+    """Exécute un graphe en reprenant depuis les checkpoints de la tâche.
+
+    Args:
+        task: Dict de la tâche; les checkpoints sont stockés sous task["steps_state"]
+        persist: Appelé (sous verrou) après chaque changement d'état à sauvegarder
+        max_parallel: Nombre maximal d'étapes indépendantes exécutées simultanément
+        sleep: Fonction d'attente entre deux tentatives (remplaçable en test)
+    """
+
+    def __init__(
+        self,
+        graph: StepGraph,
+        task: dict,
+        persist: Callable[[], None],
+        *,
+        max_parallel: int = 1,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.graph = graph
+        self.task = task
+        self.persist = persist
+        self.max_parallel = max(1, int(max_parallel))
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        state = task.get(STATE_KEY)
+        self.state: Dict[str, dict] = state if isinstance(state, dict) else {}
+        task[STATE_KEY] = self.state
+
+    def _checkpoint(self, step: Step, run: Any) -> Optional[Dict[str, Any]]:
+        st = self.state.get(step.name) or {}
+        if st.get("status") != "done":
+            return None
+        outputs = st.get("outputs") or {}
+        if any(k not in outputs for k in step.outputs):
+            return None
+        if self._is_terminal(step, outputs):
+            return outputs
+        if step.cache_key is not None and st.get("key") != step.cache_key(run):
+            return None
+        if step.is_valid is not None and not step.is_valid(outputs):
+            return None
+        return outputs
+
+    @staticmethod
+    def _is_terminal(step: Step, outputs: Dict[str, Any]) -> bool:
+        return step.terminal is not None and bool(step.terminal(outputs))
+
+    def _save(self) -> None:
+        with self._lock:
+            self.persist()
+
+    def _run_step(self, step: Step, run: Any, values: Dict[str, Any]) -> Dict[str, Any]:
+        inputs = {k: values.get(k) for k in step.inputs}
+        key = step.cache_key(run) if step.cache_key is not None else None
+        attempt = 0
+        while True:
+            attempt += 1
+            with self._lock:
+                self.state[step.name] = {
+                    "status": "running",
+                    "attempts": attempt,
+                    "started_at": datetime.now().isoformat(),
+                }
+            try:
+                outputs = step.fn(run, inputs) or {}
+                status = "done"
+                error = None
+                break
+            except StepAbort:
+                raise
+            except Exception as e:
+                retryable = isinstance(e, step.retry.retry_on)
+                if retryable and attempt < step.retry.max_attempts:
+                    delay = step.retry.delay(attempt)
+                    log.warning(
+                        "Étape %s échouée (tentative %d/%d): %s; nouvel essai dans %.1fs",
+                        step.name,
+                        attempt,
+                        step.retry.max_attempts,
+                        e,
+                        delay,
+                    )
+                    if delay > 0:
+                        self.sleep(delay)
+                    continue
+                if step.fallback is None:
+                    with self._lock:
+                        self.state[step.name].update(
+                            {"status": "failed", "error": str(e)}
+                        )
+                    self._save()
+                    raise StepFailed(step.name, e) from e
+                log.warning("Étape %s en repli après échec: %s", step.name, e)
+                outputs = step.fallback(run, inputs, e) or {}
+                status = "fallback"
+                error = str(e)
+                break
+
+        missing = [k for k in step.outputs if k not in outputs]
+        if missing:
+            raise StepFailed(step.name, ValueError(f"sorties manquantes: {missing}"))
+        entry = {
+            "status": status,
+            "attempts": attempt,
+            "finished_at": datetime.now().isoformat(),
+            "outputs": {k: outputs[k] for k in step.outputs},
+        }
+        if key is not None:
+            entry["key"] = key
+        if error:
+            entry["error"] = error
+        with self._lock:
+            self.state[step.name] = entry
+        self._save()
+        return entry["outputs"]
+
+    def run(self, run: Any, initial: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Exécute les étapes restantes et renvoie toutes les valeurs produites.
+
+        Les étapes en repli (fallback) sont rejouées au passage suivant; seules les
+        étapes terminées avec succès sont considérées comme acquises.
+        """
+        values: Dict[str, Any] = dict(initial or {})
+        pending: List[Step] = []
+        done: set = set()
+        for step in self.graph.steps:
+            outputs = self._checkpoint(step, run)
+            # Une dépendance sans aucun état a été ajoutée au graphe après ce
+            # checkpoint: elle s'exécute sans invalider l'étape déjà faite
+            deps = {d for d in self.graph.deps[step.name] if d in self.state}
+            if outputs is not None and (
+                deps <= done or self._is_terminal(step, outputs)
+            ):
+                log.info(
+                    "Étape %s déjà effectuée, reprise depuis le checkpoint", step.name
+                )
+                values.update(outputs)
+                done.add(step.name)
+            else:
+                pending.append(step)
+
+        if self.max_parallel == 1:
+            for step in pending:
+                values.update(self._run_step(step, run, values))
+            return values
+
+        running: Dict[Future, Step] = {}
+        with ThreadPoolExecutor(
+            max_workers=self.max_parallel, thread_name_prefix="step"
+        ) as pool:
+            try:
+                while pending or running:
+                    for step in list(pending):
+                        if len(running) >= self.max_parallel:
+                            break
+                        if self.graph.deps[step.name] <= done:
+                            pending.remove(step)
+                            snapshot = dict(values)
+                            running[
+                                pool.submit(self._run_step, step, run, snapshot)
+                            ] = step
+                    if not running:
+                        raise RuntimeError("Graphe bloqué: dépendances insatisfaites")
+                    finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        step = running.pop(fut)
+                        values.update(fut.result())
+                        done.add(step.name)
+            finally:
+                # Laisser finir les étapes en cours avant de propager une erreur
+                for fut in list(running):
+                    try:
+                        fut.result()
+                    except Exception:
+                        pass
+        return values
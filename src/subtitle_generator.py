@@ -5,11 +5,14 @@ Supporte la détection automatique de langue et la traduction multilingue
 
 import logging
 import subprocess
+import wave
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 import json
 import tempfile
 
+from .resource_governor import get_governor
+
 log = logging.getLogger(__name__)
 
 
@@ -30,13 +33,26 @@ def is_whisper_available() -> bool:
         return False
 
 
-def detect_language(video_path: Path, model: str = "base") -> Optional[str]:
+def _copy_wav_head(src: Path, dst: Path, seconds: float) -> None:
+    """Copie les `seconds` premières secondes d'un WAV PCM (sans décodage ffmpeg)."""
+    with wave.open(str(src), "rb") as reader:
+        params = reader.getparams()
+        frames = reader.readframes(int(seconds * reader.getframerate()))
+    with wave.open(str(dst), "wb") as writer:
+        writer.setparams(params)
+        writer.writeframes(frames)
+
+
+def detect_language(
+    video_path: Path, model: str = "base", *, audio_path: Optional[Path] = None
+) -> Optional[str]:
     """
     Détecte la langue principale de la vidéo
 
     Args:
         video_path: Chemin vers la vidéo
         model: Modèle Whisper à utiliser (tiny, base, small, medium, large)
+        audio_path: WAV 16 kHz déjà extrait (passe d'analyse), évite un décodage
 
     Returns:
         Code langue ISO (ex: 'fr', 'en') ou None si échec
@@ -54,29 +70,10 @@ def detect_language(video_path: Path, model: str = "base") -> Optional[str]:
         with tempfile.TemporaryDirectory() as temp_dir:
             temp_audio = Path(temp_dir) / "audio_sample.wav"
 
-            # Extraire un échantillon audio de 30s pour la détection
-            cmd = [
-                "ffmpeg",
-                "-i",
-                str(video_path),
-                "-t",
-                "30",  # 30 secondes
-                "-vn",  # Pas de vidéo
-                "-acodec",
-                "pcm_s16le",
-                "-ar",
-                "16000",  # Sample rate pour Whisper
-                "-ac",
-                "1",  # Mono
-                "-y",  # Overwrite
-                str(temp_audio),
-            ]
-
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-            if result.returncode != 0:
-                log.warning(
-                    "Échec extraction audio pour détection langue: %s", result.stderr
-                )
+            # Échantillon audio de 30s: tiré du WAV de la passe d'analyse si fourni
+            if audio_path is not None and audio_path.exists():
+                _copy_wav_head(audio_path, temp_audio, 30)
+            elif not _extract_audio_sample(video_path, temp_audio):
                 return None
 
             # Détecter la langue avec Whisper
@@ -93,7 +90,13 @@ def detect_language(video_path: Path, model: str = "base") -> Optional[str]:
                 temp_dir,
             ]
 
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+            with get_governor().acquire(label="whisper (langue)") as lease:
+                result = subprocess.run(
+                    lease.whisper_command(cmd),
+                    capture_output=True,
+                    text=True,
+                    timeout=120,
+                )
             if result.returncode != 0:
                 log.warning("Échec détection langue Whisper: %s", result.stderr)
                 return None
@@ -113,12 +116,43 @@ def detect_language(video_path: Path, model: str = "base") -> Optional[str]:
         raise SubtitleError(f"Erreur détection langue: {e}")
 
 
+def _extract_audio_sample(video_path: Path, temp_audio: Path) -> bool:
+    """Extrait 30s d'audio mono 16 kHz (format attendu par Whisper)."""
+    cmd = [
+        "ffmpeg",
+        "-i",
+        str(video_path),
+        "-t",
+        "30",  # 30 secondes
+        "-vn",  # Pas de vidéo
+        "-acodec",
+        "pcm_s16le",
+        "-ar",
+        "16000",  # Sample rate pour Whisper
+        "-ac",
+        "1",  # Mono
+        "-y",  # Overwrite
+        str(temp_audio),
+    ]
+
+    with get_governor().acquire(1, label="extraction audio") as lease:
+        result = subprocess.run(
+            lease.ffmpeg_command(cmd), capture_output=True, text=True, timeout=60
+        )
+    if result.returncode != 0:
+        log.warning("Échec extraction audio pour détection langue: %s", result.stderr)
+        return False
+    return True
+
+
 def generate_subtitles(
     video_path: Path,
     output_path: Path,
     language: Optional[str] = None,
     model: str = "base",
     translate_to_english: bool = False,
+    *,
+    audio_path: Optional[Path] = None,
 ) -> Path:
     """
     Génère des sous-titres SRT pour une vidéo
@@ -129,6 +163,7 @@ def generate_subtitles(
         language: Langue source (auto-détection si None)
         model: Modèle Whisper (tiny, base, small, medium, large)
         translate_to_english: Traduire vers l'anglais
+        audio_path: WAV 16 kHz déjà extrait, transcrit à la place de la vidéo
 
     Returns:
         Chemin vers le fichier .srt généré
@@ -143,10 +178,13 @@ def generate_subtitles(
 
     try:
         output_path.parent.mkdir(parents=True, exist_ok=True)
+        source = (
+            audio_path if audio_path is not None and audio_path.exists() else video_path
+        )
 
         cmd = [
             "whisper",
-            str(video_path),
+            str(source),
             "--model",
             model,
             "--output_format",
@@ -164,16 +202,18 @@ def generate_subtitles(
             cmd.append("--task")
             cmd.append("translate")
 
-        log.info("Génération sous-titres: %s", " ".join(cmd))
-        result = subprocess.run(
-            cmd, capture_output=True, text=True, timeout=600
-        )  # 10 min max
+        with get_governor().acquire(label="whisper") as lease:
+            cmd = lease.whisper_command(cmd)
+            log.info("Génération sous-titres: %s", " ".join(cmd))
+            result = subprocess.run(
+                cmd, capture_output=True, text=True, timeout=600
+            )  # 10 min max
 
         if result.returncode != 0:
             raise SubtitleError(f"Échec génération Whisper: {result.stderr}")
 
         # Whisper génère automatiquement le nom de fichier
-        expected_srt = output_path.parent / f"{video_path.stem}.srt"
+        expected_srt = output_path.parent / f"{source.stem}.srt"
 
         if expected_srt.exists():
             # Renommer vers le nom souhaité si différent
@@ -0,0 +1,291 @@
+"""
+Estimation de la durée de préparation d'une tâche (encodage + upload).
+
+Chaque tâche terminée laisse dans `queue/stage_metrics.jsonl` la durée de ses
+étapes et ses caractéristiques (durée et hauteur de la source, codec, preset,
+filtres, taille du fichier uploadé). L'estimateur en tire:
+
+- l'encodage: coût médian en secondes par seconde de média, ramené à une
+  sortie 1080p (le coût suit le nombre de pixels), pris dans le groupe
+  d'historique le plus proche (codec+preset+filtres, puis codec+preset, puis
+  codec) qui compte assez d'échantillons; sinon le profil de calibration de
+  l'hôte (`main.py enhance-bench`), sinon l'historique entier
+- l'upload: débit médian (octets/s) des derniers uploads; taille du fichier
+  connue ou estimée par l'historique
+
+Le planificateur s'en sert pour ne retenir que des créneaux tenables, et le
+worker / le bot Telegram pour signaler une échéance intenable.
+"""
+
+from __future__ import annotations
+
+import logging
+import statistics
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from .encode_bench import (
+    DEFAULT_PROFILE_PATH,
+    FILTER_OPTIONS,
+    CalibrationProfile,
+    load_profile,
+)
+from .media_probe import MediaInfo, probe_media
+from .stage_metrics import METRICS_FILE, StageMetrics
+
+log = logging.getLogger(__name__)
+
+# Échantillons requis pour se fier à un groupe d'historique
+MIN_SAMPLES = 3
+REFERENCE_HEIGHT = 1080
+
+
+def scale_height(scale: Optional[str]) -> Optional[int]:
+    """Hauteur de sortie d'une option scale ("1080p", "1920x1080"), sinon None."""
+    s = str(scale or "").strip().lower()
+    if s.endswith("p") and s[:-1].isdigit():
+        return int(s[:-1])
+    w, sep, h = s.partition("x")
+    return int(h) if sep and w.isdigit() and h.isdigit() else None
+
+
+def enhance_filters(enhance_cfg: Optional[dict]) -> List[str]:
+    """Filtres actifs d'une config enhance, dans le vocabulaire du banc d'essai."""
+    cfg = enhance_cfg or {}
+    filters = [k for k in FILTER_OPTIONS if k != "scale" and cfg.get(k)]
+    if cfg.get("scale"):
+        filters.append("scale")
+    return filters
+
+
+@dataclass
+class TaskFeatures:
+    """Caractéristiques d'une tâche qui déterminent son coût."""
+
+    duration: float
+    height: Optional[int] = None
+    out_height: Optional[int] = None
+    codec: str = "h264"
+    preset: str = "medium"
+    filters: List[str] = field(default_factory=list)
+    # Fichier uploadé (connu quand il n'y a pas d'encodage)
+    size_bytes: Optional[int] = None
+    encode: bool = True
+
+    @property
+    def media_units(self) -> float:
+        """Secondes de média équivalent 1080p (coût proportionnel aux pixels)."""
+        height = self.out_height or self.height or REFERENCE_HEIGHT
+        return self.duration * (height / REFERENCE_HEIGHT) ** 2
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data) -> Optional["TaskFeatures"]:
+        if not isinstance(data, dict) or not data.get("duration"):
+            return None
+        known = {f.name for f in fields(cls)}
+        try:
+            return cls(**{k: v for k, v in data.items() if k in known})
+        except TypeError:
+            return None
+
+
+def features_for(
+    info: Optional[MediaInfo],
+    enhance_cfg: Optional[dict],
+    *,
+    encode: bool = True,
+    size_bytes: Optional[int] = None,
+) -> Optional[TaskFeatures]:
+    """Caractéristiques depuis la sonde de la source et la config enhance."""
+    if info is None or not info.duration:
+        return None
+    cfg = enhance_cfg or {}
+    encode = encode and bool(enhance_cfg) and cfg.get("enabled", True)
+    return TaskFeatures(
+        duration=float(info.duration),
+        height=info.height,
+        out_height=scale_height(cfg.get("scale")) or info.height,
+        codec=str(cfg.get("codec") or "h264"),
+        preset=str(cfg.get("preset") or "medium"),
+        filters=enhance_filters(cfg),
+        size_bytes=size_bytes,
+        encode=bool(encode),
+    )
+
+
+def format_duration(seconds: float) -> str:
+    """'~2 h 05' ou '~25 min'."""
+    minutes = max(1, int(round(seconds / 60)))
+    if minutes < 60:
+        return f"~{minutes} min"
+    return f"~{minutes // 60} h {minutes % 60:02d}"
+
+
+@dataclass
+class Estimate:
+    encode_seconds: float
+    upload_seconds: Optional[float] = None
+    samples: int = 0
+    basis: str = ""
+
+    @property
+    def total_seconds(self) -> float:
+        return self.encode_seconds + (self.upload_seconds or 0.0)
+
+    def describe(self) -> str:
+        parts = []
+        if self.encode_seconds:
+            parts.append(f"encodage {format_duration(self.encode_seconds)}")
+        parts.append(
+            f"upload {format_duration(self.upload_seconds)}"
+            if self.upload_seconds is not None
+            else "upload inconnu"
+        )
+        return ", ".join(parts) + (f" ({self.basis})" if self.basis else "")
+
+
+def _stage(record: dict, name: str) -> Optional[float]:
+    value = (record.get("stages") or {}).get(name)
+    return float(value) if isinstance(value, (int, float)) and value > 0 else None
+
+
+class TaskEstimator:
+    """Prédit les durées d'encodage et d'upload depuis l'historique des tâches.
+
+    Args:
+        history: Renvoie les enregistrements d'historique (relu à chaque
+            estimation: le worker démon apprend au fil des tâches)
+        profile: Profil de calibration de l'hôte, repli sans historique
+    """
+
+    def __init__(
+        self,
+        history: Callable[[], List[dict]],
+        profile: Optional[CalibrationProfile] = None,
+    ):
+        self._history = history
+        self.profile = profile
+
+    @classmethod
+    def for_queue(
+        cls,
+        queue_dir: str | Path,
+        *,
+        profile_path: str | Path = DEFAULT_PROFILE_PATH,
+    ) -> "TaskEstimator":
+        metrics = StageMetrics(Path(queue_dir) / METRICS_FILE)
+        return cls(metrics.recent, load_profile(profile_path))
+
+    def _samples(self) -> List[Tuple[dict, TaskFeatures]]:
+        try:
+            records = self._history() or []
+        except OSError as e:
+            log.debug("Historique des durées illisible: %s", e)
+            return []
+        out = []
+        for record in records:
+            features = TaskFeatures.from_dict(record.get("features"))
+            if record.get("ok", True) and features is not None:
+                out.append((record, features))
+        return out
+
+    def _encode(
+        self, features: TaskFeatures, samples: List[Tuple[dict, TaskFeatures]]
+    ) -> Optional[Tuple[float, int, str]]:
+        costs = [
+            (f, seconds / f.media_units)
+            for r, f in samples
+            if f.encode and (seconds := _stage(r, "enhance")) and f.media_units > 0
+        ]
+        wanted = sorted(features.filters)
+        groups = (
+            (
+                f"{features.codec}/{features.preset}"
+                + "".join(f"+{name}" for name in wanted),
+                lambda f: (f.codec, f.preset, sorted(f.filters))
+                == (features.codec, features.preset, wanted),
+            ),
+            (
+                f"{features.codec}/{features.preset}",
+                lambda f: (f.codec, f.preset) == (features.codec, features.preset),
+            ),
+            (features.codec, lambda f: f.codec == features.codec),
+        )
+        for label, match in groups:
+            values = [cost for f, cost in costs if match(f)]
+            if len(values) >= MIN_SAMPLES:
+                cost = statistics.median(values)
+                return cost * features.media_units, len(values), f"historique {label}"
+        if self.profile is not None:
+            seconds = self.profile.estimate_seconds(
+                features.codec,
+                features.preset,
+                duration=features.duration,
+                filters=features.filters,
+                in_height=features.height,
+                out_height=features.out_height,
+            )
+            if seconds is not None:
+                return seconds, 0, "calibration de l'hôte"
+        if costs:
+            cost = statistics.median(cost for _, cost in costs)
+            return cost * features.media_units, len(costs), "historique global"
+        return None
+
+    def _upload(
+        self, features: TaskFeatures, samples: List[Tuple[dict, TaskFeatures]]
+    ) -> Optional[float]:
+        rates, densities = [], []
+        for record, f in samples:
+            seconds = _stage(record, "upload")
+            if not f.size_bytes or f.size_bytes <= 0:
+                continue
+            if seconds:
+                rates.append(f.size_bytes / seconds)
+            if f.encode and f.media_units > 0:
+                densities.append(f.size_bytes / f.media_units)
+        if not rates:
+            return None
+        size = features.size_bytes
+        if not size and densities:
+            size = statistics.median(densities) * features.media_units
+        if not size:
+            return None
+        return size / statistics.median(rates)
+
+    def estimate(self, features: Optional[TaskFeatures]) -> Optional[Estimate]:
+        """Durées prévues; None si l'encodage nécessaire n'est pas estimable."""
+        if features is None:
+            return None
+        samples = self._samples()
+        encode: Optional[Tuple[float, int, str]] = (0.0, 0, "")
+        if features.encode:
+            encode = self._encode(features, samples)
+            if encode is None:
+                return None
+        seconds, count, basis = encode
+        return Estimate(
+            encode_seconds=round(seconds, 1),
+            upload_seconds=(
+                round(upload, 1)
+                if (upload := self._upload(features, samples)) is not None
+                else None
+            ),
+            samples=count,
+            basis=basis,
+        )
+
+    def estimate_video(
+        self,
+        video_path: str | Path,
+        enhance_cfg: Optional[dict],
+        *,
+        encode: bool = True,
+    ) -> Optional[Estimate]:
+        """Sonde la source puis estime (None sans sonde ni historique)."""
+        info = probe_media(Path(video_path)) if video_path else None
+        return self.estimate(features_for(info, enhance_cfg, encode=encode))
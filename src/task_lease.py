@@ -0,0 +1,231 @@
+"""
+Réservation des tâches par bail (lease) pour partager une file entre workers.
+
+Plusieurs processus ou machines peuvent pointer sur le même répertoire `queue/`
+(système de fichiers partagé). Pour traiter une tâche, un worker:
+
+1. crée `queue/inflight/<tâche>.lease` en mode exclusif (O_EXCL): un seul gagnant
+2. renomme `queue/<tâche>` vers `queue/inflight/<tâche>` (atomique)
+3. rafraîchit le bail (mtime du fichier .lease) pendant tout le traitement
+4. à la fin, remet la tâche dans la file si elle n'a pas été archivée, puis
+   supprime le bail
+
+Un bail non rafraîchi depuis plus de `ttl` secondes (worker tué, machine
+arrêtée) est repris: la tâche retourne dans la file et reprend depuis ses
+checkpoints. Les horloges des machines doivent être approximativement
+synchronisées (NTP).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+INFLIGHT_DIR = "inflight"
+LEASE_SUFFIX = ".lease"
+DEFAULT_LEASE_TTL = 300.0
+
+
+def default_owner_id() -> str:
+    """Identifiant unique du worker: hôte, pid et suffixe aléatoire."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def locate_task(path: str | Path) -> Path:
+    """Chemin actuel d'une tâche de la file (éventuellement en cours de traitement)."""
+    path = Path(path)
+    if not path.exists():
+        inflight = path.parent / INFLIGHT_DIR / path.name
+        if inflight.exists():
+            return inflight
+    return path
+
+
+@dataclass
+class Lease:
+    """Bail détenu sur une tâche."""
+
+    name: str
+    queue_path: Path
+    task_path: Path
+    lease_path: Path
+
+
+class LeaseManager:
+    """Réserve, entretient et libère les tâches d'une file partagée.
+
+    Args:
+        queue_dir: Répertoire de la file (le bail vit dans queue_dir/inflight)
+        owner: Identifiant du worker (défaut: hôte:pid:aléatoire)
+        ttl: Durée (s) sans rafraîchissement après laquelle un bail expire
+    """
+
+    def __init__(
+        self,
+        queue_dir: str | Path,
+        *,
+        owner: Optional[str] = None,
+        ttl: float = DEFAULT_LEASE_TTL,
+    ):
+        self.queue_dir = Path(queue_dir)
+        self.inflight_dir = self.queue_dir / INFLIGHT_DIR
+        self.inflight_dir.mkdir(parents=True, exist_ok=True)
+        self.owner = owner or default_owner_id()
+        self.ttl = max(1.0, float(ttl))
+        self._held: Dict[str, Lease] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _lease_path(self, name: str) -> Path:
+        return self.inflight_dir / f"{name}{LEASE_SUFFIX}"
+
+    def claim(self, task_path: str | Path) -> Optional[Lease]:
+        """Réserve la tâche; None si un autre worker la détient déjà."""
+        task_path = Path(task_path)
+        name = task_path.name
+        lease_path = self._lease_path(name)
+        try:
+            fd = os.open(str(lease_path), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            return None
+        try:
+            now = time.time()
+            os.write(
+                fd,
+                json.dumps(
+                    {"owner": self.owner, "claimed_at": now, "ttl": self.ttl}
+                ).encode("utf-8"),
+            )
+        finally:
+            os.close(fd)
+        inflight_path = self.inflight_dir / name
+        try:
+            os.rename(task_path, inflight_path)
+        except FileNotFoundError:
+            # Déjà prise puis relâchée/archivée par un autre worker
+            self._unlink(lease_path)
+            return None
+        lease = Lease(name, task_path, inflight_path, lease_path)
+        with self._lock:
+            self._held[name] = lease
+        return lease
+
+    def owns(self, lease_or_path) -> bool:
+        """Vérifie que le bail est toujours à nous (non repris après expiration)."""
+        name = (
+            lease_or_path.name
+            if isinstance(lease_or_path, Lease)
+            else Path(lease_or_path).name
+        )
+        try:
+            data = json.loads(self._lease_path(name).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        return data.get("owner") == self.owner
+
+    def release(self, lease: Lease) -> None:
+        """Remet la tâche dans la file si elle est encore en cours, puis libère le bail."""
+        with self._lock:
+            self._held.pop(lease.name, None)
+        if self.owns(lease):
+            try:
+                os.rename(lease.task_path, lease.queue_path)
+            except FileNotFoundError:
+                pass  # Archivée ou replanifiée pendant le traitement
+            self._unlink(lease.lease_path)
+        else:
+            log.warning("Bail perdu pendant le traitement de %s", lease.name)
+
+    def heartbeat(self) -> List[Lease]:
+        """Rafraîchit les baux détenus qui sont toujours à nous.
+
+        Un bail repris par un autre worker n'est jamais rafraîchi (ce serait
+        prolonger le sien): il est retiré des baux détenus et renvoyé, et la
+        tâche en cours le constate via `owns()` avant l'upload.
+        """
+        with self._lock:
+            held = list(self._held.values())
+        lost: List[Lease] = []
+        for lease in held:
+            if self.owns(lease):
+                try:
+                    os.utime(lease.lease_path)
+                    continue
+                except FileNotFoundError:
+                    pass  # Repris entre la vérification et le rafraîchissement
+            log.error("Bail repris par un autre worker: %s", lease.name)
+            with self._lock:
+                self._held.pop(lease.name, None)
+            lost.append(lease)
+        return lost
+
+    def reclaim_expired(self) -> List[Path]:
+        """Remet dans la file les tâches dont le bail a expiré.
+
+        Renvoie les chemins de file redevenus réservables.
+        """
+        reclaimed: List[Path] = []
+        now = time.time()
+        for lease_path in self.inflight_dir.glob(f"*{LEASE_SUFFIX}"):
+            name = lease_path.name[: -len(LEASE_SUFFIX)]
+            with self._lock:
+                if name in self._held:
+                    continue
+            try:
+                if now - lease_path.stat().st_mtime <= self.ttl:
+                    continue
+            except FileNotFoundError:
+                continue
+            # Renommage atomique: un seul worker effectue la reprise
+            grave = self.inflight_dir / f".{name}.reclaim.{uuid.uuid4().hex[:8]}"
+            try:
+                os.rename(lease_path, grave)
+            except FileNotFoundError:
+                continue
+            try:
+                os.rename(self.inflight_dir / name, self.queue_dir / name)
+                log.warning("Bail expiré, tâche remise en file: %s", name)
+            except FileNotFoundError:
+                # Bail orphelin (arrêt entre création du bail et renommage)
+                log.info("Bail orphelin supprimé: %s", name)
+            self._unlink(grave)
+            reclaimed.append(self.queue_dir / name)
+        return reclaimed
+
+    def start(self) -> None:
+        """Démarre le rafraîchissement périodique (toutes les ttl/3 secondes)."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def _loop():
+            while not self._stop.wait(self.ttl / 3):
+                self.heartbeat()
+
+        self._thread = threading.Thread(target=_loop, name="lease-heartbeat")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    @staticmethod
+    def _unlink(path: Path) -> None:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,213 @@
+"""
+File de priorité des tâches du worker.
+
+Ordre de dispatch: classe de priorité (high, normal, low), puis échéance la
+plus proche à l'intérieur d'une classe (earliest-deadline-first), puis nom de
+fichier. L'échéance vient de `deadline`, `publish_at`, `custom_schedule_time`
+ou `scheduled_time`; une tâche sans échéance passe après celles qui en ont une.
+
+Le tas est mis à jour incrémentalement (push/discard à chaque événement de la
+file); les entrées remplacées sont invalidées paresseusement au pop.
+
+Une tâche `blocked` (limite d'upload YouTube) porte un `retry_after`: elle est
+mise de côté jusqu'à cette date puis redevient traitable.
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import logging
+import math
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .queue_events import QUEUE_PATTERNS
+
+log = logging.getLogger(__name__)
+
+PRIORITY_CLASSES = {"high": 0, "normal": 1, "low": 2}
+DEFAULT_PRIORITY = "normal"
+# Statuts que le worker peut (re)prendre
+DISPATCHABLE_STATUSES = (None, "pending", "error")
+BLOCKED_STATUS = "blocked"
+DEADLINE_FIELDS = ("deadline", "publish_at", "custom_schedule_time", "scheduled_time")
+
+SortKey = Tuple[int, float, str]
+
+
+def priority_class(value) -> int:
+    """Classe numérique (0 = la plus urgente) depuis un nom ou un entier."""
+    if isinstance(value, bool):
+        value = None
+    if isinstance(value, int):
+        return max(0, value)
+    if isinstance(value, str) and value.strip().lower() in PRIORITY_CLASSES:
+        return PRIORITY_CLASSES[value.strip().lower()]
+    return PRIORITY_CLASSES[DEFAULT_PRIORITY]
+
+
+def _parse_deadline(value) -> Optional[float]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str) or not value.strip():
+        return None
+    try:
+        return datetime.fromisoformat(value.strip().replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def task_deadline(task: dict) -> Optional[float]:
+    """Échéance (timestamp) de la tâche, None si aucune."""
+    meta = task.get("meta") if isinstance(task.get("meta"), dict) else {}
+    for key in DEADLINE_FIELDS:
+        ts = _parse_deadline(task.get(key))
+        if ts is None:
+            ts = _parse_deadline(meta.get(key))
+        if ts is not None:
+            return ts
+    return None
+
+
+def retry_at(task: dict) -> Optional[float]:
+    """Date (timestamp) de nouvel essai d'une tâche bloquée, None sinon."""
+    if not isinstance(task, dict) or task.get("status") != BLOCKED_STATUS:
+        return None
+    return _parse_deadline(task.get("retry_after"))
+
+
+def is_dispatchable(task: dict, now: Optional[float] = None) -> bool:
+    """True si le worker peut prendre la tâche maintenant."""
+    if not isinstance(task, dict):
+        return False
+    if task.get("status") in DISPATCHABLE_STATUSES:
+        return True
+    ts = retry_at(task)
+    return ts is not None and ts <= (time.time() if now is None else now)
+
+
+def task_sort_key(task: dict, path: Path) -> SortKey:
+    deadline = task_deadline(task)
+    return (
+        priority_class(task.get("priority")),
+        deadline if deadline is not None else math.inf,
+        path.name,
+    )
+
+
+class TaskQueue:
+    """Tas des tâches prêtes à être traitées.
+
+    Non thread-safe: utilisé par la seule boucle de dispatch du worker.
+    """
+
+    def __init__(self, patterns: Iterable[str] = QUEUE_PATTERNS):
+        self.patterns = tuple(patterns)
+        self._heap: List[Tuple[SortKey, int, Path]] = []
+        self._live: Dict[Path, int] = {}
+        self._status: Dict[Path, str] = {}
+        # Tâches bloquées -> date de nouvel essai
+        self._deferred: Dict[Path, float] = {}
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def __contains__(self, path: Path) -> bool:
+        return Path(path) in self._live
+
+    def push(self, path: Path, task: Optional[dict] = None) -> bool:
+        """Ajoute ou reclasse une tâche; ignorée si son statut n'est pas traitable."""
+        path = Path(path)
+        if task is None:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    task = json.load(f)
+            except (OSError, ValueError) as e:
+                log.debug("Tâche illisible ignorée %s: %s", path, e)
+                self.discard(path)
+                return False
+        if not is_dispatchable(task):
+            self.discard(path)
+            ts = retry_at(task)
+            if ts is not None:
+                self._deferred[path] = ts
+            return False
+        self._deferred.pop(path, None)
+        self._seq += 1
+        self._live[path] = self._seq
+        self._status[path] = task.get("status") or "pending"
+        heapq.heappush(self._heap, (task_sort_key(task, path), self._seq, path))
+        if len(self._heap) > 4 * len(self._live) + 64:
+            # Trop d'entrées obsolètes (tâches réécrites): compacter
+            self._heap = [e for e in self._heap if self._live.get(e[2]) == e[1]]
+            heapq.heapify(self._heap)
+        return True
+
+    def discard(self, path: Path) -> None:
+        self._live.pop(Path(path), None)
+        self._status.pop(Path(path), None)
+        self._deferred.pop(Path(path), None)
+
+    def defer(self, path: Path, task: Optional[dict] = None) -> bool:
+        """Suit une tâche bloquée jusqu'à son `retry_after` (sans la mettre en file)."""
+        path = Path(path)
+        if task is None:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    task = json.load(f)
+            except (OSError, ValueError):
+                return False
+        ts = retry_at(task)
+        if ts is None:
+            return False
+        self._deferred[path] = ts
+        return True
+
+    def release_due(self, now: Optional[float] = None) -> int:
+        """Remet dans la file les tâches bloquées dont le `retry_after` est passé."""
+        now = time.time() if now is None else now
+        due = [p for p, ts in self._deferred.items() if ts <= now]
+        return sum(1 for p in due if self.push(p))
+
+    def pop(self) -> Optional[Path]:
+        """Tâche la plus prioritaire, ou None si la file est vide."""
+        while self._heap:
+            _key, seq, path = heapq.heappop(self._heap)
+            if self._live.get(path) == seq:
+                del self._live[path]
+                self._status.pop(path, None)
+                return path
+        return None
+
+    def scan(
+        self, queue_dir: Path, skip: Optional[Callable[[Path], bool]] = None
+    ) -> None:
+        """Reconstruit le tas depuis le répertoire (démarrage, débordement d'événements)."""
+        self._heap.clear()
+        self._live.clear()
+        self._status.clear()
+        self._deferred.clear()
+        for pattern in self.patterns:
+            for path in Path(queue_dir).glob(pattern):
+                if skip is None or not skip(path):
+                    self.push(path)
+
+    def counts_by_status(self) -> Dict[str, int]:
+        """Nombre de tâches en attente par statut (pending, error, blocked)."""
+        counts: Dict[str, int] = {}
+        for status in self._status.values():
+            counts[status] = counts.get(status, 0) + 1
+        if self._deferred:
+            counts[BLOCKED_STATUS] = counts.get(BLOCKED_STATUS, 0) + len(self._deferred)
+        return counts
+
+    def drain(self) -> List[Path]:
+        """Vide la file et renvoie les tâches dans l'ordre de dispatch."""
+        out = []
+        while (path := self.pop()) is not None:
+            out.append(path)
+        return out
@@ -0,0 +1,370 @@
+"""
+Index de l'historique des tâches: répertoires JSON ou base SQLite.
+
+- FileTaskStore: un fichier JSON par tâche dans queue/ et queue_archive/
+  (backend de compatibilité, chaque requête parcourt le répertoire)
+- SqliteTaskStore: une table indexée (statut, chat_id, compte, date de
+  réception) en mode WAL; les requêtes ne dépendent plus du nombre de fichiers
+
+Portée: index d'historique seulement. La file vivante reste la source de
+vérité sur disque (événements inotify, baux de réservation): l'ingestion
+Telegram, le scheduler et les vues « en attente » du monitor lisent les
+fichiers JSON. Le worker enregistre l'état final de chaque tâche traitée et
+le monitor sert l'historique des archives depuis l'index. Worker, monitor et
+`migrate-tasks` lisent tous le bloc `task_store` de la même config
+(`open_history_store`). `migrate_directories` importe les répertoires
+existants.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .config_loader import ConfigError, load_raw_config
+from .queue_events import write_json_atomic
+
+log = logging.getLogger(__name__)
+
+LOCATIONS = ("queue", "archive")
+TASK_PATTERNS = ("task_*.json", "scheduled_*.json")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT NOT NULL,
+    location TEXT NOT NULL,
+    status TEXT,
+    chat_id INTEGER,
+    account TEXT,
+    received_at TEXT,
+    updated_at REAL NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (id)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_location_received
+    ON tasks(location, received_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status);
+CREATE INDEX IF NOT EXISTS idx_tasks_chat ON tasks(chat_id, received_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_account ON tasks(account);
+"""
+
+
+def _task_account(data: dict) -> Optional[str]:
+    return data.get("upload_account_id") or data.get("account_id")
+
+
+def _chat_id(data: dict) -> Optional[int]:
+    try:
+        return int(data["chat_id"]) if data.get("chat_id") is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class TaskStore:
+    """Interface commune des backends de stockage des tâches.
+
+    Les tâches sont identifiées par leur nom de fichier (ex: task_123_42.json)
+    et rangées dans une `location`: "queue" ou "archive".
+    """
+
+    def record(self, location: str, task_id: str, data: dict) -> None:
+        """Enregistre l'état d'une tâche déjà écrite sur disque par l'appelant."""
+        raise NotImplementedError
+
+    def put(self, location: str, task_id: str, data: dict) -> None:
+        """Écrit une tâche (fichier JSON ou ligne SQLite)."""
+        raise NotImplementedError
+
+    def get(self, task_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def delete(self, task_id: str) -> None:
+        raise NotImplementedError
+
+    def list_tasks(
+        self,
+        location: Optional[str] = None,
+        *,
+        status: Optional[str] = None,
+        chat_id: Optional[int] = None,
+        account: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[dict]:
+        """Tâches filtrées, les plus récentes (received_at) en premier.
+
+        Chaque tâche porte `file_name` (identifiant) et `location`.
+        """
+        raise NotImplementedError
+
+    def count_by_status(self, location: Optional[str] = None) -> Dict[str, int]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class FileTaskStore(TaskStore):
+    """Backend de compatibilité: un fichier JSON par tâche."""
+
+    def __init__(self, queue_dir: str | Path, archive_dir: str | Path):
+        self.dirs = {"queue": Path(queue_dir), "archive": Path(archive_dir)}
+
+    def _iter_files(self, location: Optional[str]) -> Iterable[tuple]:
+        for loc in [location] if location else LOCATIONS:
+            d = self.dirs[loc]
+            if not d.exists():
+                continue
+            for pattern in TASK_PATTERNS:
+                for p in d.glob(pattern):
+                    yield loc, p
+
+    def record(self, location: str, task_id: str, data: dict) -> None:
+        # Le fichier fait foi: rien à indexer
+        return None
+
+    def put(self, location: str, task_id: str, data: dict) -> None:
+        self.dirs[location].mkdir(parents=True, exist_ok=True)
+        write_json_atomic(self.dirs[location] / task_id, data)
+
+    def get(self, task_id: str) -> Optional[dict]:
+        for loc in LOCATIONS:
+            p = self.dirs[loc] / task_id
+            if p.exists():
+                try:
+                    return json.loads(p.read_text(encoding="utf-8"))
+                except (OSError, ValueError):
+                    return None
+        return None
+
+    def delete(self, task_id: str) -> None:
+        for loc in LOCATIONS:
+            try:
+                (self.dirs[loc] / task_id).unlink()
+            except FileNotFoundError:
+                pass
+
+    def list_tasks(
+        self,
+        location: Optional[str] = None,
+        *,
+        status: Optional[str] = None,
+        chat_id: Optional[int] = None,
+        account: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[dict]:
+        tasks = []
+        for loc, p in self._iter_files(location):
+            try:
+                data = json.loads(p.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                log.error("Erreur lecture tâche %s: %s", p, e)
+                continue
+            if status is not None and data.get("status") != status:
+                continue
+            if chat_id is not None and _chat_id(data) != chat_id:
+                continue
+            if account is not None and _task_account(data) != account:
+                continue
+            data["file_path"] = str(p)
+            data["file_name"] = p.name
+            data["location"] = loc
+            tasks.append(data)
+        tasks.sort(key=lambda x: x.get("received_at") or "", reverse=True)
+        return tasks[:limit] if limit else tasks
+
+    def count_by_status(self, location: Optional[str] = None) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for task in self.list_tasks(location):
+            status = task.get("status", "unknown")
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+
+class SqliteTaskStore(TaskStore):
+    """Backend SQLite (WAL): une connexion par thread, requêtes indexées."""
+
+    def __init__(self, db_path: str | Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row(location: str, task_id: str, data: dict) -> tuple:
+        return (
+            task_id,
+            location,
+            data.get("status"),
+            _chat_id(data),
+            _task_account(data),
+            data.get("received_at"),
+            time.time(),
+            json.dumps(data, ensure_ascii=False),
+        )
+
+    def record(self, location: str, task_id: str, data: dict) -> None:
+        self.put_many([(location, task_id, data)])
+
+    def put(self, location: str, task_id: str, data: dict) -> None:
+        self.put_many([(location, task_id, data)])
+
+    def put_many(self, items: Iterable[tuple]) -> int:
+        """Insère ou remplace plusieurs tâches (location, task_id, data) en une transaction."""
+        rows = [self._row(loc, tid, data) for loc, tid, data in items]
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO tasks"
+                " (id, location, status, chat_id, account, received_at, updated_at, data)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def get(self, task_id: str) -> Optional[dict]:
+        row = (
+            self._conn()
+            .execute("SELECT data FROM tasks WHERE id = ?", (task_id,))
+            .fetchone()
+        )
+        return json.loads(row[0]) if row else None
+
+    def delete(self, task_id: str) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+
+    def list_tasks(
+        self,
+        location: Optional[str] = None,
+        *,
+        status: Optional[str] = None,
+        chat_id: Optional[int] = None,
+        account: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[dict]:
+        clauses, params = [], []
+        for column, value in (
+            ("location", location),
+            ("status", status),
+            ("chat_id", chat_id),
+            ("account", account),
+        ):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        sql = "SELECT id, location, data FROM tasks"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY received_at DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        tasks = []
+        for task_id, loc, raw in self._conn().execute(sql, params):
+            data = json.loads(raw)
+            data["file_name"] = task_id
+            data["location"] = loc
+            tasks.append(data)
+        return tasks
+
+    def count_by_status(self, location: Optional[str] = None) -> Dict[str, int]:
+        sql = "SELECT COALESCE(status, 'unknown'), COUNT(*) FROM tasks"
+        params: List[Any] = []
+        if location is not None:
+            sql += " WHERE location = ?"
+            params.append(location)
+        sql += " GROUP BY status"
+        return {s: n for s, n in self._conn().execute(sql, params)}
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def open_task_store(
+    settings: Optional[dict], queue_dir: str | Path, archive_dir: str | Path
+) -> TaskStore:
+    """Construit le store depuis le bloc `task_store` de la config.
+
+    `{backend: sqlite, path: queue/tasks.db}` active SQLite; sinon répertoires.
+    """
+    settings = settings if isinstance(settings, dict) else {}
+    if str(settings.get("backend") or "files").lower() == "sqlite":
+        return SqliteTaskStore(history_db_path(settings, queue_dir))
+    return FileTaskStore(queue_dir, archive_dir)
+
+
+def task_store_settings(config_path: Optional[str | Path]) -> dict:
+    """Bloc `task_store` de la config (vide si absent ou illisible)."""
+    if not config_path:
+        return {}
+    try:
+        settings = (load_raw_config(config_path) or {}).get("task_store")
+    except ConfigError:
+        return {}
+    return settings if isinstance(settings, dict) else {}
+
+
+def history_db_path(settings: Optional[dict], queue_dir: str | Path) -> Path:
+    """Base SQLite configurée (`task_store.path`, défaut <queue>/tasks.db)."""
+    path = (settings or {}).get("path")
+    return Path(path) if path else Path(queue_dir) / "tasks.db"
+
+
+def open_history_store(
+    config_path: Optional[str | Path], queue_dir: str | Path
+) -> Optional[SqliteTaskStore]:
+    """Index SQLite de l'historique si `task_store.backend: sqlite`, sinon None."""
+    settings = task_store_settings(config_path)
+    if str(settings.get("backend") or "files").lower() != "sqlite":
+        return None
+    return SqliteTaskStore(history_db_path(settings, queue_dir))
+
+
+def migrate_directories(
+    queue_dir: str | Path,
+    archive_dir: str | Path,
+    store: SqliteTaskStore,
+    batch_size: int = 500,
+) -> Dict[str, int]:
+    """Importe les fichiers JSON de la file et des archives dans le store SQLite.
+
+    Idempotent: une tâche déjà présente est remplacée par la version sur disque.
+    """
+    source = FileTaskStore(queue_dir, archive_dir)
+    counts = {"queue": 0, "archive": 0, "errors": 0}
+    batch: List[tuple] = []
+    for loc, p in source._iter_files(None):
+        try:
+            data = json.loads(p.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            log.warning("Tâche ignorée (JSON invalide) %s: %s", p, e)
+            counts["errors"] += 1
+            continue
+        batch.append((loc, p.name, data))
+        counts[loc] += 1
+        if len(batch) >= batch_size:
+            store.put_many(batch)
+            batch = []
+    if batch:
+        store.put_many(batch)
+    return counts
@@ -5,6 +5,8 @@ import subprocess
 from pathlib import Path
 from typing import Optional
 
+from .resource_governor import get_governor
+
 log = logging.getLogger(__name__)
 
 
@@ -65,7 +67,10 @@ def generate_thumbnail(
 
         log.info(f"Génération thumbnail: {video_path} -> {output_path} à {timestamp}")
 
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        with get_governor().acquire(1, label="miniature") as lease:
+            result = subprocess.run(
+                lease.ffmpeg_command(cmd), capture_output=True, text=True, timeout=30
+            )
 
         if result.returncode == 0:
             if output_path.exists():
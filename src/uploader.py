@@ -3,6 +3,7 @@ from __future__ import annotations
 import logging
 import json
 import random
+import threading
 import time
 from pathlib import Path
 from typing import Iterable, Optional
@@ -12,9 +13,15 @@ from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload
 
+from .worker_metrics import inc as _metric_inc
+
 
 logger = logging.getLogger(__name__)
 
+# Clients API réutilisés par thread (httplib2 n'est pas thread-safe)
+_services = threading.local()
+_SERVICE_CACHE_SIZE = 8
+
 
 def _sanitize_language(lang: Optional[str]) -> Optional[str]:
     """Convertit les codes langue en BCP-47 simple acceptés par YouTube.
@@ -111,7 +118,17 @@ def _ensure_future_publish_at(
 
 
 def _build_service(credentials):
-    return build("youtube", "v3", credentials=credentials)
+    cache = getattr(_services, "cache", None)
+    if cache is None:
+        cache = _services.cache = {}
+    entry = cache.get(id(credentials))
+    if entry is not None and entry[0] is credentials:
+        return entry[1]
+    if len(cache) >= _SERVICE_CACHE_SIZE:
+        cache.clear()
+    service = build("youtube", "v3", credentials=credentials)
+    cache[id(credentials)] = (credentials, service)
+    return service
 
 
 def upload_video(
@@ -249,6 +266,7 @@ def _resumable_upload_with_retry(request, max_retries: int = 8) -> dict:
         if error:
             logger.warning(error)
             retries += 1
+            _metric_inc("upload_retries_total")
             if retries > max_retries:
                 raise RuntimeError("Nombre maximal de tentatives atteint pour l'upload")
             sleep = _exponential_backoff(retries)
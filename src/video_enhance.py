@@ -4,10 +4,22 @@ import logging
 import re
 import shutil
 import subprocess
+import threading
 import time
 from collections import deque
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional, Union
+from typing import TYPE_CHECKING, Callable, Optional, Union
+
+from .artifact_cache import cache_key, fast_file_hash
+from .encode_progress import ProgressCallback, ProgressTracker, format_progress
+from .resource_governor import get_governor
+from .worker_metrics import inc as _metric_inc
+from .worker_metrics import observe as _metric_observe
+
+if TYPE_CHECKING:
+    from .artifact_cache import ArtifactCache
+    from .media_probe import MediaInfo
 
 
 def _infer_target_height(scale: Optional[str]) -> Optional[int]:
@@ -61,7 +73,6 @@ _PRESET_CHOICES = {
 
 
 _DURATION_RE = re.compile(r"Duration: (\d{2}):(\d{2}):(\d{2})[\.,](\d{2})")
-_TIME_RE = re.compile(r"time=(\d{2}):(\d{2}):(\d{2})[\.,](\d{2})")
 
 
 def _hms_to_seconds(h: str, m: str, s: str, cs: str) -> float:
@@ -110,64 +121,58 @@ def _parse_scale_arg(scale: Optional[str]) -> Optional[str]:
     )
 
 
-def enhance_video(
+def _parse_crop_arg(crop: Optional[str]) -> Optional[str]:
+    """
+    Convertit un recadrage en paramètres du filtre 'crop' (centré), ou None.
+
+    Exemples d'entrée:
+    - "9:16" => plus grande zone centrale au ratio 9:16 (dimensions paires)
+    - "1080x1920" => zone centrale de 1080x1920 pixels
+    """
+    if not crop:
+        return None
+    s = str(crop).strip().lower()
+    if ":" in s and s.count(":") == 1:
+        w, h = s.split(":", 1)
+        if w.isdigit() and h.isdigit() and int(w) > 0 and int(h) > 0:
+            return f"'trunc(min(iw,ih*{w}/{h})/2)*2':'trunc(min(ih,iw*{h}/{w})/2)*2'"
+    if "x" in s and s.count("x") == 1:
+        w, h = s.split("x", 1)
+        if w.isdigit() and h.isdigit():
+            return f"{int(w)}:{int(h)}"
+    raise EnhanceError(
+        "Format de crop invalide. Utilisez un ratio (9:16) ou WIDTHxHEIGHT"
+    )
+
+
+def _video_filters(
     *,
-    input_path: Union[str, Path],
-    output_path: Union[str, Path],
-    codec: str = "h264",
-    hwaccel: str = "none",
+    deinterlace: bool = False,
+    crop: Optional[str] = None,
     scale: Optional[str] = None,
-    fps: Optional[float] = None,
     denoise: bool = False,
-    sharpen: bool = False,
-    deinterlace: bool = False,
-    color_fix: bool = False,
     deband: bool = False,
     deblock: bool = False,
+    sharpen: bool = False,
     sharpen_amount: Optional[float] = None,
     contrast: Optional[float] = None,
     saturation: Optional[float] = None,
-    crf: int = 18,
-    bitrate: Optional[str] = None,
-    preset: str = "medium",
-    reencode_audio: bool = False,
-    loudnorm: bool = False,
-    audio_bitrate: str = "192k",
-) -> Path:
-    """
-    Améliore la qualité de la vidéo en utilisant ffmpeg via subprocess.
-
-    - Upscale (scale): 720p/1080p/1440p/2160p, WIDTHxHEIGHT, ou facteur (ex: 2x)
-    - Denoise: hqdn3d
-    - Sharpen: unsharp
-    - Deinterlace: yadif
-    - Correction légère couleurs: eq (contrast/saturation)
-    - FPS: filtre fps
-
-    Encode en H.264 (libx264) avec CRF/preset (ou bitrate constant si fourni).
-    """
-    log = logging.getLogger("video_enhance")
-
-    in_path = Path(input_path)
-    out_path = Path(output_path)
-    if not in_path.exists():
-        raise EnhanceError(f"Fichier d'entrée introuvable: {in_path}")
-
-    # Vérifier ffmpeg
-    if not shutil.which("ffmpeg"):
-        raise EnhanceError(
-            "ffmpeg introuvable dans le PATH. Installez-le (ex: brew install ffmpeg)"
-        )
-
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-
-    # Construire la chaîne de filtres vidéo
+    color_fix: bool = False,
+    fps: Optional[float] = None,
+    **_encoder_opts,
+) -> list[str]:
+    """Chaîne de filtres vidéo (dans l'ordre d'application) pour ces options."""
     vf_parts: list[str] = []
 
     # Désentrelacement d'abord si demandé
     if deinterlace:
         vf_parts.append("yadif=1")
 
+    # Recadrage avant la mise à l'échelle (ex: 9:16 pour les Shorts)
+    crop_expr = _parse_crop_arg(crop)
+    if crop_expr:
+        vf_parts.append(f"crop={crop_expr}")
+
     # Mise à l'échelle
     scale_expr = _parse_scale_arg(scale)
     if scale_expr:
@@ -207,16 +212,53 @@ def enhance_video(
     # FPS en fin de chaîne
     if fps and fps > 0:
         vf_parts.append(f"fps={fps}")
+    return vf_parts
+
 
-    # Commande ffmpeg
-    cmd: list[str] = [
-        "ffmpeg",
-        "-y",  # overwrite
-        "-hide_banner",
-        "-i",
-        str(in_path),
-    ]
+def build_ffmpeg_args(
+    *,
+    codec: str = "h264",
+    hwaccel: str = "none",
+    scale: Optional[str] = None,
+    fps: Optional[float] = None,
+    denoise: bool = False,
+    sharpen: bool = False,
+    deinterlace: bool = False,
+    color_fix: bool = False,
+    deband: bool = False,
+    deblock: bool = False,
+    sharpen_amount: Optional[float] = None,
+    contrast: Optional[float] = None,
+    saturation: Optional[float] = None,
+    crf: int = 18,
+    bitrate: Optional[str] = None,
+    preset: str = "medium",
+    reencode_audio: bool = False,
+    loudnorm: bool = False,
+    audio_bitrate: str = "192k",
+    crop: Optional[str] = None,
+) -> list[str]:
+    """Arguments ffmpeg d'encodage (filtres, codecs, audio) sans chemins d'E/S.
+
+    Cette liste normalisée sert aussi de clé au cache d'artefacts.
+    """
+    # Construire la chaîne de filtres vidéo
+    vf_parts = _video_filters(
+        deinterlace=deinterlace,
+        crop=crop,
+        scale=scale,
+        denoise=denoise,
+        deband=deband,
+        deblock=deblock,
+        sharpen=sharpen,
+        sharpen_amount=sharpen_amount,
+        contrast=contrast,
+        saturation=saturation,
+        color_fix=color_fix,
+        fps=fps,
+    )
 
+    cmd: list[str] = []
     if vf_parts:
         cmd += ["-vf", ",".join(vf_parts)]
 
@@ -333,12 +375,228 @@ def enhance_video(
     # Optimisation streaming
     cmd += ["-movflags", "+faststart"]
 
-    cmd += [str(out_path)]
+    return cmd
+
+
+def split_stream_args(args: list[str]) -> tuple[list[str], list[str]]:
+    """Sépare les arguments de build_ffmpeg_args en (vidéo, audio).
+
+    -movflags est retiré (ajouté au fichier final seulement).
+    """
+    video: list[str] = []
+    audio: list[str] = []
+    for i in range(0, len(args), 2):
+        opt, value = args[i], args[i + 1 : i + 2]
+        if opt in ("-af", "-c:a", "-b:a"):
+            audio += [opt] + value
+        elif opt != "-movflags":
+            video += [opt] + value
+    return video, audio
+
+
+# Options qu'un rendu supplémentaire peut redéfinir (le reste suit la sortie principale)
+RENDITION_OPTIONS = ("scale", "crop", "codec", "crf", "bitrate", "preset", "fps")
+
+
+def rendition_graph(chains: list[list[str]]) -> tuple[str, list[str]]:
+    """Graphe -filter_complex: un décodage, `split`, une chaîne par sortie.
+
+    Le préfixe commun des chaînes (ex: yadif) est appliqué une seule fois
+    avant `split`.
+
+    Returns:
+        (graphe, étiquettes de sortie dans l'ordre des chaînes)
+    """
+    common = 0
+    while all(len(ch) > common and ch[common] == chains[0][common] for ch in chains):
+        common += 1
+    head = ",".join(chains[0][:common] + [f"split={len(chains)}"])
+    graph = "[0:v:0]" + head + "".join(f"[s{i}]" for i in range(len(chains)))
+    labels = []
+    for i, chain in enumerate(chains):
+        rest = ",".join(chain[common:]) or "null"
+        graph += f";[s{i}]{rest}[v{i}]"
+        labels.append(f"[v{i}]")
+    return graph, labels
+
+
+# Profil de sortie du chemin rapide
+LOUDNORM_TARGET = -23.0  # I de loudnorm dans build_ffmpeg_args
+LOUDNESS_TOLERANCE = 1.5  # LU
+TRUE_PEAK_MAX = -1.0  # dBTP
+# Débit source au-delà duquel on ré-encode (multiple du débit de référence)
+MAX_BITRATE_RATIO = 2.0
+# Codecs audio acceptés tels quels dans un MP4 quand l'audio n'est pas réencodé
+MP4_AUDIO_CODECS = ("aac", "mp3", "ac3", "eac3", "alac")
+
+
+@dataclass
+class EncodePlan:
+    """Décision du chemin rapide.
+
+    Attributes:
+        action: "skip" (source utilisée telle quelle), "remux" (copie des flux
+            avec faststart) ou "encode" (seuls les flux marqués sont réencodés)
+        reasons: Écarts constatés par rapport au profil cible
+    """
+
+    action: str
+    reasons: list[str] = field(default_factory=list)
+    encode_video: bool = False
+    encode_audio: bool = False
+
+    def describe(self) -> str:
+        return f"{self.action} ({'; '.join(self.reasons) or 'source conforme'})"
+
+
+def _bitrate_to_bps(value: Optional[str]) -> Optional[int]:
+    """'8M' -> 8000000, '800k' -> 800000."""
+    if not value:
+        return None
+    s = str(value).strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000, "g": 1_000_000_000}.get(s[-1:], 1)
+    try:
+        return int(float(s[:-1] if mult > 1 else s) * mult)
+    except ValueError:
+        return None
+
+
+def _scale_satisfied(scale: Optional[str], width, height) -> bool:
+    if not scale:
+        return True
+    s = scale.strip().lower()
+    if s.endswith("x"):
+        try:
+            return float(s[:-1]) == 1.0
+        except ValueError:
+            return False
+    if "x" in s:
+        w, _, h = s.partition("x")
+        return f"{width}x{height}" == f"{w}x{h}"
+    return height is not None and height == _infer_target_height(s)
+
+
+def plan_encode(
+    info: "MediaInfo",
+    *,
+    codec: str = "h264",
+    scale: Optional[str] = None,
+    fps: Optional[float] = None,
+    deinterlace: bool = False,
+    bitrate: Optional[str] = None,
+    reencode_audio: bool = False,
+    loudnorm: bool = False,
+    filters: Optional[list[str]] = None,
+    measure_loudness: Optional[Callable[[], Optional[tuple]]] = None,
+) -> EncodePlan:
+    """Compare la source au profil cible et choisit skip, remux ou encode.
+
+    Codec, résolution, cadence, pix_fmt, entrelacement, débit, codec audio et
+    loudness décident d'un encodage. Les filtres d'amélioration explicitement
+    demandés (`filters`: denoise, sharpen...) imposent aussi le réencodage
+    vidéo: le chemin rapide ne les abandonne jamais.
+
+    Args:
+        measure_loudness: Mesure (LUFS, dBTP) appelée seulement si loudnorm est
+            demandé et que l'audio est déjà en AAC
+    """
+    c = (codec or "h264").lower()
+    video: list[str] = []
+    if not info.video_codec:
+        video.append("flux vidéo inconnu")
+    elif info.video_codec != c:
+        video.append(f"codec {info.video_codec} -> {c}")
+    if info.pix_fmt and info.pix_fmt != "yuv420p":
+        video.append(f"pix_fmt {info.pix_fmt} -> yuv420p")
+    if not _scale_satisfied(scale, info.width, info.height):
+        video.append(f"résolution {info.width}x{info.height} -> {scale}")
+    if fps and (info.fps is None or abs(info.fps - float(fps)) > 0.01):
+        video.append(f"cadence {info.fps or '?'} -> {fps}")
+    if deinterlace and info.interlaced:
+        video.append("source entrelacée")
+    ceiling = _bitrate_to_bps(bitrate)
+    if ceiling is None:
+        reference = _bitrate_to_bps(_default_bitrate_for_height(info.height, c))
+        ceiling = int(reference * MAX_BITRATE_RATIO)
+    if info.video_bitrate and info.video_bitrate > ceiling:
+        video.append(f"débit {info.video_bitrate / 1e6:.1f}M > {ceiling / 1e6:.1f}M")
+    if filters:
+        video.append("filtres demandés: " + ", ".join(filters))
+
+    audio: list[str] = []
+    if info.audio_codec:
+        wants_aac = reencode_audio or loudnorm
+        allowed = ("aac",) if wants_aac else MP4_AUDIO_CODECS
+        if info.audio_codec not in allowed:
+            audio.append(f"audio {info.audio_codec} -> aac")
+        elif loudnorm:
+            measured = measure_loudness() if measure_loudness else None
+            if not measured:
+                audio.append("loudness inconnue")
+            else:
+                lufs, peak = measured
+                if abs(lufs - LOUDNORM_TARGET) > LOUDNESS_TOLERANCE or (
+                    peak is not None and peak > TRUE_PEAK_MAX
+                ):
+                    audio.append(f"loudness {lufs:.1f} LUFS -> {LOUDNORM_TARGET:.0f}")
+
+    if video or audio:
+        return EncodePlan(
+            "encode",
+            video + audio,
+            encode_video=bool(video),
+            encode_audio=bool(audio),
+        )
+    if not info.is_mp4:
+        return EncodePlan("remux", [f"conteneur {info.format_name}"])
+    if not info.faststart:
+        return EncodePlan("remux", ["moov en fin de fichier"])
+    return EncodePlan("skip")
+
 
-    log.debug("Commande ffmpeg: %s", " ".join(cmd))
+def _run_ffmpeg(
+    cmd: list[str],
+    log: logging.Logger,
+    *,
+    label: Optional[str] = None,
+    record_speed: bool = True,
+    progress: Optional[ProgressCallback] = None,
+) -> None:
+    """Exécute ffmpeg en suivant sa progression (`-progress pipe:1`).
+
+    La durée totale est lue sur stderr (en-tête Duration), dont les dernières
+    lignes servent aussi au message d'erreur.
+
+    Args:
+        label: Nom du sous-encodage (segment); sa progression est journalisée en DEBUG
+        record_speed: False pour ne pas alimenter encode_speed_ratio (découpage,
+            concaténation, segments: la vitesse globale est mesurée par l'appelant)
+        progress: Reçoit chaque événement de progression (voir encode_progress)
+
+    Le processus tourne sous un bail du gouverneur CPU (resource_governor):
+    celui du thread appelant s'il en détient un, sinon la part par défaut.
+    """
+    with get_governor().acquire(label=label or "ffmpeg") as lease:
+        _run_ffmpeg_leased(
+            lease.ffmpeg_command(
+                [cmd[0], "-progress", "pipe:1", "-nostats"] + list(cmd[1:])
+            ),
+            log,
+            label=label,
+            record_speed=record_speed,
+            progress=progress,
+        )
 
+
+def _run_ffmpeg_leased(
+    cmd: list[str],
+    log: logging.Logger,
+    *,
+    label: Optional[str],
+    record_speed: bool,
+    progress: Optional[ProgressCallback],
+) -> None:
     try:
-        # Lecture en streaming de stderr pour progression
         proc = subprocess.Popen(
             cmd,
             stdout=subprocess.PIPE,
@@ -346,39 +604,401 @@ def enhance_video(
             text=True,
             bufsize=1,
         )
-        total_seconds: Optional[float] = None
-        last_log = 0.0
-        tail = deque(maxlen=50)
+    except FileNotFoundError:
+        raise EnhanceError("ffmpeg introuvable (commande non trouvée)")
 
-        assert proc.stderr is not None
+    tracker = ProgressTracker(label=label)
+    tail: deque = deque(maxlen=50)
+
+    def _read_stderr() -> None:
         for line in proc.stderr:
             tail.append(line.rstrip())
             # Détecter la durée totale (une seule fois)
-            if total_seconds is None:
+            if tracker.total_seconds is None:
                 m = _DURATION_RE.search(line)
                 if m:
-                    total_seconds = _hms_to_seconds(*m.groups())
-            # Extraire time courant
-            mt = _TIME_RE.search(line)
-            if mt and total_seconds and total_seconds > 0:
-                cur = _hms_to_seconds(*mt.groups())
-                pct = max(0.0, min(100.0, (cur / total_seconds) * 100.0))
-                now = time.time()
-                if now - last_log >= 1.0:
-                    rem = max(0.0, total_seconds - cur)
-                    # ETA approximatif (en sec) faute de vitesse instantanée
-                    log.info(
-                        "Progression ffmpeg: %.1f%% (t=%s, ETA~%.0fs)",
-                        pct,
-                        mt.group(0)[5:],
-                        rem,
-                    )
-                    last_log = now
-        proc.stdout.read() if proc.stdout else ""
-        ret = proc.wait()
-        if ret != 0:
-            raise EnhanceError("ffmpeg a échoué:\n" + "\n".join(tail))
-    except FileNotFoundError:
-        raise EnhanceError("ffmpeg introuvable (commande non trouvée)")
+                    tracker.total_seconds = _hms_to_seconds(*m.groups())
+
+    reader = threading.Thread(target=_read_stderr, name="ffmpeg-stderr", daemon=True)
+    reader.start()
+    last_log = 0.0
+    for line in proc.stdout:
+        event = tracker.feed(line)
+        if event is None:
+            continue
+        if progress is not None:
+            try:
+                progress(event)
+            except Exception as e:
+                log.debug("Callback de progression en erreur: %s", e)
+        now = time.monotonic()
+        if event["percent"] is not None and (now - last_log >= 5.0 or event["done"]):
+            log.log(
+                logging.DEBUG if label else logging.INFO,
+                "Progression ffmpeg%s: %s",
+                f" ({label})" if label else "",
+                format_progress(event),
+            )
+            last_log = now
+    ret = proc.wait()
+    reader.join(timeout=5)
+    if ret != 0:
+        raise EnhanceError("ffmpeg a échoué:\n" + "\n".join(tail))
+    elapsed = time.monotonic() - tracker.started
+    if record_speed and tracker.total_seconds and elapsed > 0:
+        # Vitesse d'encodage en multiple du temps réel (métrique Prometheus)
+        _metric_observe("encode_speed_ratio", tracker.total_seconds / elapsed)
+
+
+# Filtres d'amélioration: demandés, ils imposent le réencodage vidéo
+_COSMETIC_OPTIONS = (
+    "denoise",
+    "sharpen",
+    "sharpen_amount",
+    "color_fix",
+    "contrast",
+    "saturation",
+    "deband",
+    "deblock",
+)
+
+
+def _plan_fast_path(
+    in_path: Path, opts: dict, log: logging.Logger
+) -> Optional[EncodePlan]:
+    """Analyse la source et journalise la décision; None si l'analyse échoue."""
+    from .media_probe import measure_loudness, probe_media
+
+    info = probe_media(in_path)
+    if info is None:
+        log.info("Analyse ffprobe impossible pour %s: encodage complet", in_path.name)
+        return None
+    plan = plan_encode(
+        info,
+        codec=opts["codec"],
+        scale=opts["scale"],
+        fps=opts["fps"],
+        deinterlace=opts["deinterlace"],
+        bitrate=opts["bitrate"],
+        reencode_audio=opts["reencode_audio"],
+        loudnorm=opts["loudnorm"],
+        filters=[k for k in _COSMETIC_OPTIONS if opts.get(k) not in (None, False)],
+        measure_loudness=lambda: measure_loudness(in_path),
+    )
+    log.info("Chemin d'encodage pour %s: %s", in_path.name, plan.describe())
+    _metric_inc("enhance_path_total", path=plan.action)
+    return plan
+
+
+def _with_auto_crf(
+    in_path: Path, opts: dict, crf_auto: Optional[dict], work_dir: Path
+) -> tuple[dict, list[str]]:
+    """Résout `crf="auto"` (recherche sur extraits) et renvoie (options, args).
+
+    Sans effet si la vidéo n'est pas encodée en CRF (débit fixe, videotoolbox).
+    """
+    args = build_ffmpeg_args(**opts)
+    if "-crf" in args and args[args.index("-crf") + 1] == "auto":
+        from .crf_search import select_crf
+
+        work_dir.mkdir(parents=True, exist_ok=True)
+        opts = dict(opts, crf=select_crf(in_path, opts, crf_auto, work_dir=work_dir))
+        args = build_ffmpeg_args(**opts)
+    return opts, args
+
+
+def _enhance_renditions(
+    in_path: Path,
+    out_path: Path,
+    encode_opts: dict,
+    renditions: list,
+    *,
+    cache: Optional["ArtifactCache"],
+    crf_auto: Optional[dict],
+    log: logging.Logger,
+    progress: Optional[ProgressCallback],
+    report: Optional[dict] = None,
+) -> Path:
+    """Produit la sortie principale et les rendus supplémentaires en un décodage."""
+    outputs: list[tuple[Path, list[str]]] = []
+    specs = [({}, out_path)]
+    for r in renditions:
+        unknown = set(r) - set(RENDITION_OPTIONS) - {"name", "output_path", "duration"}
+        if unknown or not r.get("output_path"):
+            raise EnhanceError(
+                f"Rendu invalide {r.get('name') or '?'}: output_path requis, "
+                f"options inconnues: {', '.join(sorted(unknown)) or 'aucune'}"
+            )
+        specs.append((r, Path(r["output_path"])))
+    chains = []
+    for r, path in specs:
+        opts = dict(encode_opts, **{k: r[k] for k in RENDITION_OPTIONS if k in r})
+        opts, args = _with_auto_crf(in_path, opts, crf_auto, path.parent)
+        if r.get("duration"):
+            # Durée maximale du rendu (ex: Shorts), appliquée à la sortie
+            args = args + ["-t", f"{float(r['duration']):g}"]
+        chains.append(_video_filters(**opts))
+        outputs.append((path, args))
+
+    keys: list = []
+    if cache is not None:
+        try:
+            src_hash = fast_file_hash(in_path)
+            keys = [cache_key(src_hash, args) for _, args in outputs]
+            fetched = [cache.fetch(k, p) for k, (p, _) in zip(keys, outputs)]
+            if all(f is not None for f in fetched):
+                _report_path(report, "cache")
+                return out_path.resolve()
+        except OSError as e:
+            log.warning("Cache enhance indisponible: %s", e)
+            keys = []
+
+    if not shutil.which("ffmpeg"):
+        raise EnhanceError(
+            "ffmpeg introuvable dans le PATH. Installez-le (ex: brew install ffmpeg)"
+        )
+
+    graph, labels = rendition_graph(chains)
+    cmd = ["ffmpeg", "-y", "-hide_banner", "-i", str(in_path)]
+    cmd += ["-filter_complex", graph]
+    with get_governor().acquire(label=f"{len(outputs)} rendus") as lease:
+        # Le bail est partagé entre les encodeurs des différentes sorties
+        threads = ["-threads", str(max(1, lease.threads // len(outputs)))]
+        for label, (path, args) in zip(labels, outputs):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Nouvel inode: ne jamais réécrire un fichier lié au cache
+            if path.exists() and path.stat().st_nlink > 1:
+                path.unlink()
+            # La chaîne -vf de chaque sortie est dans le graphe
+            stream_args = []
+            for i in range(0, len(args), 2):
+                if args[i] != "-vf":
+                    stream_args += args[i : i + 2]
+            cmd += ["-map", label, "-map", "0:a:0?"] + threads + stream_args
+            cmd.append(str(path))
+        log.info("Encodage de %d rendus en un seul décodage", len(outputs))
+        log.debug("Commande ffmpeg: %s", " ".join(cmd))
+        _run_ffmpeg(cmd, log, label=f"{len(outputs)} rendus", progress=progress)
+    _report_path(report, "encode")
+
+    for key, (path, _) in zip(keys, outputs):
+        try:
+            if path.exists():
+                cache.store(key, path)
+        except OSError as e:
+            log.warning("Impossible d'ajouter la sortie au cache: %s", e)
+    return out_path.resolve()
+
+
+def _report_path(report: Optional[dict], path: str) -> None:
+    if report is not None:
+        report["path"] = path
+
+
+def enhance_video(
+    *,
+    input_path: Union[str, Path],
+    output_path: Union[str, Path],
+    codec: str = "h264",
+    hwaccel: str = "none",
+    scale: Optional[str] = None,
+    fps: Optional[float] = None,
+    denoise: bool = False,
+    sharpen: bool = False,
+    deinterlace: bool = False,
+    color_fix: bool = False,
+    deband: bool = False,
+    deblock: bool = False,
+    sharpen_amount: Optional[float] = None,
+    contrast: Optional[float] = None,
+    saturation: Optional[float] = None,
+    crf: Union[int, str] = 18,
+    bitrate: Optional[str] = None,
+    preset: str = "medium",
+    reencode_audio: bool = False,
+    loudnorm: bool = False,
+    audio_bitrate: str = "192k",
+    cache: Optional["ArtifactCache"] = None,
+    chunked: bool = False,
+    chunk_workers: Optional[int] = None,
+    segment_seconds: Optional[float] = None,
+    chunk_min_duration: Optional[float] = None,
+    fast_path: bool = False,
+    crf_auto: Optional[dict] = None,
+    progress: Optional[ProgressCallback] = None,
+    renditions: Optional[list] = None,
+    report: Optional[dict] = None,
+) -> Path:
+    """
+    Améliore la qualité de la vidéo en utilisant ffmpeg via subprocess.
+
+    - Upscale (scale): 720p/1080p/1440p/2160p, WIDTHxHEIGHT, ou facteur (ex: 2x)
+    - Denoise: hqdn3d
+    - Sharpen: unsharp
+    - Deinterlace: yadif
+    - Correction légère couleurs: eq (contrast/saturation)
+    - FPS: filtre fps
+
+    Encode en H.264 (libx264) avec CRF/preset (ou bitrate constant si fourni).
+
+    Si `cache` est fourni, une sortie déjà produite pour la même source et les
+    mêmes arguments est liée directement (pas de ré-encodage).
+
+    Avec `chunked`, les encodeurs logiciels travaillent par segments encodés en
+    parallèle (voir chunked_encode); clips courts et échecs repassent en une passe.
+
+    Avec `fast_path`, la source est d'abord analysée (ffprobe, voir plan_encode):
+    déjà conforme, elle est renvoyée telle quelle (skip) ou seulement remuxée
+    avec faststart; sinon seuls les flux hors profil sont réencodés.
+
+    `progress` reçoit les événements de progression structurés de l'encodage
+    (pourcentage, fps, vitesse, ETA; voir encode_progress).
+
+    `crf="auto"` choisit le CRF par extraits encodés et notés (ssim/psnr, réglages
+    `crf_auto`, voir crf_search).
+
+    `renditions` ajoute des sorties (ex: Shorts 9:16) produites par la même
+    commande ffmpeg: un seul décodage, `split` dans le graphe de filtres. Chaque
+    rendu est un dict `output_path` (+ `name`, `duration` et les options de
+    RENDITION_OPTIONS: scale, crop, codec, crf...). Le chemin rapide et le mode
+    segmenté ne s'appliquent pas dans ce cas.
+
+    `report` reçoit sous "path" le chemin réellement suivi: "skip", "remux",
+    "cache" (sortie liée depuis le cache), "audio" (vidéo copiée, seul l'audio
+    est réencodé) ou "encode" (vidéo réencodée). Rien en cas d'échec.
+
+    Returns:
+        Chemin de la vidéo à utiliser (la source elle-même si skip)
+    """
+    log = logging.getLogger("video_enhance")
+
+    in_path = Path(input_path)
+    out_path = Path(output_path)
+    if not in_path.exists():
+        raise EnhanceError(f"Fichier d'entrée introuvable: {in_path}")
+
+    encode_opts = dict(
+        codec=codec,
+        hwaccel=hwaccel,
+        scale=scale,
+        fps=fps,
+        denoise=denoise,
+        sharpen=sharpen,
+        deinterlace=deinterlace,
+        color_fix=color_fix,
+        deband=deband,
+        deblock=deblock,
+        sharpen_amount=sharpen_amount,
+        contrast=contrast,
+        saturation=saturation,
+        crf=crf,
+        bitrate=bitrate,
+        preset=preset,
+        reencode_audio=reencode_audio,
+        loudnorm=loudnorm,
+        audio_bitrate=audio_bitrate,
+    )
+    if renditions:
+        return _enhance_renditions(
+            in_path,
+            out_path,
+            encode_opts,
+            renditions,
+            cache=cache,
+            crf_auto=crf_auto,
+            log=log,
+            progress=progress,
+            report=report,
+        )
+    args = build_ffmpeg_args(**encode_opts)
+
+    plan = _plan_fast_path(in_path, encode_opts, log) if fast_path else None
+    if plan is not None and plan.action == "skip":
+        _report_path(report, "skip")
+        return in_path.resolve()
+    encode_video = plan is None or plan.encode_video
+
+    # crf: auto -> recherche sur extraits, seulement si la vidéo est encodée
+    if encode_video:
+        encode_opts, args = _with_auto_crf(
+            in_path, encode_opts, crf_auto, out_path.parent
+        )
+
+    if plan is not None:
+        tag = ["-tag:v", "hvc1"] if (codec or "").lower() == "hevc" else []
+        faststart = ["-movflags", "+faststart"]
+        if plan.action == "remux":
+            args = ["-map", "0:v:0", "-map", "0:a:0?", "-c", "copy"]
+            args += tag + faststart
+        elif not plan.encode_video:
+            audio_args = split_stream_args(args)[1]
+            args = ["-c:v", "copy"] + tag + audio_args + faststart
+        elif not plan.encode_audio:
+            args = build_ffmpeg_args(
+                **dict(encode_opts, reencode_audio=False, loudnorm=False)
+            )
+
+    key = None
+    if cache is not None:
+        try:
+            key = cache_key(fast_file_hash(in_path), args)
+            if cache.fetch(key, out_path) is not None:
+                _report_path(report, "cache")
+                return out_path.resolve()
+        except OSError as e:
+            log.warning("Cache enhance indisponible: %s", e)
+            key = None
+
+    # Vérifier ffmpeg
+    if not shutil.which("ffmpeg"):
+        raise EnhanceError(
+            "ffmpeg introuvable dans le PATH. Installez-le (ex: brew install ffmpeg)"
+        )
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Nouvel inode: ne jamais réécrire un fichier lié au cache
+    if out_path.exists() and out_path.stat().st_nlink > 1:
+        out_path.unlink()
+
+    done = False
+    # Les encodeurs matériels ne gagnent rien à être lancés en parallèle
+    if chunked and encode_video and (hwaccel or "none").lower() != "videotoolbox":
+        from .chunked_encode import (
+            DEFAULT_MIN_DURATION,
+            DEFAULT_SEGMENT_SECONDS,
+            encode_chunked,
+        )
+
+        done = encode_chunked(
+            in_path,
+            out_path,
+            args,
+            workers=chunk_workers,
+            segment_seconds=float(segment_seconds or DEFAULT_SEGMENT_SECONDS),
+            min_duration=float(
+                DEFAULT_MIN_DURATION
+                if chunk_min_duration is None
+                else chunk_min_duration
+            ),
+            log=log,
+            progress=progress,
+        )
+    if not done:
+        cmd = ["ffmpeg", "-y", "-hide_banner", "-i", str(in_path)]
+        cmd += args + [str(out_path)]
+        log.debug("Commande ffmpeg: %s", " ".join(cmd))
+        # Copie de flux: pas une mesure de vitesse d'encodage
+        _run_ffmpeg(cmd, log, record_speed=encode_video, progress=progress)
+    if encode_video:
+        _report_path(report, "encode")
+    else:
+        _report_path(report, "remux" if plan.action == "remux" else "audio")
+
+    if key is not None and out_path.exists():
+        try:
+            cache.store(key, out_path)
+        except OSError as e:
+            log.warning("Impossible d'ajouter la sortie au cache: %s", e)
 
     return out_path.resolve()
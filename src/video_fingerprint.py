@@ -0,0 +1,302 @@
+"""
+Empreintes vidéo pour détecter les doublons dès l'ingestion.
+
+- Empreinte exacte: hash échantillonné du fichier (taille + blocs répartis)
+- Empreinte perceptuelle: dHash 64 bits de quelques images à positions
+  relatives fixes (calcul NumPy), robuste au ré-encodage et au redimensionnement
+
+L'index répond en temps quasi constant: dictionnaire pour les hashes exacts et
+index multi-bandes pour les quasi-doublons (chaque dHash découpé en bandes de
+16 bits). Deux signatures dont la distance de Hamming totale est inférieure au
+nombre de bandes partagent forcément une bande identique: seuls ces candidats
+sont comparés.
+
+Le stockage est un fichier JSONL en ajout seul; une ligne plus récente pour le
+même file_hash complète la précédente (ex: youtube_id ajouté par le worker).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import subprocess
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .artifact_cache import fast_file_hash
+
+log = logging.getLogger(__name__)
+
+INDEX_NAME = "fingerprints.jsonl"
+FRAME_POSITIONS: Tuple[float, ...] = (0.1, 0.3, 0.5, 0.7, 0.9)
+HASH_BITS = 64
+BAND_BITS = 16
+# Distance totale (somme sur les images) sous laquelle deux vidéos sont
+# considérées comme identiques; doit rester < nombre de bandes (5 * 4 = 20)
+DEFAULT_MAX_DISTANCE = 12
+# Au moins ce nombre d'images comparables pour conclure à un quasi-doublon
+MIN_FRAMES = 3
+# Images quasi uniformes (noir, blanc): dHash peu informatif, ignoré
+MIN_SET_BITS = 8
+# Bande partagée par trop de vidéos: non discriminante, ignorée à la recherche
+MAX_BUCKET = 512
+
+_FRAME_W, _FRAME_H = 9, 8
+
+
+@dataclass
+class VideoFingerprint:
+    """Empreinte d'une vidéo (frames: dHash par position, None si indisponible)."""
+
+    file_hash: str
+    frames: List[Optional[int]] = field(default_factory=list)
+
+
+@dataclass
+class DuplicateMatch:
+    """Résultat d'une recherche: kind vaut "exact" ou "near"."""
+
+    kind: str
+    record: dict
+    distance: int = 0
+
+
+def _informative(h: Optional[int]) -> bool:
+    return h is not None and MIN_SET_BITS <= h.bit_count() <= HASH_BITS - MIN_SET_BITS
+
+
+def _probe_duration(path: Path) -> Optional[float]:
+    try:
+        result = subprocess.run(
+            [
+                "ffprobe",
+                "-v",
+                "error",
+                "-show_entries",
+                "format=duration",
+                "-of",
+                "csv=p=0",
+                str(path),
+            ],
+            capture_output=True,
+            text=True,
+            timeout=30,
+        )
+        return float(result.stdout.strip()) if result.returncode == 0 else None
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        return None
+
+
+def _grab_gray_frame(path: Path, at: float) -> Optional[bytes]:
+    """Image à `at` secondes, réduite en 9x8 niveaux de gris (72 octets bruts)."""
+    try:
+        result = subprocess.run(
+            [
+                "ffmpeg",
+                "-v",
+                "error",
+                "-ss",
+                f"{at:.3f}",
+                "-i",
+                str(path),
+                "-frames:v",
+                "1",
+                "-vf",
+                f"scale={_FRAME_W}:{_FRAME_H}:flags=area,format=gray",
+                "-f",
+                "rawvideo",
+                "-",
+            ],
+            capture_output=True,
+            timeout=60,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    raw = result.stdout
+    if result.returncode != 0 or len(raw) < _FRAME_W * _FRAME_H:
+        return None
+    return raw[: _FRAME_W * _FRAME_H]
+
+
+def dhash_frames(frames: Sequence[Optional[bytes]]) -> List[Optional[int]]:
+    """dHash 64 bits de chaque image 9x8 (gradient horizontal), calculé avec NumPy."""
+    import numpy as np
+
+    valid = [i for i, f in enumerate(frames) if f is not None]
+    out: List[Optional[int]] = [None] * len(frames)
+    if not valid:
+        return out
+    stack = np.stack(
+        [
+            np.frombuffer(frames[i], dtype=np.uint8).reshape(_FRAME_H, _FRAME_W)
+            for i in valid
+        ]
+    )
+    bits = stack[:, :, 1:] > stack[:, :, :-1]
+    packed = np.packbits(bits.reshape(len(valid), -1), axis=1)
+    for i, row in zip(valid, packed):
+        out[i] = int.from_bytes(row.tobytes(), "big")
+    return out
+
+
+def perceptual_hashes(
+    path: str | Path, positions: Sequence[float] = FRAME_POSITIONS
+) -> List[Optional[int]]:
+    """dHash des images aux positions relatives données ([] si outils absents)."""
+    path = Path(path)
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        log.warning("NumPy non disponible, détection de quasi-doublons désactivée")
+        return []
+    if not (shutil.which("ffmpeg") and shutil.which("ffprobe")):
+        log.debug("ffmpeg/ffprobe introuvables, empreinte perceptuelle ignorée")
+        return []
+    duration = _probe_duration(path)
+    if not duration or duration <= 0:
+        return []
+    return dhash_frames([_grab_gray_frame(path, duration * p) for p in positions])
+
+
+def compute_fingerprint(path: str | Path) -> VideoFingerprint:
+    """Empreinte exacte + perceptuelle d'un fichier vidéo."""
+    return VideoFingerprint(
+        file_hash=fast_file_hash(path), frames=perceptual_hashes(path)
+    )
+
+
+def frames_distance(
+    a: Sequence[Optional[int]], b: Sequence[Optional[int]]
+) -> Optional[int]:
+    """Distance de Hamming totale sur les images informatives communes.
+
+    Renvoie None s'il y a moins de MIN_FRAMES images comparables.
+    """
+    total = 0
+    compared = 0
+    for x, y in zip(a, b):
+        if _informative(x) and _informative(y):
+            total += (x ^ y).bit_count()
+            compared += 1
+    return total if compared >= MIN_FRAMES else None
+
+
+def append_record(index_path: str | Path, record: dict) -> None:
+    """Ajoute une ligne à l'index sans le charger (utilisé par le worker)."""
+    line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+    fd = os.open(str(index_path), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+        # Une seule écriture en mode ajout: pas d'entrelacement entre processus
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+class FingerprintIndex:
+    """Index persistant des empreintes déjà reçues.
+
+    Les lignes ajoutées par d'autres processus sont relues à la volée (suivi de
+    l'offset du fichier) avant chaque recherche.
+    """
+
+    def __init__(
+        self, path: str | Path, *, max_distance: int = DEFAULT_MAX_DISTANCE
+    ) -> None:
+        self.path = Path(path)
+        self.max_distance = int(max_distance)
+        self._lock = threading.Lock()
+        self._records: Dict[str, dict] = {}
+        self._by_unique_id: Dict[str, str] = {}
+        self._bands: Dict[Tuple[int, int, int], List[str]] = {}
+        self._offset = 0
+        self.refresh()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @staticmethod
+    def _band_keys(frames: Sequence[Optional[int]]):
+        for pos, h in enumerate(frames):
+            if not _informative(h):
+                continue
+            for band in range(HASH_BITS // BAND_BITS):
+                yield (pos, band, (h >> (band * BAND_BITS)) & ((1 << BAND_BITS) - 1))
+
+    def _ingest(self, rec: dict) -> None:
+        key = rec.get("file_hash")
+        if not key:
+            return
+        current = self._records.get(key)
+        if current is None:
+            current = self._records[key] = {}
+            for bk in self._band_keys(rec.get("frames") or []):
+                self._bands.setdefault(bk, []).append(key)
+        current.update(rec)
+        uid = rec.get("unique_id")
+        if uid:
+            self._by_unique_id[uid] = key
+
+    def refresh(self) -> None:
+        """Charge les lignes ajoutées depuis la dernière lecture."""
+        with self._lock:
+            try:
+                size = self.path.stat().st_size
+            except OSError:
+                return
+            if size < self._offset:
+                # Fichier tronqué/remplacé: tout recharger
+                self._records.clear()
+                self._by_unique_id.clear()
+                self._bands.clear()
+                self._offset = 0
+            if size == self._offset:
+                return
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                chunk = f.read(size - self._offset)
+            end = chunk.rfind(b"\n") + 1
+            for line in chunk[:end].splitlines():
+                try:
+                    self._ingest(json.loads(line))
+                except ValueError:
+                    log.warning("Ligne d'index d'empreintes invalide ignorée")
+            self._offset += end
+
+    def add(self, fp: VideoFingerprint, **extra) -> dict:
+        """Enregistre une empreinte (extra: task, unique_id, chat_id, ...)."""
+        rec = {"file_hash": fp.file_hash, "frames": list(fp.frames), **extra}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        append_record(self.path, rec)
+        self.refresh()
+        return self._records[fp.file_hash]
+
+    def lookup_unique_id(self, unique_id: str) -> Optional[dict]:
+        """Recherche par identifiant stable de la source (ex: file_unique_id Telegram)."""
+        self.refresh()
+        key = self._by_unique_id.get(unique_id)
+        return self._records.get(key) if key else None
+
+    def find(self, fp: VideoFingerprint) -> Optional[DuplicateMatch]:
+        """Doublon exact (même contenu) puis quasi-doublon (même vidéo ré-encodée)."""
+        self.refresh()
+        exact = self._records.get(fp.file_hash)
+        if exact is not None:
+            return DuplicateMatch("exact", exact, 0)
+        candidates = set()
+        for bk in self._band_keys(fp.frames):
+            bucket = self._bands.get(bk)
+            if bucket and len(bucket) <= MAX_BUCKET:
+                candidates.update(bucket)
+        best: Optional[DuplicateMatch] = None
+        for key in candidates:
+            rec = self._records[key]
+            dist = frames_distance(fp.frames, rec.get("frames") or [])
+            if dist is None or dist > self.max_distance:
+                continue
+            if best is None or dist < best.distance:
+                best = DuplicateMatch("near", rec, dist)
+        return best
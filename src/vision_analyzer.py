@@ -15,6 +15,8 @@ import base64
 import json
 from datetime import datetime
 
+from .resource_governor import get_governor
+
 log = logging.getLogger(__name__)
 
 
@@ -187,7 +189,10 @@ class VisionAnalyzer:
                     str(frame_path),
                 ]
 
-                result = subprocess.run(extract_cmd, capture_output=True)
+                with get_governor().acquire(1, label="frame vision") as lease:
+                    result = subprocess.run(
+                        lease.ffmpeg_command(extract_cmd), capture_output=True
+                    )
 
                 if result.returncode == 0 and frame_path.exists():
                     frame_paths.append(frame_path)
@@ -458,21 +463,30 @@ Focus on identifying the main subject and activity shown."""
             content_type.lower(), 24
         )  # 24 = Entertainment par défaut
 
-    def analyze_video(self, video_path: Path, num_frames: int = 3) -> Dict:
+    def analyze_video(
+        self,
+        video_path: Path,
+        num_frames: int = 3,
+        frame_paths: Optional[List[Path]] = None,
+    ) -> Dict:
         """
         Analyser complètement une vidéo
 
         Args:
             video_path: Chemin vers la vidéo
             num_frames: Nombre de frames à analyser
+            frame_paths: Frames déjà extraites (passe d'analyse); conservées
+                après l'analyse car elles appartiennent à l'appelant
 
         Returns:
             Dictionnaire avec l'analyse complète
         """
         log.info(f"Début analyse vision de {video_path.name}")
 
+        owned = not frame_paths
         # Extraire les frames
-        frame_paths = self.extract_frames(video_path, num_frames)
+        if owned:
+            frame_paths = self.extract_frames(video_path, num_frames)
 
         try:
             # Analyser le contenu
@@ -489,19 +503,24 @@ Focus on identifying the main subject and activity shown."""
             return analysis
 
         finally:
-            # Nettoyer les frames temporaires
-            for frame_path in frame_paths:
-                try:
-                    frame_path.unlink()
-                except Exception:
-                    pass
+            if owned:
+                self._cleanup_frames(frame_paths)
 
-            # Nettoyer le répertoire temporaire
+    @staticmethod
+    def _cleanup_frames(frame_paths: List[Path]) -> None:
+        # Nettoyer les frames temporaires
+        for frame_path in frame_paths:
             try:
-                frame_paths[0].parent.rmdir()
+                frame_path.unlink()
             except Exception:
                 pass
 
+        # Nettoyer le répertoire temporaire
+        try:
+            frame_paths[0].parent.rmdir()
+        except Exception:
+            pass
+
 
 def create_vision_analyzer(config: Dict) -> Optional[VisionAnalyzer]:
     """
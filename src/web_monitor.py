@@ -8,24 +8,41 @@ import json
 import logging
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import shutil
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request
-from fastapi.responses import HTMLResponse, Response
+from fastapi.responses import HTMLResponse, PlainTextResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 import uvicorn
 
+from .encode_progress import read_progress
+from .stage_metrics import METRICS_FILE, StageMetrics
+from .task_lease import INFLIGHT_DIR
+from .worker_metrics import read_states, render_prometheus
+from .task_store import TaskStore, open_history_store
+
 log = logging.getLogger(__name__)
 
 
 class TaskMonitor:
     """Gestionnaire de monitoring des tâches"""
 
-    def __init__(self, queue_dir: Path, archive_dir: Path):
+    def __init__(
+        self,
+        queue_dir: Path,
+        archive_dir: Path,
+        store: Optional[TaskStore] = None,
+        timings_window: int = 100,
+    ):
         self.queue_dir = Path(queue_dir)
         self.archive_dir = Path(archive_dir)
+        # Store SQLite: historique servi par requête indexée plutôt que par glob
+        self.store = store
+        # Durées par étape écrites par le worker (queue/stage_metrics.jsonl)
+        self.stage_metrics = StageMetrics(self.queue_dir / METRICS_FILE)
+        self.timings_window = timings_window
         self.active_connections: List[WebSocket] = []
 
     async def connect(self, websocket: WebSocket):
@@ -63,12 +80,18 @@ class TaskMonitor:
         if not self.queue_dir.exists():
             return tasks
 
-        for task_file in self.queue_dir.glob("task_*.json"):
+        # Tâches en file et tâches réservées par un worker (queue/inflight)
+        task_files = list(self.queue_dir.glob("task_*.json"))
+        task_files += list((self.queue_dir / INFLIGHT_DIR).glob("task_*.json"))
+        progress = self.get_encode_progress()
+        for task_file in task_files:
             try:
                 with open(task_file, "r", encoding="utf-8") as f:
                     task_data = json.load(f)
                     task_data["file_path"] = str(task_file)
                     task_data["file_name"] = task_file.name
+                    if task_file.name in progress:
+                        task_data["progress"] = progress[task_file.name]
                     tasks.append(task_data)
             except Exception as e:
                 log.error(f"Erreur lecture tâche {task_file}: {e}")
@@ -77,8 +100,15 @@ class TaskMonitor:
         tasks.sort(key=lambda x: x.get("received_at", ""), reverse=True)
         return tasks
 
+    def get_encode_progress(self) -> Dict[str, Dict[str, Any]]:
+        """Progression live des encodages en cours, par nom de fichier de tâche"""
+        return read_progress(self.queue_dir)
+
     def get_archived_tasks(self, limit: int = 50) -> List[Dict[str, Any]]:
         """Récupérer les tâches archivées (historique)"""
+        if self.store is not None:
+            return self.store.list_tasks("archive", limit=limit)
+
         tasks = []
         if not self.archive_dir.exists():
             return tasks
@@ -133,8 +163,17 @@ class TaskMonitor:
             "status_counts": status_counts,
             "recent_24h": len(recent_tasks),
             "success_rate": self._calculate_success_rate(archived_tasks),
+            "stage_timings": self.get_stage_timings(),
         }
 
+    def get_stage_timings(self, last: Optional[int] = None) -> Dict[str, Any]:
+        """p50/p95 (secondes) par étape sur les N dernières tâches traitées"""
+        try:
+            return self.stage_metrics.percentiles(last or self.timings_window)
+        except OSError as e:
+            log.error(f"Erreur lecture des durées par étape: {e}")
+            return {}
+
     def _calculate_success_rate(self, tasks: List[Dict]) -> float:
         """Calculer le taux de succès"""
         if not tasks:
@@ -162,11 +201,15 @@ class TaskMonitor:
                 del task_data["error"]
             if "youtube_id" in task_data:
                 del task_data["youtube_id"]
+                # Relance explicite: le checkpoint d'upload (définitif) aussi
+                (task_data.get("steps_state") or {}).pop("upload", None)
 
             # Créer nouvelle tâche dans la queue
             new_task_path = self.queue_dir / task_file
             with open(new_task_path, "w", encoding="utf-8") as f:
                 json.dump(task_data, f, ensure_ascii=False, indent=2)
+            if self.store is not None:
+                self.store.record("queue", task_file, task_data)
 
             log.info(f"Tâche relancée: {task_file}")
 
@@ -205,6 +248,8 @@ class TaskMonitor:
 
             archive_path = self.archive_dir / task_file
             shutil.move(str(task_path), str(archive_path))
+            if self.store is not None:
+                self.store.record("archive", task_file, task_data)
 
             log.info(f"Tâche annulée: {task_file}")
 
@@ -231,6 +276,8 @@ class TaskMonitor:
                 return False
 
             archive_path.unlink()
+            if self.store is not None:
+                self.store.delete(task_file)
             log.info(f"Tâche supprimée: {task_file}")
 
             # Notifier via WebSocket
@@ -249,8 +296,14 @@ class TaskMonitor:
             return False
 
 
-def create_app(queue_dir: str, archive_dir: str) -> FastAPI:
-    """Créer l'application FastAPI"""
+def create_app(
+    queue_dir: str, archive_dir: str, config_path: Optional[str] = None
+) -> FastAPI:
+    """Créer l'application FastAPI
+
+    L'historique est servi par l'index SQLite quand le bloc `task_store` de
+    la config (la même que celle du worker) l'active.
+    """
 
     app = FastAPI(
         title="YouTube Automation Monitor",
@@ -259,7 +312,9 @@ def create_app(queue_dir: str, archive_dir: str) -> FastAPI:
     )
 
     # Initialiser le monitor
-    monitor = TaskMonitor(queue_dir, archive_dir)
+    store = open_history_store(config_path, queue_dir)
+    monitor = TaskMonitor(queue_dir, archive_dir, store=store)
+    app.state.task_store = store
 
     # Templates et fichiers statiques
     templates_dir = Path(__file__).parent.parent / "web" / "templates"
@@ -291,6 +346,16 @@ def create_app(queue_dir: str, archive_dir: str) -> FastAPI:
         """API: Historique des tâches"""
         return monitor.get_archived_tasks(limit)
 
+    @app.get("/api/stage-timings")
+    async def get_stage_timings(last: int = 100):
+        """API: p50/p95 par étape sur les N dernières tâches"""
+        return monitor.get_stage_timings(last)
+
+    @app.get("/api/progress")
+    async def get_progress():
+        """API: Progression des encodages en cours (%, fps, vitesse, ETA)"""
+        return monitor.get_encode_progress()
+
     @app.post("/api/tasks/{task_file}/retry")
     async def retry_task(task_file: str):
         """API: Relancer une tâche"""
@@ -327,6 +392,14 @@ def create_app(queue_dir: str, archive_dir: str) -> FastAPI:
             "stats": monitor.get_task_stats(),
         }
 
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        """Métriques Prometheus publiées par les workers (sans scan des tâches)"""
+        return PlainTextResponse(
+            render_prometheus(read_states(monitor.queue_dir)),
+            media_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
     @app.get("/favicon.ico")
     async def favicon():
         return Response(status_code=204)
@@ -346,17 +419,31 @@ def create_app(queue_dir: str, archive_dir: str) -> FastAPI:
                 }
             )
 
-            # Boucle de mise à jour périodique
+            # Progression des encodages chaque seconde, état complet toutes les 5
+            tick = 0
+            last_progress = None
             while True:
-                await asyncio.sleep(5)  # Mise à jour toutes les 5 secondes
-                await websocket.send_json(
-                    {
-                        "type": "update",
-                        "stats": monitor.get_task_stats(),
-                        "pending_tasks": monitor.get_pending_tasks(),
-                        "timestamp": datetime.now().isoformat(),
-                    }
-                )
+                await asyncio.sleep(1)
+                tick += 1
+                if tick % 5 == 0:
+                    await websocket.send_json(
+                        {
+                            "type": "update",
+                            "stats": monitor.get_task_stats(),
+                            "pending_tasks": monitor.get_pending_tasks(),
+                            "timestamp": datetime.now().isoformat(),
+                        }
+                    )
+                progress = monitor.get_encode_progress()
+                if progress != last_progress:
+                    await websocket.send_json(
+                        {
+                            "type": "progress",
+                            "progress": progress,
+                            "timestamp": datetime.now().isoformat(),
+                        }
+                    )
+                    last_progress = progress
 
         except WebSocketDisconnect:
             monitor.disconnect(websocket)
@@ -368,15 +455,21 @@ def create_app(queue_dir: str, archive_dir: str) -> FastAPI:
 
 
 def run_server(
-    queue_dir: str, archive_dir: str, host: str = "127.0.0.1", port: int = 8000
+    queue_dir: str,
+    archive_dir: str,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    config_path: Optional[str] = None,
 ):
     """Lancer le serveur web"""
-    app = create_app(queue_dir, archive_dir)
+    app = create_app(queue_dir, archive_dir, config_path=config_path)
 
     print("🚀 Démarrage du serveur de monitoring...")
     print(f"📊 Dashboard: http://{host}:{port}")
     print(f"📁 Queue: {queue_dir}")
     print(f"📁 Archive: {archive_dir}")
+    if app.state.task_store is not None:
+        print(f"🗄️  Historique SQLite: {app.state.task_store.db_path}")
 
     uvicorn.run(app, host=host, port=port, log_level="info", access_log=True)
 
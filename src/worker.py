@@ -1,19 +1,26 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
 import shutil
 import subprocess
-from datetime import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
 import re
 from pathlib import Path
 from typing import Optional
-import smtplib
-from email.message import EmailMessage
 import os
 
-from src.config_loader import load_config, ConfigError
+from src.config_loader import load_config, load_raw_config, ConfigError
 from src.video_enhance import enhance_video, EnhanceError
+from src.artifact_cache import ArtifactCache, create_enhance_cache
+from src.task_store import TaskStore, open_history_store
+from src.video_fingerprint import INDEX_NAME as FINGERPRINT_INDEX, append_record
 from src.ai_generator import MetaRequest, generate_metadata
 from src.scheduler import UploadScheduler
 from src.subtitle_generator import (
@@ -22,7 +29,37 @@ from src.subtitle_generator import (
     generate_subtitles,
 )
 from .thumbnail_generator import get_best_thumbnail
-from .multi_account_manager import create_multi_account_manager
+from .multi_account_manager import create_multi_account_manager, next_quota_reset
+from .worker_pool import StageLimits, log_throughput_summary
+from .queue_events import create_event_source, write_json_atomic
+from .task_lease import (
+    DEFAULT_LEASE_TTL,
+    LeaseManager,
+    default_owner_id,
+    locate_task,
+)
+from .task_queue import TaskQueue, is_dispatchable, task_deadline
+from .step_engine import RetryPolicy, Step, StepAbort, StepEngine, StepGraph
+from .stage_metrics import METRICS_FILE, StageMetrics, TaskTimings, save_timings
+from .encode_progress import ProgressPublisher
+from .analysis_pass import AnalysisArtifacts, run_analysis
+from .encode_bench import DEFAULT_PROFILE_PATH, load_profile
+from .media_probe import probe_media
+from .task_estimator import (
+    Estimate,
+    TaskEstimator,
+    TaskFeatures,
+    enhance_filters,
+    format_duration,
+    scale_height,
+)
+from .resource_governor import (
+    ResourceGovernor,
+    governor_from_settings,
+    install_governor,
+    job_priority,
+)
+from . import worker_metrics
 
 log = logging.getLogger("worker")
 
@@ -150,6 +187,9 @@ def _notify_email(email_cfg: dict, subject: str, body: str) -> None:
             password = email_cfg.get("password")
         sender = email_cfg.get("from") or username or "noreply@example.com"
 
+        import smtplib
+        from email.message import EmailMessage
+
         msg = EmailMessage()
         msg["Subject"] = subject
         msg["From"] = sender
@@ -201,10 +241,11 @@ def _add_video_to_playlist(
 
 
 def _read_tasks(queue_dir: Path) -> list[Path]:
-    # Inclure les tâches normales et celles issues du scheduler
-    tasks = list(queue_dir.glob("task_*.json"))
-    tasks += list(queue_dir.glob("scheduled_*.json"))
-    return sorted(tasks)
+    """Tâches traitables (normales et issues du scheduler) dans l'ordre de dispatch:
+    priorité, puis échéance la plus proche."""
+    queue = TaskQueue()
+    queue.scan(queue_dir)
+    return queue.drain()
 
 
 def _load_task(path: Path) -> dict:
@@ -213,12 +254,18 @@ def _load_task(path: Path) -> dict:
 
 
 def _save_task(path: Path, data: dict) -> None:
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    write_json_atomic(path, data)
 
 
 def _process_subtitles(
-    creds, video_id: str, video_path: Path, subtitles_cfg: dict, task: dict
+    creds,
+    video_id: str,
+    video_path: Path,
+    subtitles_cfg: dict,
+    task: dict,
+    stages: Optional[StageLimits] = None,
+    timings: Optional[TaskTimings] = None,
+    audio_path: Optional[Path] = None,
 ):
     """
     Génère et upload les sous-titres pour une vidéo
@@ -229,7 +276,16 @@ def _process_subtitles(
         video_path: Chemin vers la vidéo
         subtitles_cfg: Configuration des sous-titres
         task: Données de la tâche
+        stages: Limites CPU/I/O du worker (Whisper = CPU, upload = I/O)
+        timings: Spans de la tâche (durée de Whisper et de l'upload des captions)
+        audio_path: WAV 16 kHz de la passe d'analyse, transcrit sans redécoder la vidéo
     """
+
+    def stage(name: str):
+        if stages:
+            return stages.stage(name, timings)
+        return timings.span(name) if timings is not None else nullcontext()
+
     if not is_whisper_available():
         log.warning(
             "Whisper non disponible, sous-titres ignorés. Installez avec: pip install openai-whisper"
@@ -249,13 +305,16 @@ def _process_subtitles(
     subtitles_dir.mkdir(exist_ok=True)
 
     log.info("Génération sous-titres pour vidéo %s", video_id)
+    # Les fonctions Whisper ne reçoivent audio_path que s'il existe (fakes des tests)
+    audio = {"audio_path": audio_path} if audio_path is not None else {}
 
     try:
         # Détecter la langue source si demandé
         source_language = None
         if auto_detect:
             try:
-                source_language = detect_language(video_path, model)
+                with stage("subtitles"):
+                    source_language = detect_language(video_path, model, **audio)
                 log.info("Langue détectée: %s", source_language)
             except Exception as e:
                 log.warning("Échec détection langue: %s", e)
@@ -273,29 +332,35 @@ def _process_subtitles(
 
                 if lang == source_language:
                     # Transcription dans la langue source
-                    generate_subtitles(
-                        video_path=video_path,
-                        output_path=srt_path,
-                        language=source_language,
-                        model=model,
-                    )
+                    with stage("subtitles"):
+                        generate_subtitles(
+                            video_path=video_path,
+                            output_path=srt_path,
+                            language=source_language,
+                            model=model,
+                            **audio,
+                        )
                 elif lang == "en" and translate_en:
                     # Traduction vers l'anglais
-                    generate_subtitles(
-                        video_path=video_path,
-                        output_path=srt_path,
-                        language=source_language,
-                        model=model,
-                        translate_to_english=True,
-                    )
+                    with stage("subtitles"):
+                        generate_subtitles(
+                            video_path=video_path,
+                            output_path=srt_path,
+                            language=source_language,
+                            model=model,
+                            translate_to_english=True,
+                            **audio,
+                        )
                 else:
                     # Génération directe dans la langue cible
-                    generate_subtitles(
-                        video_path=video_path,
-                        output_path=srt_path,
-                        language=lang,
-                        model=model,
-                    )
+                    with stage("subtitles"):
+                        generate_subtitles(
+                            video_path=video_path,
+                            output_path=srt_path,
+                            language=lang,
+                            model=model,
+                            **audio,
+                        )
 
                 if srt_path.exists():
                     subtitle_files[lang] = srt_path
@@ -308,13 +373,15 @@ def _process_subtitles(
         if translate_en and "en" not in subtitle_files and source_language != "en":
             try:
                 en_srt_path = subtitles_dir / f"{video_path.stem}_en.srt"
-                generate_subtitles(
-                    video_path=video_path,
-                    output_path=en_srt_path,
-                    language=source_language,
-                    model=model,
-                    translate_to_english=True,
-                )
+                with stage("subtitles"):
+                    generate_subtitles(
+                        video_path=video_path,
+                        output_path=en_srt_path,
+                        language=source_language,
+                        model=model,
+                        translate_to_english=True,
+                        **audio,
+                    )
                 if en_srt_path.exists():
                     subtitle_files["en"] = en_srt_path
                     log.info("Traduction anglaise générée: %s", en_srt_path)
@@ -330,13 +397,14 @@ def _process_subtitles(
                     from src.youtube_captions import smart_upload_captions as _impl
 
                     _fn = _impl
-                results = _fn(
-                    credentials=creds,
-                    video_id=video_id,
-                    subtitle_files=subtitle_files,
-                    replace_existing=replace_existing,
-                    is_draft=draft_mode,
-                )
+                with stage("captions"):
+                    results = _fn(
+                        credentials=creds,
+                        video_id=video_id,
+                        subtitle_files=subtitle_files,
+                        replace_existing=replace_existing,
+                        is_draft=draft_mode,
+                    )
 
                 # Logger les résultats
                 for lang, result in results.items():
@@ -456,23 +524,35 @@ def _generate_placeholder_thumbnail(
 
 
 def _handle_scheduled_task(
-    task: dict, task_path: Path, scheduler: UploadScheduler
+    task: dict,
+    task_path: Path,
+    scheduler: UploadScheduler,
+    estimate: Optional[Estimate] = None,
 ) -> bool:
     """
     Gérer une tâche avec planification
 
+    Args:
+        estimate: Durée de préparation prévue (encodage + upload); la tâche
+            sort du planning d'autant en avance sur son créneau
+
     Returns:
         True si la tâche doit être traitée maintenant, False si elle doit être planifiée
     """
     schedule_mode = task.get("schedule_mode", "now")
 
-    if schedule_mode == "now":
+    if schedule_mode == "now" or task.get("scheduled_task_id"):
+        # Déjà sortie du planning par le scheduled worker
         return True
 
-    elif schedule_mode == "auto":
+    lead = {}
+    if estimate is not None and estimate.total_seconds > 0:
+        lead["lead_time"] = timedelta(seconds=estimate.total_seconds)
+
+    if schedule_mode == "auto":
         # Planifier automatiquement aux heures optimales
         try:
-            scheduled_task = scheduler.schedule_task(task_path)
+            scheduled_task = scheduler.schedule_task(task_path, **lead)
             log.info(
                 f"Tâche planifiée automatiquement: {scheduled_task.task_id} pour {scheduled_task.scheduled_time}"
             )
@@ -503,8 +583,15 @@ def _handle_scheduled_task(
                     )
                     return True
 
+                if lead and custom_time - lead["lead_time"] <= now:
+                    log.warning(
+                        "Heure planifiée probablement intenable (%s, préparation %s): "
+                        "traitement dès maintenant",
+                        custom_time,
+                        estimate.describe(),
+                    )
                 scheduled_task = scheduler.schedule_task(
-                    task_path, scheduled_time=custom_time
+                    task_path, scheduled_time=custom_time, **lead
                 )
                 log.info(
                     f"Tâche planifiée pour {custom_time}: {scheduled_task.task_id}"
@@ -521,439 +608,613 @@ def _handle_scheduled_task(
     return True  # Fallback par défaut
 
 
-def process_queue(
-    *,
-    queue_dir: str | Path,
-    archive_dir: str | Path,
-    config_path: Optional[str | Path] = None,
-    log_level: str = "INFO",
-) -> None:
-    logging.basicConfig(
-        level=getattr(logging, log_level),
-        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-    )
-    qdir = Path(queue_dir)
-    adir = Path(archive_dir)
-    qdir.mkdir(parents=True, exist_ok=True)
-    adir.mkdir(parents=True, exist_ok=True)
+@dataclass
+class _WorkerContext:
+    """État partagé par toutes les tâches d'un passage du worker."""
+
+    qdir: Path
+    adir: Path
+    config_path: Optional[str | Path]
+    cfg: Optional[dict]
+    scheduler: UploadScheduler
+    stages: StageLimits
+    stop_event: threading.Event = field(default_factory=threading.Event)
+    # Sérialise les accès aux fichiers partagés (planning, quotas multi-comptes)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    # Mode démon: credentials mono-compte conservés entre les tâches
+    cache_credentials: bool = False
+    credentials: Optional[object] = None
+    config_mtime: Optional[float] = None
+    # Étapes indépendantes d'une même tâche exécutées en parallèle
+    parallel_steps: int = 2
+    # Cache des sorties d'amélioration (enhance.cache.enabled)
+    enhance_cache: Optional[ArtifactCache] = None
+    # Baux de réservation (file partagée entre plusieurs workers)
+    leases: Optional[LeaseManager] = None
+    # Index SQLite de l'historique des tâches (task_store.backend: sqlite),
+    # None en mode fichiers; la file vivante reste sur les fichiers JSON
+    store: Optional[TaskStore] = None
+    # Durées par étape des dernières tâches (p50/p95 du monitor web)
+    metrics: Optional[StageMetrics] = None
+    # Compte unique épuisé (uploadLimitExceeded) jusqu'à cette date
+    upload_blocked_until: Optional[datetime] = None
+    # Budget CPU des sous-processus (ffmpeg, Whisper), installé pendant le run
+    governor: Optional[ResourceGovernor] = None
+    # Durées d'encodage/upload prévues (planification, échéances)
+    estimator: Optional[TaskEstimator] = None
+
+
+def _task_store_for(
+    config_path: Optional[str | Path], qdir: Path, adir: Path
+) -> Optional[TaskStore]:
+    """Index d'historique (task_store.backend: sqlite), partagé avec le monitor."""
+    try:
+        return open_history_store(config_path, qdir)
+    except Exception as e:
+        log.warning("Store SQLite des tâches indisponible: %s", e)
+        return None
 
-    # Initialiser le scheduler pour la planification
-    schedule_dir = qdir.parent / "schedule"
-    scheduler = UploadScheduler(
-        config_path=config_path or Path("config/video.yaml"), schedule_dir=schedule_dir
-    )
 
-    cfg = None
+def _resource_governor_for(
+    config_path: Optional[str | Path], cpu_slots: int
+) -> ResourceGovernor:
+    """Budget CPU des sous-processus (section `resources` de la config)."""
+    settings = None
     if config_path:
         try:
-            cfg = load_config(config_path)
-        except ConfigError as e:
-            log.warning(
-                "Config non chargée (%s), on continue avec des valeurs par défaut.", e
-            )
-            cfg = None
+            settings = (load_raw_config(config_path) or {}).get("resources")
+        except ConfigError:
+            settings = None
+    return governor_from_settings(settings, cpu_slots=cpu_slots)
 
-    for task_path in _read_tasks(qdir):
-        try:
-            task = _load_task(task_path)
-            if task.get("status") not in (None, "pending", "error"):
-                continue
-
-            # Vérifier si la tâche doit être planifiée
-            if not _handle_scheduled_task(task, task_path, scheduler):
-                # Tâche planifiée, la supprimer de la queue normale
-                archive_path = adir / task_path.name
-                shutil.move(str(task_path), str(archive_path))
-                log.info(f"Tâche déplacée vers planification: {task_path.name}")
-                continue
-            video_path = Path(task["video_path"]).resolve()
-            if not video_path.exists():
-                log.error("Vidéo introuvable: %s", video_path)
-                task["status"] = "error"
-                task["error"] = f"Video not found: {video_path}"
-                _save_task(task_path, task)
-                # Archiver la tâche en erreur pour ne pas bloquer la file
-                archive_path = adir / task_path.name
-                shutil.move(str(task_path), str(archive_path))
-                log.info(f"Tâche archivée (erreur fichier manquant): {archive_path}")
-                continue
-
-            # Enhance: fusion presets qualité depuis la tâche (prefs.quality) + config
-            enhance_cfg = (cfg or {}).get("enhance") if isinstance(cfg, dict) else None
-            task_prefs = (task.get("prefs") or {}) if isinstance(task, dict) else {}
-            qname = (task_prefs or {}).get("quality")
-            if qname:
-                base = _quality_defaults(qname)
-                # le preset fournit des valeurs par défaut; la config existante a priorité s'il y a conflit
-                enhance_cfg = {**base, **(enhance_cfg or {})}
-
-            # Amélioration vidéo (si activée et non skippée)
-            enhanced = Path(video_path)
-            skip_enhance = task.get("skip_enhance", False)
-
-            if skip_enhance:
-                log.info("Amélioration skippée (upload direct demandé)")
-            elif enhance_cfg and enhance_cfg.get("enabled", True):
-                try:
-                    log.info("Amélioration vidéo en cours...")
-                    out_path = video_path.with_name(video_path.stem + ".enhanced.mp4")
-                    enhanced = enhance_video(
-                        input_path=video_path,
-                        output_path=out_path,
-                        codec=(enhance_cfg or {}).get("codec", "h264"),
-                        hwaccel=(enhance_cfg or {}).get("hwaccel", "none"),
-                        scale=(enhance_cfg or {}).get("scale"),
-                        fps=(enhance_cfg or {}).get("fps"),
-                        denoise=bool((enhance_cfg or {}).get("denoise", False)),
-                        sharpen=bool((enhance_cfg or {}).get("sharpen", False)),
-                        deband=bool((enhance_cfg or {}).get("deband", False)),
-                        deblock=bool((enhance_cfg or {}).get("deblock", False)),
-                        sharpen_amount=(enhance_cfg or {}).get("sharpen_amount"),
-                        contrast=(enhance_cfg or {}).get("contrast"),
-                        saturation=(enhance_cfg or {}).get("saturation"),
-                        deinterlace=bool((enhance_cfg or {}).get("deinterlace", False)),
-                        color_fix=bool((enhance_cfg or {}).get("color_fix", False)),
-                        loudnorm=bool((enhance_cfg or {}).get("loudnorm", False)),
-                        crf=(enhance_cfg or {}).get("crf"),
-                        bitrate=(enhance_cfg or {}).get("bitrate"),
-                        preset=(enhance_cfg or {}).get("preset", "medium"),
-                        reencode_audio=bool(
-                            (enhance_cfg or {}).get("reencode_audio", True)
-                        ),
-                        audio_bitrate=(enhance_cfg or {}).get("audio_bitrate", "192k"),
-                    )
-                    log.info("Amélioration terminée: %s", enhanced)
-                except EnhanceError as e:
-                    log.error("Erreur d'amélioration: %s", e)
-                    # Continuer avec la vidéo originale
-                    enhanced = Path(video_path)
-
-            # Métadonnées SEO: privilégier celles fournies dans la tâche (via Telegram)
-            user_meta = (task.get("meta") or {}) if isinstance(task, dict) else {}
-            title = user_meta.get("title") if user_meta.get("title") else None
-            description = (
-                user_meta.get("description") if user_meta.get("description") else None
-            )
-            tags = list(user_meta.get("tags") or [])
 
-            # Si des champs manquent ou si config impose le titre IA depuis la description
-            try:
-                seo_cfg = (cfg or {}).get("seo") if isinstance(cfg, dict) else None
-                if not seo_cfg:
-                    # Fallback: lire le YAML brut pour récupérer le bloc seo
-                    try:
-                        import yaml
-
-                        cfg_path = (
-                            Path(config_path)
-                            if config_path
-                            else Path("config/video.yaml")
-                        )
-                        if cfg_path.exists():
-                            raw_doc = (
-                                yaml.safe_load(cfg_path.read_text(encoding="utf-8"))
-                                or {}
-                            )
-                            seo_cfg = raw_doc.get("seo")
-                    except Exception:
-                        seo_cfg = None
-                seo_provider = (
-                    (seo_cfg or {}).get("provider")
-                    if isinstance(seo_cfg, dict)
-                    else None
-                )
-                seo_model = (
-                    (seo_cfg or {}).get("model") if isinstance(seo_cfg, dict) else None
-                )
-                seo_host = (
-                    (seo_cfg or {}).get("host") if isinstance(seo_cfg, dict) else None
-                )
-                force_ai_title = (
-                    bool((seo_cfg or {}).get("force_title_from_description", False))
-                    if isinstance(seo_cfg, dict)
-                    else False
-                )
-                # Préférence par chat : surchage le YAML si présent
-                try:
-                    task_prefs = (
-                        (task.get("prefs") or {}) if isinstance(task, dict) else {}
-                    )
-                    if "ai_title_force" in task_prefs:
-                        force_ai_title = bool(task_prefs.get("ai_title_force"))
-                except Exception:
-                    pass
+def _enhance_cache_for(cfg: Optional[dict]) -> Optional[ArtifactCache]:
+    enhance_cfg = (cfg or {}).get("enhance") if isinstance(cfg, dict) else None
+    try:
+        return create_enhance_cache((enhance_cfg or {}).get("cache"))
+    except OSError as e:
+        log.warning("Cache enhance désactivé: %s", e)
+        return None
+
+
+def _single_account_credentials(ctx: _WorkerContext):
+    """Retourne les credentials du compte unique (réutilisés en mode démon)."""
+    if ctx.cache_credentials and ctx.credentials is not None:
+        return ctx.credentials
+    _get_credentials = globals().get("get_credentials")
+    if not callable(_get_credentials):
+        from src.auth import get_credentials as _impl
+
+        _get_credentials = _impl
+    credentials = _get_credentials(
+        SCOPES,
+        client_secrets_path=DEFAULT_CLIENT_SECRETS,
+        token_path=DEFAULT_TOKEN_FILE,
+    )
+    if ctx.cache_credentials:
+        ctx.credentials = credentials
+    return credentials
+
+
+@dataclass
+class _TaskRun:
+    """Contexte d'exécution d'une tâche, transmis à chaque étape du graphe."""
+
+    task_path: Path
+    task: dict
+    ctx: _WorkerContext
+    video_path: Path
+    credentials: Optional[object] = None
+    manager: Optional[object] = None
+    timings: TaskTimings = field(default_factory=TaskTimings)
+    # Caractéristiques de coût (codec, preset, taille uploadée...) enregistrées
+    # avec les durées pour l'estimateur
+    features: dict = field(default_factory=dict)
+
+    @property
+    def cfg(self) -> Optional[dict]:
+        return self.ctx.cfg
+
+    @property
+    def meta(self) -> dict:
+        return (self.task.get("meta") or {}) if isinstance(self.task, dict) else {}
+
+
+def _fingerprint(*parts) -> str:
+    raw = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _job_priority(run: _TaskRun):
+    """Priorité de la tâche appliquée à ses sous-processus (nice/ionice, file CPU)."""
+    return job_priority(run.task.get("priority"))
+
+
+def _enhance_settings(run: _TaskRun) -> Optional[dict]:
+    """Fusion presets qualité depuis la tâche (prefs.quality) + config."""
+    return _enhance_settings_for(run.cfg, run.task)
+
+
+def _enhance_settings_for(cfg: Optional[dict], task: dict) -> Optional[dict]:
+    enhance_cfg = (cfg or {}).get("enhance") if isinstance(cfg, dict) else None
+    task_prefs = task.get("prefs") or {}
+    qname = (task_prefs or {}).get("quality")
+    if qname:
+        base = _quality_defaults(qname)
+        # le preset fournit des valeurs par défaut; la config existante a priorité s'il y a conflit
+        enhance_cfg = {**base, **(enhance_cfg or {})}
+    return enhance_cfg
+
+
+def _step_enhance(run: _TaskRun, inputs: dict) -> dict:
+    video_path = Path(inputs["source"])
+    enhance_cfg = _enhance_settings(run)
+
+    run.features["encode"] = False
+    if run.task.get("skip_enhance", False):
+        log.info("Amélioration skippée (upload direct demandé)")
+        return {"video": str(video_path), "renditions": {}}
+    if not (enhance_cfg and enhance_cfg.get("enabled", True)):
+        return {"video": str(video_path), "renditions": {}}
+
+    log.info("Amélioration vidéo en cours...")
+    out_path = video_path.with_name(video_path.stem + ".enhanced.mp4")
+    extra = {}
+    if run.ctx.enhance_cache is not None:
+        extra["cache"] = run.ctx.enhance_cache
+    # Source déjà conforme au profil: pas de réencodage complet (désactivable)
+    if (enhance_cfg or {}).get("fast_path", True):
+        extra["fast_path"] = True
+    if (enhance_cfg or {}).get("crf") == "auto":
+        extra["crf_auto"] = (enhance_cfg or {}).get("crf_auto") or {}
+    chunked_cfg = (enhance_cfg or {}).get("chunked") or {}
+    if chunked_cfg.get("enabled", False):
+        extra.update(
+            chunked=True,
+            chunk_workers=chunked_cfg.get("workers"),
+            segment_seconds=chunked_cfg.get("segment_seconds"),
+            chunk_min_duration=chunked_cfg.get("min_duration"),
+        )
+    # Rendus supplémentaires (ex: Shorts 9:16) produits par le même décodage
+    renditions = _rendition_specs(video_path, enhance_cfg)
+    if renditions:
+        extra["renditions"] = renditions
+    # Progression live pour le moniteur web et /status (queue/progress)
+    progress = ProgressPublisher(run.ctx.qdir, run.task_path.name)
+    extra["progress"] = progress
+    preset = _deadline_preset(run, video_path, enhance_cfg or {})
+    report: dict = {}
+    run.features.update(
+        codec=(enhance_cfg or {}).get("codec", "h264"),
+        preset=preset,
+        filters=enhance_filters(enhance_cfg),
+        scale=(enhance_cfg or {}).get("scale"),
+    )
+    with run.ctx.stages.stage("enhance", run.timings), _job_priority(run), progress:
+        enhanced = enhance_video(
+            input_path=video_path,
+            output_path=out_path,
+            codec=(enhance_cfg or {}).get("codec", "h264"),
+            hwaccel=(enhance_cfg or {}).get("hwaccel", "none"),
+            scale=(enhance_cfg or {}).get("scale"),
+            fps=(enhance_cfg or {}).get("fps"),
+            denoise=bool((enhance_cfg or {}).get("denoise", False)),
+            sharpen=bool((enhance_cfg or {}).get("sharpen", False)),
+            deband=bool((enhance_cfg or {}).get("deband", False)),
+            deblock=bool((enhance_cfg or {}).get("deblock", False)),
+            sharpen_amount=(enhance_cfg or {}).get("sharpen_amount"),
+            contrast=(enhance_cfg or {}).get("contrast"),
+            saturation=(enhance_cfg or {}).get("saturation"),
+            deinterlace=bool((enhance_cfg or {}).get("deinterlace", False)),
+            color_fix=bool((enhance_cfg or {}).get("color_fix", False)),
+            loudnorm=bool((enhance_cfg or {}).get("loudnorm", False)),
+            crf=(enhance_cfg or {}).get("crf"),
+            bitrate=(enhance_cfg or {}).get("bitrate"),
+            preset=preset,
+            reencode_audio=bool((enhance_cfg or {}).get("reencode_audio", True)),
+            audio_bitrate=(enhance_cfg or {}).get("audio_bitrate", "192k"),
+            report=report,
+            **extra,
+        )
+    # Seul un vrai réencodage vidéo alimente l'estimation des durées
+    # (skip, remux et hit de cache ne coûtent presque rien)
+    run.features["encode"] = report.get("path") == "encode"
+    log.info("Amélioration terminée: %s (%s)", enhanced, report.get("path"))
+    return {
+        "video": str(enhanced),
+        "renditions": {r["name"]: r["output_path"] for r in renditions},
+    }
 
-                # Règle spéciale Telegram: toujours affiner le titre et les tags à l'aide de l'IA,
-                # même s'ils existent déjà, pour les rendre plus percutants.
-                is_telegram = task.get("source") == "telegram"
-                need_ai = (
-                    is_telegram
-                    or force_ai_title
-                    or (not title or not description or not tags)
-                )
-                if need_ai:
-                    req = MetaRequest(
-                        # Si un titre existe, l'utiliser comme topic de base; sinon fallback sur le nom de fichier
-                        topic=(title or _default_title_for(video_path)),
-                        language=((cfg or {}).get("language") or "fr"),
-                        tone=((cfg or {}).get("tone") or "informatif"),
-                        target_keywords=None,
-                        channel_style=None,
-                        include_hashtags=True,
-                        include_category=True,
-                        max_tags=15,
-                        max_title_chars=70,
-                        provider=seo_provider,
-                        # Ne définir model/host que pour Ollama. Pour OpenAI, laisser None pour que
-                        # src.ai_generator choisisse OPENAI_MODEL ou sa valeur par défaut.
-                        model=(
-                            seo_model
-                            if ((seo_provider or "").lower() == "ollama")
-                            else None
-                        ),
-                        host=(
-                            seo_host
-                            if ((seo_provider or "").lower() == "ollama")
-                            else None
-                        ),
-                        # Contexte: inclure titre + description s'ils existent pour guider la réécriture
-                        input_text=(
-                            (f"Titre utilisateur: {title}\n\n" if title else "")
-                            + (description or "")
-                        )
-                        or None,
-                    )
-                    ai_meta = generate_metadata(
-                        req,
-                        config_path=(
-                            str(config_path) if config_path else "config/video.yaml"
-                        ),
-                        video_path=str(video_path),
-                    )
 
-                    # Si la tâche vient de Telegram: toujours remplacer titre et tags avec la version IA
-                    if is_telegram:
-                        title = ai_meta.get("title") or (
-                            title or _default_title_for(video_path)
-                        )
-                        title = _clean_title(title)
-                        tags = ai_meta.get("tags") or []
-                        # Ne pas écraser la description utilisateur si elle existe; compléter seulement si absente
-                        if not description:
-                            description = ai_meta.get("description") or ""
-                    else:
-                        # Cas standard: Titre: remplacer si force_ai_title, sinon seulement s'il manque
-                        if force_ai_title or not title:
-                            title = ai_meta.get("title") or _default_title_for(
-                                video_path
-                            )
-                            title = _clean_title(title)
-                        # Description/Tags: compléter seulement si manquants
-                        if not description:
-                            description = ai_meta.get("description") or ""
-                        if not tags:
-                            tags = ai_meta.get("tags") or []
-                    # Stocker la catégorie générée automatiquement pour usage ultérieur
-                    ai_generated_category = ai_meta.get("category_id")
-                else:
-                    ai_generated_category = None
-            except Exception as e:
-                log.warning(
-                    "AI metadata non générées (%s), on complète avec des valeurs par défaut.",
-                    e,
-                )
-                ai_generated_category = None
-                if not title:
-                    title = _default_title_for(video_path)
-                if not description:
-                    description = ""
-                if not tags:
-                    tags = []
-
-            # Normaliser tags (unicité, minuscule) – pas de limitation stricte
-            if tags:
-                tags = sorted(
-                    {str(t).strip().lstrip("#").lower() for t in tags if str(t).strip()}
-                )
+def _deadline_preset(run: _TaskRun, video_path: Path, enhance_cfg: dict) -> str:
+    """Preset configuré, accéléré si l'échéance de la tâche ne peut pas être tenue.
 
-            # Titre/description: seulement un défaut si vide, pas de troncature
-            if not title or not str(title).strip():
-                title = _default_title_for(video_path)
+    L'estimation vient du profil de calibration de l'hôte (`main.py
+    enhance-bench`); sans échéance, profil ou sonde de la source: inchangé.
+    """
+    preset = enhance_cfg.get("preset", "medium")
+    deadline = task_deadline(run.task)
+    if deadline is None or (enhance_cfg.get("hwaccel") or "none") != "none":
+        return preset
+    profile = load_profile(enhance_cfg.get("bench_profile") or DEFAULT_PROFILE_PATH)
+    if profile is None:
+        return preset
+    info = probe_media(video_path)
+    if info is None or not info.duration:
+        return preset
+    codec = enhance_cfg.get("codec", "h264")
+    budget = deadline - time.time()
+    chosen = profile.preset_for_deadline(
+        codec,
+        preset,
+        budget_seconds=budget,
+        duration=info.duration,
+        source_fps=info.fps,
+        filters=enhance_filters(enhance_cfg),
+        in_height=info.height,
+        out_height=scale_height(enhance_cfg.get("scale")) or info.height,
+    )
+    if chosen != preset:
+        log.info(
+            "Preset %s -> %s pour tenir l'échéance (%.0f min restantes)",
+            preset,
+            chosen,
+            budget / 60,
+        )
+    return chosen
 
-            # Obtenir les credentials YouTube avec gestion multi-comptes
-            try:
-                # Charger la config brute pour lire multi_accounts (ne pas utiliser load_config qui normalise)
-                import yaml
-
-                raw_cfg_path = Path("config/video.yaml")
-                multi_accounts_enabled = False
-                if raw_cfg_path.exists():
-                    try:
-                        raw_cfg = (
-                            yaml.safe_load(raw_cfg_path.read_text(encoding="utf-8"))
-                            or {}
-                        )
-                        multi_accounts_enabled = bool(
-                            (raw_cfg.get("multi_accounts") or {}).get("enabled", False)
-                        )
-                    except Exception:
-                        multi_accounts_enabled = False
 
-                if multi_accounts_enabled:
-                    # Utiliser le gestionnaire multi-comptes
-                    manager = create_multi_account_manager()
+def _enhance_fallback(run: _TaskRun, inputs: dict, error: BaseException) -> dict:
+    if not isinstance(error, EnhanceError):
+        raise error
+    log.error("Erreur d'amélioration: %s", error)
+    # Continuer avec la vidéo originale
+    return {"video": str(inputs["source"]), "renditions": {}}
 
-                    # Obtenir le compte pour ce chat ou le meilleur compte disponible
-                    chat_id = task.get("chat_id")
-                    if chat_id:
-                        account = manager.get_chat_account(str(chat_id))
-                    else:
-                        account = manager.get_best_account_for_upload()
-
-                    if not account:
-                        log.error("Aucun compte YouTube disponible pour upload")
-                        # Marquer la tâche en erreur et archiver
-                        try:
-                            task["status"] = "error"
-                            task["error"] = "No YouTube account available"
-                            _save_task(task_path, task)
-                            archive_path = adir / task_path.name
-                            shutil.move(str(task_path), str(archive_path))
-                            log.info(
-                                f"Tâche archivée (aucun compte disponible): {archive_path}"
-                            )
-                        except Exception as _e:
-                            log.warning(
-                                f"Impossible d'archiver la tâche sans compte: {_e}"
-                            )
-                        continue
-
-                    log.info(
-                        f"Utilisation du compte: {account.name} ({account.account_id})"
-                    )
-                    credentials = manager.get_credentials_for_account(
-                        account.account_id
-                    )
 
-                    # Enregistrer l'utilisation du compte après upload réussi
-                    upload_account_id = account.account_id
-                else:
-                    # Mode single compte classique
-                    _get_credentials = globals().get("get_credentials")
-                    if not callable(_get_credentials):
-                        from src.auth import get_credentials as _impl
-
-                        _get_credentials = _impl
-                    credentials = _get_credentials(
-                        SCOPES,
-                        client_secrets_path=DEFAULT_CLIENT_SECRETS,
-                        token_path=DEFAULT_TOKEN_FILE,
-                    )
-                    upload_account_id = None
+def _rendition_specs(video_path: Path, enhance_cfg: Optional[dict]) -> list:
+    """Rendus `enhance.renditions` avec leur chemin de sortie à côté de la source."""
+    specs = []
+    for r in (enhance_cfg or {}).get("renditions") or []:
+        spec = {k: v for k, v in r.items() if k != "task"}
+        spec["output_path"] = str(
+            video_path.with_name(f"{video_path.stem}.{r['name']}.mp4")
+        )
+        specs.append(spec)
+    return specs
 
-            except Exception as e:
-                log.error(f"Erreur credentials YouTube: {e}")
-                return False
 
-            # Champs additionnels YouTube
-            cfg_lang = (cfg or {}).get("language") if isinstance(cfg, dict) else None
-            cfg_priv = (
-                (cfg or {}).get("privacy_status") if isinstance(cfg, dict) else None
-            )
-            cfg_license = (
-                (cfg or {}).get("license") if isinstance(cfg, dict) else None
-            )  # "youtube" | "creativeCommon"
-            cfg_emb = (cfg or {}).get("embeddable") if isinstance(cfg, dict) else None
-            cfg_public_stats = (
-                (cfg or {}).get("public_stats_viewable")
-                if isinstance(cfg, dict)
-                else None
-            )
-            cfg_default_audio_lang = (
-                (cfg or {}).get("default_audio_language")
-                if isinstance(cfg, dict)
-                else None
-            )
+def _enhance_outputs_exist(outputs: dict) -> bool:
+    paths = [outputs.get("video")] + list((outputs.get("renditions") or {}).values())
+    return all(not p or Path(p).exists() for p in paths)
 
-            # Derivations à partir de la tâche
-            task_meta = (task.get("meta") or {}) if isinstance(task, dict) else {}
-            lang = task_meta.get("language") or cfg_lang or "fr"
-            privacy_status = (
-                task.get("privacy_status")
-                or task_meta.get("privacy_status")
-                or cfg_priv
-                or "public"
-            )
 
-            # Brancher Vision (Ollama) pour catégorie si activée (toujours tenter si activé)
-            vision_cat = None
-            vision_cfg = (cfg or {}).get("vision") if isinstance(cfg, dict) else None
-            if isinstance(vision_cfg, dict) and vision_cfg.get("enabled", False):
-                try:
-                    from src.vision_analyzer import VisionAnalyzer
-                    from src.thumbnail_generator import extract_frames
+def _linked_task(run: _TaskRun, inputs: dict, name: str, path: str) -> dict:
+    """Tâche de publication d'un rendu, liée à la vidéo principale.
 
-                    analyzer = VisionAnalyzer(
-                        host=(vision_cfg or {}).get("host"),
-                        model=(vision_cfg or {}).get("model", "llava"),
-                        timeout=int((vision_cfg or {}).get("timeout", 60)),
-                    )
-                    # Extraire quelques frames pour l'analyse
-                    frames = extract_frames(Path(enhanced), num_frames=3)
-                    if frames:
-                        analysis = analyzer.analyze_video(Path(enhanced), num_frames=3)
-                        vision_cat = analysis.get("category_id")
-                        if vision_cat is not None:
-                            log.info("Catégorie Vision détectée: %s", vision_cat)
-                except Exception as ve:
-                    log.warning("Échec analyse Vision pour catégorie: %s", ve)
-
-            # Catégorie: uniquement IA/Vision, sinon 22 (ignorer catégorie utilisateur et config)
-            category_id = vision_cat or ai_generated_category or 22
-            # Validation categoryId
-            valid_categories = {
-                "1",
-                "2",
-                "10",
-                "15",
-                "17",
-                "19",
-                "20",
-                "22",
-                "23",
-                "24",
-                "25",
-                "26",
-                "27",
-                "28",
-            }
-            try:
-                if str(category_id) not in valid_categories:
-                    log.warning("categoryId invalide %s, fallback 22", category_id)
-                    category_id = 22
-            except Exception:
-                category_id = 22
-            made_for_kids = (
-                task.get("made_for_kids")
-                or task_meta.get("made_for_kids")
-                or (cfg or {}).get("made_for_kids")
-            )
-            # Forcer made_for_kids à False par défaut
-            if made_for_kids is None:
-                made_for_kids = False
-
-            # Date d'enregistrement: utiliser received_at si présent
-            recording_date = (
-                task.get("received_at")
-                if isinstance(task.get("received_at"), str)
-                else None
+    Reprend les métadonnées finales de la tâche parente (pas de nouvel appel
+    IA) et n'est pas réencodée: le rendu sort déjà de l'encodage parent.
+    """
+    youtube_id = inputs.get("youtube_id")
+    description = inputs.get("description") or ""
+    if youtube_id:
+        description += f"\n\nVidéo complète: https://youtu.be/{youtube_id}"
+    description = f"{description.strip()}\n\n#{name}".strip()
+    task = {
+        "video_path": path,
+        "status": "pending",
+        "skip_enhance": True,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "meta": {
+            "title": inputs.get("title") or _default_title_for(run.video_path),
+            "description": description,
+            "tags": sorted(set(inputs.get("tags") or []) | {name}),
+        },
+        "linked_to": {
+            "task": run.task_path.name,
+            "youtube_id": youtube_id,
+            "rendition": name,
+        },
+    }
+    for key in ("prefs", "chat_id", "privacy_status", "priority"):
+        if key in run.task:
+            task[key] = run.task[key]
+    return task
+
+
+def _step_linked_tasks(run: _TaskRun, inputs: dict) -> dict:
+    """Crée une tâche de publication par rendu marqué `task` (défaut: oui)."""
+    enhance_cfg = _enhance_settings(run) or {}
+    wanted = {
+        r["name"] for r in enhance_cfg.get("renditions") or [] if r.get("task", True)
+    }
+    created = []
+    for name, path in sorted((inputs.get("renditions") or {}).items()):
+        if name not in wanted or not Path(path).exists():
+            continue
+        task_name = f"{run.task_path.stem}.{name}.json"
+        # En file, déjà réservée par un worker (inflight/) ou archivée
+        if not any(
+            locate_task(d / task_name).exists() for d in (run.ctx.qdir, run.ctx.adir)
+        ):
+            write_json_atomic(
+                run.ctx.qdir / task_name, _linked_task(run, inputs, name, path)
             )
+            log.info("Tâche liée créée (%s): %s", name, task_name)
+        created.append(task_name)
+    return {"linked_tasks": created}
+
+
+def _linked_tasks_fallback(run: _TaskRun, inputs: dict, error: BaseException) -> dict:
+    log.error("Tâches liées non créées: %s", error)
+    return {"linked_tasks": []}
+
+
+def _vision_settings(run: _TaskRun) -> Optional[dict]:
+    cfg = run.cfg
+    vision_cfg = (cfg or {}).get("vision") if isinstance(cfg, dict) else None
+    if isinstance(vision_cfg, dict) and vision_cfg.get("enabled", False):
+        return vision_cfg
+    return None
+
+
+def _subtitles_wanted(run: _TaskRun) -> bool:
+    cfg = run.cfg
+    subtitles_cfg = (cfg or {}).get("subtitles") if isinstance(cfg, dict) else None
+    # Activer si demandé dans la tâche OU dans la config
+    return bool(
+        run.task.get("subtitles_enabled", False)
+        or (subtitles_cfg or {}).get("enabled", False)
+    )
+
+
+def _analysis_of(inputs: dict) -> Optional[AnalysisArtifacts]:
+    return AnalysisArtifacts.from_dict(inputs.get("analysis"))
+
 
-            # Génération automatique de thumbnail (INFAILLIBLE)
-            thumbnail_path = None
-            thumb_output = enhanced.parent / f"{enhanced.stem}_thumb.jpg"
+def _step_analysis(run: _TaskRun, inputs: dict) -> dict:
+    """Passe d'analyse unique de la source, en parallèle de l'encodage.
+
+    Un seul décodage produit les miniatures candidates, les frames Vision et
+    le WAV 16 kHz de Whisper; les étapes suivantes les consomment au lieu de
+    relancer ffmpeg sur la vidéo.
+    """
+    vision_cfg = _vision_settings(run)
+    # Créneau propre (ANALYSIS_STAGES): décodage des seules images clés, léger,
+    # qui s'exécute pendant l'encodage sans occuper un créneau CPU ou I/O
+    with run.ctx.stages.stage("analysis", run.timings), _job_priority(run):
+        artifacts = run_analysis(
+            Path(inputs["source"]),
+            frames=int((vision_cfg or {}).get("frames_to_analyze", 3))
+            if vision_cfg
+            else 0,
+            audio=_subtitles_wanted(run),
+        )
+    return {"analysis": artifacts.to_dict() if artifacts else None}
+
+
+def _analysis_fallback(run: _TaskRun, inputs: dict, error: BaseException) -> dict:
+    log.warning("Passe d'analyse indisponible (%s), extractions séparées", error)
+    return {"analysis": None}
+
+
+def _analysis_valid(outputs: dict) -> bool:
+    analysis = outputs.get("analysis")
+    return not analysis or Path(analysis.get("dir") or "").is_dir()
+
+
+def _discard_analysis(values: dict) -> None:
+    """Supprime les artefacts d'analyse une fois la tâche terminée."""
+    analysis = values.get("analysis")
+    if isinstance(analysis, dict) and analysis.get("dir"):
+        shutil.rmtree(analysis["dir"], ignore_errors=True)
+
+
+def _seo_settings(run: _TaskRun) -> Optional[dict]:
+    cfg, config_path = run.cfg, run.ctx.config_path
+    seo_cfg = (cfg or {}).get("seo") if isinstance(cfg, dict) else None
+    if not seo_cfg:
+        # Fallback: vue brute du snapshot de config pour récupérer le bloc seo
+        try:
+            raw_doc = load_raw_config(config_path or "config/video.yaml") or {}
+            seo_cfg = raw_doc.get("seo")
+        except Exception:
+            seo_cfg = None
+    return seo_cfg
+
+
+def _finalize_meta(run: _TaskRun, title, description, tags, ai_category) -> dict:
+    video_path = run.video_path
+    # Normaliser tags (unicité, minuscule) – pas de limitation stricte
+    if tags:
+        tags = sorted(
+            {str(t).strip().lstrip("#").lower() for t in tags if str(t).strip()}
+        )
+    # Titre/description: seulement un défaut si vide, pas de troncature
+    if not title or not str(title).strip():
+        title = _default_title_for(video_path)
+    return {
+        "title": title,
+        "description": description or "",
+        "tags": list(tags or []),
+        "ai_category": ai_category,
+    }
+
+
+def _step_ai_meta(run: _TaskRun, inputs: dict) -> dict:
+    """Métadonnées SEO: privilégier celles fournies dans la tâche (via Telegram).
+
+    Le contexte Vision vient de l'étape vision (frames de la passe d'analyse):
+    la génération ne réextrait pas de frames de la vidéo.
+    """
+    task, cfg, config_path = run.task, run.cfg, run.ctx.config_path
+    video_path = Path(inputs["source"])
+    user_meta = run.meta
+    title = user_meta.get("title") if user_meta.get("title") else None
+    description = user_meta.get("description") if user_meta.get("description") else None
+    tags = list(user_meta.get("tags") or [])
+
+    # Si des champs manquent ou si config impose le titre IA depuis la description
+    seo_cfg = _seo_settings(run)
+    seo_provider = (
+        (seo_cfg or {}).get("provider") if isinstance(seo_cfg, dict) else None
+    )
+    seo_model = (seo_cfg or {}).get("model") if isinstance(seo_cfg, dict) else None
+    seo_host = (seo_cfg or {}).get("host") if isinstance(seo_cfg, dict) else None
+    force_ai_title = (
+        bool((seo_cfg or {}).get("force_title_from_description", False))
+        if isinstance(seo_cfg, dict)
+        else False
+    )
+    # Préférence par chat : surchage le YAML si présent
+    task_prefs = task.get("prefs") or {}
+    if "ai_title_force" in task_prefs:
+        force_ai_title = bool(task_prefs.get("ai_title_force"))
+
+    # Règle spéciale Telegram: toujours affiner le titre et les tags à l'aide de l'IA,
+    # même s'ils existent déjà, pour les rendre plus percutants.
+    is_telegram = task.get("source") == "telegram"
+    need_ai = (
+        is_telegram or force_ai_title or (not title or not description or not tags)
+    )
+    if not need_ai:
+        return _finalize_meta(run, title, description, tags, None)
+
+    req = MetaRequest(
+        # Si un titre existe, l'utiliser comme topic de base; sinon fallback sur le nom de fichier
+        topic=(title or _default_title_for(video_path)),
+        language=((cfg or {}).get("language") or "fr"),
+        tone=((cfg or {}).get("tone") or "informatif"),
+        target_keywords=None,
+        channel_style=None,
+        include_hashtags=True,
+        include_category=True,
+        max_tags=15,
+        max_title_chars=70,
+        provider=seo_provider,
+        # Ne définir model/host que pour Ollama. Pour OpenAI, laisser None pour que
+        # src.ai_generator choisisse OPENAI_MODEL ou sa valeur par défaut.
+        model=(seo_model if ((seo_provider or "").lower() == "ollama") else None),
+        host=(seo_host if ((seo_provider or "").lower() == "ollama") else None),
+        # Contexte: inclure titre + description s'ils existent pour guider la réécriture
+        input_text=(
+            (f"Titre utilisateur: {title}\n\n" if title else "") + (description or "")
+        )
+        or None,
+    )
+    with run.ctx.stages.stage("ai_meta", run.timings):
+        ai_meta = generate_metadata(
+            req,
+            config_path=(str(config_path) if config_path else "config/video.yaml"),
+            vision_analysis=inputs.get("vision_analysis"),
+        )
 
-            # Niveau 1: get_best_thumbnail (frame 30% ou 5s)
+    # Si la tâche vient de Telegram: toujours remplacer titre et tags avec la version IA
+    if is_telegram:
+        title = ai_meta.get("title") or (title or _default_title_for(video_path))
+        title = _clean_title(title)
+        tags = ai_meta.get("tags") or []
+        # Ne pas écraser la description utilisateur si elle existe; compléter seulement si absente
+        if not description:
+            description = ai_meta.get("description") or ""
+    else:
+        # Cas standard: Titre: remplacer si force_ai_title, sinon seulement s'il manque
+        if force_ai_title or not title:
+            title = ai_meta.get("title") or _default_title_for(video_path)
+            title = _clean_title(title)
+        # Description/Tags: compléter seulement si manquants
+        if not description:
+            description = ai_meta.get("description") or ""
+        if not tags:
+            tags = ai_meta.get("tags") or []
+    # Stocker la catégorie générée automatiquement pour usage ultérieur
+    return _finalize_meta(run, title, description, tags, ai_meta.get("category_id"))
+
+
+def _ai_meta_fallback(run: _TaskRun, inputs: dict, error: BaseException) -> dict:
+    log.warning(
+        "AI metadata non générées (%s), on complète avec des valeurs par défaut.",
+        error,
+    )
+    user_meta = run.meta
+    return _finalize_meta(
+        run,
+        user_meta.get("title"),
+        user_meta.get("description"),
+        list(user_meta.get("tags") or []),
+        None,
+    )
+
+
+def _step_vision(run: _TaskRun, inputs: dict) -> dict:
+    """Brancher Vision pour catégorie si activée (toujours tenter si activé).
+
+    Analyse les frames de la passe d'analyse (vidéo d'origine); sans elles,
+    l'analyseur extrait ses propres frames.
+    """
+    source = Path(inputs["source"])
+    vision_cat = None
+    vision_cfg = _vision_settings(run)
+    result = None
+    if vision_cfg:
+        from src.vision_analyzer import create_vision_analyzer
+
+        analyzer = create_vision_analyzer(vision_cfg)
+        if analyzer is None:
+            return {"vision_category": None, "vision_analysis": None}
+        analysis = _analysis_of(inputs)
+        with run.ctx.stages.stage("vision", run.timings), _job_priority(run):
+            result = analyzer.analyze_video(
+                source,
+                num_frames=int(vision_cfg.get("frames_to_analyze", 3)),
+                frame_paths=(analysis.frames if analysis else None) or None,
+            )
+        result = result if isinstance(result, dict) else None
+        vision_cat = (result or {}).get("category_id")
+        if vision_cat is not None:
+            log.info("Catégorie Vision détectée: %s", vision_cat)
+    # Analyse complète réutilisée par ai_meta (contexte des métadonnées)
+    return {"vision_category": vision_cat, "vision_analysis": result}
+
+
+def _vision_fallback(run: _TaskRun, inputs: dict, error: BaseException) -> dict:
+    log.warning("Échec analyse Vision pour catégorie: %s", error)
+    return {"vision_category": None, "vision_analysis": None}
+
+
+def _step_audio_language(run: _TaskRun, inputs: dict) -> dict:
+    """Langue audio (ffprobe) de la vidéo d'origine, en parallèle de l'encodage."""
+    cfg = run.cfg
+    if isinstance(cfg, dict) and cfg.get("default_audio_language"):
+        return {"audio_language": None}
+    analysis = _analysis_of(inputs)
+    if analysis is not None and analysis.info is not None:
+        # Déjà lue par le ffprobe de la passe d'analyse
+        return {"audio_language": analysis.audio_language}
+    with run.timings.span("audio_probe"):
+        return {"audio_language": _probe_audio_language(Path(inputs["source"]))}
+
+
+def _step_thumbnail(run: _TaskRun, inputs: dict) -> dict:
+    """Génération automatique de thumbnail (INFAILLIBLE)."""
+    enhanced = Path(inputs["video"])
+    thumbnail_path = None
+    thumb_output = enhanced.parent / f"{enhanced.stem}_thumb.jpg"
+
+    with run.ctx.stages.stage("thumbnail", run.timings), _job_priority(run):
+        # Niveau 0: meilleure candidate de la passe d'analyse (aucun décodage)
+        analysis = _analysis_of(inputs)
+        best = analysis.best_thumbnail() if analysis else None
+        if best is not None:
+            try:
+                shutil.copyfile(best, thumb_output)
+                thumbnail_path = str(thumb_output)
+                log.info("Thumbnail (passe d'analyse): %s", best.name)
+            except OSError as e:
+                log.warning("Copie de la miniature d'analyse impossible: %s", e)
+
+        # Niveau 1: get_best_thumbnail (frame 30% ou 5s)
+        if not thumbnail_path:
             try:
                 generated_thumb = get_best_thumbnail(enhanced, thumb_output)
                 if generated_thumb and generated_thumb.exists():
@@ -962,74 +1223,310 @@ def process_queue(
             except Exception as e:
                 log.warning("Échec get_best_thumbnail: %s", e)
 
-            # Niveau 2: fallback ffmpeg frame simple (1s)
-            if not thumbnail_path:
-                try:
-                    cmd = [
-                        "ffmpeg",
-                        "-y",
-                        "-v",
-                        "error",
-                        "-ss",
-                        "00:00:01",
-                        "-i",
-                        str(enhanced),
-                        "-vframes",
-                        "1",
-                        "-q:v",
-                        "2",
-                        str(thumb_output),
-                    ]
-                    res = subprocess.run(
-                        cmd, capture_output=True, text=True, timeout=30
-                    )
-                    if res.returncode == 0 and thumb_output.exists():
-                        thumbnail_path = str(thumb_output)
-                        log.info(
-                            "Thumbnail générée (ffmpeg fallback): %s", thumbnail_path
-                        )
-                    else:
-                        log.warning("Échec ffmpeg fallback: %s", res.stderr)
-                except Exception as e:
-                    log.warning("Erreur ffmpeg fallback: %s", e)
-
-            # Niveau 3: placeholder (Pillow) - TOUJOURS réussit si Pillow disponible
-            if not thumbnail_path:
-                log.warning("Génération placeholder thumbnail (dernière tentative)...")
-                if _generate_placeholder_thumbnail(thumb_output):
+        # Niveau 2: fallback ffmpeg frame simple (1s)
+        if not thumbnail_path:
+            try:
+                cmd = [
+                    "ffmpeg",
+                    "-y",
+                    "-v",
+                    "error",
+                    "-ss",
+                    "00:00:01",
+                    "-i",
+                    str(enhanced),
+                    "-vframes",
+                    "1",
+                    "-q:v",
+                    "2",
+                    str(thumb_output),
+                ]
+                res = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+                if res.returncode == 0 and thumb_output.exists():
                     thumbnail_path = str(thumb_output)
+                    log.info("Thumbnail générée (ffmpeg fallback): %s", thumbnail_path)
                 else:
-                    log.error("IMPOSSIBLE de générer une miniature (même placeholder)")
+                    log.warning("Échec ffmpeg fallback: %s", res.stderr)
+            except Exception as e:
+                log.warning("Erreur ffmpeg fallback: %s", e)
 
-            try:
-                _upload_video = globals().get("upload_video")
-                if not callable(_upload_video):
-                    from src.uploader import upload_video as _impl
-
-                    _upload_video = _impl
-                # Déterminer publish_at final
-                task_publish_at = (
-                    task.get("publish_at")
-                    or (
-                        task_meta.get("publish_at")
-                        if isinstance(task_meta, dict)
+        # Niveau 3: placeholder (Pillow) - TOUJOURS réussit si Pillow disponible
+        if not thumbnail_path:
+            log.warning("Génération placeholder thumbnail (dernière tentative)...")
+            if _generate_placeholder_thumbnail(thumb_output):
+                thumbnail_path = str(thumb_output)
+            else:
+                log.error("IMPOSSIBLE de générer une miniature (même placeholder)")
+    return {"thumbnail_path": thumbnail_path}
+
+
+def _multi_accounts_enabled() -> bool:
+    # Config brute pour lire multi_accounts (load_config ne conserve pas ce bloc)
+    try:
+        raw_cfg = load_raw_config("config/video.yaml") or {}
+        return bool((raw_cfg.get("multi_accounts") or {}).get("enabled", False))
+    except Exception:
+        return False
+
+
+def _archive_task(run: _TaskRun, reason: str) -> Path:
+    archive_path = run.ctx.adir / run.task_path.name
+    shutil.move(str(run.task_path), str(archive_path))
+    log.info(f"Tâche archivée ({reason}): {archive_path}")
+    return archive_path
+
+
+def _acquire_upload_credentials(run: _TaskRun) -> Optional[str]:
+    """Obtient les credentials YouTube avec gestion multi-comptes.
+
+    Returns:
+        ID du compte multi-comptes utilisé (None en mode compte unique)
+    """
+    ctx, task = run.ctx, run.task
+    try:
+        if _multi_accounts_enabled():
+            # Utiliser le gestionnaire multi-comptes
+            with ctx.lock:
+                manager = create_multi_account_manager()
+            run.manager = manager
+
+            # Obtenir le compte pour ce chat ou le meilleur compte disponible
+            chat_id = task.get("chat_id")
+            if chat_id:
+                account = manager.get_chat_account(str(chat_id))
+            else:
+                account = manager.get_best_account_for_upload()
+
+            if not account:
+                retry_at = _next_account_available(manager)
+                if retry_at is not None:
+                    _block_task(run, retry_at)
+                log.error("Aucun compte YouTube disponible pour upload")
+                # Marquer la tâche en erreur et archiver
+                try:
+                    task["status"] = "error"
+                    task["error"] = "No YouTube account available"
+                    _save_task(run.task_path, task)
+                    _archive_task(run, "aucun compte disponible")
+                except Exception as _e:
+                    log.warning(f"Impossible d'archiver la tâche sans compte: {_e}")
+                raise StepAbort("No YouTube account available")
+
+            log.info(f"Utilisation du compte: {account.name} ({account.account_id})")
+            run.credentials = manager.get_credentials_for_account(account.account_id)
+            # Enregistrer l'utilisation du compte après upload réussi
+            return account.account_id
+
+        # Mode single compte classique
+        blocked_until = ctx.upload_blocked_until
+        if blocked_until is not None and blocked_until > datetime.now(timezone.utc):
+            _block_task(run, blocked_until)
+        run.credentials = _single_account_credentials(ctx)
+        return None
+    except StepAbort:
+        raise
+    except Exception as e:
+        log.error(f"Erreur credentials YouTube: {e}")
+        raise StepAbort(str(e), stop_worker=True) from e
+
+
+def _is_upload_limit_error(error: BaseException) -> bool:
+    # Sans dépendre du type exact (ResumableUploadError, HttpError...)
+    text = str(error)
+    return "uploadLimitExceeded" in text or "exceeded the number of videos" in text
+
+
+def _next_account_available(manager) -> Optional[datetime]:
+    """Date de disponibilité d'un compte, None si attendre ne sert à rien."""
+    next_available_at = getattr(manager, "next_available_at", None)
+    if not callable(next_available_at):
+        return None
+    retry_at = next_available_at()
+    if retry_at is None or retry_at <= datetime.now(timezone.utc):
+        return None
+    return retry_at
+
+
+def _mark_account_exhausted(run: _TaskRun, account_id: Optional[str]) -> datetime:
+    """Marque le compte utilisé épuisé jusqu'à la réinitialisation des quotas."""
+    if account_id and run.manager is not None:
+        with run.ctx.lock:
+            until = run.manager.mark_upload_limit_reached(account_id)
+    else:
+        until = next_quota_reset()
+        run.ctx.upload_blocked_until = until
+    worker_metrics.inc("upload_limit_hits_total", account=account_id or "default")
+    return until
+
+
+def _block_task(run: _TaskRun, retry_at: datetime) -> None:
+    """Met la tâche en attente du prochain compte disponible, sans arrêter le worker.
+
+    La tâche reste dans la file avec `retry_after`: elle est reprise
+    automatiquement (depuis ses checkpoints) une fois cette date passée.
+    """
+    task = run.task
+    task["status"] = "blocked"
+    task["error"] = "uploadLimitExceeded"
+    task["error_message"] = (
+        "Limite quotidienne YouTube atteinte sur tous les comptes. "
+        "Nouvel essai automatique après la réinitialisation des quotas."
+    )
+    task["blocked_at"] = datetime.now().isoformat()
+    task["retry_after"] = retry_at.isoformat()
+    _save_task(run.task_path, task)
+    log.warning(
+        "Tâche %s bloquée jusqu'au %s (limite d'upload)",
+        run.task_path.name,
+        retry_at.isoformat(timespec="minutes"),
+    )
+    raise StepAbort("uploadLimitExceeded")
+
+
+def _task_credentials(run: _TaskRun, account_id: Optional[str]):
+    """Credentials des étapes post-upload (y compris en reprise après checkpoint)."""
+    if run.credentials is None:
+        if account_id:
+            with run.ctx.lock:
+                run.manager = run.manager or create_multi_account_manager()
+            run.credentials = run.manager.get_credentials_for_account(account_id)
+        else:
+            run.credentials = _single_account_credentials(run.ctx)
+    return run.credentials
+
+
+def _step_upload(run: _TaskRun, inputs: dict) -> dict:
+    task, cfg, ctx = run.task, run.cfg, run.ctx
+    enhanced = Path(inputs["video"])
+    title = inputs["title"]
+    description = inputs["description"]
+    tags = inputs["tags"]
+
+    if task.get("youtube_id"):
+        # Déjà publiée (checkpoint perdu ou invalidé): ne jamais publier deux fois
+        log.info("Vidéo déjà publiée (id=%s), upload ignoré", task["youtube_id"])
+        return {
+            "youtube_id": task["youtube_id"],
+            "upload_account_id": task.get("upload_account_id"),
+            "publish_at": task.get("publish_at"),
+        }
+    if ctx.leases is not None and not ctx.leases.owns(run.task_path):
+        # Bail expiré et repris ailleurs: ne jamais publier deux fois
+        raise StepAbort("Bail perdu avant l'upload")
+    upload_account_id = _acquire_upload_credentials(run)
+
+    # Champs additionnels YouTube
+    cfg_lang = (cfg or {}).get("language") if isinstance(cfg, dict) else None
+    cfg_priv = (cfg or {}).get("privacy_status") if isinstance(cfg, dict) else None
+    cfg_license = (
+        (cfg or {}).get("license") if isinstance(cfg, dict) else None
+    )  # "youtube" | "creativeCommon"
+    cfg_emb = (cfg or {}).get("embeddable") if isinstance(cfg, dict) else None
+    cfg_public_stats = (
+        (cfg or {}).get("public_stats_viewable") if isinstance(cfg, dict) else None
+    )
+    cfg_default_audio_lang = (
+        (cfg or {}).get("default_audio_language") if isinstance(cfg, dict) else None
+    )
+
+    # Derivations à partir de la tâche
+    task_meta = run.meta
+    lang = task_meta.get("language") or cfg_lang or "fr"
+    privacy_status = (
+        task.get("privacy_status")
+        or task_meta.get("privacy_status")
+        or cfg_priv
+        or "public"
+    )
+
+    # Catégorie: uniquement IA/Vision, sinon 22 (ignorer catégorie utilisateur et config)
+    category_id = inputs.get("vision_category") or inputs.get("ai_category") or 22
+    # Validation categoryId
+    valid_categories = {
+        "1",
+        "2",
+        "10",
+        "15",
+        "17",
+        "19",
+        "20",
+        "22",
+        "23",
+        "24",
+        "25",
+        "26",
+        "27",
+        "28",
+    }
+    try:
+        if str(category_id) not in valid_categories:
+            log.warning("categoryId invalide %s, fallback 22", category_id)
+            category_id = 22
+    except Exception:
+        category_id = 22
+    made_for_kids = (
+        task.get("made_for_kids")
+        or task_meta.get("made_for_kids")
+        or (cfg or {}).get("made_for_kids")
+    )
+    # Forcer made_for_kids à False par défaut
+    if made_for_kids is None:
+        made_for_kids = False
+
+    # Date d'enregistrement: utiliser received_at si présent
+    recording_date = (
+        task.get("received_at") if isinstance(task.get("received_at"), str) else None
+    )
+    thumbnail_path = inputs.get("thumbnail_path")
+
+    _upload_video = globals().get("upload_video")
+    if not callable(_upload_video):
+        from src.uploader import upload_video as _impl
+
+        _upload_video = _impl
+    # Déterminer publish_at final
+    task_publish_at = (
+        task.get("publish_at")
+        or (task_meta.get("publish_at") if isinstance(task_meta, dict) else None)
+        or ((cfg or {}).get("publish_at") if isinstance(cfg, dict) else None)
+    )
+    publish_at_final = task_publish_at
+    try:
+        run.features["size_bytes"] = Path(enhanced).stat().st_size
+    except OSError:
+        pass
+    early_slot = _early_release_slot(task)
+    if (
+        (privacy_status or "").lower() == "public"
+        and early_slot
+        and not publish_at_final
+    ):
+        # Sortie du planning avant le créneau (préparation estimée): publication
+        # programmée au créneau plutôt qu'immédiate
+        publish_at_final = _to_rfc3339_utc_from_dt(early_slot)
+        log.info("publishAt fixé au créneau planifié: %s", publish_at_final)
+    if (privacy_status or "").lower() == "private" and not publish_at_final:
+        try:
+            estimate = _upload_estimate(run)
+            with ctx.lock:
+                slot_dt = ctx.scheduler.find_next_optimal_slot(
+                    lead_time=(
+                        timedelta(seconds=estimate.total_seconds)
+                        if estimate is not None
                         else None
                     )
-                    or (
-                        (cfg or {}).get("publish_at") if isinstance(cfg, dict) else None
-                    )
                 )
-                publish_at_final = task_publish_at
-                if (privacy_status or "").lower() == "private" and not publish_at_final:
-                    try:
-                        slot_dt = scheduler.find_next_optimal_slot()
-                        publish_at_final = _to_rfc3339_utc_from_dt(slot_dt)
-                        log.info("publishAt auto fixé: %s", publish_at_final)
-                    except Exception as e:
-                        log.warning("Auto planification publishAt échouée: %s", e)
+            publish_at_final = _to_rfc3339_utc_from_dt(slot_dt)
+            log.info("publishAt auto fixé: %s", publish_at_final)
+        except Exception as e:
+            log.warning("Auto planification publishAt échouée: %s", e)
 
+    tried: set = set()
+    while True:
+        try:
+            with ctx.stages.stage("upload", run.timings):
                 resp = _upload_video(
-                    credentials,
+                    run.credentials,
                     video_path=str(enhanced),
                     title=title,
                     description=description,
@@ -1046,151 +1543,919 @@ def process_queue(
                     ),
                     default_language=lang,
                     default_audio_language=(
-                        cfg_default_audio_lang
-                        or _probe_audio_language(enhanced)
-                        or lang
+                        cfg_default_audio_lang or inputs.get("audio_language") or lang
                     ),
                     recording_date=recording_date,
                 )
-                vid = resp.get("id")
-                log.info("Upload réussi: video id=%s", vid)
-                try:
-                    import yaml
+            break
+        except Exception as e:
+            if not _is_upload_limit_error(e):
+                raise
+            log.warning(
+                "Limite d'upload YouTube atteinte (compte %s): %s",
+                upload_account_id or "unique",
+                e,
+            )
+            retry_at = _mark_account_exhausted(run, upload_account_id)
+            if not upload_account_id:
+                _block_task(run, retry_at)
+            # Le gestionnaire ignore désormais ce compte: bascule sur le suivant
+            tried.add(upload_account_id)
+            run.credentials = None
+            upload_account_id = _acquire_upload_credentials(run)
+            if upload_account_id in tried:
+                _block_task(run, retry_at)
+
+    vid = resp.get("id")
+    log.info("Upload réussi: video id=%s", vid)
+    # Enregistré dans la tâche dès la publication (sauvegardé avec le checkpoint)
+    task["youtube_id"] = vid
+    task["upload_account_id"] = upload_account_id
+    try:
+        worker_metrics.inc(
+            "upload_bytes_total",
+            os.stat(enhanced).st_size,
+            account=upload_account_id or "default",
+        )
+    except OSError:
+        pass
+    _notify_upload(
+        run, vid, title, privacy_status, publish_at_final, enhanced, upload_account_id
+    )
 
-                    cfg_path = (
-                        Path(config_path) if config_path else Path("config/video.yaml")
-                    )
-                    raw_cfg = (
-                        yaml.safe_load(cfg_path.read_text(encoding="utf-8"))
-                        if cfg_path.exists()
-                        else {}
-                    )
-                    email_cfg = (
-                        (raw_cfg.get("notifications") or {}).get("email")
-                        if isinstance(raw_cfg, dict)
-                        else None
-                    )
-                    if isinstance(email_cfg, dict):
-                        video_url = f"https://youtu.be/{vid}" if vid else ""
-                        subject = f"Publication YouTube: {title}"
-                        body_lines = [
-                            f"Titre: {title}",
-                            f"ID: {vid}",
-                            f"URL: {video_url}",
-                            f"Visibilité: {privacy_status}",
-                            f"publishAt: {publish_at_final or '(immédiat)'}",
-                            f"Fichier: {enhanced}",
-                        ]
-                        if upload_account_id:
-                            body_lines.append(f"Compte: {upload_account_id}")
-                        _notify_email(email_cfg, subject, "\n".join(body_lines))
-                except Exception as _e:
-                    log.warning("Notification email ignorée: %s", _e)
-                # Ajout éventuel à une playlist si demandée
-                try:
-                    playlist_id = (
-                        task.get("playlist_id")
-                        or task_meta.get("playlist_id")
-                        or (
-                            (cfg or {}).get("playlist_id")
-                            if isinstance(cfg, dict)
-                            else None
-                        )
-                    )
-                    if playlist_id:
-                        _add_video_to_playlist(credentials, vid, str(playlist_id))
-                except Exception as e:
-                    log.error("Erreur ajout à la playlist: %s", e)
-            except Exception as e:
-                # Gestion spécifique uploadLimitExceeded (sans dépendre du type exact)
-                if "uploadLimitExceeded" in str(
-                    e
-                ) or "exceeded the number of videos" in str(e):
-                    log.warning(f"Limite d'upload YouTube atteinte: {e}")
-
-                    # Marquer la tâche comme bloquée
-                    task["status"] = "blocked"
-                    task["error"] = "uploadLimitExceeded"
-                    task[
-                        "error_message"
-                    ] = "Limite quotidienne YouTube atteinte. Réessayez dans 24h."
-                    task["blocked_at"] = datetime.now().isoformat()
-
-                    # Sauvegarder la tâche bloquée
-                    task_path.write_text(
-                        json.dumps(task, ensure_ascii=False, indent=2), encoding="utf-8"
-                    )
+    # Enregistrer l'utilisation du quota si multi-comptes
+    if upload_account_id:
+        try:
+            with ctx.lock:
+                run.manager.record_upload(upload_account_id, api_calls_used=1600)
+                usage = run.manager.quota_usage.get(upload_account_id)
+            log.info(f"Quota enregistré pour le compte {upload_account_id}")
+            if usage is not None:
+                worker_metrics.set_gauge(
+                    "quota_api_calls_used", usage.api_calls, account=upload_account_id
+                )
+        except Exception as e:
+            log.error(f"Erreur enregistrement quota: {e}")
 
-                    # Archiver la tâche bloquée
-                    archive_path = adir / task_path.name
-                    shutil.move(str(task_path), str(archive_path))
+    return {
+        "youtube_id": vid,
+        "upload_account_id": upload_account_id,
+        "publish_at": publish_at_final,
+    }
 
-                    log.info(f"Tâche marquée comme bloquée et archivée: {archive_path}")
 
-                    # Arrêter le traitement des autres tâches pour éviter les échecs en cascade
-                    log.warning(
-                        "Arrêt du worker pour éviter d'autres échecs uploadLimitExceeded"
-                    )
-                    return
-                else:
-                    # Autres erreurs d'upload
-                    raise
+def _notify_upload(
+    run: _TaskRun,
+    vid: Optional[str],
+    title: str,
+    privacy_status: str,
+    publish_at_final: Optional[str],
+    enhanced: Path,
+    upload_account_id: Optional[str],
+) -> None:
+    config_path = run.ctx.config_path
+    try:
+        try:
+            raw_cfg = load_raw_config(config_path or "config/video.yaml")
+        except ConfigError:
+            raw_cfg = {}
+        email_cfg = (
+            (raw_cfg.get("notifications") or {}).get("email")
+            if isinstance(raw_cfg, dict)
+            else None
+        )
+        if isinstance(email_cfg, dict):
+            video_url = f"https://youtu.be/{vid}" if vid else ""
+            subject = f"Publication YouTube: {title}"
+            body_lines = [
+                f"Titre: {title}",
+                f"ID: {vid}",
+                f"URL: {video_url}",
+                f"Visibilité: {privacy_status}",
+                f"publishAt: {publish_at_final or '(immédiat)'}",
+                f"Fichier: {enhanced}",
+            ]
+            if upload_account_id:
+                body_lines.append(f"Compte: {upload_account_id}")
+            _notify_email(email_cfg, subject, "\n".join(body_lines))
+    except Exception as _e:
+        log.warning("Notification email ignorée: %s", _e)
+
+
+def _step_playlist(run: _TaskRun, inputs: dict) -> dict:
+    """Ajout éventuel à une playlist si demandée."""
+    cfg, task = run.cfg, run.task
+    playlist_id = (
+        task.get("playlist_id")
+        or run.meta.get("playlist_id")
+        or ((cfg or {}).get("playlist_id") if isinstance(cfg, dict) else None)
+    )
+    if playlist_id:
+        credentials = _task_credentials(run, inputs.get("upload_account_id"))
+        with run.ctx.stages.stage("playlist", run.timings):
+            _add_video_to_playlist(credentials, inputs["youtube_id"], str(playlist_id))
+    return {"playlist_id": str(playlist_id) if playlist_id else None}
+
+
+def _playlist_fallback(run: _TaskRun, inputs: dict, error: BaseException) -> dict:
+    log.error("Erreur ajout à la playlist: %s", error)
+    return {"playlist_id": None}
+
+
+def _step_subtitles(run: _TaskRun, inputs: dict) -> dict:
+    """Génération et upload de sous-titres (si activé)."""
+    cfg = run.cfg
+    subtitles_cfg = (cfg or {}).get("subtitles") if isinstance(cfg, dict) else None
+    if not _subtitles_wanted(run):
+        return {"subtitles": None}
+    analysis = _analysis_of(inputs)
+
+    # Les infos (générés/uploadés) sont recueillies hors de la tâche partagée puis
+    # persistées via le checkpoint de l'étape
+    result: dict = {}
+    with _job_priority(run):
+        _process_subtitles(
+            _task_credentials(run, inputs.get("upload_account_id")),
+            inputs["youtube_id"],
+            Path(inputs["video"]),
+            subtitles_cfg or {},
+            result,
+            stages=run.ctx.stages,
+            timings=run.timings,
+            audio_path=analysis.audio if analysis else None,
+        )
+    return {"subtitles": result.get("subtitles")}
 
-            task["status"] = "done"
-            task["youtube_id"] = vid
-            _save_task(task_path, task)
 
-            # Génération et upload de sous-titres (si activé)
-            subtitles_cfg = (
-                (cfg or {}).get("subtitles") if isinstance(cfg, dict) else None
-            )
-            task_subtitles_enabled = task.get("subtitles_enabled", False)
-            config_subtitles_enabled = (
-                subtitles_cfg.get("enabled", False) if subtitles_cfg else False
+def _subtitles_fallback(run: _TaskRun, inputs: dict, error: BaseException) -> dict:
+    # Ne pas faire échouer la tâche pour les sous-titres
+    log.error(
+        "Erreur génération sous-titres pour %s: %s", inputs.get("youtube_id"), error
+    )
+    return {"subtitles": None}
+
+
+def _path_outputs_exist(*keys: str):
+    def check(outputs: dict) -> bool:
+        return all(not outputs.get(k) or Path(outputs[k]).exists() for k in keys)
+
+    return check
+
+
+# Graphe des étapes d'une tâche. Les dépendances découlent des entrées/sorties:
+# la chaîne analysis -> vision -> ai_meta ne dépend pas d'enhance et s'exécute en parallèle.
+TASK_STEPS = StepGraph(
+    [
+        Step(
+            "enhance",
+            _step_enhance,
+            inputs=("source",),
+            outputs=("video", "renditions"),
+            fallback=_enhance_fallback,
+            cache_key=lambda run: _fingerprint(
+                run.task.get("skip_enhance", False), _enhance_settings(run)
+            ),
+            is_valid=_enhance_outputs_exist,
+        ),
+        Step(
+            "analysis",
+            _step_analysis,
+            inputs=("source",),
+            outputs=("analysis",),
+            fallback=_analysis_fallback,
+            cache_key=lambda run: _fingerprint(
+                _vision_settings(run), _subtitles_wanted(run)
+            ),
+            is_valid=_analysis_valid,
+        ),
+        Step(
+            "audio_language",
+            _step_audio_language,
+            inputs=("source", "analysis"),
+            outputs=("audio_language",),
+            fallback=lambda run, inputs, error: {"audio_language": None},
+        ),
+        Step(
+            "vision",
+            _step_vision,
+            inputs=("source", "analysis"),
+            outputs=("vision_category", "vision_analysis"),
+            fallback=_vision_fallback,
+        ),
+        Step(
+            "ai_meta",
+            _step_ai_meta,
+            inputs=("source", "analysis", "vision_category", "vision_analysis"),
+            outputs=("title", "description", "tags", "ai_category"),
+            retry=RetryPolicy(max_attempts=2, backoff_seconds=5.0),
+            fallback=_ai_meta_fallback,
+            cache_key=lambda run: _fingerprint(
+                run.task.get("source"), run.meta, run.task.get("prefs")
+            ),
+        ),
+        Step(
+            "thumbnail",
+            _step_thumbnail,
+            inputs=("video", "analysis"),
+            outputs=("thumbnail_path",),
+            is_valid=_path_outputs_exist("thumbnail_path"),
+        ),
+        Step(
+            "upload",
+            _step_upload,
+            inputs=(
+                "video",
+                "title",
+                "description",
+                "tags",
+                "ai_category",
+                "vision_category",
+                "audio_language",
+                "thumbnail_path",
+            ),
+            outputs=("youtube_id", "upload_account_id", "publish_at"),
+            # Pas de nouvel essai au niveau du graphe: un timeout peut masquer
+            # un upload réussi (l'uploader reprend déjà ses chunks); une vidéo
+            # publiée ne se rejoue jamais, même si une étape amont est rejouée
+            terminal=lambda outputs: bool(outputs.get("youtube_id")),
+        ),
+        Step(
+            "linked_tasks",
+            _step_linked_tasks,
+            inputs=("renditions", "title", "description", "tags", "youtube_id"),
+            outputs=("linked_tasks",),
+            fallback=_linked_tasks_fallback,
+        ),
+        Step(
+            "playlist",
+            _step_playlist,
+            inputs=("youtube_id", "upload_account_id"),
+            outputs=("playlist_id",),
+            retry=RetryPolicy(max_attempts=3, backoff_seconds=2.0),
+            fallback=_playlist_fallback,
+        ),
+        Step(
+            "subtitles",
+            _step_subtitles,
+            inputs=("youtube_id", "upload_account_id", "video", "analysis"),
+            outputs=("subtitles",),
+            retry=RetryPolicy(max_attempts=2, backoff_seconds=10.0),
+            fallback=_subtitles_fallback,
+        ),
+    ],
+    initial=("source",),
+)
+
+
+def _record_fingerprint(ctx: _WorkerContext, task: dict, archived: Path) -> None:
+    """Complète l'index d'empreintes d'ingestion avec l'ID YouTube publié."""
+    fp = task.get("fingerprint")
+    if not isinstance(fp, dict) or not fp.get("file_hash"):
+        return
+    try:
+        append_record(
+            ctx.qdir / FINGERPRINT_INDEX,
+            {
+                "file_hash": fp["file_hash"],
+                "task": str(archived),
+                "youtube_id": task.get("youtube_id"),
+            },
+        )
+    except OSError as e:
+        log.warning("Mise à jour de l'index d'empreintes impossible: %s", e)
+
+
+def _estimator_for(cfg: Optional[dict], qdir: Path) -> TaskEstimator:
+    enhance_cfg = (cfg or {}).get("enhance") if isinstance(cfg, dict) else None
+    profile_path = (enhance_cfg or {}).get("bench_profile") or DEFAULT_PROFILE_PATH
+    return TaskEstimator.for_queue(qdir, profile_path=profile_path)
+
+
+def _admission_estimate(ctx: _WorkerContext, task: dict) -> Optional[Estimate]:
+    """Préparation prévue d'une tâche planifiée ou à échéance (sinon None).
+
+    Avertit quand l'échéance de la tâche ne peut probablement pas être tenue.
+    """
+    if ctx.estimator is None or task.get("scheduled_task_id"):
+        return None
+    deadline = task_deadline(task)
+    if task.get("schedule_mode", "now") == "now" and deadline is None:
+        return None
+    estimate = ctx.estimator.estimate_video(
+        task.get("video_path") or "",
+        _enhance_settings_for(ctx.cfg, task),
+        encode=not task.get("skip_enhance", False),
+    )
+    if estimate is None:
+        return None
+    if deadline is not None and time.time() + estimate.total_seconds > deadline:
+        log.warning(
+            "Échéance probablement intenable (%s restantes, préparation %s)",
+            format_duration(max(0.0, deadline - time.time())),
+            estimate.describe(),
+        )
+    return estimate
+
+
+def _upload_estimate(run: _TaskRun) -> Optional[Estimate]:
+    """Durée d'upload prévue du fichier final (délai avant un publishAt auto)."""
+    size = run.features.get("size_bytes")
+    if run.ctx.estimator is None or not size:
+        return None
+    info = probe_media(run.video_path)
+    if info is None or not info.duration:
+        return None
+    estimate = run.ctx.estimator.estimate(
+        TaskFeatures(
+            duration=info.duration, height=info.height, size_bytes=size, encode=False
+        )
+    )
+    return estimate if estimate is not None and estimate.upload_seconds else None
+
+
+def _early_release_slot(task: dict) -> Optional[datetime]:
+    """Créneau planifié encore à venir d'une tâche sortie du planning en avance."""
+    if not (task.get("scheduled_task_id") and task.get("scheduled_time")):
+        return None
+    try:
+        slot = datetime.fromisoformat(task["scheduled_time"])
+    except (TypeError, ValueError):
+        return None
+    if slot.tzinfo is None:
+        slot = slot.astimezone()
+    return slot if slot > datetime.now(timezone.utc) else None
+
+
+def _task_features(run: _TaskRun, values: dict) -> Optional[dict]:
+    """Caractéristiques de coût d'une tâche terminée (historique de l'estimateur)."""
+    artifacts = AnalysisArtifacts.from_dict(values.get("analysis"))
+    media = artifacts.info if artifacts and artifacts.info else None
+    media = media or probe_media(run.video_path)
+    if media is None or not media.duration:
+        return None
+    f = run.features
+    return TaskFeatures(
+        duration=media.duration,
+        height=media.height,
+        out_height=scale_height(f.get("scale")) or media.height,
+        codec=f.get("codec") or "h264",
+        preset=f.get("preset") or "medium",
+        filters=list(f.get("filters") or []),
+        size_bytes=f.get("size_bytes"),
+        encode=bool(f.get("encode")),
+    ).to_dict()
+
+
+def _record_timings(
+    ctx: _WorkerContext,
+    task_path: Path,
+    task: dict,
+    timings: TaskTimings,
+    ok: bool,
+    features: Optional[dict] = None,
+) -> None:
+    """Bloc `timings` de la tâche + historique glissant (monitor web, estimateur)."""
+    block = save_timings(task, timings)
+    worker_metrics.inc("tasks_processed_total", result="done" if ok else "error")
+    for sp in block["spans"]:
+        stage = sp["stage"]
+        if stage.startswith(("ai_meta.ollama", "ai_meta.openai")):
+            worker_metrics.observe(
+                "llm_latency_seconds", sp["seconds"], call=stage.split(".", 1)[1]
             )
+        elif "." not in stage:
+            worker_metrics.observe("stage_duration_seconds", sp["seconds"], stage=stage)
+    if ctx.metrics is None:
+        return
+    try:
+        ctx.metrics.append(task_path.name, block, ok=ok, features=features)
+    except OSError as e:
+        log.warning("Historique des durées non mis à jour: %s", e)
 
-            # Activer si demandé dans la tâche OU dans la config
-            if task_subtitles_enabled or config_subtitles_enabled:
-                try:
-                    _process_subtitles(
-                        credentials, vid, enhanced, subtitles_cfg or {}, task
-                    )
-                except Exception as e:
-                    log.error("Erreur génération sous-titres pour %s: %s", vid, e)
-                    # Ne pas faire échouer la tâche pour les sous-titres
-                # Toujours persister les infos de sous-titres (générés/uploadés) si le task a été modifié
-                try:
-                    _save_task(task_path, task)
-                except Exception as _e:
-                    log.warning(
-                        f"Impossible de sauvegarder les infos de sous-titres: {_e}"
-                    )
 
-            # Enregistrer l'utilisation du quota si multi-comptes
-            if upload_account_id:
-                try:
-                    manager.record_upload(upload_account_id, api_calls_used=1600)
-                    log.info(f"Quota enregistré pour le compte {upload_account_id}")
-                except Exception as e:
-                    log.error(f"Erreur enregistrement quota: {e}")
+def _process_task(task_path: Path, ctx: _WorkerContext) -> bool:
+    """Traite une tâche de la file via le graphe d'étapes TASK_STEPS.
 
-            # Marquer comme terminée si tâche planifiée
-            if task.get("scheduled_task_id"):
-                try:
+    Les sorties de chaque étape sont enregistrées dans la tâche (steps_state):
+    après une erreur ou un arrêt, le passage suivant reprend à la première
+    étape incomplète.
+
+    Returns:
+        False si le worker doit s'arrêter (ex: credentials YouTube invalides), True sinon
+    """
+    adir = ctx.adir
+    scheduler = ctx.scheduler
+    stages = ctx.stages
+    timings: Optional[TaskTimings] = None
+
+    try:
+        task = _load_task(task_path)
+        if not is_dispatchable(task):
+            return True
+        if task.get("status") == "blocked":
+            log.info("Reprise de la tâche bloquée: %s", task_path.name)
+            task["status"] = "pending"
+            task.pop("retry_after", None)
+
+        # Durée de préparation prévue: créneau tenable, échéance à risque
+        estimate = _admission_estimate(ctx, task)
+        # Vérifier si la tâche doit être planifiée
+        with ctx.lock:
+            process_now = _handle_scheduled_task(task, task_path, scheduler, estimate)
+        if not process_now:
+            # Tâche planifiée, la supprimer de la queue normale
+            archive_path = adir / task_path.name
+            shutil.move(str(task_path), str(archive_path))
+            log.info(f"Tâche déplacée vers planification: {task_path.name}")
+            return True
+        video_path = Path(task["video_path"]).resolve()
+        if not video_path.exists():
+            log.error("Vidéo introuvable: %s", video_path)
+            task["status"] = "error"
+            task["error"] = f"Video not found: {video_path}"
+            _save_task(task_path, task)
+            # Archiver la tâche en erreur pour ne pas bloquer la file
+            archive_path = adir / task_path.name
+            shutil.move(str(task_path), str(archive_path))
+            log.info(f"Tâche archivée (erreur fichier manquant): {archive_path}")
+            return True
+
+        run = _TaskRun(task_path=task_path, task=task, ctx=ctx, video_path=video_path)
+        timings = run.timings
+        engine = StepEngine(
+            TASK_STEPS,
+            task,
+            persist=lambda: _save_task(task_path, task),
+            max_parallel=ctx.parallel_steps,
+        )
+        try:
+            values = engine.run(run, {"source": str(video_path)})
+        except StepAbort as e:
+            return not e.stop_worker
+
+        if values.get("subtitles"):
+            task["subtitles"] = values["subtitles"]
+        task["status"] = "done"
+        task["youtube_id"] = values.get("youtube_id")
+        _record_timings(
+            ctx, task_path, task, timings, ok=True, features=_task_features(run, values)
+        )
+        _save_task(task_path, task)
+
+        # Marquer comme terminée si tâche planifiée
+        if task.get("scheduled_task_id"):
+            try:
+                with ctx.lock:
                     scheduler.mark_task_completed(task["scheduled_task_id"])
-                except Exception as e:
-                    log.error("Erreur marquage tâche planifiée terminée: %s", e)
+            except Exception as e:
+                log.error("Erreur marquage tâche planifiée terminée: %s", e)
+
+        # Archive
+        dest = adir / task_path.name
+        shutil.move(str(task_path), str(dest))
+        # Après l'archivage seulement: un arrêt avant invaliderait le
+        # checkpoint d'analyse et rejouerait les étapes en aval
+        _discard_analysis(values)
+        _record_fingerprint(ctx, task, dest)
+        stages.stats.record_task(True)
+
+    except Exception as e:
+        log.exception("Erreur inattendue sur %s: %s", task_path, e)
+        stages.stats.record_task(False)
+        try:
+            task = _load_task(task_path)
+            task["status"] = "error"
+            task["error"] = str(e)
+            if timings is not None:
+                _record_timings(ctx, task_path, task, timings, ok=False)
+            _save_task(task_path, task)
+        except Exception:
+            pass
+
+    return True
+
+
+def _process_claimed(task_path: Path, ctx: _WorkerContext) -> Optional[bool]:
+    """Réserve la tâche (bail) puis la traite depuis queue/inflight.
+
+    Returns:
+        None si un autre worker détient déjà la tâche, sinon le résultat de
+        _process_task
+    """
+    if ctx.leases is None:
+        try:
+            return _process_task(task_path, ctx)
+        finally:
+            _record_task_state(ctx, task_path.name)
+    lease = ctx.leases.claim(task_path)
+    if lease is None:
+        log.debug("Tâche déjà réservée par un autre worker: %s", task_path.name)
+        return None
+    try:
+        return _process_task(lease.task_path, ctx)
+    finally:
+        ctx.leases.release(lease)
+        _record_task_state(ctx, task_path.name)
 
-            # Archive
-            dest = adir / task_path.name
-            shutil.move(str(task_path), str(dest))
 
+def _record_task_state(ctx: _WorkerContext, name: str) -> None:
+    """Reporte l'état final de la tâche (archive ou file) dans le store SQLite."""
+    if ctx.store is None:
+        return
+    for location, directory in (("archive", ctx.adir), ("queue", ctx.qdir)):
+        try:
+            task = _load_task(directory / name)
+        except FileNotFoundError:
+            continue
+        except (OSError, ValueError) as e:
+            log.warning("Tâche illisible, store non mis à jour %s: %s", name, e)
+            return
+        try:
+            ctx.store.record(location, name, task)
         except Exception as e:
-            log.exception("Erreur inattendue sur %s: %s", task_path, e)
-            try:
-                task = _load_task(task_path)
-                task["status"] = "error"
-                task["error"] = str(e)
-                _save_task(task_path, task)
-            except Exception:
-                pass
+            log.warning("Mise à jour du store des tâches impossible: %s", e)
+        return
+
+
+def _run_task(task_path: Path, ctx: _WorkerContext) -> None:
+    """Exécute une tâche dans le pool (ignorée si l'arrêt a été demandé)."""
+    if ctx.stop_event.is_set():
+        return
+    if _process_claimed(task_path, ctx) is False:
+        ctx.stop_event.set()
+
+
+def _config_mtime(config_path: Optional[str | Path]) -> Optional[float]:
+    try:
+        return Path(config_path).stat().st_mtime if config_path else None
+    except OSError:
+        return None
+
+
+def _load_worker_config(config_path: Optional[str | Path]) -> Optional[dict]:
+    if not config_path:
+        return None
+    try:
+        return load_config(config_path)
+    except ConfigError as e:
+        log.warning(
+            "Config non chargée (%s), on continue avec des valeurs par défaut.", e
+        )
+        return None
+
+
+def _build_context(
+    queue_dir: str | Path,
+    archive_dir: str | Path,
+    config_path: Optional[str | Path],
+    concurrency: int,
+    cpu_slots: Optional[int],
+    io_slots: Optional[int],
+    parallel_steps: int = 2,
+    lease_ttl: Optional[float] = DEFAULT_LEASE_TTL,
+) -> _WorkerContext:
+    qdir = Path(queue_dir)
+    adir = Path(archive_dir)
+    qdir.mkdir(parents=True, exist_ok=True)
+    adir.mkdir(parents=True, exist_ok=True)
+
+    # Initialiser le scheduler pour la planification
+    schedule_dir = qdir.parent / "schedule"
+    scheduler = UploadScheduler(
+        config_path=config_path or Path("config/video.yaml"), schedule_dir=schedule_dir
+    )
+
+    cfg = _load_worker_config(config_path)
+    return _WorkerContext(
+        qdir=qdir,
+        adir=adir,
+        config_path=config_path,
+        cfg=cfg,
+        scheduler=scheduler,
+        stages=StageLimits(
+            cpu_slots=cpu_slots or 1,
+            io_slots=io_slots or concurrency,
+        ),
+        config_mtime=_config_mtime(config_path),
+        parallel_steps=max(1, int(parallel_steps or 1)),
+        enhance_cache=_enhance_cache_for(cfg),
+        leases=LeaseManager(qdir, ttl=lease_ttl) if lease_ttl else None,
+        store=_task_store_for(config_path, qdir, adir),
+        metrics=StageMetrics(qdir / METRICS_FILE),
+        governor=_resource_governor_for(config_path, cpu_slots or 1),
+        estimator=_estimator_for(cfg, qdir),
+    )
+
+
+def process_queue(
+    *,
+    queue_dir: str | Path,
+    archive_dir: str | Path,
+    config_path: Optional[str | Path] = None,
+    log_level: str = "INFO",
+    concurrency: int = 1,
+    cpu_slots: Optional[int] = None,
+    io_slots: Optional[int] = None,
+    parallel_steps: int = 2,
+    lease_ttl: Optional[float] = DEFAULT_LEASE_TTL,
+) -> None:
+    """Traite la file de tâches.
+
+    Args:
+        concurrency: Nombre de tâches traitées simultanément (1 = séquentiel)
+        cpu_slots: Étapes CPU simultanées (enhance, Whisper). Défaut: 1
+        io_slots: Étapes I/O simultanées (upload, IA, sous-titres). Défaut: concurrency
+        parallel_steps: Étapes indépendantes d'une tâche exécutées en parallèle
+        lease_ttl: Durée (s) des baux de réservation (None/0: pas de réservation,
+            file non partagée)
+    """
+    logging.basicConfig(
+        level=getattr(logging, log_level),
+        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+    )
+    concurrency = max(1, int(concurrency or 1))
+    ctx = _build_context(
+        queue_dir,
+        archive_dir,
+        config_path,
+        concurrency,
+        cpu_slots,
+        io_slots,
+        parallel_steps,
+        lease_ttl,
+    )
+
+    if ctx.leases is not None:
+        ctx.leases.reclaim_expired()
+        ctx.leases.start()
+    publisher = _metrics_publisher(ctx)
+    publisher.start()
+    tasks = _read_tasks(ctx.qdir)
+    _publish_queue_depth({"pending": len(tasks)}, 0)
+    previous_governor = install_governor(ctx.governor)
+    try:
+        _dispatch_tasks(tasks, ctx, concurrency)
+    finally:
+        install_governor(previous_governor)
+        if ctx.leases is not None:
+            ctx.leases.stop()
+        _publish_queue_depth({}, 0)
+        publisher.stop()
+
+    ctx.stages.stats.finish()
+    if tasks:
+        log_throughput_summary(ctx.stages.summary())
+
+
+def _metrics_publisher(ctx: _WorkerContext) -> worker_metrics.MetricsPublisher:
+    """Publie les métriques du worker pour l'endpoint /metrics du monitor."""
+    worker_id = ctx.leases.owner if ctx.leases is not None else default_owner_id()
+    return worker_metrics.MetricsPublisher(ctx.qdir, worker_id)
+
+
+def _publish_queue_depth(counts: dict, running: int) -> None:
+    for status in ("pending", "error", "blocked"):
+        worker_metrics.set_gauge("queue_depth", counts.get(status, 0), status=status)
+    worker_metrics.set_gauge("queue_depth", running, status="running")
+
+
+def _dispatch_tasks(tasks: list[Path], ctx: _WorkerContext, concurrency: int) -> None:
+    if concurrency == 1:
+        for task_path in tasks:
+            if _process_claimed(task_path, ctx) is False:
+                break
+    else:
+        log.info(
+            "Mode concurrent: %d tâches, %d slot(s) CPU, %d slot(s) I/O",
+            concurrency,
+            ctx.stages.cpu_slots,
+            ctx.stages.io_slots,
+        )
+        with ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="task"
+        ) as pool:
+            for fut in [pool.submit(_run_task, p, ctx) for p in tasks]:
+                fut.result()
+
+
+def _warm_up() -> None:
+    """Précharge les modules importés paresseusement pendant le traitement."""
+    for mod in ("src.auth", "src.uploader", "src.youtube_captions", "yaml", "pytz"):
+        try:
+            __import__(mod)
+        except Exception as e:
+            log.debug("Préchargement %s ignoré: %s", mod, e)
+
+
+def _refresh_config(ctx: _WorkerContext) -> None:
+    """Recharge la config si le fichier a été modifié depuis le dernier passage.
+
+    Le gouverneur (section `resources`) et l'estimateur (`enhance.bench_profile`)
+    sont reconstruits; les jobs en cours rendent leur bail à l'ancien gouverneur.
+    """
+    mtime = _config_mtime(ctx.config_path)
+    if mtime == ctx.config_mtime:
+        return
+    log.info("Config modifiée, rechargement: %s", ctx.config_path)
+    ctx.cfg = _load_worker_config(ctx.config_path)
+    ctx.enhance_cache = _enhance_cache_for(ctx.cfg)
+    ctx.governor = _resource_governor_for(ctx.config_path, ctx.stages.cpu_slots)
+    install_governor(ctx.governor)
+    ctx.estimator = _estimator_for(ctx.cfg, ctx.qdir)
+    ctx.config_mtime = mtime
+
+
+def _install_stop_signals(stop_event: threading.Event, source=None) -> None:
+    import signal
+
+    def _handler(signum, _frame):
+        log.info("Signal %s reçu, arrêt après les tâches en cours...", signum)
+        stop_event.set()
+        if source is not None:
+            source.wake()
+
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            signal.signal(sig, _handler)
+        except (ValueError, OSError):
+            # Hors du thread principal (ex: tests): l'appelant gère stop_event
+            pass
+
+
+def run_daemon(
+    *,
+    queue_dir: str | Path,
+    archive_dir: str | Path,
+    config_path: Optional[str | Path] = None,
+    log_level: str = "INFO",
+    concurrency: int = 1,
+    cpu_slots: Optional[int] = None,
+    io_slots: Optional[int] = None,
+    parallel_steps: int = 2,
+    poll_interval: float = 0.5,
+    limit_cooldown: float = 3600.0,
+    stop_event: Optional[threading.Event] = None,
+    event_backend: str = "auto",
+    rescan_interval: float = 1.0,
+    lease_ttl: Optional[float] = DEFAULT_LEASE_TTL,
+) -> None:
+    """Worker résident: garde modules, config et credentials en mémoire.
+
+    Les nouvelles tâches sont prises en charge dès leur apparition dans la file.
+    SIGTERM/SIGINT terminent les tâches en cours puis arrêtent proprement le démon.
+
+    Args:
+        poll_interval: Délai (s) entre deux scans si inotify est indisponible
+        limit_cooldown: Pause (s) après une erreur qui arrête le traitement
+            (ex: credentials YouTube). Une limite d'upload ne bloque que les
+            tâches concernées, reprises seules après la réinitialisation du quota
+        stop_event: Événement d'arrêt externe (sinon créé et relié aux signaux)
+        event_backend: Source d'événements de la file: auto, inotify ou polling
+        rescan_interval: Attente maximale (s) entre deux scans, même sans événement
+        lease_ttl: Durée (s) des baux de réservation; les baux expirés d'autres
+            workers sont repris toutes les lease_ttl/2 secondes
+    """
+    logging.basicConfig(
+        level=getattr(logging, log_level),
+        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+    )
+    concurrency = max(1, int(concurrency or 1))
+    _warm_up()
+    ctx = _build_context(
+        queue_dir,
+        archive_dir,
+        config_path,
+        concurrency,
+        cpu_slots,
+        io_slots,
+        parallel_steps,
+        lease_ttl,
+    )
+    ctx.cache_credentials = True
+    source = create_event_source(
+        [ctx.qdir], backend=event_backend, poll_interval=poll_interval
+    )
+    if stop_event is None:
+        stop_event = threading.Event()
+        _install_stop_signals(stop_event, source)
+    log.info(
+        "Worker démon démarré (file: %s, %d tâche(s) en parallèle, événements: %s)",
+        ctx.qdir,
+        concurrency,
+        type(source).__name__,
+    )
+
+    # Tâches déjà traitées et inchangées depuis (ex: en erreur): pas de nouvel essai
+    # tant que leur fichier n'est pas modifié
+    seen: dict[Path, float] = {}
+    inflight: set[Path] = set()
+    inflight_lock = threading.Lock()
+    queue = TaskQueue()
+
+    def _mtime(p: Path) -> Optional[float]:
+        try:
+            return p.stat().st_mtime
+        except OSError:
+            return None
+
+    def _skip(p: Path) -> bool:
+        return p in inflight or (p in seen and seen[p] == _mtime(p))
+
+    def _on_change(p: Path) -> None:
+        if p == ctx.qdir or p.is_dir():
+            # Débordement d'événements: reconstruire depuis le répertoire
+            queue.scan(ctx.qdir, skip=_skip)
+            return
+        if p in inflight:
+            return
+        m = _mtime(p)
+        if m is None:
+            seen.pop(p, None)
+            queue.discard(p)
+        elif seen.get(p) != m:
+            seen.pop(p, None)
+            queue.push(p)
+
+    def _run(p: Path) -> None:
+        claimed = True
+        try:
+            if not (stop_event.is_set() or ctx.stop_event.is_set()):
+                result = _process_claimed(p, ctx)
+                claimed = result is not None
+                if result is False:
+                    ctx.stop_event.set()
+        finally:
+            with inflight_lock:
+                inflight.discard(p)
+                m = _mtime(p)
+                # Tâche réservée ailleurs: pas d'entrée `seen`, elle sera revue
+                # au prochain événement ou à la reprise d'un bail expiré
+                if m is not None and claimed:
+                    seen[p] = m
+                    # Tâche bloquée (limite d'upload): reprise à son retry_after
+                    queue.defer(p)
+            # Un slot s'est libéré: relancer le dispatch sans attendre
+            source.wake()
+
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="task")
+    next_reclaim = 0.0
+    if ctx.leases is not None:
+        ctx.leases.start()
+    publisher = _metrics_publisher(ctx)
+    publisher.start()
+    queue.scan(ctx.qdir)
+    previous_governor = install_governor(ctx.governor)
+    try:
+        while not stop_event.is_set():
+            if ctx.leases is not None and time.monotonic() >= next_reclaim:
+                next_reclaim = time.monotonic() + ctx.leases.ttl / 2
+                if ctx.leases.reclaim_expired():
+                    with inflight_lock:
+                        queue.scan(ctx.qdir, skip=_skip)
+
+            if ctx.stop_event.is_set():
+                log.warning("Traitement interrompu, reprise dans %.0fs", limit_cooldown)
+                if stop_event.wait(limit_cooldown):
+                    break
+                ctx.stop_event.clear()
+                with inflight_lock:
+                    seen.clear()
+                    queue.scan(ctx.qdir, skip=_skip)
+
+            _refresh_config(ctx)
+            with inflight_lock:
+                released = queue.release_due()
+            if released:
+                log.info("%d tâche(s) bloquée(s) remise(s) dans la file", released)
+            # Dispatch au fil des slots libres: la tâche la plus urgente d'abord
+            batch = []
+            with inflight_lock:
+                while len(inflight) < concurrency:
+                    p = queue.pop()
+                    if p is None:
+                        break
+                    inflight.add(p)
+                    batch.append(p)
+            for p in batch:
+                pool.submit(_run, p)
+            with inflight_lock:
+                _publish_queue_depth(queue.counts_by_status(), len(inflight))
+
+            # Réveil immédiat sur renommage/écriture d'une tâche (rafales regroupées)
+            changed = source.wait(timeout=rescan_interval)
+            with inflight_lock:
+                for p in changed:
+                    _on_change(p)
+    finally:
+        log.info("Arrêt du worker démon: attente des tâches en cours...")
+        source.close()
+        pool.shutdown(wait=True, cancel_futures=True)
+        install_governor(previous_governor)
+        if ctx.leases is not None:
+            ctx.leases.stop()
+        _publish_queue_depth({}, 0)
+        publisher.stop()
+        ctx.stages.stats.finish()
+        if ctx.stages.stats.tasks_done or ctx.stages.stats.tasks_failed:
+            log_throughput_summary(ctx.stages.summary())
+        log.info("Worker démon arrêté")
@@ -0,0 +1,383 @@
+"""
+Métriques du worker exposées au format Prometheus par le monitor web.
+
+Le worker accumule compteurs, jauges et histogrammes en mémoire (REGISTRY) et
+publie périodiquement un instantané JSON dans `queue/metrics/<worker>.json`.
+Le monitor ne lit que ces petits fichiers d'état (un par worker) et les
+agrège: un scrape de /metrics ne parcourt jamais les répertoires de tâches.
+À l'arrêt, un worker replie ses compteurs et histogrammes dans
+`queue/metrics/_retired.json` et supprime son fichier: le répertoire ne
+grossit pas d'un fichier par exécution.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import logging
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .queue_events import write_json_atomic
+
+try:
+    import fcntl
+except ImportError:  # Windows: verrou entre processus indisponible
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+STATE_DIR = "metrics"
+PREFIX = "ytauto_"
+# Jauges d'un worker silencieux depuis plus longtemps: ignorées (worker arrêté)
+STALE_AFTER = 300.0
+# Totaux cumulés des workers arrêtés
+RETIRED_FILE = "_retired.json"
+RETIRED_LOCK = "_retired.lock"
+# État d'un worker interrompu sans arrêt propre: replié au bout d'une journée
+ABANDONED_AFTER = 86400.0
+
+_DURATION_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+
+# nom -> (type, aide, labels, buckets)
+METRICS: Dict[str, Tuple[str, str, Tuple[str, ...], Tuple[float, ...]]] = {
+    "queue_depth": ("gauge", "Tâches dans la file par statut", ("status",), ()),
+    "tasks_processed_total": (
+        "counter",
+        "Tâches traitées par résultat",
+        ("result",),
+        (),
+    ),
+    "stage_duration_seconds": (
+        "histogram",
+        "Durée des étapes du worker",
+        ("stage",),
+        _DURATION_BUCKETS,
+    ),
+    "upload_bytes_total": (
+        "counter",
+        "Octets de vidéo uploadés",
+        ("account",),
+        (),
+    ),
+    "upload_limit_hits_total": (
+        "counter",
+        "Refus uploadLimitExceeded par compte",
+        ("account",),
+        (),
+    ),
+    "upload_retries_total": (
+        "counter",
+        "Reprises de l'upload résumable après erreur",
+        (),
+        (),
+    ),
+    "encode_speed_ratio": (
+        "histogram",
+        "Vitesse d'encodage ffmpeg (x temps réel)",
+        (),
+        (0.25, 0.5, 1, 2, 4, 8, 16),
+    ),
+    "enhance_path_total": (
+        "counter",
+        "Décisions du chemin rapide d'encodage (skip, remux, encode)",
+        ("path",),
+        (),
+    ),
+    "llm_latency_seconds": (
+        "histogram",
+        "Latence des appels LLM (génération des métadonnées)",
+        ("call",),
+        (0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300),
+    ),
+    "quota_api_calls_used": (
+        "gauge",
+        "Unités de quota API YouTube consommées aujourd'hui par compte",
+        ("account",),
+        (),
+    ),
+}
+
+_LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> _LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+class MetricsRegistry:
+    """Valeurs en mémoire du processus (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[str, Dict[_LabelKey, object]] = {}
+
+    def _series(self, name: str) -> Dict[_LabelKey, object]:
+        if name not in METRICS:
+            raise KeyError(f"Métrique inconnue: {name}")
+        return self._values.setdefault(name, {})
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        with self._lock:
+            series = self._series(name)
+            key = _label_key(labels)
+            series[key] = float(series.get(key, 0.0)) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._series(name)[_label_key(labels)] = float(value)
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        buckets = METRICS[name][3]
+        with self._lock:
+            series = self._series(name)
+            key = _label_key(labels)
+            h = series.get(key)
+            if h is None:
+                h = series[key] = {
+                    "buckets": [0] * len(buckets),
+                    "sum": 0.0,
+                    "count": 0,
+                }
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    h["buckets"][i] += 1
+            h["sum"] += float(value)
+            h["count"] += 1
+
+    def snapshot(self) -> dict:
+        """État sérialisable en JSON."""
+        with self._lock:
+            return {
+                name: [
+                    {
+                        "labels": dict(key),
+                        "value": copy.deepcopy(val),
+                    }
+                    for key, val in series.items()
+                ]
+                for name, series in self._values.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+
+def inc(name: str, value: float = 1.0, **labels) -> None:
+    REGISTRY.inc(name, value, **labels)
+
+
+def set_gauge(name: str, value: float, **labels) -> None:
+    REGISTRY.set(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels) -> None:
+    REGISTRY.observe(name, value, **labels)
+
+
+class MetricsPublisher:
+    """Écrit l'instantané du registre dans le fichier d'état du worker."""
+
+    def __init__(
+        self,
+        queue_dir: str | Path,
+        worker_id: str,
+        *,
+        registry: MetricsRegistry = REGISTRY,
+        interval: float = 5.0,
+    ):
+        safe_id = re.sub(r"[^A-Za-z0-9_.-]", "-", worker_id)
+        self.path = Path(queue_dir) / STATE_DIR / f"{safe_id}.json"
+        self.registry = registry
+        self.interval = max(0.5, float(interval))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def flush(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            write_json_atomic(
+                self.path,
+                {"updated_at": time.time(), "metrics": self.registry.snapshot()},
+            )
+        except OSError as e:
+            log.debug("Publication des métriques ignorée: %s", e)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def _loop():
+            while not self._stop.wait(self.interval):
+                self.flush()
+
+        self._thread = threading.Thread(target=_loop, name="metrics-publisher")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.retire()
+
+    def retire(self) -> None:
+        """Replie compteurs et histogrammes dans `_retired.json`, puis supprime
+        le fichier d'état du worker (et ceux des workers interrompus).
+
+        Les jauges, valeurs instantanées, disparaissent avec le worker. Le
+        registre est remis à zéro: une exécution suivante du même processus ne
+        republie pas des totaux déjà repliés.
+        """
+        state_dir = self.path.parent
+        retired = state_dir / RETIRED_FILE
+        now = time.time()
+        try:
+            state_dir.mkdir(parents=True, exist_ok=True)
+            with open(state_dir / RETIRED_LOCK, "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                states = [{"metrics": self.registry.snapshot()}]
+                states += _read_state(retired)
+                folded = [self.path]
+                for path in state_dir.glob("*.json"):
+                    if path in (self.path, retired):
+                        continue
+                    state = _read_state(path)
+                    updated_at = float((state or [{}])[0].get("updated_at") or 0)
+                    if state and now - updated_at > ABANDONED_AFTER:
+                        states += state
+                        folded.append(path)
+                # Ancienneté négative: toutes les jauges sont écartées
+                merged = _merge(states, now, -1.0)
+                write_json_atomic(
+                    retired, {"updated_at": now, "metrics": _to_snapshot(merged)}
+                )
+                for path in folded:
+                    path.unlink(missing_ok=True)
+        except OSError as e:
+            log.warning("Repli des métriques du worker impossible: %s", e)
+            self.flush()
+            return
+        self.registry.reset()
+
+
+def _read_state(path: Path) -> List[dict]:
+    try:
+        return [json.loads(path.read_text(encoding="utf-8"))]
+    except (OSError, ValueError) as e:
+        log.debug("État de métriques illisible %s: %s", path, e)
+        return []
+
+
+def _to_snapshot(merged: Dict[str, Dict[_LabelKey, object]]) -> dict:
+    return {
+        name: [{"labels": dict(key), "value": val} for key, val in series.items()]
+        for name, series in merged.items()
+    }
+
+
+def read_states(queue_dir: str | Path) -> List[dict]:
+    """Fichiers d'état publiés par les workers de la file."""
+    states = []
+    for path in sorted((Path(queue_dir) / STATE_DIR).glob("*.json")):
+        states += _read_state(path)
+    return states
+
+
+def _merge(
+    states: Iterable[dict], now: float, stale_after: float
+) -> Dict[str, Dict[_LabelKey, object]]:
+    merged: Dict[str, Dict[_LabelKey, object]] = {}
+    for state in states:
+        stale = now - float(state.get("updated_at") or 0) > stale_after
+        for name, series in (state.get("metrics") or {}).items():
+            if name not in METRICS:
+                continue
+            kind = METRICS[name][0]
+            if kind == "gauge" and stale:
+                continue
+            out = merged.setdefault(name, {})
+            for entry in series:
+                key = _label_key(entry.get("labels") or {})
+                val = entry.get("value")
+                if kind == "histogram":
+                    cur = out.setdefault(
+                        key,
+                        {
+                            "buckets": [0] * len(METRICS[name][3]),
+                            "sum": 0.0,
+                            "count": 0,
+                        },
+                    )
+                    for i, n in enumerate((val or {}).get("buckets") or []):
+                        if i < len(cur["buckets"]):
+                            cur["buckets"][i] += n
+                    cur["sum"] += float((val or {}).get("sum") or 0.0)
+                    cur["count"] += int((val or {}).get("count") or 0)
+                elif key in out and kind == "gauge":
+                    out[key] = _combine_gauge(name, key, out[key], float(val or 0.0))
+                else:
+                    out[key] = float(out.get(key, 0.0)) + float(val or 0.0)
+    return merged
+
+
+def _combine_gauge(name: str, key: _LabelKey, cur: float, val: float) -> float:
+    # File partagée: chaque worker voit les mêmes tâches en attente et le même
+    # fichier de quotas; seules les tâches en cours s'additionnent
+    if name == "queue_depth" and dict(key).get("status") == "running":
+        return cur + val
+    return max(cur, val)
+
+
+def _fmt_labels(key: _LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(
+            k, v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        )
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+def _fmt_value(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+def render_prometheus(
+    states: Iterable[dict],
+    *,
+    now: Optional[float] = None,
+    stale_after: float = STALE_AFTER,
+) -> str:
+    """Agrège les états des workers au format texte d'exposition Prometheus."""
+    merged = _merge(states, time.time() if now is None else now, stale_after)
+    lines: List[str] = []
+    for name, (kind, help_text, _labels, buckets) in METRICS.items():
+        full = PREFIX + name
+        lines.append(f"# HELP {full} {help_text}")
+        lines.append(f"# TYPE {full} {kind}")
+        for key, val in sorted((merged.get(name) or {}).items()):
+            if kind != "histogram":
+                lines.append(f"{full}{_fmt_labels(key)} {_fmt_value(val)}")
+                continue
+            for bound, n in zip(buckets, val["buckets"]):
+                le = (("le", _fmt_value(bound)),)
+                lines.append(f"{full}_bucket{_fmt_labels(key, le)} {n}")
+            inf = (("le", "+Inf"),)
+            lines.append(f"{full}_bucket{_fmt_labels(key, inf)} {val['count']}")
+            lines.append(f"{full}_sum{_fmt_labels(key)} {_fmt_value(val['sum'])}")
+            lines.append(f"{full}_count{_fmt_labels(key)} {val['count']}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,158 @@
+"""
+Exécution concurrente des tâches du worker.
+
+Fournit des limites séparées pour les étapes CPU (encodage ffmpeg, Whisper),
+I/O (upload, sous-titres, appels IA) et la passe d'analyse, ainsi qu'un résumé
+de débit en fin de run.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import TYPE_CHECKING, Dict, Iterator, Optional
+
+if TYPE_CHECKING:
+    from .stage_metrics import TaskTimings
+
+log = logging.getLogger(__name__)
+
+# Classification des étapes du worker
+CPU_STAGES = {"enhance", "subtitles", "thumbnail"}
+IO_STAGES = {"ai_meta", "vision", "upload", "captions", "playlist", "notify"}
+# Décodage léger des images clés, lancé pendant l'encodage: ni un créneau CPU
+# (il attendrait la fin de l'encodage) ni un créneau I/O (il retarderait les
+# uploads); une passe par créneau CPU au plus
+ANALYSIS_STAGES = {"analysis"}
+
+
+def stage_kind(name: str) -> str:
+    """Retourne 'cpu', 'analysis' ou 'io' pour un nom d'étape (io par défaut)."""
+    if name in CPU_STAGES:
+        return "cpu"
+    return "analysis" if name in ANALYSIS_STAGES else "io"
+
+
+class ThroughputStats:
+    """Accumule les temps d'occupation par étape et le nombre de tâches traitées."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.busy: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.tasks_done = 0
+        self.tasks_failed = 0
+
+    def record_stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.busy[name] = self.busy.get(name, 0.0) + max(0.0, seconds)
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def record_task(self, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self.tasks_done += 1
+            else:
+                self.tasks_failed += 1
+
+    def finish(self) -> None:
+        self.finished_at = time.monotonic()
+
+    @property
+    def wall_seconds(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return max(1e-6, end - self.started_at)
+
+    def summary(self, cpu_slots: int = 1, io_slots: int = 1) -> dict:
+        """Résumé: tâches/heure et utilisation par étape et par classe de ressources."""
+        wall = self.wall_seconds
+        with self._lock:
+            busy = dict(self.busy)
+            calls = dict(self.calls)
+            done, failed = self.tasks_done, self.tasks_failed
+        stages = {}
+        for name in sorted(busy):
+            stages[name] = {
+                "calls": calls.get(name, 0),
+                "busy_seconds": round(busy[name], 2),
+                "utilisation": round(busy[name] / wall, 3),
+            }
+        cpu_busy = sum(v for k, v in busy.items() if stage_kind(k) == "cpu")
+        io_busy = sum(v for k, v in busy.items() if stage_kind(k) == "io")
+        return {
+            "wall_seconds": round(wall, 2),
+            "tasks_done": done,
+            "tasks_failed": failed,
+            "tasks_per_hour": round((done + failed) * 3600.0 / wall, 2),
+            "cpu_utilisation": round(cpu_busy / (wall * max(1, cpu_slots)), 3),
+            "io_utilisation": round(io_busy / (wall * max(1, io_slots)), 3),
+            "stages": stages,
+        }
+
+
+class StageLimits:
+    """Sémaphores bornant les étapes CPU, I/O et d'analyse exécutées simultanément."""
+
+    def __init__(
+        self,
+        cpu_slots: int = 1,
+        io_slots: int = 1,
+        stats: Optional[ThroughputStats] = None,
+    ):
+        self.cpu_slots = max(1, int(cpu_slots))
+        self.io_slots = max(1, int(io_slots))
+        self._cpu = threading.BoundedSemaphore(self.cpu_slots)
+        self._io = threading.BoundedSemaphore(self.io_slots)
+        self._analysis = threading.BoundedSemaphore(self.cpu_slots)
+        self.stats = stats or ThroughputStats()
+
+    @contextmanager
+    def stage(
+        self, name: str, timings: Optional["TaskTimings"] = None
+    ) -> Iterator[None]:
+        """Réserve un slot de la classe de l'étape puis mesure le temps passé.
+
+        Avec `timings`, le span de l'étape (hors attente du slot) est aussi
+        enregistré dans la tâche.
+        """
+        sem = {"cpu": self._cpu, "analysis": self._analysis}.get(
+            stage_kind(name), self._io
+        )
+        with sem:
+            t0 = time.monotonic()
+            try:
+                with timings.span(name) if timings is not None else nullcontext():
+                    yield
+            finally:
+                self.stats.record_stage(name, time.monotonic() - t0)
+
+    def summary(self) -> dict:
+        return self.stats.summary(self.cpu_slots, self.io_slots)
+
+
+def log_throughput_summary(summary: dict) -> None:
+    """Affiche le résumé de débit dans les logs du worker."""
+    log.info(
+        "Résumé worker: %d tâche(s) ok, %d en erreur en %.1fs (%.2f tâches/h)",
+        summary.get("tasks_done", 0),
+        summary.get("tasks_failed", 0),
+        summary.get("wall_seconds", 0.0),
+        summary.get("tasks_per_hour", 0.0),
+    )
+    log.info(
+        "Utilisation: CPU %.0f%%, I/O %.0f%%",
+        summary.get("cpu_utilisation", 0.0) * 100,
+        summary.get("io_utilisation", 0.0) * 100,
+    )
+    for name, st in (summary.get("stages") or {}).items():
+        log.info(
+            "  - %s: %d appel(s), %.1fs occupés (%.0f%% du temps)",
+            name,
+            st.get("calls", 0),
+            st.get("busy_seconds", 0.0),
+            st.get("utilisation", 0.0) * 100,
+        )
@@ -5,7 +5,8 @@ Lanceur unifié des services:
 - Bot Telegram d'ingestion
 - Scheduler de tâches planifiées
 - Web Monitor (FastAPI)
-- Watcher de la queue: lance automatiquement le worker quand une tâche est créée
+- Worker résident (main.py worker --daemon) qui traite les tâches dès leur création
+  (ou, avec --worker-mode oneshot, un watcher qui lance un worker par lot de tâches)
 
 Usage:
   python start_services.py \
@@ -17,6 +18,7 @@ Usage:
     --monitor-host 127.0.0.1 \
     --monitor-port 8000 \
     --log-level INFO \
+    --worker-mode daemon \
     --auto-restart (activé par défaut) ou --no-auto-restart pour désactiver
 
 Arrêt: Ctrl+C (tous les sous-processus seront arrêtés proprement si possible)
@@ -166,6 +168,32 @@ def run_worker_once(
     return subprocess.call(cmd, cwd=str(PROJECT_ROOT))
 
 
+def worker_daemon_cmd(
+    queue_dir: str,
+    archive_dir: str,
+    config_path: Optional[str],
+    log_level: str,
+    concurrency: int = 1,
+) -> List[str]:
+    cmd = [
+        PYTHON,
+        "main.py",
+        "worker",
+        "--daemon",
+        "--queue-dir",
+        queue_dir,
+        "--archive-dir",
+        archive_dir,
+        "--log-level",
+        log_level,
+        "--concurrency",
+        str(max(1, int(concurrency))),
+    ]
+    if config_path:
+        cmd.extend(["--config", config_path])
+    return cmd
+
+
 def queue_watcher(
     queue_dir: str,
     archive_dir: str,
@@ -178,21 +206,26 @@ def queue_watcher(
     """
     q = Path(queue_dir)
     q.mkdir(parents=True, exist_ok=True)
-    worker_running = False
+    from src.queue_events import create_event_source
 
-    while not stop_event.is_set():
-        try:
-            # Y a-t-il des tâches pending ? (normales ou issues du scheduler)
-            has_task = any(q.glob("task_*.json")) or any(q.glob("scheduled_*.json"))
-            if has_task and not worker_running:
-                worker_running = True
-                rc = run_worker_once(queue_dir, archive_dir, config_path, log_level)
-                print(f"✅ Worker terminé (code {rc}).")
-                worker_running = False
-            time.sleep(2.0)
-        except Exception as e:
-            print(f"❗ Watcher erreur: {e}")
-            time.sleep(3.0)
+    # inotify si disponible (réveil immédiat), sinon polling toutes les 2 s
+    events = create_event_source([q], poll_interval=2.0)
+
+    try:
+        while not stop_event.is_set():
+            try:
+                # Y a-t-il des tâches pending ? (normales ou issues du scheduler)
+                has_task = any(q.glob("task_*.json")) or any(q.glob("scheduled_*.json"))
+                if has_task:
+                    rc = run_worker_once(queue_dir, archive_dir, config_path, log_level)
+                    print(f"✅ Worker terminé (code {rc}).")
+                # Attendre un nouveau fichier de tâche (rafales regroupées)
+                events.wait(timeout=60.0 if not has_task else 2.0)
+            except Exception as e:
+                print(f"❗ Watcher erreur: {e}")
+                time.sleep(3.0)
+    finally:
+        events.close()
 
 
 def main():
@@ -249,6 +282,21 @@ def main():
         default=3.0,
         help="Délai minimal (s) entre deux relances d'un même service",
     )
+    ap.add_argument(
+        "--worker-mode",
+        default="daemon",
+        choices=["daemon", "oneshot"],
+        help=(
+            "daemon: worker résident (modules/config/credentials gardés en mémoire); "
+            "oneshot: un processus worker lancé par lot de tâches détectées"
+        ),
+    )
+    ap.add_argument(
+        "--worker-concurrency",
+        type=int,
+        default=1,
+        help="Mode daemon: nombre de tâches traitées en parallèle",
+    )
     args = ap.parse_args()
     if os.environ.get("LOG_LEVEL"):
         raw = (os.environ.get("LOG_LEVEL") or "").strip()
@@ -356,21 +404,32 @@ def main():
                 f"⏭️  Telegram bot ignoré ({reason}). Modifiez {args.sources} pour l'activer."
             )
 
-        # 3) Lancer un watcher qui déclenche le worker quand des tâches apparaissent
+        # 3) Worker: démon résident, ou watcher qui lance un worker one-shot par lot
         stop_event = threading.Event()
-        t = threading.Thread(
-            target=queue_watcher,
-            args=(
+        wk_cmd = None
+        if args.worker_mode == "daemon":
+            wk_cmd = worker_daemon_cmd(
                 args.queue_dir,
                 args.archive_dir,
                 args.config,
                 args.log_level,
-                stop_event,
-            ),
-            name="queue-watcher",
-            daemon=True,
-        )
-        t.start()
+                args.worker_concurrency,
+            )
+            procs.append(("worker", start_process(wk_cmd, "worker")))
+        else:
+            t = threading.Thread(
+                target=queue_watcher,
+                args=(
+                    args.queue_dir,
+                    args.archive_dir,
+                    args.config,
+                    args.log_level,
+                    stop_event,
+                ),
+                name="queue-watcher",
+                daemon=True,
+            )
+            t.start()
 
         print("\n🎛️  Tous les services sont lancés. Ctrl+C pour arrêter.\n")
 
@@ -383,6 +442,8 @@ def main():
         # Ajouter la commande du bot uniquement si démarré
         if "start_telegram" in locals() and start_telegram:
             cmd_by_name["telegram-bot"] = bot_cmd
+        if wk_cmd is not None:
+            cmd_by_name["worker"] = wk_cmd
         provider = str(
             ((video_cfg or {}).get("seo") or {}).get("provider") or ""
         ).lower()
@@ -440,6 +501,10 @@ def main():
             try:
                 if p.poll() is None:
                     print(f"🛑 Arrêt {name}…")
+                    if name == "worker":
+                        # Laisser le démon terminer proprement les tâches en cours
+                        p.send_signal(signal.SIGTERM)
+                        continue
                     if os.name == "posix":
                         p.send_signal(signal.SIGINT)
                         time.sleep(0.5)
@@ -12,11 +12,8 @@ class _FakeProc:
         ]
         self.stderr = iter(self._stderr_lines)
 
-        class _Stdout:
-            def read(self_inner):
-                return ""
-
-        self.stdout = _Stdout()
+        # Sortie -progress pipe:1
+        self.stdout = iter(["out_time_us=10000000\n", "progress=end\n"])
 
     def wait(self):
         return 0
@@ -8,22 +8,32 @@ import src.video_enhance as ve
 
 
 class _FakeProc:
-    def __init__(self, *args, **kwargs):
-        # Simulate ffmpeg's stderr stream with Duration and time lines
-        # Patterns expected by video_enhance._DURATION_RE and _TIME_RE
-        self._stderr_lines = [
-            "ffmpeg version N-12345\n",
-            "Duration: 00:00:10,00\n",
-            "frame=  100 fps=30 time=00:00:05,00 bitrate=2000kbits/s\n",
-            "frame=  200 fps=30 time=00:00:10,00 bitrate=2000kbits/s\n",
-        ]
-        self.stderr = iter(self._stderr_lines)
-
-        class _Stdout:
-            def read(self_inner):
-                return ""
-
-        self.stdout = _Stdout()
+    calls = []
+
+    def __init__(self, cmd, *args, **kwargs):
+        _FakeProc.calls.append(cmd)
+        # stderr: en-tête avec la durée (video_enhance._DURATION_RE)
+        self.stderr = iter(
+            [
+                "ffmpeg version N-12345\n",
+                "Duration: 00:00:10,00\n",
+            ]
+        )
+        # stdout: blocs clé=valeur de -progress pipe:1
+        self.stdout = iter(
+            [
+                "frame=150\n",
+                "fps=30.00\n",
+                "out_time_us=5000000\n",
+                "speed=1.5x\n",
+                "progress=continue\n",
+                "frame=300\n",
+                "fps=30.00\n",
+                "out_time_us=10000000\n",
+                "speed=1.5x\n",
+                "progress=end\n",
+            ]
+        )
 
     def wait(self):
         return 0
@@ -166,3 +176,20 @@ def test_worker_enhance_with_mock_ffmpeg(monkeypatch, tmp_path: Path):
     assert data.get("youtube_id") == "vid_enh_1"
     # Verify enhanced path was used
     assert captured.get("video_path", "").endswith(".enhanced.mp4")
+
+
+def test_enhance_video_reports_structured_progress(monkeypatch, tmp_path):
+    _install_ffmpeg_monkeypatch(monkeypatch)
+    _FakeProc.calls.clear()
+    inp = tmp_path / "in.mp4"
+    inp.write_bytes(b"\x00\x00fake")
+    events = []
+
+    ve.enhance_video(
+        input_path=inp, output_path=tmp_path / "out.mp4", progress=events.append
+    )
+
+    assert _FakeProc.calls[0][1:4] == ["-progress", "pipe:1", "-nostats"]
+    assert [e["frame"] for e in events] == [150, 300]
+    assert events[-1]["done"] and events[-1]["percent"] == 100.0
+    assert events[-1]["eta_seconds"] == 0.0 and events[-1]["fps"] == 30.0
@@ -109,7 +109,7 @@ def test_multi_accounts_e2e(monkeypatch, tmp_path: Path):
     monkeypatch.setattr(worker, "create_multi_account_manager", _fake_create_manager)
     # Ensure worker doesn't try OAuth flow elsewhere
     monkeypatch.setattr(worker, "get_credentials", lambda *a, **k: object())
-    # Raw YAML check will be forced via sys.modules['yaml'] injection below
+    # Raw config check will be forced via worker.load_raw_config below
 
     # Upload stub
     monkeypatch.setattr(worker, "upload_video", lambda *a, **k: {"id": "vid_multi_1"})
@@ -118,10 +118,10 @@ def test_multi_accounts_e2e(monkeypatch, tmp_path: Path):
     monkeypatch.setattr(worker, "get_best_thumbnail", lambda *a, **k: None)
     monkeypatch.setattr(worker, "smart_upload_captions", lambda *a, **k: {})
 
-    # Ensure inline `import yaml` inside worker sees multi_accounts enabled
-    fake_yaml = types.ModuleType("yaml")
-    fake_yaml.safe_load = lambda _text: {"multi_accounts": {"enabled": True}}
-    monkeypatch.setitem(sys.modules, "yaml", fake_yaml)
+    # Ensure the raw config view read by the worker sees multi_accounts enabled
+    monkeypatch.setattr(
+        worker, "load_raw_config", lambda _path: {"multi_accounts": {"enabled": True}}
+    )
 
     # Run worker
     worker.process_queue(
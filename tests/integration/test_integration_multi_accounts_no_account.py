@@ -43,10 +43,10 @@ def test_worker_multi_accounts_no_account_archives_error(monkeypatch, tmp_path:
 
     from src import worker
 
-    # Force multi-accounts enabled via fake yaml module
-    fake_yaml = types.ModuleType("yaml")
-    fake_yaml.safe_load = lambda _text: {"multi_accounts": {"enabled": True}}
-    monkeypatch.setitem(sys.modules, "yaml", fake_yaml)
+    # Force multi-accounts enabled via the raw config view used by the worker
+    monkeypatch.setattr(
+        worker, "load_raw_config", lambda _path: {"multi_accounts": {"enabled": True}}
+    )
 
     # Fake manager that returns no account
     class _FakeManager:
@@ -0,0 +1,147 @@
+import json
+import sys
+import types
+from pathlib import Path
+
+
+def _stub_googleapiclient():
+    ga = types.ModuleType("googleapiclient")
+    ga_discovery = types.ModuleType("googleapiclient.discovery")
+    ga_errors = types.ModuleType("googleapiclient.errors")
+    ga_http = types.ModuleType("googleapiclient.http")
+
+    class _StubResumableUploadError(Exception):
+        pass
+
+    ga_errors.ResumableUploadError = _StubResumableUploadError
+    sys.modules["googleapiclient"] = ga
+    sys.modules["googleapiclient.discovery"] = ga_discovery
+    sys.modules["googleapiclient.errors"] = ga_errors
+    sys.modules["googleapiclient.http"] = ga_http
+
+
+def test_shorts_rendition_queues_linked_task(monkeypatch, tmp_path: Path):
+    _stub_googleapiclient()
+    from src import worker
+    from src.media_probe import MediaInfo
+
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"\x00\x00fakevideo")
+    cfg = {
+        "video_path": str(video),
+        "title": "T",
+        "privacy_status": "private",
+        "enhance": {
+            "enabled": True,
+            "renditions": [
+                {"name": "shorts", "crop": "9:16", "scale": "1080x1920", "duration": 60}
+            ],
+        },
+        "subtitles": {"enabled": False},
+        "seo": {"provider": "none"},
+        "multi_accounts": {"enabled": False},
+    }
+    cfg_path = tmp_path / "video.yaml"
+    cfg_path.write_text(json.dumps(cfg), encoding="utf-8")
+    queue_dir = tmp_path / "queue"
+    archive_dir = tmp_path / "queue_archive"
+    queue_dir.mkdir()
+    archive_dir.mkdir()
+    task = {
+        "video_path": str(video),
+        "status": "pending",
+        "chat_id": 42,
+        "meta": {"title": "Titre", "description": "Desc", "tags": ["a"]},
+    }
+    (queue_dir / "task_001.json").write_text(json.dumps(task), encoding="utf-8")
+
+    encodes = []
+
+    def fake_enhance(*, input_path, output_path, renditions=None, report, **kwargs):
+        encodes.append(renditions)
+        # Sorties liées depuis le cache d'encodage: pas un encodage réel
+        report["path"] = "cache"
+        Path(output_path).write_bytes(b"enhanced")
+        for r in renditions or []:
+            Path(r["output_path"]).write_bytes(b"short")
+        return Path(output_path)
+
+    uploads = []
+    monkeypatch.setattr(worker, "enhance_video", fake_enhance)
+    monkeypatch.setattr(worker, "_probe_audio_language", lambda p: None)
+    monkeypatch.setattr(
+        worker, "probe_media", lambda p: MediaInfo(duration=10.0, height=1080)
+    )
+    monkeypatch.setattr(worker, "get_credentials", lambda *a, **k: object())
+    monkeypatch.setattr(worker, "get_best_thumbnail", lambda *a, **k: None)
+    monkeypatch.setattr(worker, "_generate_placeholder_thumbnail", lambda *a, **k: True)
+    monkeypatch.setattr(
+        worker,
+        "upload_video",
+        lambda creds, **kw: uploads.append(kw) or {"id": f"v{len(uploads)}"},
+    )
+
+    worker.process_queue(
+        queue_dir=str(queue_dir),
+        archive_dir=str(archive_dir),
+        config_path=str(cfg_path),
+    )
+
+    # Un seul encodage parent, avec le rendu shorts
+    assert encodes[0] == [
+        {
+            "name": "shorts",
+            "crop": "9:16",
+            "scale": "1080x1920",
+            "duration": 60,
+            "output_path": str(tmp_path / "video.shorts.mp4"),
+        }
+    ]
+    linked_path = next(
+        d / "task_001.shorts.json"
+        for d in (queue_dir, archive_dir)
+        if (d / "task_001.shorts.json").exists()
+    )
+    linked = json.loads(linked_path.read_text(encoding="utf-8"))
+    assert linked["video_path"] == str(tmp_path / "video.shorts.mp4")
+    assert linked["skip_enhance"] is True
+    assert linked["chat_id"] == 42
+    assert linked["linked_to"] == {
+        "task": "task_001.json",
+        "youtube_id": "v1",
+        "rendition": "shorts",
+    }
+    assert "shorts" in linked["meta"]["tags"]
+    assert "https://youtu.be/v1" in linked["meta"]["description"]
+    assert uploads[0]["video_path"].endswith(".enhanced.mp4")
+    # Hit de cache: durée d'enhance exclue de l'historique de l'estimateur
+    history = (queue_dir / "stage_metrics.jsonl").read_text(encoding="utf-8")
+    assert '"encode": false' in history and '"encode": true' not in history
+
+
+def test_linked_task_claimed_by_worker_is_not_recreated(tmp_path: Path):
+    _stub_googleapiclient()
+    from src import worker
+
+    queue_dir = tmp_path / "queue"
+    archive_dir = tmp_path / "queue_archive"
+    (queue_dir / "inflight").mkdir(parents=True)
+    archive_dir.mkdir()
+    short = tmp_path / "video.shorts.mp4"
+    short.write_bytes(b"short")
+    # Tâche liée déjà réservée par un autre worker (file -> inflight/)
+    claimed = queue_dir / "inflight" / "task_001.shorts.json"
+    claimed.write_text(json.dumps({"status": "processing"}), encoding="utf-8")
+    run = types.SimpleNamespace(
+        cfg={"enhance": {"renditions": [{"name": "shorts"}]}},
+        task={},
+        task_path=queue_dir / "task_001.json",
+        ctx=types.SimpleNamespace(qdir=queue_dir, adir=archive_dir),
+    )
+
+    out = worker._step_linked_tasks(
+        run, {"renditions": {"shorts": str(short)}, "youtube_id": "v1"}
+    )
+    assert out == {"linked_tasks": ["task_001.shorts.json"]}
+    assert not (queue_dir / "task_001.shorts.json").exists()
+    assert json.loads(claimed.read_text(encoding="utf-8")) == {"status": "processing"}
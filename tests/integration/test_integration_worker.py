@@ -82,3 +82,19 @@ def test_worker_integration_end_to_end(monkeypatch, tmp_path: Path):
     data = json.loads(archived.read_text(encoding="utf-8"))
     assert data.get("status") == "done"
     assert data.get("youtube_id") == "vid_worker_123"
+
+    # Durées par étape: bloc `timings` de la tâche + historique du monitor
+    timings = data.get("timings") or {}
+    assert "upload" in timings.get("stages", {})
+    assert all(s["end"] >= s["start"] for s in timings["spans"])
+    from src.stage_metrics import METRICS_FILE, StageMetrics
+
+    assert "upload" in StageMetrics(queue_dir / METRICS_FILE).percentiles()
+
+    # Métriques publiées pour /metrics: repliées à l'arrêt du worker
+    from src.worker_metrics import RETIRED_FILE, read_states, render_prometheus
+
+    assert [p.name for p in (queue_dir / "metrics").glob("*.json")] == [RETIRED_FILE]
+    text = render_prometheus(read_states(queue_dir))
+    assert 'ytauto_stage_duration_seconds_count{stage="upload"}' in text
+    assert 'ytauto_queue_depth{status="pending"}' not in text
@@ -0,0 +1,93 @@
+import json
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+
+def _stub_googleapiclient():
+    ga = types.ModuleType("googleapiclient")
+    ga_discovery = types.ModuleType("googleapiclient.discovery")
+    ga_errors = types.ModuleType("googleapiclient.errors")
+    ga_http = types.ModuleType("googleapiclient.http")
+
+    class _StubError(Exception):
+        pass
+
+    ga_errors.ResumableUploadError = _StubError
+    ga_errors.HttpError = _StubError
+    ga_discovery.build = lambda *a, **k: object()
+    ga_http.MediaFileUpload = lambda *a, **k: None
+    sys.modules["googleapiclient"] = ga
+    sys.modules["googleapiclient.discovery"] = ga_discovery
+    sys.modules["googleapiclient.errors"] = ga_errors
+    sys.modules["googleapiclient.http"] = ga_http
+
+
+def test_worker_concurrent_tasks_overlap_uploads(monkeypatch, tmp_path: Path):
+    _stub_googleapiclient()
+    from src import worker
+
+    cfg = {
+        "privacy_status": "private",
+        "enhance": {"enabled": False},
+        "subtitles": {"enabled": False},
+        "seo": {"provider": "none"},
+        "multi_accounts": {"enabled": False},
+    }
+    cfg_path = tmp_path / "video.yaml"
+    cfg_path.write_text(json.dumps(cfg), encoding="utf-8")
+
+    queue_dir = tmp_path / "queue"
+    archive_dir = tmp_path / "queue_archive"
+    queue_dir.mkdir()
+    archive_dir.mkdir()
+
+    for i in range(3):
+        video = tmp_path / f"video_{i}.mp4"
+        video.write_bytes(b"\x00\x00fakevideo")
+        task = {
+            "video_path": str(video),
+            "status": "pending",
+            "meta": {"title": f"Titre {i}", "description": "Desc", "tags": ["t"]},
+            "skip_enhance": True,
+        }
+        (queue_dir / f"task_00{i}.json").write_text(json.dumps(task), encoding="utf-8")
+
+    monkeypatch.setattr(worker, "get_credentials", lambda *a, **k: object())
+    monkeypatch.setattr(worker, "get_best_thumbnail", lambda *a, **k: None)
+    monkeypatch.setattr(worker, "smart_upload_captions", lambda *a, **k: {})
+
+    lock = threading.Lock()
+    state = {"active": 0, "max": 0, "n": 0}
+
+    def fake_upload(creds, **kwargs):
+        with lock:
+            state["active"] += 1
+            state["n"] += 1
+            state["max"] = max(state["max"], state["active"])
+            n = state["n"]
+        time.sleep(0.1)
+        with lock:
+            state["active"] -= 1
+        return {"id": f"vid_{n}"}
+
+    monkeypatch.setattr(worker, "upload_video", fake_upload)
+
+    worker.process_queue(
+        queue_dir=str(queue_dir),
+        archive_dir=str(archive_dir),
+        config_path=str(cfg_path),
+        log_level="INFO",
+        concurrency=3,
+    )
+
+    archived = sorted(archive_dir.glob("task_*.json"))
+    assert len(archived) == 3
+    for p in archived:
+        data = json.loads(p.read_text(encoding="utf-8"))
+        assert data.get("status") == "done"
+        assert data.get("youtube_id", "").startswith("vid_")
+    # Les uploads (étape I/O) se sont chevauchés
+    assert state["max"] >= 2
@@ -0,0 +1,108 @@
+import json
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+
+def _stub_googleapiclient():
+    ga = types.ModuleType("googleapiclient")
+    ga_discovery = types.ModuleType("googleapiclient.discovery")
+    ga_errors = types.ModuleType("googleapiclient.errors")
+    ga_http = types.ModuleType("googleapiclient.http")
+
+    class _StubError(Exception):
+        pass
+
+    ga_errors.ResumableUploadError = _StubError
+    ga_errors.HttpError = _StubError
+    ga_discovery.build = lambda *a, **k: object()
+    ga_http.MediaFileUpload = lambda *a, **k: None
+    sys.modules["googleapiclient"] = ga
+    sys.modules["googleapiclient.discovery"] = ga_discovery
+    sys.modules["googleapiclient.errors"] = ga_errors
+    sys.modules["googleapiclient.http"] = ga_http
+
+
+def _write_task(queue_dir: Path, tmp_path: Path, name: str, **extra) -> Path:
+    video = tmp_path / f"{name}.mp4"
+    video.write_bytes(b"\x00\x00fakevideo")
+    task = {
+        "video_path": str(video),
+        "status": "pending",
+        "meta": {"title": f"Titre {name}", "description": "Desc", "tags": ["t"]},
+        "skip_enhance": True,
+        **extra,
+    }
+    path = queue_dir / f"task_{name}.json"
+    tmp = queue_dir / f".{name}.tmp"
+    tmp.write_text(json.dumps(task), encoding="utf-8")
+    tmp.replace(path)
+    return path
+
+
+def _wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_worker_daemon_picks_up_new_tasks(monkeypatch, tmp_path: Path):
+    _stub_googleapiclient()
+    from src import worker
+
+    cfg_path = tmp_path / "video.yaml"
+    cfg_path.write_text(
+        json.dumps({"enhance": {"enabled": False}, "subtitles": {"enabled": False}}),
+        encoding="utf-8",
+    )
+    queue_dir = tmp_path / "queue"
+    archive_dir = tmp_path / "queue_archive"
+
+    calls = {"creds": 0}
+
+    def fake_creds(*a, **k):
+        calls["creds"] += 1
+        return object()
+
+    monkeypatch.setattr(worker, "get_credentials", fake_creds)
+    monkeypatch.setattr(worker, "get_best_thumbnail", lambda *a, **k: None)
+    monkeypatch.setattr(worker, "smart_upload_captions", lambda *a, **k: {})
+    monkeypatch.setattr(worker, "upload_video", lambda creds, **k: {"id": "vid_d"})
+
+    stop = threading.Event()
+    t = threading.Thread(
+        target=worker.run_daemon,
+        kwargs=dict(
+            queue_dir=str(queue_dir),
+            archive_dir=str(archive_dir),
+            config_path=str(cfg_path),
+            poll_interval=0.05,
+            stop_event=stop,
+        ),
+        daemon=True,
+    )
+    t.start()
+    try:
+        assert _wait_for(lambda: queue_dir.exists())
+        # Tâche en attente de confirmation: ignorée, laissée dans la file
+        waiting = _write_task(queue_dir, tmp_path, "waiting", status="awaiting_confirm")
+        first = _write_task(queue_dir, tmp_path, "a")
+        assert _wait_for(lambda: (archive_dir / first.name).exists())
+        second = _write_task(queue_dir, tmp_path, "b")
+        assert _wait_for(lambda: (archive_dir / second.name).exists())
+    finally:
+        stop.set()
+        t.join(timeout=5)
+
+    assert not t.is_alive()
+    assert waiting.exists()
+    for name in (first.name, second.name):
+        data = json.loads((archive_dir / name).read_text(encoding="utf-8"))
+        assert data["status"] == "done"
+    # Credentials chargés une seule fois pour toute la durée du démon
+    assert calls["creds"] == 1
@@ -4,7 +4,7 @@ import types
 from pathlib import Path
 
 
-def test_worker_multi_tasks_stops_on_upload_limit(monkeypatch, tmp_path: Path):
+def test_worker_multi_tasks_blocked_on_upload_limit(monkeypatch, tmp_path: Path):
     # Stub googleapiclient modules before importing worker
     ga = types.ModuleType("googleapiclient")
     ga_discovery = types.ModuleType("googleapiclient.discovery")
@@ -116,14 +116,122 @@ def test_worker_multi_tasks_stops_on_upload_limit(monkeypatch, tmp_path: Path):
         log_level="INFO",
     )
 
-    # First task should be archived as blocked
-    a1 = archive_dir / p1.name
-    assert a1.exists(), "First task should be archived after uploadLimitExceeded"
-    d1 = json.loads(a1.read_text(encoding="utf-8"))
-    assert d1.get("status") == "blocked"
-    assert d1.get("error") == "uploadLimitExceeded"
-
-    # Second task should remain in queue (not processed), worker stopped
-    assert (queue_dir / p2.name).exists(), "Second task should remain in queue"
-    # And upload should have been attempted only once
+    # Both tasks stay queued as blocked until the quota reset
+    for p in (p1, p2):
+        assert not (archive_dir / p.name).exists()
+        d = json.loads(p.read_text(encoding="utf-8"))
+        assert d.get("status") == "blocked"
+        assert d.get("error") == "uploadLimitExceeded"
+        assert d.get("retry_after")
+    # The exhausted single account is not called again for the second task
     assert calls["count"] == 1
+
+
+def test_worker_reroutes_to_next_account_on_upload_limit(monkeypatch, tmp_path: Path):
+    for name in ("discovery", "errors", "http"):
+        sys.modules.setdefault(
+            f"googleapiclient.{name}", types.ModuleType(f"googleapiclient.{name}")
+        )
+    sys.modules.setdefault("googleapiclient", types.ModuleType("googleapiclient"))
+
+    from src import worker
+    from src.multi_account_manager import MultiAccountManager
+
+    accounts_path = tmp_path / "config" / "multi_accounts.json"
+    accounts_path.parent.mkdir()
+    accounts_path.write_text(
+        json.dumps(
+            {
+                "accounts": [
+                    {
+                        "account_id": acc,
+                        "name": acc,
+                        "channel_id": "",
+                        "credentials_path": "",
+                        "token_path": "",
+                    }
+                    for acc in ("acc-a", "acc-b")
+                ],
+                "chat_mappings": {"chat-1": "acc-a"},
+            }
+        ),
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(
+        worker,
+        "create_multi_account_manager",
+        lambda: MultiAccountManager(accounts_path),
+    )
+    monkeypatch.setattr(
+        MultiAccountManager,
+        "get_credentials_for_account",
+        lambda self, account_id, **k: account_id,
+    )
+    monkeypatch.setattr(
+        worker, "load_raw_config", lambda _path: {"multi_accounts": {"enabled": True}}
+    )
+    monkeypatch.setattr(worker, "get_best_thumbnail", lambda *a, **k: None)
+    monkeypatch.setattr(worker, "smart_upload_captions", lambda *a, **k: {})
+
+    uploads = []
+
+    def upload(credentials, **kwargs):
+        uploads.append(credentials)
+        if credentials == "acc-a":
+            raise RuntimeError("uploadLimitExceeded: daily limit reached")
+        return {"id": f"vid_{len(uploads)}"}
+
+    monkeypatch.setattr(worker, "upload_video", upload)
+
+    queue_dir = tmp_path / "queue"
+    archive_dir = tmp_path / "queue_archive"
+    queue_dir.mkdir()
+    archive_dir.mkdir()
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"\x00\x00fakevideo")
+    cfg_path = tmp_path / "video.yaml"
+    cfg_path.write_text(
+        json.dumps(
+            {
+                "video_path": str(video),
+                "title": "T",
+                "privacy_status": "public",
+                "enhance": {"enabled": False},
+                "subtitles": {"enabled": False},
+                "seo": {"provider": "none"},
+            }
+        ),
+        encoding="utf-8",
+    )
+    for i in (1, 2):
+        (queue_dir / f"task_00{i}.json").write_text(
+            json.dumps(
+                {
+                    "video_path": str(video),
+                    "status": "pending",
+                    "chat_id": "chat-1",
+                    "meta": {"title": f"T{i}", "description": "D", "tags": ["a"]},
+                    "skip_enhance": True,
+                }
+            ),
+            encoding="utf-8",
+        )
+
+    worker.process_queue(
+        queue_dir=str(queue_dir),
+        archive_dir=str(archive_dir),
+        config_path=str(cfg_path),
+        log_level="INFO",
+    )
+
+    for i in (1, 2):
+        data = json.loads(
+            (archive_dir / f"task_00{i}.json").read_text(encoding="utf-8")
+        )
+        assert data["status"] == "done"
+        assert data["steps_state"]["upload"]["outputs"]["upload_account_id"] == "acc-b"
+    # Le compte épuisé n'est plus sollicité pour la tâche suivante
+    assert uploads == ["acc-a", "acc-b", "acc-b"]
+    quota = json.loads((accounts_path.parent / "quota_usage.json").read_text())
+    assert quota["acc-a"]["exhausted_until"]
+    assert quota["acc-b"]["uploads"] == 2
@@ -0,0 +1,105 @@
+import json
+import sys
+import types
+from pathlib import Path
+
+
+def _stub_googleapiclient():
+    ga = types.ModuleType("googleapiclient")
+    ga_discovery = types.ModuleType("googleapiclient.discovery")
+    ga_errors = types.ModuleType("googleapiclient.errors")
+    ga_http = types.ModuleType("googleapiclient.http")
+
+    class _StubError(Exception):
+        pass
+
+    ga_errors.ResumableUploadError = _StubError
+    ga_errors.HttpError = _StubError
+    ga_discovery.build = lambda *a, **k: object()
+    ga_http.MediaFileUpload = lambda *a, **k: None
+    sys.modules["googleapiclient"] = ga
+    sys.modules["googleapiclient.discovery"] = ga_discovery
+    sys.modules["googleapiclient.errors"] = ga_errors
+    sys.modules["googleapiclient.http"] = ga_http
+
+
+def test_worker_resumes_after_upload_error_without_reencoding(
+    monkeypatch, tmp_path: Path
+):
+    _stub_googleapiclient()
+    from src import worker
+
+    cfg_path = tmp_path / "video.yaml"
+    cfg_path.write_text(
+        "video_path: x.mp4\ntitle: T\nenhance:\n  enabled: true\n", encoding="utf-8"
+    )
+    queue_dir = tmp_path / "queue"
+    archive_dir = tmp_path / "queue_archive"
+    queue_dir.mkdir()
+    archive_dir.mkdir()
+
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"\x00\x00fakevideo")
+    task_path = queue_dir / "task_001.json"
+    task_path.write_text(
+        json.dumps(
+            {
+                "video_path": str(video),
+                "status": "pending",
+                "meta": {"title": "Titre", "description": "Desc", "tags": ["a"]},
+            }
+        ),
+        encoding="utf-8",
+    )
+
+    calls = {"enhance": 0, "upload": 0}
+
+    def fake_enhance(*, input_path, output_path, **kwargs):
+        calls["enhance"] += 1
+        Path(output_path).write_bytes(b"enhanced")
+        return Path(output_path)
+
+    def fake_upload(creds, **kwargs):
+        calls["upload"] += 1
+        if calls["upload"] == 1:
+            raise RuntimeError("503 backend error")
+        assert kwargs["video_path"].endswith(".enhanced.mp4")
+        return {"id": "vid_resume"}
+
+    monkeypatch.setattr(worker, "enhance_video", fake_enhance)
+    monkeypatch.setattr(worker, "upload_video", fake_upload)
+    monkeypatch.setattr(worker, "get_credentials", lambda *a, **k: object())
+    monkeypatch.setattr(worker, "get_best_thumbnail", lambda *a, **k: None)
+    monkeypatch.setattr(worker, "_generate_placeholder_thumbnail", lambda *a: False)
+
+    kwargs = dict(
+        queue_dir=str(queue_dir),
+        archive_dir=str(archive_dir),
+        config_path=str(cfg_path),
+    )
+    # 1er passage: upload en échec (pas de nouvel essai: un timeout peut
+    # masquer un upload réussi), tâche en erreur
+    worker.process_queue(**kwargs)
+    data = json.loads(task_path.read_text(encoding="utf-8"))
+    assert data["status"] == "error"
+    assert data["steps_state"]["enhance"]["status"] == "done"
+    assert data["steps_state"]["upload"]["status"] == "failed"
+
+    # 2e passage: reprise directement à l'upload
+    worker.process_queue(**kwargs)
+    archived = json.loads((archive_dir / task_path.name).read_text(encoding="utf-8"))
+    assert archived["status"] == "done"
+    assert archived["youtube_id"] == "vid_resume"
+    assert calls == {"enhance": 1, "upload": 2}
+
+    # Relancée après un arrêt (fichier amélioré supprimé, amont rejoué): la
+    # vidéo déjà publiée n'est jamais renvoyée
+    archived["status"] = "pending"
+    archived["steps_state"].pop("upload")
+    (archive_dir / task_path.name).unlink()
+    Path(archived["steps_state"]["enhance"]["outputs"]["video"]).unlink()
+    task_path.write_text(json.dumps(archived), encoding="utf-8")
+    worker.process_queue(**kwargs)
+    archived = json.loads((archive_dir / task_path.name).read_text(encoding="utf-8"))
+    assert archived["youtube_id"] == "vid_resume"
+    assert calls == {"enhance": 2, "upload": 2}
@@ -253,3 +253,73 @@ def test_worker_processes_scheduled_task_marks_completed(monkeypatch, tmp_path:
     assert data.get("youtube_id") == "vid_sched"
     # And mark_task_completed called
     assert called.get("task_id") == "sched_test_123"
+
+
+def test_worker_early_released_task_publishes_at_slot(monkeypatch, tmp_path: Path):
+    _stub_google_api_modules()
+    from src import worker
+    from src.media_probe import MediaInfo
+
+    cfg = {
+        "privacy_status": "public",
+        "language": "fr",
+        "enhance": {"enabled": False},
+        "seo": {"provider": "none"},
+        "multi_accounts": {"enabled": False},
+    }
+    cfg_path = tmp_path / "video.json"
+    cfg_path.write_text(json.dumps(cfg), encoding="utf-8")
+
+    queue_dir = tmp_path / "queue"
+    archive_dir = tmp_path / "queue_archive"
+    queue_dir.mkdir()
+    archive_dir.mkdir()
+
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"\x00\x00fakevideo")
+
+    # Sortie du planning avant son créneau (préparation estimée): le mode
+    # custom ne doit pas la replanifier, la publication attend le créneau
+    tz = pytz.timezone("Europe/Paris")
+    slot = (datetime.now(tz) + timedelta(hours=2)).replace(microsecond=0)
+    task = {
+        "video_path": str(video),
+        "status": "pending",
+        "meta": {"title": "Titre", "description": "D", "tags": []},
+        "skip_enhance": True,
+        "schedule_mode": "custom",
+        "custom_schedule_time": slot.isoformat(),
+        "scheduled_task_id": "sched_early_1",
+        "scheduled_time": slot.isoformat(),
+    }
+    task_path = queue_dir / "scheduled_sched_early_1.json"
+    task_path.write_text(json.dumps(task), encoding="utf-8")
+
+    uploads = []
+
+    def fake_upload(*args, **kwargs):
+        uploads.append(kwargs)
+        return {"id": "vid_early"}
+
+    monkeypatch.setattr(worker, "get_credentials", lambda *a, **k: object())
+    monkeypatch.setattr(worker, "upload_video", fake_upload)
+    monkeypatch.setattr(
+        worker, "probe_media", lambda p: MediaInfo(duration=10.0, height=720)
+    )
+    monkeypatch.setattr(worker, "get_best_thumbnail", lambda *a, **k: None)
+    monkeypatch.setattr(worker, "smart_upload_captions", lambda *a, **k: {})
+
+    worker.process_queue(
+        queue_dir=str(queue_dir),
+        archive_dir=str(archive_dir),
+        config_path=str(cfg_path),
+        log_level="INFO",
+    )
+
+    data = json.loads((archive_dir / task_path.name).read_text(encoding="utf-8"))
+    assert data.get("youtube_id") == "vid_early"
+    assert uploads[0]["publish_at"] == worker._to_rfc3339_utc_from_dt(slot)
+    # Durées et caractéristiques enregistrées pour l'estimateur
+    history = (queue_dir / "stage_metrics.jsonl").read_text(encoding="utf-8")
+    assert '"features": {"duration": 10.0, "height": 720' in history
+    assert '"size_bytes": 11, "encode": false' in history
@@ -0,0 +1,85 @@
+import json
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+
+def _stub_googleapiclient():
+    ga = types.ModuleType("googleapiclient")
+    ga_discovery = types.ModuleType("googleapiclient.discovery")
+    ga_errors = types.ModuleType("googleapiclient.errors")
+    ga_http = types.ModuleType("googleapiclient.http")
+
+    class _StubError(Exception):
+        pass
+
+    ga_errors.ResumableUploadError = _StubError
+    ga_errors.HttpError = _StubError
+    ga_discovery.build = lambda *a, **k: object()
+    ga_http.MediaFileUpload = lambda *a, **k: None
+    sys.modules["googleapiclient"] = ga
+    sys.modules["googleapiclient.discovery"] = ga_discovery
+    sys.modules["googleapiclient.errors"] = ga_errors
+    sys.modules["googleapiclient.http"] = ga_http
+
+
+def test_two_workers_share_queue_without_double_upload(monkeypatch, tmp_path: Path):
+    _stub_googleapiclient()
+    from src import worker
+
+    cfg_path = tmp_path / "video.yaml"
+    cfg_path.write_text(
+        json.dumps({"privacy_status": "private", "enhance": {"enabled": False}}),
+        encoding="utf-8",
+    )
+    queue_dir = tmp_path / "queue"
+    archive_dir = tmp_path / "queue_archive"
+    queue_dir.mkdir()
+    archive_dir.mkdir()
+    for i in range(6):
+        video = tmp_path / f"video_{i}.mp4"
+        video.write_bytes(b"\x00\x00fakevideo")
+        task = {
+            "video_path": str(video),
+            "status": "pending",
+            "meta": {"title": f"Titre {i}", "description": "D", "tags": ["t"]},
+            "skip_enhance": True,
+        }
+        (queue_dir / f"task_00{i}.json").write_text(json.dumps(task), encoding="utf-8")
+
+    monkeypatch.setattr(worker, "get_credentials", lambda *a, **k: object())
+    monkeypatch.setattr(worker, "get_best_thumbnail", lambda *a, **k: None)
+    monkeypatch.setattr(worker, "smart_upload_captions", lambda *a, **k: {})
+
+    lock = threading.Lock()
+    uploads = []
+
+    def fake_upload(creds, video_path, **kwargs):
+        time.sleep(0.05)
+        with lock:
+            uploads.append(video_path)
+        return {"id": f"vid_{len(uploads)}"}
+
+    monkeypatch.setattr(worker, "upload_video", fake_upload)
+
+    def _worker():
+        worker.process_queue(
+            queue_dir=str(queue_dir),
+            archive_dir=str(archive_dir),
+            config_path=str(cfg_path),
+            concurrency=2,
+        )
+
+    threads = [threading.Thread(target=_worker) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=30)
+
+    # Chaque vidéo publiée exactement une fois, tout est archivé
+    assert sorted(uploads) == sorted(set(uploads))
+    assert len(uploads) == 6
+    assert len(list(archive_dir.glob("task_*.json"))) == 6
+    assert not list((queue_dir / "inflight").iterdir())
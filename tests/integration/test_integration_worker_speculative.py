@@ -0,0 +1,147 @@
+import json
+import sys
+import threading
+import types
+from pathlib import Path
+
+
+def _stub_googleapiclient():
+    ga = types.ModuleType("googleapiclient")
+    ga_discovery = types.ModuleType("googleapiclient.discovery")
+    ga_errors = types.ModuleType("googleapiclient.errors")
+    ga_http = types.ModuleType("googleapiclient.http")
+
+    class _StubResumableUploadError(Exception):
+        pass
+
+    ga_errors.ResumableUploadError = _StubResumableUploadError
+    sys.modules["googleapiclient"] = ga
+    sys.modules["googleapiclient.discovery"] = ga_discovery
+    sys.modules["googleapiclient.errors"] = ga_errors
+    sys.modules["googleapiclient.http"] = ga_http
+
+
+def test_probes_run_on_original_while_encoding(monkeypatch, tmp_path: Path):
+    _stub_googleapiclient()
+    from src import worker
+
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"\x00\x00fakevideo")
+    cfg = {
+        "video_path": str(video),
+        "title": "T",
+        "privacy_status": "private",
+        "language": "fr",
+        "enhance": {"enabled": True},
+        "subtitles": {"enabled": False},
+        "seo": {"provider": "none"},
+        "multi_accounts": {"enabled": False},
+    }
+    cfg_path = tmp_path / "video.yaml"
+    cfg_path.write_text(json.dumps(cfg), encoding="utf-8")
+    queue_dir = tmp_path / "queue"
+    archive_dir = tmp_path / "queue_archive"
+    queue_dir.mkdir()
+    archive_dir.mkdir()
+    task = {
+        "video_path": str(video),
+        "status": "pending",
+        "meta": {"title": "T", "description": "D", "tags": ["a"]},
+    }
+    (queue_dir / "task_001.json").write_text(json.dumps(task), encoding="utf-8")
+
+    probed = threading.Event()
+    probed_paths = []
+    overlapped = {}
+
+    def fake_probe(path):
+        probed_paths.append(Path(path))
+        probed.set()
+        return "en"
+
+    def fake_enhance(*, input_path, output_path, **kwargs):
+        # L'encodage ne se termine qu'après la sonde audio: preuve du parallélisme
+        overlapped["probe_during_encode"] = probed.wait(timeout=5)
+        Path(output_path).write_bytes(b"enhanced")
+        return Path(output_path)
+
+    uploads = []
+    monkeypatch.setattr(worker, "_probe_audio_language", fake_probe)
+    monkeypatch.setattr(worker, "enhance_video", fake_enhance)
+    monkeypatch.setattr(worker, "get_credentials", lambda *a, **k: object())
+    monkeypatch.setattr(worker, "get_best_thumbnail", lambda *a, **k: None)
+    monkeypatch.setattr(worker, "_generate_placeholder_thumbnail", lambda *a, **k: True)
+    monkeypatch.setattr(
+        worker, "upload_video", lambda creds, **kw: uploads.append(kw) or {"id": "v1"}
+    )
+
+    worker.process_queue(
+        queue_dir=str(queue_dir),
+        archive_dir=str(archive_dir),
+        config_path=str(cfg_path),
+        parallel_steps=2,
+    )
+
+    assert overlapped == {"probe_during_encode": True}
+    assert probed_paths == [video.resolve()]
+    assert uploads[0]["video_path"].endswith(".enhanced.mp4")
+    assert uploads[0]["default_audio_language"] == "en"
+    data = json.loads((archive_dir / "task_001.json").read_text(encoding="utf-8"))
+    assert data["status"] == "done"
+
+
+def test_analysis_pass_feeds_thumbnail_and_language(monkeypatch, tmp_path: Path):
+    _stub_googleapiclient()
+    from src import worker
+    from src.analysis_pass import AnalysisArtifacts
+    from src.media_probe import MediaInfo
+
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"\x00\x00fakevideo")
+    queue_dir = tmp_path / "queue"
+    archive_dir = tmp_path / "queue_archive"
+    queue_dir.mkdir()
+    archive_dir.mkdir()
+    task = {
+        "video_path": str(video),
+        "status": "pending",
+        "skip_enhance": True,
+        "meta": {"title": "T", "description": "D", "tags": ["a"]},
+    }
+    (queue_dir / "task_001.json").write_text(json.dumps(task), encoding="utf-8")
+
+    analysis_dir = tmp_path / "video.analysis"
+
+    def fake_analysis(path, **kwargs):
+        analysis_dir.mkdir()
+        thumbs = [analysis_dir / "thumb_01.jpg", analysis_dir / "thumb_02.jpg"]
+        thumbs[0].write_bytes(b"dark")
+        thumbs[1].write_bytes(b"detailed frame")
+        return AnalysisArtifacts(
+            directory=analysis_dir,
+            info=MediaInfo(duration=10.0, audio_codec="aac", audio_language="de"),
+            thumbnails=thumbs,
+        )
+
+    def unexpected(*a, **k):
+        raise AssertionError("décodage supplémentaire de la source")
+
+    uploads = []
+    monkeypatch.setattr(worker, "run_analysis", fake_analysis)
+    monkeypatch.setattr(worker, "_probe_audio_language", unexpected)
+    monkeypatch.setattr(worker, "get_best_thumbnail", unexpected)
+    monkeypatch.setattr(worker, "get_credentials", lambda *a, **k: object())
+    monkeypatch.setattr(
+        worker, "upload_video", lambda creds, **kw: uploads.append(kw) or {"id": "v1"}
+    )
+
+    worker.process_queue(
+        queue_dir=str(queue_dir), archive_dir=str(archive_dir), config_path=None
+    )
+
+    assert uploads[0]["default_audio_language"] == "de"
+    thumb = Path(uploads[0]["thumbnail_path"])
+    assert thumb.name == "video_thumb.jpg"
+    assert thumb.read_bytes() == b"detailed frame"
+    # Artefacts d'analyse supprimés une fois la tâche terminée
+    assert not analysis_dir.exists()
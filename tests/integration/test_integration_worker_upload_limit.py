@@ -105,10 +105,59 @@ def test_worker_blocks_on_upload_limit(monkeypatch, tmp_path: Path):
         log_level="INFO",
     )
 
-    # Verify task blocked and archived
-    archived = archive_dir / task_path.name
-    assert archived.exists(), "Task should be moved to archive"
-    data = json.loads(archived.read_text(encoding="utf-8"))
+    # Verify task blocked and kept in queue for an automatic retry
+    assert not (archive_dir / task_path.name).exists()
+    data = json.loads(task_path.read_text(encoding="utf-8"))
     assert data.get("status") == "blocked"
     assert data.get("error") == "uploadLimitExceeded"
     assert "blocked_at" in data
+    assert data.get("retry_after")
+
+
+def test_blocked_task_is_retried_after_reset(monkeypatch, tmp_path: Path):
+    for name in ("discovery", "errors", "http"):
+        sys.modules.setdefault(
+            f"googleapiclient.{name}", types.ModuleType(f"googleapiclient.{name}")
+        )
+    sys.modules.setdefault("googleapiclient", types.ModuleType("googleapiclient"))
+
+    from src import worker
+
+    monkeypatch.setattr(worker, "get_credentials", lambda *a, **k: object())
+    monkeypatch.setattr(worker, "get_best_thumbnail", lambda *a, **k: None)
+    monkeypatch.setattr(worker, "smart_upload_captions", lambda *a, **k: {})
+    monkeypatch.setattr(worker, "upload_video", lambda *a, **k: {"id": "vid_late"})
+
+    queue_dir = tmp_path / "queue"
+    archive_dir = tmp_path / "queue_archive"
+    queue_dir.mkdir()
+    archive_dir.mkdir()
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"\x00\x00fakevideo")
+    base = {
+        "video_path": str(video),
+        "status": "blocked",
+        "error": "uploadLimitExceeded",
+        "meta": {"title": "T", "description": "D", "tags": ["a"]},
+        "skip_enhance": True,
+    }
+    waiting = queue_dir / "task_001.json"
+    waiting.write_text(
+        json.dumps(dict(base, retry_after="2999-01-01T08:00:00+00:00")),
+        encoding="utf-8",
+    )
+    due = queue_dir / "task_002.json"
+    due.write_text(
+        json.dumps(dict(base, retry_after="2000-01-01T08:00:00+00:00")),
+        encoding="utf-8",
+    )
+
+    worker.process_queue(
+        queue_dir=str(queue_dir), archive_dir=str(archive_dir), log_level="INFO"
+    )
+
+    assert json.loads(waiting.read_text(encoding="utf-8"))["status"] == "blocked"
+    data = json.loads((archive_dir / due.name).read_text(encoding="utf-8"))
+    assert data["status"] == "done"
+    assert data["youtube_id"] == "vid_late"
+    assert "retry_after" not in data
@@ -66,3 +66,27 @@ def test_safe_json_loads_variants():
     assert _safe_json_loads('{"a": 1}') == {"a": 1}
     assert _safe_json_loads('```json\n{"a":2}\n```') == {"a": 2}
     assert _safe_json_loads('xx{"b":3}yy') == {"b": 3}
+
+
+def test_precomputed_vision_analysis_skips_video_analysis(tmp_path: Path, monkeypatch):
+    import src.ai_generator as ai_gen
+
+    cfg = tmp_path / "video.yaml"
+    cfg.write_text("video_path: v.mp4\n", encoding="utf-8")
+    monkeypatch.setattr(ai_gen, "load_config", lambda p: {"vision": {"enabled": True}})
+    calls = []
+    monkeypatch.setattr(ai_gen, "create_vision_analyzer", lambda c: calls.append(c))
+
+    req = MetaRequest(topic="Partie de jeu", provider="none")
+    generate_metadata(req, config_path=str(cfg), video_path="v.mp4")
+    assert len(calls) == 1
+
+    data = generate_metadata(
+        req,
+        config_path=str(cfg),
+        video_path="v.mp4",
+        vision_analysis={"category_id": 20, "confidence": 0.9, "tags": ["gaming"]},
+    )
+    # Résultat Vision fourni par le worker: aucune réextraction de frames
+    assert len(calls) == 1
+    assert data["category_id"] == 20 and "gaming" in data["tags"]
@@ -0,0 +1,128 @@
+import wave
+from pathlib import Path
+
+import src.analysis_pass as ap
+import src.subtitle_generator as sg
+import src.video_enhance as ve
+from src.media_probe import MediaInfo
+
+
+def _info(**kw):
+    base = dict(
+        format_name="mov,mp4",
+        duration=100.0,
+        video_codec="h264",
+        width=1920,
+        height=1080,
+        audio_codec="aac",
+        audio_language="fr",
+    )
+    base.update(kw)
+    return MediaInfo(**base)
+
+
+def test_command_decodes_once_for_all_outputs(tmp_path):
+    cmd = ap.build_analysis_command(
+        Path("in.mp4"),
+        tmp_path,
+        thumbnails=[30.0, 50.0],
+        frames=[25.0],
+        audio=True,
+    )
+    assert cmd.count("-i") == 1
+    assert cmd[cmd.index("-skip_frame:v") + 1] == "nokey"
+    graph = cmd[cmd.index("-filter_complex") + 1]
+    assert graph.startswith("[0:v:0]split=2[thumbs_in][frames_in];")
+    assert "select='gte(t,30.000)*not(gte(prev_pts*TB,30.000))+gte(t,50.000)" in graph
+    assert "pad=1280:720" in graph
+    assert str(tmp_path / "thumb_%02d.jpg") in cmd
+    assert str(tmp_path / "frame_%02d.jpg") in cmd
+    assert cmd[-9:] == [
+        "-map",
+        "0:a:0",
+        "-ac",
+        "1",
+        "-ar",
+        "16000",
+        "-c:a",
+        "pcm_s16le",
+        str(tmp_path / "in.audio.wav"),
+    ]
+
+
+def test_audio_only_command_skips_video_decoding(tmp_path):
+    cmd = ap.build_analysis_command(Path("in.mp4"), tmp_path, audio=True)
+    assert "-filter_complex" not in cmd and "-skip_frame:v" not in cmd
+
+
+def test_frame_times_match_vision_spacing():
+    assert ap.frame_times(100.0, 3) == [25.0, 50.0, 75.0]
+    assert ap.frame_times(100.0, 1) == [50.0]
+    assert ap.frame_times(100.0, 0) == []
+
+
+def test_run_analysis_collects_artifacts(monkeypatch, tmp_path):
+    video = tmp_path / "clip.mp4"
+    video.write_bytes(b"src")
+    commands = []
+
+    def fake_run(cmd, log, *, label=None, record_speed=True, progress=None):
+        commands.append(cmd)
+        out = Path(cmd[-1]).parent
+        (out / "thumb_01.jpg").write_bytes(b"x" * 10)
+        (out / "thumb_02.jpg").write_bytes(b"x" * 500)
+        (out / "frame_01.jpg").write_bytes(b"f")
+        (out / "clip.audio.wav").write_bytes(b"RIFF")
+
+    monkeypatch.setattr(ap.shutil, "which", lambda name: "/usr/bin/" + name)
+    monkeypatch.setattr(ap, "probe_media", lambda p: _info())
+    monkeypatch.setattr(ve, "_run_ffmpeg", fake_run)
+
+    artifacts = ap.run_analysis(video, frames=1, audio=True)
+
+    assert len(commands) == 1
+    assert artifacts.directory == tmp_path / "clip.analysis"
+    assert artifacts.best_thumbnail().name == "thumb_02.jpg"
+    assert [p.name for p in artifacts.frames] == ["frame_01.jpg"]
+    assert artifacts.audio.name == "clip.audio.wav"
+    assert artifacts.audio_language == "fr"
+
+    restored = ap.AnalysisArtifacts.from_dict(artifacts.to_dict())
+    assert restored.info == artifacts.info
+    assert restored.thumbnails == artifacts.thumbnails
+
+
+def test_run_analysis_without_ffmpeg(monkeypatch, tmp_path):
+    monkeypatch.setattr(ap.shutil, "which", lambda name: None)
+    assert ap.run_analysis(tmp_path / "clip.mp4") is None
+
+
+def test_language_detection_reuses_extracted_wav(monkeypatch, tmp_path):
+    wav = tmp_path / "clip.audio.wav"
+    with wave.open(str(wav), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(16000)
+        w.writeframes(b"\x00\x00" * 16000 * 40)
+    video = tmp_path / "clip.mp4"
+    video.write_bytes(b"src")
+    calls = []
+
+    class _Result:
+        returncode = 0
+        stderr = ""
+
+    def fake_run(cmd, **kwargs):
+        calls.append(cmd[0])
+        sample = Path(cmd[1])
+        with wave.open(str(sample), "rb") as r:
+            assert r.getnframes() == 16000 * 30
+        sample.with_suffix(".json").write_text('{"language": "fr"}', encoding="utf-8")
+        return _Result()
+
+    monkeypatch.setattr(sg, "is_whisper_available", lambda: True)
+    monkeypatch.setattr(sg.subprocess, "run", fake_run)
+
+    assert sg.detect_language(video, audio_path=wav) == "fr"
+    # Pas d'extraction ffmpeg: seul Whisper est lancé
+    assert calls == ["whisper"]
@@ -0,0 +1,122 @@
+from pathlib import Path
+
+import src.video_enhance as ve
+from src.artifact_cache import ArtifactCache, cache_key, fast_file_hash
+
+
+def _write(path: Path, data: bytes) -> Path:
+    path.write_bytes(data)
+    return path
+
+
+def test_fast_file_hash_depends_on_content_and_size(tmp_path):
+    a = _write(tmp_path / "a.bin", b"x" * 5000)
+    b = _write(tmp_path / "b.bin", b"x" * 5000)
+    c = _write(tmp_path / "c.bin", b"x" * 4999 + b"y")
+    assert fast_file_hash(a) == fast_file_hash(b)
+    assert fast_file_hash(a) != fast_file_hash(c)
+    # Mode échantillonné (fichier plus grand que samples * sample_size)
+    big = _write(tmp_path / "big.bin", bytes(range(256)) * 400)
+    assert fast_file_hash(big, sample_size=64, samples=4) != fast_file_hash(
+        a, sample_size=64, samples=4
+    )
+
+
+def test_cache_key_depends_on_args():
+    assert cache_key("h", ["-crf", "18"]) != cache_key("h", ["-crf", "20"])
+    assert cache_key("h", ["-crf", "18"]) == cache_key("h", ["-crf", "18"])
+
+
+def test_store_then_fetch_hard_links(tmp_path):
+    cache = ArtifactCache(tmp_path / "cache")
+    index = tmp_path / "cache" / "index.json"
+    # Un miss ne réécrit pas l'index; le compteur est fusionné à l'écriture suivante
+    assert cache.fetch("missing", tmp_path / "none.mp4") is None
+    assert not index.exists()
+    src = _write(tmp_path / "out.mp4", b"encoded")
+    cache.store("k1", src)
+
+    dest = tmp_path / "again.mp4"
+    assert cache.fetch("k1", dest) == dest
+    assert dest.read_bytes() == b"encoded"
+    assert dest.stat().st_ino == src.stat().st_ino
+
+    # Compteurs persistés dans l'index
+    reloaded = ArtifactCache(tmp_path / "cache")
+    stats = reloaded.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["entries"] == 1
+
+
+def test_lru_eviction_respects_size_limit(tmp_path):
+    cache = ArtifactCache(tmp_path / "cache", max_bytes=25)
+    for i in range(3):
+        cache.store(f"k{i}", _write(tmp_path / f"o{i}.mp4", b"0" * 10))
+        if i == 1:
+            # k0 redevient le plus récemment utilisé
+            cache.fetch("k0", tmp_path / "tmp.mp4")
+
+    stats = cache.stats()
+    assert stats["total_bytes"] <= 25
+    assert stats["evictions"] == 1
+    assert cache.fetch("k1", tmp_path / "x.mp4") is None
+    assert cache.fetch("k0", tmp_path / "y.mp4") is not None
+
+
+def test_instances_merge_index_and_prune_orphans(tmp_path):
+    # Deux processus sur le même répertoire: aucun n'écrase les entrées de l'autre
+    first = ArtifactCache(tmp_path / "cache", max_bytes=25)
+    second = ArtifactCache(tmp_path / "cache", max_bytes=25)
+    first.store("k1", _write(tmp_path / "a.mp4", b"1" * 10))
+    second.store("k2", _write(tmp_path / "b.mp4", b"2" * 10))
+    assert first.fetch("k2", tmp_path / "c.mp4") is not None
+    assert ArtifactCache(tmp_path / "cache").stats()["entries"] == 2
+
+    # Fichier laissé hors index (processus interrompu): supprimé, pas ignoré
+    orphan = tmp_path / "cache" / "zz" / "zz_orphan.mp4"
+    orphan.parent.mkdir()
+    orphan.write_bytes(b"0" * 10)
+    first.store("k3", _write(tmp_path / "d.mp4", b"3" * 5))
+    assert not orphan.exists()
+    assert first.stats()["total_bytes"] == 25
+
+
+class _WritingProc:
+    calls = 0
+
+    def __init__(self, cmd, **kwargs):
+        type(self).calls += 1
+        Path(cmd[-1]).write_bytes(b"enhanced")
+        self.stderr = iter(["Duration: 00:00:01,00\n"])
+        self.stdout = iter(["out_time_us=1000000\n", "progress=end\n"])
+
+    def wait(self):
+        return 0
+
+
+def test_enhance_video_skips_encode_on_cache_hit(monkeypatch, tmp_path):
+    monkeypatch.setattr(ve.shutil, "which", lambda name: "/usr/bin/ffmpeg")
+    monkeypatch.setattr(ve.subprocess, "Popen", _WritingProc)
+    _WritingProc.calls = 0
+    cache = ArtifactCache(tmp_path / "cache")
+    inp = _write(tmp_path / "in.mp4", b"source")
+
+    first = ve.enhance_video(
+        input_path=inp, output_path=tmp_path / "a.mp4", crf=20, cache=cache
+    )
+    report = {}
+    second = ve.enhance_video(
+        input_path=inp,
+        output_path=tmp_path / "b.mp4",
+        crf=20,
+        cache=cache,
+        report=report,
+    )
+    assert _WritingProc.calls == 1 and report == {"path": "cache"}
+    assert second.read_bytes() == first.read_bytes() == b"enhanced"
+
+    # Réglages différents: nouvel encodage
+    ve.enhance_video(
+        input_path=inp, output_path=tmp_path / "c.mp4", crf=23, cache=cache
+    )
+    assert _WritingProc.calls == 2
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,86 @@
+import json
+from pathlib import Path
+
+from src.batch_import import build_report, format_report, import_directory
+from src.worker_metrics import MetricsRegistry
+
+
+def _videos(root: Path) -> None:
+    (root / "season_1").mkdir(parents=True)
+    for rel in ("season_1/ep-01_intro.mp4", "season_1/ep_02.mkv", "b_roll.mov"):
+        (root / rel).write_bytes(b"\x00fake")
+    (root / "notes.txt").write_text("ignoré")
+    (root / "season_1" / "ep_02.yaml").write_text(
+        "title: Épisode deux\ntags: [serie]\nprivacy_status: unlisted\n"
+    )
+    (root / "batch.csv").write_text(
+        "file,title,tags,priority\n"
+        'season_1/ep-01_intro.mp4,Intro,"a, b",high\n'
+        "season_1/ep_02.mkv,Remplacé par le sidecar,,\n",
+        encoding="utf-8",
+    )
+
+
+def test_import_directory_builds_tasks_and_is_replayable(tmp_path: Path):
+    root, queue, archive = tmp_path / "src", tmp_path / "queue", tmp_path / "arch"
+    _videos(root)
+
+    result = import_directory(
+        root, queue, archive, defaults={"priority": "low"}, batch_id="b1"
+    )
+    assert len(result["created"]) == 3
+    assert result["unlisted"] == 1
+    tasks = {
+        t["batch_file"]: t
+        for t in (json.loads((queue / n).read_text()) for n in result["created"])
+    }
+    intro = tasks["season_1/ep-01_intro.mp4"]
+    assert intro["status"] == "pending" and intro["source"] == "batch"
+    assert intro["priority"] == "high"
+    assert intro["meta"]["title"] == "Intro"
+    assert intro["meta"]["tags"] == ["a", "b"]
+    ep2 = tasks["season_1/ep_02.mkv"]
+    assert ep2["meta"]["title"] == "Épisode deux"
+    assert ep2["privacy_status"] == "unlisted"
+    assert tasks["b_roll.mov"]["meta"]["title"] == "b roll"
+    assert tasks["b_roll.mov"]["priority"] == "low"
+
+    # Une tâche déjà traitée n'est pas recréée, les autres restent à traiter
+    archive.mkdir()
+    done = result["created"][0]
+    (queue / done).rename(archive / done)
+    again = import_directory(root, queue, archive)
+    assert again["created"] == [] and again["skipped"] == 1
+    assert sorted(again["queued"]) == sorted(result["created"][1:])
+
+
+def test_report_uses_metrics_delta_and_task_status(tmp_path: Path):
+    queue, archive = tmp_path / "queue", tmp_path / "arch"
+    queue.mkdir()
+    archive.mkdir()
+    (archive / "task_batch_1.json").write_text(json.dumps({"status": "done"}))
+    (queue / "task_batch_2.json").write_text(
+        json.dumps({"status": "error", "error": "boom", "batch_file": "x.mp4"})
+    )
+    reg = MetricsRegistry()
+    reg.inc("upload_bytes_total", 5_000_000, account="default")
+    before = reg.snapshot()
+    reg.inc("upload_bytes_total", 20_000_000, account="default")
+    reg.observe("stage_duration_seconds", 10.0, stage="upload")
+    reg.observe("encode_speed_ratio", 2.0)
+    reg.observe("encode_speed_ratio", 4.0)
+
+    report = build_report(
+        ["task_batch_1.json", "task_batch_2.json"],
+        queue,
+        archive,
+        wall_seconds=60.0,
+        metrics_before=before,
+        metrics_after=reg.snapshot(),
+    )
+    assert report["done"] == 1 and report["failed"] == 1
+    assert report["avg_encode_speed"] == 3.0
+    assert report["upload_mb"] == 20.0
+    assert report["upload_mb_per_s"] == 2.0
+    assert report["tasks_per_hour"] == 60.0
+    assert "x.mp4: error (boom)" in format_report(report)
@@ -0,0 +1,115 @@
+from pathlib import Path
+
+import src.chunked_encode as ce
+import src.video_enhance as ve
+
+
+def test_plan_segments_cuts_on_keyframes():
+    keyframes = [0.0, 50.0, 118.0, 121.5, 200.0, 245.0, 300.0, 480.0, 590.0]
+    cuts = ce.plan_segments(600.0, keyframes, 120.0)
+    # Première image clé après chaque intervalle; dernier segment >= 60s
+    assert cuts == [121.5, 245.0, 480.0]
+
+
+def test_plan_segments_without_usable_keyframe():
+    assert ce.plan_segments(600.0, [0.0], 120.0) == []
+    assert ce.plan_segments(150.0, [0.0, 120.0], 120.0) == []
+
+
+def test_split_stream_args_keeps_video_and_audio_apart():
+    args = ve.build_ffmpeg_args(codec="hevc", scale="1080p", loudnorm=True)
+    video, audio = ve.split_stream_args(args)
+    assert video[:2] == ["-vf", "scale=-2:1080:flags=lanczos"]
+    assert "libx265" in video and "-tag:v" in video
+    assert audio == ["-af", "loudnorm=I=-23:TP=-2:LRA=7", "-c:a", "aac", "-b:a", "192k"]
+    assert "-movflags" not in video + audio
+
+
+class _FakeFfmpeg:
+    """Remplace _run_ffmpeg: crée les fichiers attendus et note les commandes."""
+
+    def __init__(self):
+        self.commands = []
+
+    def __call__(self, cmd, log, *, label=None, record_speed=True, progress=None):
+        self.commands.append(cmd)
+        out = Path(cmd[-1])
+        if "segment" in cmd:
+            count = len(cmd[cmd.index("-segment_times") + 1].split(",")) + 1
+            for i in range(count):
+                Path(str(out) % i).write_bytes(b"seg")
+        else:
+            out.write_bytes(b"video")
+
+
+def _setup(monkeypatch, out_duration):
+    fake = _FakeFfmpeg()
+    monkeypatch.setattr(ve, "_run_ffmpeg", fake)
+    monkeypatch.setattr(
+        ve.shutil, "which", lambda name: "/usr/bin/ffmpeg" if name == "ffmpeg" else None
+    )
+    monkeypatch.setattr(
+        ce,
+        "probe_duration",
+        lambda p: out_duration if Path(p).name == "out.mp4" else 600.0,
+    )
+    monkeypatch.setattr(
+        ce, "probe_keyframes", lambda p: [float(t) for t in range(0, 600, 2)]
+    )
+    return fake
+
+
+def test_chunked_encode_splits_encodes_and_concats(monkeypatch, tmp_path):
+    fake = _setup(monkeypatch, out_duration=600.02)
+    inp = tmp_path / "in.mp4"
+    inp.write_bytes(b"src")
+    out = tmp_path / "out.mp4"
+
+    ve.enhance_video(
+        input_path=inp,
+        output_path=out,
+        codec="hevc",
+        scale="1080p",
+        reencode_audio=True,
+        chunked=True,
+        chunk_workers=3,
+    )
+
+    split, *encodes, concat = fake.commands
+    assert split[split.index("-segment_times") + 1] == "119.999,239.999,359.999,479.999"
+    assert len(encodes) == 5
+    for cmd in encodes:
+        assert "scale=-2:1080:flags=lanczos" in cmd and "-an" in cmd
+        assert "-c:a" not in cmd
+    assert concat[concat.index("-f") + 1] == "concat"
+    assert ["-c:v", "copy", "-tag:v", "hvc1", "-c:a", "aac"] == concat[
+        concat.index("-c:v") : concat.index("-c:v") + 6
+    ]
+    assert concat[-3:] == ["-movflags", "+faststart", str(out)]
+    # Répertoire de travail supprimé
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["in.mp4", "out.mp4"]
+
+
+def test_chunked_encode_falls_back_on_duration_mismatch(monkeypatch, tmp_path):
+    fake = _setup(monkeypatch, out_duration=480.0)
+    inp = tmp_path / "in.mp4"
+    inp.write_bytes(b"src")
+    out = tmp_path / "out.mp4"
+
+    ve.enhance_video(input_path=inp, output_path=out, chunked=True)
+
+    single = fake.commands[-1]
+    assert single[:5] == ["ffmpeg", "-y", "-hide_banner", "-i", str(inp)]
+    assert "concat" not in single
+
+
+def test_short_clip_is_encoded_in_one_pass(monkeypatch, tmp_path):
+    fake = _setup(monkeypatch, out_duration=600.0)
+    monkeypatch.setattr(ce, "probe_duration", lambda p: 90.0)
+    inp = tmp_path / "in.mp4"
+    inp.write_bytes(b"src")
+
+    ve.enhance_video(input_path=inp, output_path=tmp_path / "out.mp4", chunked=True)
+
+    assert len(fake.commands) == 1
+    assert "segment" not in fake.commands[0]
@@ -66,3 +66,47 @@ def test_write_metadata_to_config(tmp_path: Path):
     assert data["tags"] == ["x", "y"]
     assert data["category_id"] == 22
     assert data["privacy_status"] == "private"
+
+
+def test_config_parsed_once_until_file_changes(tmp_path: Path, monkeypatch):
+    import src.config_loader as cl
+
+    calls = []
+    real_load = yaml.safe_load
+    monkeypatch.setattr(
+        cl.yaml, "safe_load", lambda text: calls.append(1) or real_load(text)
+    )
+    cfg_path = tmp_path / "video.yaml"
+    cfg_path.write_text(
+        yaml.safe_dump({"video_path": "a.mp4", "title": "t", "seo": {"x": 1}}),
+        encoding="utf-8",
+    )
+
+    for _ in range(50):
+        cfg = load_config(cfg_path)
+        raw = cl.load_raw_config(cfg_path)
+    assert len(calls) == 1
+    # Copies indépendantes: une modification locale ne pollue pas le cache
+    cfg["title"] = "modifié"
+    raw["seo"]["x"] = 2
+    assert load_config(cfg_path)["title"] == "t"
+    assert cl.load_raw_config(cfg_path)["seo"] == {"x": 1}
+
+    # Remplacement atomique (nouvel inode): invalidation
+    tmp = tmp_path / "video.tmp"
+    tmp.write_text(
+        yaml.safe_dump({"video_path": "a.mp4", "title": "nouveau"}), encoding="utf-8"
+    )
+    tmp.replace(cfg_path)
+    assert load_config(cfg_path)["title"] == "nouveau"
+    assert len(calls) == 2
+
+
+def test_raw_view_available_when_normalisation_fails(tmp_path: Path):
+    from src.config_loader import load_raw_config
+
+    cfg_path = tmp_path / "partial.yaml"
+    cfg_path.write_text(yaml.safe_dump({"seo": {"provider": "ollama"}}))
+    with pytest.raises(ConfigError):
+        load_config(cfg_path)
+    assert load_raw_config(cfg_path)["seo"]["provider"] == "ollama"
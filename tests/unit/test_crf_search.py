@@ -0,0 +1,93 @@
+from pathlib import Path
+
+import src.crf_search as cs
+import src.video_enhance as ve
+
+
+def test_sample_starts_spread_over_the_video():
+    assert cs.sample_starts(120.0, 3, 4.0) == [18.0, 58.0, 98.0]
+    assert cs.sample_starts(3.0, 3, 4.0) == [0.0]
+    assert len(cs.sample_starts(9.0, 5, 4.0)) == 2
+
+
+def test_parse_score_reads_filter_summary():
+    ssim = (
+        "[Parsed_ssim_4 @ 0x1] SSIM Y:0.991 (20.4) U:0.99 V:0.99 All:0.990512 (20.23)\n"
+    )
+    psnr = "[Parsed_psnr_4 @ 0x1] PSNR y:44.1 u:47.2 v:47.9 average:45.03 min:40.1 max:49.8\n"
+    assert cs.parse_score("ssim", ssim) == 0.990512
+    assert cs.parse_score("psnr", psnr) == 45.03
+    assert cs.parse_score("ssim", "nothing") is None
+
+
+def test_pick_crf_binary_search_highest_passing():
+    quality = {
+        18: 0.995,
+        20: 0.992,
+        22: 0.989,
+        24: 0.986,
+        26: 0.981,
+        28: 0.975,
+        30: 0.97,
+    }
+    tried = []
+
+    def score(crf):
+        tried.append(crf)
+        return quality[crf]
+
+    crf, value, scores = cs.pick_crf(list(quality), score, 0.985)
+    assert (crf, value) == (24, 0.986)
+    assert len(tried) <= 3
+    # Aucun candidat suffisant: meilleure qualité
+    crf, _, _ = cs.pick_crf([18, 20], lambda c: 0.9, 0.985)
+    assert crf == 18
+
+
+def test_select_crf_is_cached_per_source(monkeypatch, tmp_path):
+    src = tmp_path / "in.mp4"
+    src.write_bytes(b"video")
+    runs = []
+
+    def fake_run(cmd, log, **kw):
+        runs.append(cmd)
+        Path(cmd[-1]).write_bytes(b"sample")
+
+    # Plus le CRF est bas, meilleur le score
+    monkeypatch.setattr(ve, "_run_ffmpeg", fake_run)
+    monkeypatch.setattr(cs, "probe_duration", lambda p: 60.0)
+    monkeypatch.setattr(cs.shutil, "which", lambda name: "/usr/bin/" + name)
+    monkeypatch.setattr(
+        cs,
+        "_score_sample",
+        lambda metric, enc, source, start, length, vf: 1.0 - int(enc.name[3:5]) / 1000,
+    )
+    settings = {"cache_file": str(tmp_path / "crf.json"), "target": 0.975}
+    opts = {"codec": "h264", "scale": "1080p", "preset": "slow"}
+
+    assert cs.select_crf(src, opts, settings) == 24
+    assert runs and all("-crf" in cmd and "-an" in cmd for cmd in runs)
+    assert not list(tmp_path.glob(".crf-*"))
+
+    runs.clear()
+    assert cs.select_crf(src, opts, settings) == 24
+    assert runs == []
+    # Autres réglages: nouvelle recherche
+    assert cs.select_crf(src, dict(opts, scale="720p"), settings) == 24
+    assert runs
+
+
+def test_select_crf_unscored_samples_fall_back_uncached(monkeypatch, tmp_path):
+    src = tmp_path / "in.mp4"
+    src.write_bytes(b"video")
+    monkeypatch.setattr(
+        ve, "_run_ffmpeg", lambda cmd, log, **kw: Path(cmd[-1]).write_bytes(b"x")
+    )
+    monkeypatch.setattr(cs, "probe_duration", lambda p: 60.0)
+    monkeypatch.setattr(cs.shutil, "which", lambda name: "/usr/bin/" + name)
+    # Filtre de notation en échec pour tous les extraits
+    monkeypatch.setattr(cs, "_score_sample", lambda *a: None)
+    settings = {"cache_file": str(tmp_path / "crf.json")}
+
+    assert cs.select_crf(src, {"codec": "hevc"}, settings) == cs.FALLBACK_CRF["hevc"]
+    assert not (tmp_path / "crf.json").exists()
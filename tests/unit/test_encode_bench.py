@@ -0,0 +1,90 @@
+import json
+from pathlib import Path
+
+import src.encode_bench as eb
+import src.video_enhance as ve
+
+
+def _profile():
+    # Décodage 400 fps: 2.5 ms/image; encodeurs et filtres ajoutent leur coût
+    return eb.CalibrationProfile(
+        width=1920,
+        height=1080,
+        decode_fps=400.0,
+        encoders={"h264": {"ultrafast": 200.0, "fast": 80.0, "slow": 25.0}},
+        filters={"denoise": 200.0, "scale": 100.0},
+    )
+
+
+def test_estimate_adds_filter_costs_and_scales_with_pixels():
+    profile = _profile()
+    assert round(profile.estimate_fps("h264", "fast"), 1) == 80.0
+    # 12.5 ms + 2.5 ms (hqdn3d) = 15 ms/image
+    assert round(profile.estimate_fps("h264", "fast", filters=["denoise"]), 1) == 66.7
+    # Sortie 2160p: encodeur et filtres x4, décodage 1080p inchangé
+    fps_4k = profile.estimate_fps("h264", "fast", in_height=1080, out_height=2160)
+    assert round(fps_4k, 1) == round(1 / (0.0025 + 0.01 * 4), 1)
+    assert profile.estimate_fps("hevc", "fast") is None
+
+
+def test_preset_for_deadline_keeps_quality_when_possible():
+    profile = _profile()
+    # 60 s à 30 fps = 1800 images: slow ~72 s, fast ~22.5 s, ultrafast 9 s
+    kwargs = dict(duration=60.0, source_fps=30.0)
+    assert (
+        profile.preset_for_deadline("h264", "slow", budget_seconds=100, **kwargs)
+        == "slow"
+    )
+    assert (
+        profile.preset_for_deadline("h264", "slow", budget_seconds=30, **kwargs)
+        == "fast"
+    )
+    assert (
+        profile.preset_for_deadline("h264", "slow", budget_seconds=1, **kwargs)
+        == "ultrafast"
+    )
+    # Jamais plus lent que la config; preset non mesuré: inchangé
+    assert (
+        profile.preset_for_deadline("h264", "fast", budget_seconds=1e6, **kwargs)
+        == "fast"
+    )
+    assert (
+        profile.preset_for_deadline("h264", "medium", budget_seconds=1, **kwargs)
+        == "medium"
+    )
+
+
+def test_run_bench_measures_decode_filters_and_encoders(monkeypatch, tmp_path):
+    commands = []
+
+    def fake_run(cmd, log, *, label=None, record_speed=True, progress=None):
+        commands.append(cmd)
+        if cmd[-1].endswith(".mp4"):
+            Path(cmd[-1]).write_bytes(b"clip")
+
+    monkeypatch.setattr(eb.shutil, "which", lambda name: "/usr/bin/ffmpeg")
+    monkeypatch.setattr(ve, "_run_ffmpeg", fake_run)
+
+    profile = eb.run_bench(
+        codecs=["h264"],
+        presets=["fast", "slow"],
+        filters=["denoise", "scale"],
+        seconds=1,
+        work_dir=tmp_path,
+    )
+
+    clip, decode, denoise, scale, fast, slow = commands
+    assert "testsrc2=size=1920x1080:rate=30" in clip
+    assert decode[-3:] == ["-f", "null", "-"] and "-vf" not in decode
+    assert denoise[denoise.index("-vf") + 1] == "hqdn3d=1.5:1.5:6:6"
+    assert scale[scale.index("-vf") + 1] == "scale=-2:2160:flags=lanczos"
+    assert fast[fast.index("-preset") + 1] == "fast" and "libx264" in fast
+    assert set(profile.filters) == {"denoise", "scale"}
+    assert set(profile.encoders["h264"]) == {"fast", "slow"}
+    # Clip temporaire supprimé
+    assert list(tmp_path.iterdir()) == []
+
+    path = eb.save_profile(profile, tmp_path / "bench.json")
+    assert json.loads(path.read_text(encoding="utf-8"))["width"] == 1920
+    assert eb.load_profile(path) == profile
+    assert eb.load_profile(tmp_path / "absent.json") is None
@@ -0,0 +1,77 @@
+import json
+import time
+
+from src.encode_progress import (
+    ProgressPublisher,
+    ProgressTracker,
+    format_progress,
+    read_progress,
+)
+
+
+def test_tracker_computes_wall_clock_eta():
+    now = [100.0]
+    tracker = ProgressTracker(600.0, clock=lambda: now[0])
+    now[0] = 160.0  # 60s d'encodage pour 120s de média: x2
+    event = None
+    for line in (
+        "frame=3600",
+        "fps=60.0",
+        "out_time_us=120000000",
+        "speed=2.0x",
+        "progress=continue",
+    ):
+        event = tracker.feed(line + "\n")
+    assert event["percent"] == 20.0
+    assert event["speed"] == 2.0 and event["fps"] == 60.0
+    # 480s de média restantes à x2: 4 minutes réelles
+    assert event["eta_seconds"] == 240.0
+    assert format_progress(event) == "20.0% - x2.00 - 60 fps - fin dans ~4 min"
+
+
+def test_tracker_handles_missing_values():
+    tracker = ProgressTracker()
+    for line in ("frame=0", "fps=0.00", "out_time_us=N/A", "speed=N/A"):
+        assert tracker.feed(line) is None
+    event = tracker.feed("progress=continue")
+    assert event["percent"] is None and event["eta_seconds"] is None
+    assert format_progress(event) == "en cours"
+
+
+def test_publisher_throttles_and_clears(tmp_path):
+    with ProgressPublisher(tmp_path, "task_1.json", interval=60) as pub:
+        pub({"percent": 10.0, "done": False})
+        pub({"percent": 11.0, "done": False})
+        live = read_progress(tmp_path)
+        assert live["task_1.json"]["percent"] == 10.0
+        assert live["task_1.json"]["stage"] == "enhance"
+        pub({"percent": 100.0, "done": True})
+        assert read_progress(tmp_path)["task_1.json"]["percent"] == 100.0
+    assert read_progress(tmp_path) == {}
+
+
+def test_read_progress_ignores_stale_files(tmp_path):
+    (tmp_path / "progress").mkdir()
+    (tmp_path / "progress" / "task_old.json").write_text(
+        json.dumps({"percent": 50.0, "updated_at": time.time() - 3600})
+    )
+    assert read_progress(tmp_path) == {}
+
+
+def test_monitor_exposes_progress(tmp_path):
+    from fastapi.testclient import TestClient
+
+    from src.web_monitor import create_app
+
+    queue_dir, archive_dir = tmp_path / "queue", tmp_path / "queue_archive"
+    (queue_dir / "inflight").mkdir(parents=True)
+    archive_dir.mkdir()
+    (queue_dir / "inflight" / "task_1.json").write_text(
+        json.dumps({"status": "running"})
+    )
+    ProgressPublisher(queue_dir, "task_1.json")({"percent": 42.0, "done": False})
+
+    client = TestClient(create_app(str(queue_dir), str(archive_dir)))
+    assert client.get("/api/progress").json()["task_1.json"]["percent"] == 42.0
+    pending = client.get("/api/tasks/pending").json()
+    assert pending[0]["progress"]["percent"] == 42.0
@@ -0,0 +1,64 @@
+"""Budget de temps d'import des sous-commandes lancées en boucle par start_services."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# Budgets larges (CI lente); sans imports paresseux on dépasse la seconde
+WORKER_BUDGET_MS = 500
+UPLOAD_BUDGET_MS = 800
+# Jamais chargés au démarrage: uniquement par l'étape qui s'en sert
+HEAVY_MODULES = ("openai", "aiohttp", "whisper", "cv2", "google.cloud.vision")
+
+
+def _import_cost(*modules: str):
+    """Coût cumulé (ms) des imports de premier niveau et modules lourds chargés."""
+    code = "; ".join(f"import {m}" for m in modules)
+    code += "; import sys; print(','.join(m for m in %r if m in sys.modules))" % (
+        HEAVY_MODULES,
+    )
+    best = None
+    for _ in range(3):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            timeout=60,
+        )
+        assert proc.returncode == 0, proc.stderr[-2000:]
+        costs = {}
+        for line in proc.stderr.splitlines():
+            parts = line.split("|")
+            # Premier niveau: un seul espace avant le nom du module
+            if len(parts) != 3 or parts[2].startswith("  "):
+                continue
+            try:
+                costs[parts[2].strip()] = int(parts[1])
+            except ValueError:
+                continue  # En-tête
+        total = sum(costs.get(m, 0) for m in modules) / 1000.0
+        if best is None or total < best[0]:
+            best = (total, costs, proc.stdout.strip())
+    return best
+
+
+def _check(modules, budget_ms):
+    total, costs, heavy = _import_cost(*modules)
+    assert heavy == "", f"Modules lourds importés au démarrage: {heavy}"
+    detail = ", ".join(f"{m}={costs.get(m, 0) / 1000:.0f}ms" for m in modules)
+    assert total <= budget_ms, f"Import {total:.0f}ms > budget {budget_ms}ms ({detail})"
+
+
+def test_worker_startup_import_budget():
+    _check(("main", "src.worker"), WORKER_BUDGET_MS)
+
+
+def test_upload_startup_import_budget():
+    pytest.importorskip("googleapiclient")
+    pytest.importorskip("google_auth_oauthlib")
+    _check(("main", "src.auth", "src.uploader"), UPLOAD_BUDGET_MS)
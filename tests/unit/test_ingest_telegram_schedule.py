@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+
+from src import ingest_telegram as tg
+from src import task_estimator
+from src.media_probe import MediaInfo
+from src.stage_metrics import StageMetrics
+from src.task_estimator import TaskFeatures
+
+
+def test_schedule_feasibility_warns_when_time_is_too_close(monkeypatch, tmp_path):
+    queue_dir = tmp_path / "queue"
+    metrics = StageMetrics(queue_dir / "stage_metrics.jsonl")
+    for _ in range(3):
+        metrics.append(
+            "task.json",
+            {"total_seconds": 3600, "stages": {"enhance": 3000, "upload": 600}},
+            features=TaskFeatures(
+                duration=1500.0, height=1080, size_bytes=10**9
+            ).to_dict(),
+        )
+    cfg_path = tmp_path / "video.yaml"
+    cfg_path.write_text("enhance:\n  codec: h264\n  preset: medium\n", encoding="utf-8")
+    monkeypatch.setattr(
+        task_estimator, "probe_media", lambda p: MediaInfo(duration=1500.0, height=1080)
+    )
+    task = {"video_path": str(tmp_path / "clip.mp4"), "status": "pending"}
+
+    soon = datetime.now() + timedelta(minutes=30)
+    note = tg.schedule_feasibility(queue_dir, task, soon, config_path=str(cfg_path))
+    assert note.startswith("⚠️ Préparation estimée: encodage ~50 min, upload ~10 min")
+    later = datetime.now() + timedelta(hours=3)
+    assert (
+        tg.schedule_feasibility(queue_dir, task, later, config_path=str(cfg_path)) == ""
+    )
+
+    note = tg.schedule_feasibility(queue_dir, task, config_path=str(cfg_path))
+    assert "Prochain créneau tenable" in note
+    # Upload direct: seule la durée d'upload compte
+    task["skip_enhance"] = True
+    assert (
+        tg.schedule_feasibility(queue_dir, task, soon, config_path=str(cfg_path)) == ""
+    )
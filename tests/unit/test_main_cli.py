@@ -116,3 +116,84 @@ def test_ai_meta_writes_out_config(monkeypatch, tmp_path: Path):
     assert data["title"] == "Titre Out"
     assert data["video_path"] == "video.mp4"
     assert data["tags"] == ["a", "b"]
+
+
+def test_batch_import_runs_worker_and_writes_report(
+    monkeypatch, capsys, tmp_path: Path
+):
+    import json
+
+    videos = tmp_path / "videos"
+    videos.mkdir()
+    (videos / "clip_a.mp4").write_bytes(b"\x00")
+    (videos / "clip_b.mp4").write_bytes(b"\x00")
+    queue, archive = tmp_path / "queue", tmp_path / "archive"
+    calls = {}
+
+    def fake_process_queue(**kwargs):
+        calls.update(kwargs)
+        Path(kwargs["archive_dir"]).mkdir(exist_ok=True)
+        for p in Path(kwargs["queue_dir"]).glob("task_batch_*.json"):
+            data = json.loads(p.read_text())
+            data["status"] = "done"
+            (Path(kwargs["archive_dir"]) / p.name).write_text(json.dumps(data))
+            p.unlink()
+
+    monkeypatch.setattr(cli, "process_queue", fake_process_queue)
+    report_path = tmp_path / "report.json"
+    rc = cli.main(
+        [
+            "batch-import",
+            str(videos),
+            "--queue-dir",
+            str(queue),
+            "--archive-dir",
+            str(archive),
+            "--concurrency",
+            "3",
+            "--report",
+            str(report_path),
+        ]
+    )
+    assert rc == 0
+    assert calls["concurrency"] == 3
+    report = json.loads(report_path.read_text())
+    assert report["tasks"] == 2 and report["done"] == 2
+    assert "2/2 publiées" in capsys.readouterr().out
+
+
+def test_enhance_bench_writes_profile(monkeypatch, tmp_path: Path, capsys):
+    import src.encode_bench as eb
+
+    calls = {}
+
+    def fake_run_bench(**kwargs):
+        calls.update(kwargs)
+        return eb.CalibrationProfile(
+            width=1280,
+            height=720,
+            decode_fps=500.0,
+            encoders={"hevc": {"fast": 42.0}},
+        )
+
+    monkeypatch.setattr(eb, "run_bench", fake_run_bench)
+    out = tmp_path / "bench.json"
+
+    rc = cli.main(
+        [
+            "enhance-bench",
+            "--output",
+            str(out),
+            "--codecs",
+            "hevc",
+            "--presets",
+            "fast",
+            "--size",
+            "1280x720",
+        ]
+    )
+
+    assert rc == 0
+    assert calls["codecs"] == ["hevc"] and calls["size"] == (1280, 720)
+    assert eb.load_profile(out).encoders == {"hevc": {"fast": 42.0}}
+    assert "hevc  fast" in capsys.readouterr().out
@@ -0,0 +1,46 @@
+from src.media_probe import MediaInfo, has_faststart
+
+
+def test_from_ffprobe_applies_rotation_and_container_bitrate():
+    data = {
+        "format": {
+            "format_name": "matroska,webm",
+            "duration": "12.5",
+            "bit_rate": "5128000",
+        },
+        "streams": [
+            {
+                "codec_type": "video",
+                "codec_name": "h264",
+                "width": 1920,
+                "height": 1080,
+                "avg_frame_rate": "30000/1001",
+                "pix_fmt": "yuv420p",
+                "side_data_list": [{"rotation": -90}],
+            },
+            {"codec_type": "audio", "codec_name": "opus", "bit_rate": "128000"},
+        ],
+    }
+    info = MediaInfo.from_ffprobe(data)
+    assert (info.width, info.height) == (1080, 1920)
+    assert round(info.fps, 2) == 29.97
+    assert info.video_bitrate == 5_000_000
+    assert not info.is_mp4 and not info.interlaced
+
+
+def _atom(kind: bytes, payload: bytes = b"") -> bytes:
+    return (8 + len(payload)).to_bytes(4, "big") + kind + payload
+
+
+def test_has_faststart_reads_top_level_atoms(tmp_path):
+    fast = tmp_path / "fast.mp4"
+    fast.write_bytes(
+        _atom(b"ftyp", b"isom") + _atom(b"moov", b"x") + _atom(b"mdat", b"yy")
+    )
+    slow = tmp_path / "slow.mp4"
+    slow.write_bytes(
+        _atom(b"ftyp", b"isom") + _atom(b"mdat", b"yy") + _atom(b"moov", b"x")
+    )
+    assert has_faststart(fast) is True
+    assert has_faststart(slow) is False
+    assert has_faststart(tmp_path / "missing.mp4") is None
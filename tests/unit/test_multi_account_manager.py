@@ -0,0 +1,55 @@
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from src.multi_account_manager import MultiAccountManager, next_quota_reset
+
+
+def _manager(tmp_path: Path, *ids: str) -> MultiAccountManager:
+    path = tmp_path / "multi_accounts.json"
+    path.write_text(
+        json.dumps(
+            {
+                "accounts": [
+                    {
+                        "account_id": acc,
+                        "name": acc,
+                        "channel_id": "",
+                        "credentials_path": "",
+                        "token_path": "",
+                    }
+                    for acc in ids
+                ],
+                "chat_mappings": {"chat-1": ids[0]},
+            }
+        ),
+        encoding="utf-8",
+    )
+    return MultiAccountManager(path)
+
+
+def test_next_quota_reset_is_pacific_midnight():
+    # 2030-07-01 15:00 UTC = 08:00 PDT -> reset à 07:00 UTC le lendemain
+    now = datetime(2030, 7, 1, 15, tzinfo=timezone.utc)
+    assert next_quota_reset(now) == datetime(2030, 7, 2, 7, tzinfo=timezone.utc)
+    winter = datetime(2030, 1, 1, 15, tzinfo=timezone.utc)
+    assert next_quota_reset(winter) == datetime(2030, 1, 2, 8, tzinfo=timezone.utc)
+
+
+def test_exhausted_account_is_skipped_until_reset(tmp_path: Path):
+    manager = _manager(tmp_path, "acc-a", "acc-b")
+    manager.mark_upload_limit_reached("acc-a")
+
+    # Persisté: un nouveau gestionnaire (autre tâche, autre worker) le voit aussi
+    reloaded = _manager(tmp_path, "acc-a", "acc-b")
+    assert reloaded.is_exhausted("acc-a")
+    assert reloaded.get_chat_account("chat-1").account_id == "acc-b"
+    assert reloaded.get_account_status("acc-a")["can_upload"] is False
+
+    reloaded.mark_upload_limit_reached("acc-b")
+    assert reloaded.get_best_account_for_upload() is None
+    assert reloaded.next_available_at() > datetime.now(timezone.utc)
+
+    past = datetime.now(timezone.utc) - timedelta(minutes=1)
+    reloaded.mark_upload_limit_reached("acc-a", until=past)
+    assert reloaded.get_best_account_for_upload().account_id == "acc-a"
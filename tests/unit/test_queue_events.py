@@ -0,0 +1,63 @@
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src.queue_events import (
+    InotifyEventSource,
+    PollingEventSource,
+    create_event_source,
+    write_json_atomic,
+)
+
+
+def test_write_json_atomic_leaves_no_temp_file(tmp_path: Path):
+    target = tmp_path / "task_001.json"
+    write_json_atomic(target, {"status": "pending"})
+    assert json.loads(target.read_text(encoding="utf-8")) == {"status": "pending"}
+    assert [p.name for p in tmp_path.iterdir()] == ["task_001.json"]
+
+
+def test_polling_source_detects_new_task(tmp_path: Path):
+    src = PollingEventSource([tmp_path], ["task_*.json"], poll_interval=0.01)
+    (tmp_path / "other.json").write_text("{}", encoding="utf-8")
+    write_json_atomic(tmp_path / "task_a.json", {})
+    changed = src.wait(timeout=1.0)
+    assert changed == [tmp_path / "task_a.json"]
+    # Plus rien de neuf: timeout sans événement
+    assert src.wait(timeout=0.05) == []
+
+
+def test_polling_source_wake_unblocks_wait(tmp_path: Path):
+    src = PollingEventSource([tmp_path], ["task_*.json"], poll_interval=0.5)
+    threading.Timer(0.05, src.wake).start()
+    t0 = time.monotonic()
+    assert src.wait(timeout=5.0) == []
+    assert time.monotonic() - t0 < 2.0
+
+
+@pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="inotify: Linux uniquement"
+)
+def test_inotify_source_batches_burst_of_renames(tmp_path: Path):
+    with InotifyEventSource([tmp_path], ["task_*.json", "scheduled_*.json"]) as src:
+        for i in range(5):
+            write_json_atomic(tmp_path / f"task_{i}.json", {"i": i})
+        write_json_atomic(tmp_path / "scheduled_x.json", {})
+        (tmp_path / "prefs_1.json").write_text("{}", encoding="utf-8")
+        changed = src.wait(timeout=2.0)
+        names = sorted(p.name for p in changed)
+        expected = sorted([f"task_{i}.json" for i in range(5)] + ["scheduled_x.json"])
+        assert names == expected
+        assert src.wait(timeout=0.05) == []
+
+
+def test_create_event_source_polling_backend(tmp_path: Path):
+    src = create_event_source([tmp_path], backend="polling", poll_interval=0.01)
+    try:
+        assert isinstance(src, PollingEventSource)
+    finally:
+        src.close()
@@ -0,0 +1,125 @@
+import threading
+import time
+
+import src.resource_governor as rg
+
+
+def _wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def _start(governor, threads, priority, started, release):
+    def run():
+        with governor.acquire(threads, priority=priority, label=priority):
+            started.append(priority)
+            release.wait(5)
+
+    t = threading.Thread(target=run)
+    t.start()
+    return t
+
+
+def test_jobs_wait_for_budget_in_priority_order():
+    governor = rg.ResourceGovernor(4)
+    started = []
+    release = threading.Event()
+    blocker = threading.Event()
+
+    with governor.acquire(4, label="encode") as lease:
+        assert lease.threads == 4 and governor.in_use == 4
+        low = _start(governor, 2, "low", started, release)
+        _wait_until(lambda: governor.snapshot()["waiting"] == 1)
+        high = _start(governor, 2, "high", started, blocker)
+        _wait_until(lambda: governor.snapshot()["waiting"] == 2)
+        assert started == []
+
+    # Budget libéré: le job prioritaire passe devant, l'autre tient à côté
+    _wait_until(lambda: len(started) == 2)
+    assert started == ["high", "low"]
+    assert governor.in_use == 4
+    release.set()
+    blocker.set()
+    low.join()
+    high.join()
+    assert governor.in_use == 0
+
+
+def test_nested_acquire_reuses_lease():
+    governor = rg.ResourceGovernor(8, job_threads=2)
+    with governor.acquire(3) as outer:
+        with governor.acquire() as inner:
+            assert inner is outer
+        assert governor.in_use == 3
+    with governor.acquire() as lease:
+        assert lease.threads == 2
+    assert rg.current_lease() is None
+
+
+def test_ffmpeg_command_limits_threads_and_renices(monkeypatch):
+    monkeypatch.setattr(rg.shutil, "which", lambda name: "/usr/bin/" + name)
+    cmd = [
+        "ffmpeg",
+        "-progress",
+        "pipe:1",
+        "-i",
+        "in.mp4",
+        "-c:v",
+        "libx264",
+        "out.mp4",
+    ]
+
+    plain = rg.Lease(3, priority=1).ffmpeg_command(cmd)
+    assert plain == [
+        "ffmpeg",
+        "-progress",
+        "pipe:1",
+        "-filter_threads",
+        "3",
+        "-filter_complex_threads",
+        "3",
+        "-i",
+        "in.mp4",
+        "-c:v",
+        "libx264",
+        "-threads",
+        "3",
+        "out.mp4",
+    ]
+
+    low = rg.Lease(2, priority=2, renice=True)
+    assert low.ffmpeg_command(cmd)[:6] == ["ionice", "-c", "3", "nice", "-n", "19"]
+    normal = rg.Lease(4, priority=1, renice=True)
+    assert normal.whisper_command(["whisper", "a.wav"]) == [
+        "ionice",
+        "-c",
+        "2",
+        "-n",
+        "7",
+        "nice",
+        "-n",
+        "10",
+        "whisper",
+        "a.wav",
+        "--threads",
+        "4",
+    ]
+
+
+def test_worker_settings_share_budget_between_cpu_slots():
+    governor = rg.governor_from_settings({"cpu_threads": 12}, cpu_slots=3)
+    assert (governor.total, governor.job_threads, governor.renice) == (12, 4, True)
+    governor = rg.governor_from_settings(
+        {"cpu_threads": 4, "job_threads": 16, "nice": False}
+    )
+    assert (governor.job_threads, governor.renice) == (4, False)
+
+
+def test_job_priority_is_thread_local():
+    governor = rg.ResourceGovernor(2)
+    with rg.job_priority("high"):
+        with governor.acquire() as lease:
+            assert lease.priority == 0
+    assert rg.current_priority() == "normal"
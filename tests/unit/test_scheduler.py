@@ -43,3 +43,45 @@ def test_schedule_and_ready_tasks(tmp_path: Path):
     assert any(t.task_id == st.task_id for t in ready_list)
     # persist updated status
     assert us.schedule_file.exists()
+
+
+def test_scheduled_worker_waits_until_next_due_task(tmp_path):
+    from datetime import datetime
+
+    from src.scheduled_worker import ScheduledWorker
+
+    sw = ScheduledWorker(
+        schedule_dir=tmp_path / "schedule",
+        queue_dir=tmp_path / "queue",
+        archive_dir=tmp_path / "archive",
+        check_interval=60,
+    )
+    now = datetime.now(sw.scheduler.timezone)
+    assert sw._next_wait(now) == 60.0
+
+    task_file = tmp_path / "task.json"
+    task_file.write_text("{}", encoding="utf-8")
+    sw.scheduler.schedule_task(task_file, scheduled_time=now + timedelta(seconds=5))
+    assert 0.0 < sw._next_wait(now) <= 5.0
+
+
+def test_lead_time_picks_feasible_slot_and_releases_early(tmp_path: Path):
+    from src.scheduler import ScheduledTask
+
+    us = UploadScheduler(
+        config_path=tmp_path / "video.yaml",
+        schedule_dir=tmp_path / "schedule",
+    )
+    now = us.find_next_optimal_slot() - timedelta(hours=2)
+    lead = timedelta(hours=30)
+
+    slot = us.find_next_optimal_slot(from_time=now, lead_time=lead)
+    assert slot > now + lead
+
+    task_file = tmp_path / "task_001.json"
+    task_file.write_text("{}", encoding="utf-8")
+    st = us.schedule_task(task_file, scheduled_time=slot, lead_time=lead)
+    assert st.release_time == slot - lead
+    assert us.get_ready_tasks(current_time=slot - lead - timedelta(minutes=1)) == []
+    assert us.get_ready_tasks(current_time=slot - lead)[0].task_id == st.task_id
+    assert ScheduledTask.from_dict(st.to_dict()).lead_seconds == lead.total_seconds()
@@ -0,0 +1,79 @@
+import threading
+
+from src.stage_metrics import StageMetrics, TaskTimings, percentile, span
+from src.worker_pool import StageLimits
+
+
+def test_spans_recorded_per_stage_and_nested():
+    timings = TaskTimings()
+    limits = StageLimits(cpu_slots=1, io_slots=2)
+
+    with limits.stage("ai_meta", timings):
+        with span("ai_meta.ollama_title"):
+            pass
+        with span("ai_meta.ollama_tags"):
+            pass
+    with limits.stage("upload", timings):
+        pass
+    # Hors tâche: no-op
+    with span("orphan"):
+        pass
+
+    block = timings.to_dict()
+    names = [s["stage"] for s in block["spans"]]
+    assert names[0] == "ai_meta" and "orphan" not in names
+    assert set(block["stages"]) == {
+        "ai_meta",
+        "ai_meta.ollama_title",
+        "ai_meta.ollama_tags",
+        "upload",
+    }
+    assert limits.stats.calls == {"ai_meta": 1, "upload": 1}
+
+
+def test_nested_span_stays_in_its_thread():
+    timings = TaskTimings()
+    seen = []
+
+    def _other():
+        with span("elsewhere"):
+            seen.append(True)
+
+    with timings.span("enhance"):
+        t = threading.Thread(target=_other)
+        t.start()
+        t.join()
+    assert seen and set(timings.totals()) == {"enhance"}
+
+
+def test_rolling_percentiles_and_compaction(tmp_path):
+    metrics = StageMetrics(tmp_path / "stage_metrics.jsonl", window=10)
+    for i in range(1, 31):
+        metrics.append(
+            f"task_{i}.json",
+            {"total_seconds": i * 2.0, "stages": {"enhance": float(i)}},
+        )
+
+    lines = (tmp_path / "stage_metrics.jsonl").read_text().splitlines()
+    assert len(lines) <= 20
+    stats = metrics.percentiles(10)
+    assert stats["enhance"] == {"count": 10, "p50": 25.0, "p95": 30.0}
+    assert stats["total"]["p95"] == 60.0
+    assert percentile([], 50) == 0.0
+
+
+def test_compaction_rereads_only_past_size_threshold(tmp_path, monkeypatch):
+    metrics = StageMetrics(tmp_path / "stage_metrics.jsonl", window=10)
+    reads = []
+    read = metrics._read
+    monkeypatch.setattr(metrics, "_read", lambda: reads.append(1) or read())
+    for i in range(100):
+        metrics.append(f"task_{i:03d}.json", {"stages": {"upload": 1.0}})
+
+    # Relectures à chaque doublement estimé de la taille, pas à chaque ajout
+    assert len(reads) < 20
+    assert len(metrics.recent()) == 10
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "stage_metrics.jsonl",
+        "stage_metrics.jsonl.lock",
+    ]
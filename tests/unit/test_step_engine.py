@@ -0,0 +1,212 @@
+import threading
+import time
+
+import pytest
+
+from src.step_engine import (
+    RetryPolicy,
+    Step,
+    StepAbort,
+    StepEngine,
+    StepFailed,
+    StepGraph,
+)
+
+
+def _graph(calls, fail_upload=False):
+    def enhance(run, inputs):
+        calls.append("enhance")
+        return {"video": inputs["source"] + ".enh"}
+
+    def meta(run, inputs):
+        calls.append("meta")
+        return {"title": "T"}
+
+    def upload(run, inputs):
+        calls.append("upload")
+        if fail_upload:
+            raise RuntimeError("network down")
+        return {"youtube_id": f"{inputs['title']}:{inputs['video']}"}
+
+    return StepGraph(
+        [
+            Step("enhance", enhance, inputs=("source",), outputs=("video",)),
+            Step("meta", meta, inputs=("source",), outputs=("title",)),
+            Step(
+                "upload",
+                upload,
+                inputs=("video", "title"),
+                outputs=("youtube_id",),
+            ),
+        ],
+        initial=("source",),
+    )
+
+
+def test_engine_resumes_at_first_incomplete_step():
+    task: dict = {}
+    saves = []
+    calls: list = []
+    engine = StepEngine(_graph(calls, fail_upload=True), task, lambda: saves.append(1))
+    with pytest.raises(StepFailed):
+        engine.run(None, {"source": "v.mp4"})
+    assert calls == ["enhance", "meta", "upload"]
+    assert task["steps_state"]["enhance"]["status"] == "done"
+    assert task["steps_state"]["upload"]["status"] == "failed"
+    assert saves
+
+    calls.clear()
+    engine = StepEngine(_graph(calls), task, lambda: None)
+    values = engine.run(None, {"source": "v.mp4"})
+    assert calls == ["upload"]
+    assert values["youtube_id"] == "T:v.mp4.enh"
+
+
+def test_engine_retries_then_uses_fallback():
+    attempts = []
+    delays = []
+
+    def flaky(run, inputs):
+        attempts.append(1)
+        raise RuntimeError("boom")
+
+    graph = StepGraph(
+        [
+            Step(
+                "ai",
+                flaky,
+                outputs=("title",),
+                retry=RetryPolicy(max_attempts=3, backoff_seconds=1.0),
+                fallback=lambda run, inputs, err: {"title": "défaut"},
+            )
+        ]
+    )
+    task: dict = {}
+    values = StepEngine(graph, task, lambda: None, sleep=delays.append).run(None)
+    assert values == {"title": "défaut"}
+    assert len(attempts) == 3
+    assert delays == [1.0, 2.0]
+    assert task["steps_state"]["ai"]["status"] == "fallback"
+
+
+def test_engine_abort_propagates_without_retry():
+    calls = []
+
+    def abort(run, inputs):
+        calls.append(1)
+        raise StepAbort("limite", stop_worker=True)
+
+    graph = StepGraph(
+        [Step("upload", abort, outputs=("id",), retry=RetryPolicy(max_attempts=5))]
+    )
+    with pytest.raises(StepAbort) as exc:
+        StepEngine(graph, {}, lambda: None).run(None)
+    assert exc.value.stop_worker
+    assert calls == [1]
+
+
+def test_engine_checkpoint_invalidated_by_cache_key():
+    calls: list = []
+    key = {"v": "a"}
+
+    def step(run, inputs):
+        calls.append(1)
+        return {"out": key["v"]}
+
+    graph = StepGraph(
+        [Step("s", step, outputs=("out",), cache_key=lambda run: key["v"])]
+    )
+    task: dict = {}
+    StepEngine(graph, task, lambda: None).run(None)
+    StepEngine(graph, task, lambda: None).run(None)
+    assert len(calls) == 1
+    key["v"] = "b"
+    assert StepEngine(graph, task, lambda: None).run(None) == {"out": "b"}
+    assert len(calls) == 2
+
+
+def test_engine_runs_independent_steps_concurrently():
+    barrier = threading.Barrier(2, timeout=2)
+
+    def a(run, inputs):
+        barrier.wait()
+        return {"a": 1}
+
+    def b(run, inputs):
+        barrier.wait()
+        return {"b": 2}
+
+    def c(run, inputs):
+        return {"c": inputs["a"] + inputs["b"]}
+
+    graph = StepGraph(
+        [
+            Step("a", a, outputs=("a",)),
+            Step("b", b, outputs=("b",)),
+            Step("c", c, inputs=("a", "b"), outputs=("c",)),
+        ]
+    )
+    t0 = time.monotonic()
+    values = StepEngine(graph, {}, lambda: None, max_parallel=2).run(None)
+    assert values["c"] == 3
+    assert time.monotonic() - t0 < 2
+
+
+def test_graph_rejects_unknown_input_and_bad_order():
+    with pytest.raises(ValueError):
+        StepGraph([Step("x", lambda r, i: {}, inputs=("missing",))])
+    with pytest.raises(ValueError):
+        StepGraph(
+            [
+                Step("b", lambda r, i: {}, inputs=("a",), outputs=("b",)),
+                Step("a", lambda r, i: {"a": 1}, outputs=("a",)),
+            ]
+        )
+
+
+def test_step_added_later_does_not_invalidate_done_checkpoint():
+    calls: list = []
+    task: dict = {}
+    StepEngine(_graph(calls), task, lambda: None).run(None, {"source": "v.mp4"})
+    # Ancien checkpoint: l'étape "meta" n'existait pas encore
+    del task["steps_state"]["meta"]
+
+    calls.clear()
+    values = StepEngine(_graph(calls), task, lambda: None).run(
+        None, {"source": "v.mp4"}
+    )
+    assert calls == ["meta"]
+    assert values["youtube_id"] == "T:v.mp4.enh"
+
+
+def test_terminal_checkpoint_survives_upstream_rerun():
+    calls: list = []
+    key = {"v": "a"}
+
+    def enhance(run, inputs):
+        calls.append("enhance")
+        return {"video": key["v"]}
+
+    def upload(run, inputs):
+        calls.append("upload")
+        return {"youtube_id": "vid_" + inputs["video"]}
+
+    graph = StepGraph(
+        [
+            Step("enhance", enhance, outputs=("video",), cache_key=lambda r: key["v"]),
+            Step(
+                "upload",
+                upload,
+                inputs=("video",),
+                outputs=("youtube_id",),
+                terminal=lambda outputs: bool(outputs.get("youtube_id")),
+            ),
+        ]
+    )
+    task: dict = {}
+    StepEngine(graph, task, lambda: None).run(None)
+    # Config modifiée: l'amont est rejoué, la vidéo publiée reste acquise
+    key["v"] = "b"
+    values = StepEngine(graph, task, lambda: None).run(None)
+    assert calls == ["enhance", "upload", "enhance"]
+    assert values["youtube_id"] == "vid_a"
@@ -0,0 +1,72 @@
+from src.encode_bench import CalibrationProfile
+from src.media_probe import MediaInfo
+from src.stage_metrics import StageMetrics
+from src.task_estimator import TaskEstimator, TaskFeatures, features_for
+
+
+def _record(metrics, enhance, upload, ok=True, **features):
+    base = dict(duration=600.0, height=1080, codec="h264", preset="medium")
+    base.update(features)
+    metrics.append(
+        "task.json",
+        {
+            "total_seconds": enhance + upload,
+            "stages": {"enhance": enhance, "upload": upload},
+        },
+        ok=ok,
+        features=TaskFeatures(**base).to_dict(),
+    )
+
+
+def test_encode_uses_closest_history_group(tmp_path):
+    metrics = StageMetrics(tmp_path / "stage_metrics.jsonl")
+    # h264/medium: 1 s de calcul par seconde de média 1080p; hevc 3 fois plus lent
+    for _ in range(3):
+        _record(metrics, 600.0, 60.0, size_bytes=600_000_000)
+        _record(metrics, 1800.0, 60.0, codec="hevc", size_bytes=600_000_000)
+        # Tâches en échec ignorées
+        _record(metrics, 9999.0, 60.0, ok=False)
+    estimator = TaskEstimator(metrics.recent)
+
+    # 720p: coût proportionnel aux pixels
+    est = estimator.estimate(TaskFeatures(duration=300.0, height=720))
+    assert est.basis == "historique h264/medium"
+    assert round(est.encode_seconds) == round(300 * (720 / 1080) ** 2)
+    # Taille prévue au prorata, débit médian 10 Mo/s
+    assert round(est.upload_seconds) == round(30 * (720 / 1080) ** 2)
+
+    est = estimator.estimate(TaskFeatures(duration=600.0, codec="hevc", preset="fast"))
+    assert (est.basis, est.encode_seconds) == ("historique hevc", 1800.0)
+    # Sans encodage: upload seul, taille connue
+    est = estimator.estimate(
+        TaskFeatures(duration=600.0, size_bytes=100_000_000, encode=False)
+    )
+    assert (est.encode_seconds, est.upload_seconds) == (0.0, 10.0)
+
+
+def test_encode_falls_back_to_host_calibration(tmp_path):
+    profile = CalibrationProfile(
+        width=1920, height=1080, decode_fps=600.0, encoders={"h264": {"fast": 60.0}}
+    )
+    empty = StageMetrics(tmp_path / "stage_metrics.jsonl")
+    features = features_for(
+        MediaInfo(duration=120.0, height=1080, fps=30.0),
+        {"codec": "h264", "preset": "fast"},
+    )
+    assert TaskEstimator(empty.recent).estimate(features) is None
+
+    est = TaskEstimator(empty.recent, profile).estimate(features)
+    assert est.basis == "calibration de l'hôte"
+    assert est.encode_seconds == 60.0  # 3600 images à 60 fps
+    assert est.upload_seconds is None and est.total_seconds == 60.0
+
+
+def test_features_follow_enhance_settings():
+    info = MediaInfo(duration=60.0, height=720)
+    features = features_for(
+        info, {"codec": "hevc", "scale": "1080p", "denoise": True, "preset": "slow"}
+    )
+    assert (features.out_height, features.filters) == (1080, ["denoise", "scale"])
+    assert features_for(info, {"enabled": False}).encode is False
+    assert features_for(info, None).encode is False
+    assert features_for(MediaInfo(duration=None), {}) is None
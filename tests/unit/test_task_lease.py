@@ -0,0 +1,91 @@
+import json
+import os
+import time
+from pathlib import Path
+
+from src.task_lease import LeaseManager, locate_task
+
+
+def _task(queue_dir: Path, name: str = "task_001.json") -> Path:
+    queue_dir.mkdir(parents=True, exist_ok=True)
+    p = queue_dir / name
+    p.write_text(json.dumps({"status": "pending"}), encoding="utf-8")
+    return p
+
+
+def test_claim_is_exclusive_and_release_requeues(tmp_path: Path):
+    task = _task(tmp_path)
+    a = LeaseManager(tmp_path, owner="host-a")
+    b = LeaseManager(tmp_path, owner="host-b")
+
+    lease = a.claim(task)
+    assert lease is not None
+    assert not task.exists() and lease.task_path.exists()
+    assert locate_task(task) == lease.task_path
+    assert b.claim(task) is None
+    assert a.owns(lease) and not b.owns(lease)
+
+    a.release(lease)
+    assert task.exists()
+    assert not lease.lease_path.exists()
+
+
+def test_release_after_archive_only_drops_lease(tmp_path: Path):
+    task = _task(tmp_path)
+    mgr = LeaseManager(tmp_path, owner="w")
+    lease = mgr.claim(task)
+    lease.task_path.rename(tmp_path / "archived.json")
+
+    mgr.release(lease)
+    assert not task.exists()
+    assert not lease.lease_path.exists()
+
+
+def test_expired_lease_is_reclaimed_by_another_worker(tmp_path: Path):
+    task = _task(tmp_path)
+    dead = LeaseManager(tmp_path, owner="dead", ttl=5)
+    lease = dead.claim(task)
+    old = time.time() - 60
+    os.utime(lease.lease_path, (old, old))
+
+    other = LeaseManager(tmp_path, owner="alive", ttl=5)
+    assert other.reclaim_expired() == [task]
+    assert task.exists()
+    # L'ancien propriétaire ne doit plus rien publier ni remettre en file
+    assert not dead.owns(lease)
+    assert other.claim(task) is not None
+
+
+def test_fresh_lease_is_not_reclaimed(tmp_path: Path):
+    task = _task(tmp_path)
+    LeaseManager(tmp_path, owner="busy", ttl=60).claim(task)
+    assert LeaseManager(tmp_path, owner="other", ttl=60).reclaim_expired() == []
+    assert not task.exists()
+
+
+def test_heartbeat_never_refreshes_a_lease_taken_over(tmp_path: Path):
+    task = _task(tmp_path)
+    dead = LeaseManager(tmp_path, owner="dead", ttl=5)
+    lease = dead.claim(task)
+    old = time.time() - 60
+    os.utime(lease.lease_path, (old, old))
+    other = LeaseManager(tmp_path, owner="alive", ttl=5)
+    other.reclaim_expired()
+    taken = other.claim(task)
+    os.utime(taken.lease_path, (old, old))
+
+    assert dead.heartbeat() == [lease]
+    # Le bail de l'autre worker n'est pas prolongé et n'est plus suivi ici
+    assert taken.lease_path.stat().st_mtime == old
+    assert dead.heartbeat() == []
+    assert not dead.owns(lease)
+
+
+def test_heartbeat_refreshes_owned_leases(tmp_path: Path):
+    mgr = LeaseManager(tmp_path, owner="w", ttl=5)
+    lease = mgr.claim(_task(tmp_path))
+    old = time.time() - 60
+    os.utime(lease.lease_path, (old, old))
+
+    assert mgr.heartbeat() == []
+    assert lease.lease_path.stat().st_mtime > old
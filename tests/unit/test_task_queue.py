@@ -0,0 +1,81 @@
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+from src.task_queue import TaskQueue, task_deadline
+
+
+def _task(queue_dir: Path, name: str, **fields) -> Path:
+    p = queue_dir / name
+    p.write_text(json.dumps({"status": "pending", **fields}), encoding="utf-8")
+    return p
+
+
+def test_priority_then_earliest_deadline(tmp_path: Path):
+    _task(tmp_path, "task_001.json", priority="low")
+    _task(tmp_path, "task_002.json")
+    _task(tmp_path, "task_003.json", publish_at="2030-01-02T10:00:00Z")
+    _task(tmp_path, "task_004.json", custom_schedule_time="2030-01-01T10:00:00")
+    _task(tmp_path, "scheduled_005.json", priority="high")
+    _task(tmp_path, "task_006.json", status="awaiting_confirm")
+
+    q = TaskQueue()
+    q.scan(tmp_path)
+    assert [p.name for p in q.drain()] == [
+        "scheduled_005.json",
+        "task_004.json",
+        "task_003.json",
+        "task_002.json",
+        "task_001.json",
+    ]
+
+
+def test_incremental_updates_reorder_and_drop(tmp_path: Path):
+    a = _task(tmp_path, "task_a.json")
+    b = _task(tmp_path, "task_b.json")
+    q = TaskQueue()
+    q.scan(tmp_path)
+
+    # b devient urgente, a est confirmée puis annulée
+    _task(tmp_path, "task_b.json", priority="high")
+    q.push(b)
+    _task(tmp_path, "task_a.json", status="cancelled")
+    q.push(a)
+    c = _task(tmp_path, "task_c.json", deadline="2030-01-01T00:00:00Z")
+    q.push(c)
+
+    assert len(q) == 2
+    assert q.pop() == b
+    assert q.pop() == c
+    assert q.pop() is None
+
+
+def test_deadline_from_meta_publish_at():
+    assert task_deadline({"meta": {"publish_at": "2030-01-01T00:00:00Z"}}) == 1893456000
+    assert task_deadline({"publish_at": "not a date"}) is None
+
+
+def test_blocked_task_waits_for_retry_after(tmp_path: Path):
+    blocked = _task(
+        tmp_path,
+        "task_001.json",
+        status="blocked",
+        retry_after="2030-01-01T08:00:00+00:00",
+    )
+    _task(tmp_path, "task_002.json", status="blocked")  # sans retry_after: jamais
+
+    q = TaskQueue()
+    q.scan(tmp_path)
+    assert len(q) == 0
+    assert q.counts_by_status() == {"blocked": 1}
+
+    reset = datetime(2030, 1, 1, 8, tzinfo=timezone.utc).timestamp()
+    assert q.release_due(now=reset - 1) == 0
+    # Le worker a réessayé plus tôt que prévu (ex: édition manuelle de la tâche)
+    blocked.write_text(
+        json.dumps({"status": "blocked", "retry_after": "2000-01-01T00:00:00Z"}),
+        encoding="utf-8",
+    )
+    q.defer(blocked)
+    assert q.release_due() == 1
+    assert q.pop() == blocked
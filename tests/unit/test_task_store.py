@@ -0,0 +1,147 @@
+import json
+import threading
+from pathlib import Path
+
+from src.task_store import (
+    FileTaskStore,
+    SqliteTaskStore,
+    migrate_directories,
+    open_history_store,
+    open_task_store,
+)
+
+
+def _write(path: Path, data: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def test_sqlite_store_filters_and_orders(tmp_path):
+    store = SqliteTaskStore(tmp_path / "tasks.db")
+    store.put(
+        "archive",
+        "task_1.json",
+        {"status": "done", "chat_id": 1, "received_at": "2025-01-01T00:00:00"},
+    )
+    store.put(
+        "archive",
+        "task_2.json",
+        {"status": "error", "chat_id": 2, "received_at": "2025-01-03T00:00:00"},
+    )
+    store.put(
+        "queue",
+        "task_3.json",
+        {
+            "status": "pending",
+            "chat_id": 1,
+            "upload_account_id": "acc",
+            "received_at": "2025-01-02T00:00:00",
+        },
+    )
+
+    assert store.db_path.exists()
+    mode = store._conn().execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode.lower() == "wal"
+
+    archived = store.list_tasks("archive")
+    assert [t["file_name"] for t in archived] == ["task_2.json", "task_1.json"]
+    assert [t["file_name"] for t in store.list_tasks(chat_id=1)] == [
+        "task_3.json",
+        "task_1.json",
+    ]
+    assert store.list_tasks(account="acc")[0]["location"] == "queue"
+    assert len(store.list_tasks(limit=1)) == 1
+    assert store.count_by_status() == {"done": 1, "error": 1, "pending": 1}
+
+    # Mise à jour: la tâche passe en archive
+    store.record(
+        "archive",
+        "task_3.json",
+        {"status": "done", "received_at": "2025-01-02T00:00:00"},
+    )
+    assert store.count_by_status("archive") == {"done": 2, "error": 1}
+    store.delete("task_1.json")
+    assert store.get("task_1.json") is None
+
+
+def test_sqlite_store_usable_from_threads(tmp_path):
+    store = SqliteTaskStore(tmp_path / "tasks.db")
+
+    def _writer(i):
+        for j in range(20):
+            store.record("archive", f"task_{i}_{j}.json", {"status": "done"})
+
+    threads = [threading.Thread(target=_writer, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert store.count_by_status("archive") == {"done": 80}
+
+
+def test_migration_imports_queue_and_archive(tmp_path):
+    qdir, adir = tmp_path / "queue", tmp_path / "queue_archive"
+    _write(qdir / "task_1.json", {"status": "pending", "received_at": "2025-01-01"})
+    _write(adir / "task_2.json", {"status": "done", "received_at": "2025-01-02"})
+    _write(adir / "scheduled_3.json", {"status": "scheduled"})
+    (adir / "task_bad.json").write_text("{", encoding="utf-8")
+
+    store = SqliteTaskStore(tmp_path / "tasks.db")
+    counts = migrate_directories(qdir, adir, store)
+    assert counts == {"queue": 1, "archive": 2, "errors": 1}
+    # Idempotent
+    migrate_directories(qdir, adir, store)
+    assert len(store.list_tasks()) == 3
+
+    files = FileTaskStore(qdir, adir)
+    assert [t["file_name"] for t in files.list_tasks("archive", status="done")] == [
+        "task_2.json"
+    ]
+
+
+def test_open_task_store_defaults_to_files(tmp_path):
+    assert isinstance(
+        open_task_store(None, tmp_path / "q", tmp_path / "a"), FileTaskStore
+    )
+    store = open_task_store({"backend": "sqlite"}, tmp_path / "q", tmp_path / "a")
+    assert isinstance(store, SqliteTaskStore)
+    assert store.db_path == tmp_path / "q" / "tasks.db"
+
+
+def test_history_store_shared_config(tmp_path):
+    from src import worker
+    from src.web_monitor import create_app
+
+    cfg = tmp_path / "video.yaml"
+    cfg.write_text("task_store:\n  backend: files\n", encoding="utf-8")
+    assert open_history_store(cfg, tmp_path / "q") is None
+    assert open_history_store(tmp_path / "absent.yaml", tmp_path / "q") is None
+
+    db = tmp_path / "hist.db"
+    cfg = tmp_path / "sqlite.yaml"
+    cfg.write_text(f"task_store:\n  backend: sqlite\n  path: {db}\n", encoding="utf-8")
+    # Worker et monitor lisent la même base depuis la même config
+    store = worker._task_store_for(cfg, tmp_path / "q", tmp_path / "a")
+    app = create_app(str(tmp_path / "q"), str(tmp_path / "a"), config_path=str(cfg))
+    assert store.db_path == app.state.task_store.db_path == db
+
+
+def test_worker_records_final_location(tmp_path):
+    import types
+
+    from src import worker
+
+    qdir, adir = tmp_path / "queue", tmp_path / "queue_archive"
+    _write(adir / "task_1.json", {"status": "done", "youtube_id": "yt"})
+    _write(qdir / "task_2.json", {"status": "error"})
+    ctx = types.SimpleNamespace(
+        qdir=qdir, adir=adir, store=SqliteTaskStore(tmp_path / "tasks.db")
+    )
+
+    worker._record_task_state(ctx, "task_1.json")
+    worker._record_task_state(ctx, "task_2.json")
+    worker._record_task_state(ctx, "task_missing.json")
+    assert ctx.store.list_tasks("archive")[0]["youtube_id"] == "yt"
+    assert (
+        ctx.store.list_tasks("queue", status="error")[0]["file_name"] == "task_2.json"
+    )
@@ -19,3 +19,197 @@ def test_parse_scale_arg_invalid():
 def test_default_bitrate_for_height():
     assert _default_bitrate_for_height(720, "h264").endswith("M")
     assert _default_bitrate_for_height(1080, "hevc").endswith("M")
+
+
+def _phone_info(**overrides):
+    from src.media_probe import MediaInfo
+
+    fields = dict(
+        format_name="mov,mp4,m4a,3gp,3g2,mj2",
+        video_codec="h264",
+        width=1920,
+        height=1080,
+        fps=30.0,
+        video_bitrate=9_000_000,
+        pix_fmt="yuv420p",
+        field_order="progressive",
+        audio_codec="aac",
+        faststart=True,
+    )
+    fields.update(overrides)
+    return MediaInfo(**fields)
+
+
+def test_plan_encode_skips_conforming_source():
+    from src.video_enhance import plan_encode
+
+    plan = plan_encode(_phone_info(), scale="1080p", fps=30, reencode_audio=True)
+    assert plan.action == "skip"
+    # Un filtre demandé n'est jamais abandonné: réencodage vidéo
+    plan = plan_encode(_phone_info(), filters=["sharpen"])
+    assert (plan.action, plan.encode_video) == ("encode", True)
+    assert plan.reasons == ["filtres demandés: sharpen"]
+
+
+def test_plan_encode_remux_and_partial_encode():
+    from src.video_enhance import plan_encode
+
+    assert plan_encode(_phone_info(faststart=False)).action == "remux"
+    assert plan_encode(_phone_info(format_name="matroska,webm")).action == "remux"
+
+    plan = plan_encode(_phone_info(audio_codec="opus"), reencode_audio=True)
+    assert (plan.action, plan.encode_video, plan.encode_audio) == (
+        "encode",
+        False,
+        True,
+    )
+
+    plan = plan_encode(_phone_info(video_bitrate=40_000_000, height=1080))
+    assert (plan.encode_video, plan.encode_audio) == (True, False)
+    assert "débit" in plan.reasons[0]
+
+
+def test_plan_encode_checks_loudness_only_when_requested():
+    from src.video_enhance import plan_encode
+
+    calls = []
+
+    def measure():
+        calls.append(1)
+        return (-16.0, -0.5)
+
+    assert plan_encode(_phone_info(), measure_loudness=measure).action == "skip"
+    assert calls == []
+    plan = plan_encode(_phone_info(), loudnorm=True, measure_loudness=measure)
+    assert plan.encode_audio and not plan.encode_video
+    ok = plan_encode(
+        _phone_info(), loudnorm=True, measure_loudness=lambda: (-23.4, -3.0)
+    )
+    assert ok.action == "skip"
+
+
+def test_enhance_video_fast_path_copies_video(monkeypatch, tmp_path):
+    import src.media_probe as mp
+    import src.video_enhance as ve
+
+    commands = []
+    monkeypatch.setattr(ve.shutil, "which", lambda name: "/usr/bin/" + name)
+    monkeypatch.setattr(ve, "_run_ffmpeg", lambda cmd, log, **kw: commands.append(cmd))
+    inp = tmp_path / "in.mp4"
+    inp.write_bytes(b"src")
+    out = tmp_path / "out.mp4"
+
+    monkeypatch.setattr(mp, "probe_media", lambda p: _phone_info())
+    report = {}
+    assert (
+        ve.enhance_video(input_path=inp, output_path=out, fast_path=True, report=report)
+        == inp.resolve()
+    )
+    assert commands == [] and report == {"path": "skip"}
+
+    monkeypatch.setattr(mp, "probe_media", lambda p: _phone_info(audio_codec="opus"))
+    ve.enhance_video(
+        input_path=inp,
+        output_path=out,
+        fast_path=True,
+        reencode_audio=True,
+        report=report,
+    )
+    cmd = commands[-1]
+    assert cmd[cmd.index("-c:v") + 1] == "copy"
+    assert "-vf" not in cmd and cmd[cmd.index("-c:a") + 1] == "aac"
+    assert report == {"path": "audio"}
+
+    ve.enhance_video(input_path=inp, output_path=out, fast_path=True, sharpen=True)
+    assert "unsharp" in commands[-1][commands[-1].index("-vf") + 1]
+
+    monkeypatch.setattr(mp, "probe_media", lambda p: None)
+    ve.enhance_video(input_path=inp, output_path=out, fast_path=True, report=report)
+    assert "libx264" in commands[-1]
+    assert report == {"path": "encode"}
+
+
+def test_crop_ratio_is_centered_and_even():
+    from src.video_enhance import _parse_crop_arg, build_ffmpeg_args
+
+    assert _parse_crop_arg("1080x1920") == "1080:1920"
+    args = build_ffmpeg_args(crop="9:16", scale="1080x1920")
+    vf = args[args.index("-vf") + 1]
+    assert vf.startswith(
+        "crop='trunc(min(iw,ih*9/16)/2)*2':'trunc(min(ih,iw*16/9)/2)*2',scale=1080:1920"
+    )
+    with pytest.raises(Exception):
+        _parse_crop_arg("portrait")
+
+
+def test_rendition_graph_shares_common_prefix():
+    from src.video_enhance import rendition_graph
+
+    graph, labels = rendition_graph(
+        [["yadif=1", "scale=-2:1080"], ["yadif=1", "crop=a:b", "scale=1080:1920"]]
+    )
+    assert graph == (
+        "[0:v:0]yadif=1,split=2[s0][s1];"
+        "[s0]scale=-2:1080[v0];[s1]crop=a:b,scale=1080:1920[v1]"
+    )
+    assert labels == ["[v0]", "[v1]"]
+    assert (
+        rendition_graph([[], []])[0]
+        == "[0:v:0]split=2[s0][s1];[s0]null[v0];[s1]null[v1]"
+    )
+
+
+def test_renditions_are_encoded_from_one_decode(monkeypatch, tmp_path):
+    import src.video_enhance as ve
+
+    commands = []
+    monkeypatch.setattr(ve.shutil, "which", lambda name: "/usr/bin/ffmpeg")
+    monkeypatch.setattr(ve, "_run_ffmpeg", lambda cmd, log, **kw: commands.append(cmd))
+    inp = tmp_path / "in.mp4"
+    inp.write_bytes(b"src")
+    shorts = tmp_path / "in.shorts.mp4"
+
+    out = ve.enhance_video(
+        input_path=inp,
+        output_path=tmp_path / "in.enhanced.mp4",
+        scale="1080p",
+        fast_path=True,
+        renditions=[
+            {
+                "name": "shorts",
+                "output_path": str(shorts),
+                "crop": "9:16",
+                "scale": "1080x1920",
+                "crf": 23,
+                "duration": 60,
+            }
+        ],
+    )
+
+    assert out == (tmp_path / "in.enhanced.mp4").resolve()
+    (cmd,) = commands
+    assert cmd.count("-i") == 1 and "-vf" not in cmd
+    graph = cmd[cmd.index("-filter_complex") + 1]
+    assert graph.startswith(
+        "[0:v:0]split=2[s0][s1];[s0]scale=-2:1080:flags=lanczos[v0]"
+    )
+    first = cmd.index("[v0]")
+    second = cmd.index("[v1]") - 1
+    main_args, shorts_args = cmd[first:second], cmd[second:]
+    assert main_args[-1].endswith("in.enhanced.mp4")
+    assert main_args[main_args.index("-crf") + 1] == "18"
+    assert shorts_args[shorts_args.index("-crf") + 1] == "23"
+    assert shorts_args[-3:] == ["-t", "60", str(shorts)]
+
+
+def test_invalid_rendition_is_rejected(tmp_path):
+    import src.video_enhance as ve
+
+    inp = tmp_path / "in.mp4"
+    inp.write_bytes(b"src")
+    with pytest.raises(ve.EnhanceError):
+        ve.enhance_video(
+            input_path=inp,
+            output_path=tmp_path / "out.mp4",
+            renditions=[{"name": "shorts", "rotate": 90}],
+        )
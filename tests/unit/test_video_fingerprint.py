@@ -0,0 +1,210 @@
+import asyncio
+import json
+import random
+import time
+import types
+from pathlib import Path
+
+import pytest
+
+from src import ingest_telegram as tg
+from src import video_fingerprint as vf
+from src.video_fingerprint import FingerprintIndex, VideoFingerprint, append_record
+
+
+def _frames(rng: random.Random, n: int = 5):
+    return [rng.getrandbits(64) for _ in range(n)]
+
+
+def test_exact_and_near_duplicates(tmp_path):
+    rng = random.Random(1)
+    idx = FingerprintIndex(tmp_path / "fp.jsonl")
+    frames = _frames(rng)
+    idx.add(VideoFingerprint("abc", frames), task="queue/task_1.json")
+
+    exact = idx.find(VideoFingerprint("abc", []))
+    assert exact.kind == "exact"
+
+    # Ré-encodage: quelques bits différents sur chaque image
+    near = idx.find(VideoFingerprint("other", [h ^ 0b11 for h in frames]))
+    assert near.kind == "near" and near.distance == 10
+    assert near.record["task"] == "queue/task_1.json"
+
+    assert idx.find(VideoFingerprint("new", _frames(rng))) is None
+
+
+def test_uniform_frames_are_not_matched(tmp_path):
+    idx = FingerprintIndex(tmp_path / "fp.jsonl")
+    # Images noires (dHash nul): aucune information exploitable
+    idx.add(VideoFingerprint("black", [0] * 5))
+    assert idx.find(VideoFingerprint("black2", [0] * 5)) is None
+
+
+def test_index_reads_lines_appended_by_other_processes(tmp_path):
+    path = tmp_path / "fp.jsonl"
+    idx = FingerprintIndex(path)
+    idx.add(VideoFingerprint("abc", _frames(random.Random(2))), unique_id="tg1")
+    append_record(path, {"file_hash": "abc", "youtube_id": "yt_1"})
+
+    rec = idx.lookup_unique_id("tg1")
+    assert rec["youtube_id"] == "yt_1"
+    assert len(FingerprintIndex(path)) == 1
+
+
+def test_lookup_under_a_millisecond_at_100k(tmp_path):
+    rng = random.Random(3)
+    idx = FingerprintIndex(tmp_path / "fp.jsonl")
+    for i in range(100_000):
+        idx._ingest({"file_hash": f"h{i}", "frames": _frames(rng)})
+    queries = [VideoFingerprint(f"q{i}", _frames(rng)) for i in range(200)]
+    target = idx._records["h42"]["frames"]
+    queries.append(VideoFingerprint("q", [h ^ 1 for h in target]))
+
+    start = time.perf_counter()
+    results = [idx.find(q) for q in queries]
+    elapsed = (time.perf_counter() - start) / len(queries)
+    assert elapsed < 0.001
+    assert results[-1].record["file_hash"] == "h42"
+
+
+def test_dhash_frames_gradient():
+    pytest.importorskip("numpy")
+    rising = bytes(range(72))
+    falling = bytes(reversed(range(72)))
+    assert vf.dhash_frames([rising, None, falling]) == [(1 << 64) - 1, None, 0]
+
+
+class _FakeBot:
+    def __init__(self):
+        self.downloads = 0
+        self.sent = []
+
+    async def get_file(self, file_id):
+        bot = self
+
+        class _File:
+            async def download_to_drive(self, path):
+                bot.downloads += 1
+                Path(path).write_bytes(b"same video bytes")
+
+        return _File()
+
+    async def send_message(self, **kwargs):
+        self.sent.append(kwargs["text"])
+
+
+def _update(replies):
+    async def reply_text(text, **kwargs):
+        replies.append(text)
+
+    video = types.SimpleNamespace(
+        file_id="f1", file_unique_id="u1", file_name="clip.mp4"
+    )
+    msg = types.SimpleNamespace(
+        chat_id=1,
+        video=video,
+        document=None,
+        caption=None,
+        message_id=10,
+        reply_text=reply_text,
+    )
+    return types.SimpleNamespace(message=msg)
+
+
+def test_telegram_resend_is_short_circuited(tmp_path, monkeypatch):
+    monkeypatch.setattr(tg, "_fingerprint_indexes", {})
+    monkeypatch.setattr(vf, "perceptual_hashes", lambda path: [])
+    cfg = tg.TelegramConfig(
+        token="t",
+        allowed_chat_ids=[],
+        download_dir=tmp_path / "dl",
+        queue_dir=tmp_path / "queue",
+    )
+    bot = _FakeBot()
+    context = types.SimpleNamespace(bot=bot)
+    replies = []
+
+    asyncio.run(tg._handle_video(_update(replies), context, cfg))
+    tasks = list((tmp_path / "queue").glob("task_*.json"))
+    assert len(tasks) == 1
+    assert json.loads(tasks[0].read_text())["fingerprint"]["file_hash"]
+
+    # Même fichier Telegram renvoyé: ni téléchargement ni nouvelle tâche
+    asyncio.run(tg._handle_video(_update(replies), context, cfg))
+    assert bot.downloads == 1
+    assert len(list((tmp_path / "queue").glob("task_*.json"))) == 1
+    assert replies and "déjà été reçue" in replies[-1]
+
+
+def _resend_after(tmp_path, monkeypatch, move):
+    """Ingère une vidéo, applique `move` à la tâche créée puis la renvoie."""
+    monkeypatch.setattr(tg, "_fingerprint_indexes", {})
+    monkeypatch.setattr(vf, "perceptual_hashes", lambda path: [])
+    cfg = tg.TelegramConfig(
+        token="t",
+        allowed_chat_ids=[],
+        download_dir=tmp_path / "dl",
+        queue_dir=tmp_path / "queue",
+    )
+    bot = _FakeBot()
+    context = types.SimpleNamespace(bot=bot)
+    replies = []
+
+    asyncio.run(tg._handle_video(_update(replies), context, cfg))
+    (task,) = list((tmp_path / "queue").glob("task_*.json"))
+    move(task)
+    asyncio.run(tg._handle_video(_update(replies), context, cfg))
+    return bot, replies
+
+
+def test_telegram_resend_of_scheduled_original_is_duplicate(tmp_path, monkeypatch):
+    def schedule(task):
+        # Comme le worker: tâche déplacée en archive, puis suivie par le planificateur
+        archived = tmp_path / "queue_archive" / task.name
+        archived.parent.mkdir()
+        task.rename(archived)
+        schedule_dir = tmp_path / "schedule"
+        schedule_dir.mkdir()
+        (schedule_dir / "scheduled_tasks.json").write_text(
+            json.dumps(
+                [
+                    {
+                        "task_id": "t1",
+                        "scheduled_time": "2026-10-20T18:00:00",
+                        "original_task_path": str(archived),
+                        "status": "scheduled",
+                    }
+                ]
+            )
+        )
+
+    bot, replies = _resend_after(tmp_path, monkeypatch, schedule)
+    assert bot.downloads == 1
+    assert not list((tmp_path / "queue").glob("task_*.json"))
+    assert "déjà été reçue" in replies[-1]
+
+
+def test_telegram_resend_of_archived_done_original_is_duplicate(tmp_path, monkeypatch):
+    def archive(task):
+        data = json.loads(task.read_text())
+        data["status"] = "done"
+        archived = tmp_path / "queue_archive" / task.name
+        archived.parent.mkdir()
+        archived.write_text(json.dumps(data))
+        task.unlink()
+
+    bot, replies = _resend_after(tmp_path, monkeypatch, archive)
+    assert bot.downloads == 1
+    assert not list((tmp_path / "queue").glob("task_*.json"))
+    assert "déjà été reçue" in replies[-1]
+
+
+def test_telegram_resend_of_failed_original_is_ingested_again(tmp_path, monkeypatch):
+    def fail(task):
+        data = json.loads(task.read_text())
+        data["status"] = "failed"
+        task.write_text(json.dumps(data))
+
+    bot, replies = _resend_after(tmp_path, monkeypatch, fail)
+    assert bot.downloads == 2
+    assert not any("déjà été reçue" in r for r in replies)
@@ -0,0 +1,104 @@
+import json
+import time
+
+import pytest
+
+from src.worker_metrics import (
+    MetricsPublisher,
+    MetricsRegistry,
+    read_states,
+    render_prometheus,
+)
+
+
+def _registry():
+    reg = MetricsRegistry()
+    reg.inc("tasks_processed_total", result="done")
+    reg.inc("upload_bytes_total", 2048, account="main")
+    reg.set("queue_depth", 3, status="pending")
+    reg.set("queue_depth", 1, status="running")
+    reg.observe("stage_duration_seconds", 42.0, stage="enhance")
+    reg.observe("llm_latency_seconds", 1.5, call="ollama_title")
+    return reg
+
+
+def test_prometheus_text_from_published_states(tmp_path):
+    for worker in ("host:1:a", "host:2:b"):
+        MetricsPublisher(tmp_path, worker, registry=_registry()).flush()
+    assert len(list((tmp_path / "metrics").glob("*.json"))) == 2
+
+    text = render_prometheus(read_states(tmp_path))
+    assert "# TYPE ytauto_stage_duration_seconds histogram" in text
+    assert 'ytauto_tasks_processed_total{result="done"} 2' in text
+    assert 'ytauto_upload_bytes_total{account="main"} 4096' in text
+    # File partagée: les tâches en attente ne sont pas comptées deux fois
+    assert 'ytauto_queue_depth{status="pending"} 3' in text
+    assert 'ytauto_queue_depth{status="running"} 2' in text
+    assert 'ytauto_stage_duration_seconds_bucket{stage="enhance",le="30"} 0' in text
+    assert 'ytauto_stage_duration_seconds_bucket{stage="enhance",le="60"} 2' in text
+    assert 'ytauto_stage_duration_seconds_count{stage="enhance"} 2' in text
+    assert 'ytauto_llm_latency_seconds_sum{call="ollama_title"} 3' in text
+
+
+def test_stale_worker_gauges_are_dropped(tmp_path):
+    MetricsPublisher(tmp_path, "old", registry=_registry()).flush()
+    state = read_states(tmp_path)[0]
+    text = render_prometheus([state], now=time.time() + 3600)
+    assert "ytauto_queue_depth{" not in text
+    assert 'ytauto_tasks_processed_total{result="done"} 1' in text
+
+
+def test_stopped_workers_fold_into_retired_state(tmp_path):
+    import json
+
+    from src.worker_metrics import RETIRED_FILE
+
+    for worker in ("host:1:a", "host:2:b"):
+        publisher = MetricsPublisher(tmp_path, worker, registry=_registry())
+        publisher.flush()
+        publisher.stop()
+        assert not publisher.path.exists()
+        # Registre remis à zéro: pas de double comptage au prochain run
+        assert publisher.registry.snapshot() == {}
+    # Worker interrompu sans arrêt propre depuis plus d'une journée
+    crashed = MetricsPublisher(tmp_path, "host:3:c", registry=_registry())
+    crashed.flush()
+    state = json.loads(crashed.path.read_text(encoding="utf-8"))
+    state["updated_at"] -= 2 * 86400
+    crashed.path.write_text(json.dumps(state), encoding="utf-8")
+    live = MetricsPublisher(tmp_path, "host:4:d", registry=MetricsRegistry())
+    live.stop()
+
+    assert [p.name for p in (tmp_path / "metrics").glob("*.json")] == [RETIRED_FILE]
+    text = render_prometheus(read_states(tmp_path))
+    assert 'ytauto_tasks_processed_total{result="done"} 3' in text
+    assert 'ytauto_stage_duration_seconds_count{stage="enhance"} 3' in text
+    assert "ytauto_queue_depth{" not in text
+
+
+def test_unknown_metric_is_rejected():
+    with pytest.raises(KeyError):
+        MetricsRegistry().inc("nope_total")
+
+
+def test_metrics_endpoint_reads_state_files_only(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from src.web_monitor import TaskMonitor, create_app
+
+    queue_dir, archive_dir = tmp_path / "queue", tmp_path / "queue_archive"
+    queue_dir.mkdir()
+    archive_dir.mkdir()
+    (queue_dir / "task_1.json").write_text(json.dumps({"status": "pending"}))
+    MetricsPublisher(queue_dir, "w1", registry=_registry()).flush()
+
+    def _no_scan(self, *a, **k):
+        raise AssertionError("scan des tâches pendant /metrics")
+
+    monkeypatch.setattr(TaskMonitor, "get_pending_tasks", _no_scan)
+    monkeypatch.setattr(TaskMonitor, "get_archived_tasks", _no_scan)
+    client = TestClient(create_app(str(queue_dir), str(archive_dir)))
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert 'ytauto_queue_depth{status="pending"} 3' in resp.text
@@ -206,10 +206,10 @@ def test_default_privacy_status_logic():
     _stub_googleapiclient()
     worker = importlib.import_module("src.worker")
 
-    # On ne peut pas tester directement process_queue, mais on peut vérifier
+    # On ne peut pas tester directement le traitement d'une tâche, mais on peut vérifier
     # que la chaîne 'public' est bien dans le code comme défaut
     import inspect
 
-    source = inspect.getsource(worker.process_queue)
+    source = inspect.getsource(worker._step_upload)
     # Vérifier que 'public' est présent comme fallback dans la chaîne de priorité
     assert 'or "public"' in source or "or 'public'" in source
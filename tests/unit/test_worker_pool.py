@@ -0,0 +1,52 @@
+import threading
+import time
+
+from src.worker_pool import StageLimits, ThroughputStats, stage_kind
+
+
+def test_stage_kind_classification():
+    assert stage_kind("enhance") == "cpu"
+    assert stage_kind("subtitles") == "cpu"
+    assert stage_kind("upload") == "io"
+    assert stage_kind("analysis") == "analysis"
+    assert stage_kind("inconnue") == "io"
+
+
+def test_stage_limits_bound_cpu_stages():
+    limits = StageLimits(cpu_slots=1, io_slots=4)
+    active = {"cpu": 0, "max": 0}
+    lock = threading.Lock()
+
+    def work():
+        with limits.stage("enhance"):
+            with lock:
+                active["cpu"] += 1
+                active["max"] = max(active["max"], active["cpu"])
+            time.sleep(0.02)
+            with lock:
+                active["cpu"] -= 1
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert active["max"] == 1
+    assert limits.stats.calls["enhance"] == 4
+
+
+def test_throughput_summary_reports_utilisation():
+    stats = ThroughputStats()
+    stats.record_stage("enhance", 1.0)
+    stats.record_stage("upload", 0.5)
+    stats.record_task(True)
+    stats.record_task(False)
+    stats.finish()
+
+    summary = stats.summary(cpu_slots=1, io_slots=2)
+    assert summary["tasks_done"] == 1
+    assert summary["tasks_failed"] == 1
+    assert summary["tasks_per_hour"] > 0
+    assert set(summary["stages"]) == {"enhance", "upload"}
+    assert summary["stages"]["enhance"]["calls"] == 1
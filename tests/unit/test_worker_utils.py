@@ -43,3 +43,157 @@ def test_default_title_for_builds_from_filename(tmp_path: Path):
     title = worker._default_title_for(p)
     assert "ma super video demo final" in title
     assert len(title) <= 90
+
+
+def test_deadline_preset_speeds_up_encode_when_late(monkeypatch, tmp_path: Path):
+    import time
+
+    from src.encode_bench import CalibrationProfile
+    from src.media_probe import MediaInfo
+
+    # Stub googleapiclient to avoid hard dependency when importing worker
+    ga = types.ModuleType("googleapiclient")
+    ga_discovery = types.ModuleType("googleapiclient.discovery")
+    ga_errors = types.ModuleType("googleapiclient.errors")
+    ga_http = types.ModuleType("googleapiclient.http")
+    sys.modules["googleapiclient"] = ga
+    sys.modules["googleapiclient.discovery"] = ga_discovery
+    sys.modules["googleapiclient.errors"] = ga_errors
+    sys.modules["googleapiclient.http"] = ga_http
+
+    worker = importlib.import_module("src.worker")
+
+    profile = CalibrationProfile(
+        width=1920,
+        height=1080,
+        decode_fps=1000.0,
+        encoders={"h264": {"ultrafast": 300.0, "medium": 60.0, "slow": 20.0}},
+    )
+    monkeypatch.setattr(worker, "load_profile", lambda path: profile)
+    monkeypatch.setattr(
+        worker,
+        "probe_media",
+        lambda p: MediaInfo(duration=600.0, height=1080, fps=30.0),
+    )
+    cfg = {"preset": "slow", "codec": "h264"}
+
+    def run(task):
+        return types.SimpleNamespace(task=task)
+
+    video = tmp_path / "v.mp4"
+    # Sans échéance: preset de la config
+    assert worker._deadline_preset(run({}), video, cfg) == "slow"
+    # 18000 images: slow ~900 s, medium ~300 s
+    soon = time.time() + 400
+    assert worker._deadline_preset(run({"deadline": soon}), video, cfg) == "medium"
+    later = time.time() + 3600
+    assert worker._deadline_preset(run({"publish_at": later}), video, cfg) == "slow"
+
+
+def test_custom_bench_profile_reaches_worker(monkeypatch, tmp_path: Path):
+    import time
+
+    from src.config_loader import load_config
+    from src.encode_bench import CalibrationProfile, save_profile
+    from src.media_probe import MediaInfo
+
+    # Stub googleapiclient to avoid hard dependency when importing worker
+    ga = types.ModuleType("googleapiclient")
+    ga_discovery = types.ModuleType("googleapiclient.discovery")
+    ga_errors = types.ModuleType("googleapiclient.errors")
+    ga_http = types.ModuleType("googleapiclient.http")
+    sys.modules["googleapiclient"] = ga
+    sys.modules["googleapiclient.discovery"] = ga_discovery
+    sys.modules["googleapiclient.errors"] = ga_errors
+    sys.modules["googleapiclient.http"] = ga_http
+
+    worker = importlib.import_module("src.worker")
+
+    profile_path = tmp_path / "bench" / "host.json"
+    save_profile(
+        CalibrationProfile(
+            width=1920, height=1080, decode_fps=1000.0, encoders={"h264": {"slow": 1.0}}
+        ),
+        profile_path,
+    )
+    cfg_path = tmp_path / "video.yaml"
+    cfg_path.write_text(
+        "video_path: v.mp4\ntitle: T\n"
+        f"enhance:\n  preset: slow\n  bench_profile: {profile_path}\n",
+        encoding="utf-8",
+    )
+    cfg = load_config(cfg_path)
+    assert cfg["enhance"]["bench_profile"] == str(profile_path)
+
+    # Estimateur d'admission: profil de calibration de la config
+    estimator = worker._estimator_for(cfg, tmp_path / "queue")
+    assert estimator.profile is not None
+    assert estimator.profile.encoders == {"h264": {"slow": 1.0}}
+
+    # Preset à échéance: même profil
+    loaded = []
+    real_load = worker.load_profile
+    monkeypatch.setattr(
+        worker, "load_profile", lambda path: loaded.append(path) or real_load(path)
+    )
+    monkeypatch.setattr(
+        worker, "probe_media", lambda p: MediaInfo(duration=60.0, height=1080, fps=30.0)
+    )
+    run = types.SimpleNamespace(task={"deadline": time.time() + 60})
+    worker._deadline_preset(run, tmp_path / "v.mp4", cfg["enhance"])
+    assert loaded == [str(profile_path)]
+
+
+def test_refresh_config_rebuilds_governor_and_estimator(tmp_path: Path):
+    import os
+
+    from src.encode_bench import CalibrationProfile, save_profile
+    from src.resource_governor import get_governor, install_governor
+
+    # Stub googleapiclient to avoid hard dependency when importing worker
+    ga = types.ModuleType("googleapiclient")
+    ga_discovery = types.ModuleType("googleapiclient.discovery")
+    ga_errors = types.ModuleType("googleapiclient.errors")
+    ga_http = types.ModuleType("googleapiclient.http")
+    sys.modules["googleapiclient"] = ga
+    sys.modules["googleapiclient.discovery"] = ga_discovery
+    sys.modules["googleapiclient.errors"] = ga_errors
+    sys.modules["googleapiclient.http"] = ga_http
+
+    worker = importlib.import_module("src.worker")
+
+    cfg_path = tmp_path / "video.yaml"
+    cfg_path.write_text(
+        "video_path: v.mp4\ntitle: T\nresources:\n  cpu_threads: 4\n",
+        encoding="utf-8",
+    )
+    ctx = worker._build_context(
+        tmp_path / "queue", tmp_path / "archive", cfg_path, 1, 2, 1, lease_ttl=None
+    )
+    assert ctx.governor.total == 4
+    estimator = ctx.estimator
+
+    profile_path = tmp_path / "bench" / "host.json"
+    save_profile(
+        CalibrationProfile(
+            width=1920, height=1080, decode_fps=1000.0, encoders={"h264": {"slow": 1.0}}
+        ),
+        profile_path,
+    )
+    cfg_path.write_text(
+        "video_path: v.mp4\ntitle: T\nresources:\n  cpu_threads: 8\n"
+        f"enhance:\n  bench_profile: {profile_path}\n",
+        encoding="utf-8",
+    )
+    later = ctx.config_mtime + 10
+    os.utime(cfg_path, (later, later))
+
+    previous = install_governor(None)
+    try:
+        worker._refresh_config(ctx)
+        assert ctx.governor.total == 8
+        assert get_governor() is ctx.governor
+    finally:
+        install_governor(previous)
+    assert ctx.estimator is not estimator
+    assert ctx.estimator.profile.encoders == {"h264": {"slow": 1.0}}
@@ -23,6 +23,7 @@ class DashboardApp {
         // Task lists
         this.pendingTasks = document.getElementById('pending-tasks');
         this.archivedTasks = document.getElementById('archived-tasks');
+        this.stageTimings = document.getElementById('stage-timings');
 
         // Buttons
         this.refreshBtn = document.getElementById('refresh-btn');
@@ -131,6 +132,10 @@ class DashboardApp {
                 this.updatePendingTasks(data.pending_tasks);
                 break;
 
+            case 'progress':
+                this.updateProgress(data.progress || {});
+                break;
+
             case 'task_retried':
                 this.showNotification('Tâche relancée avec succès', 'success');
                 this.refreshData();
@@ -153,6 +158,40 @@ class DashboardApp {
         this.successRate.textContent = `${stats.success_rate || 0}%`;
         this.recentCount.textContent = stats.recent_24h || 0;
         this.archivedCount.textContent = stats.total_archived || 0;
+        this.updateStageTimings(stats.stage_timings);
+    }
+
+    updateStageTimings(timings) {
+        const stages = Object.entries(timings || {});
+        if (stages.length === 0) {
+            this.stageTimings.innerHTML = '<p class="empty-state">Aucune tâche mesurée pour le moment</p>';
+            return;
+        }
+
+        const rows = stages.map(([stage, t]) => `
+            <tr>
+                <td>${this.escapeHtml(stage)}</td>
+                <td>${this.formatSeconds(t.p50)}</td>
+                <td>${this.formatSeconds(t.p95)}</td>
+                <td>${t.count}</td>
+            </tr>
+        `).join('');
+        this.stageTimings.innerHTML = `
+            <table class="timings-table">
+                <thead>
+                    <tr><th>Étape</th><th>p50</th><th>p95</th><th>Tâches</th></tr>
+                </thead>
+                <tbody>${rows}</tbody>
+            </table>
+        `;
+    }
+
+    formatSeconds(seconds) {
+        const s = Number(seconds) || 0;
+        if (s >= 60) {
+            return `${Math.floor(s / 60)} min ${Math.round(s % 60)} s`;
+        }
+        return `${s.toFixed(1)} s`;
     }
 
     updatePendingTasks(tasks) {
@@ -164,6 +203,31 @@ class DashboardApp {
         this.pendingTasks.innerHTML = tasks.map(task => this.renderTask(task, 'pending')).join('');
     }
 
+    updateProgress(progress) {
+        document.querySelectorAll('.task-progress[data-task]').forEach(el => {
+            el.innerHTML = this.renderProgress(progress[el.dataset.task]);
+        });
+    }
+
+    renderProgress(progress) {
+        if (!progress) {
+            return '';
+        }
+        const percent = progress.percent != null ? progress.percent : 0;
+        const parts = [];
+        if (progress.percent != null) parts.push(`${percent.toFixed(1)}%`);
+        if (progress.speed) parts.push(`x${progress.speed.toFixed(2)}`);
+        if (progress.fps) parts.push(`${Math.round(progress.fps)} fps`);
+        if (progress.eta_seconds != null) {
+            const eta = progress.eta_seconds;
+            parts.push(eta >= 90 ? `fin dans ~${Math.round(eta / 60)} min` : `fin dans ~${Math.round(eta)}s`);
+        }
+        return `
+            <div class="progress-bar"><div class="progress-fill" style="width: ${percent}%"></div></div>
+            <span><i class="fas fa-cogs"></i> Encodage: ${this.escapeHtml(parts.join(' - ') || 'en cours')}</span>
+        `;
+    }
+
     renderTask(task, type) {
         const status = task.status || 'unknown';
         const receivedAt = new Date(task.received_at).toLocaleString('fr-FR');
@@ -200,6 +264,8 @@ class DashboardApp {
                     ${task.youtube_id ? `<span><i class="fab fa-youtube"></i> ${task.youtube_id}</span>` : ''}
                 </div>
 
+                ${type === 'pending' ? `<div class="task-progress" data-task="${this.escapeHtml(task.file_name || '')}">${this.renderProgress(task.progress)}</div>` : ''}
+
                 <div class="task-description">
                     ${this.escapeHtml(truncatedDesc)}
                 </div>